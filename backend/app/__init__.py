@@ -10,6 +10,10 @@ load_dotenv()
 def create_app():
     app = Flask(__name__)
 
+    # JSON シリアライザ（orjson が利用可能な場合は高速化）
+    from app.utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
     # CORS設定
     CORS(app, origins=["http://localhost:3000"])
 
@@ -25,6 +29,30 @@ def create_app():
     app.config['AZURE_TENANT_ID'] = os.getenv('AZURE_TENANT_ID')
     app.config['AZURE_SUBSCRIPTION_ID'] = os.getenv('AZURE_SUBSCRIPTION_ID')
 
+    # リクエスト ID（ログと X-Request-ID ヘッダーに付ける）
+    from app.utils.logger import init_request_logging
+    init_request_logging(app)
+
+    # 処理時間のメトリクス（/metrics で公開）
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+
+    # リクエストごとのトレース（TRACE_EXPORTER 設定時は OTLP またはファイルへ出力）
+    from app.utils.tracing import init_tracing
+    init_tracing(app)
+
+    # 管理者トークン付きで要求されたリクエストのプロファイル（PROFILE_ADMIN_TOKEN 設定時のみ）
+    from app.utils.profiling import init_profiling
+    init_profiling(app)
+
+    # レート制限
+    from app.utils.rate_limiter import init_rate_limiter
+    init_rate_limiter(app)
+
+    # インベントリのスナップショット（INVENTORY_SNAPSHOT_PATH 設定時のみ）
+    from app.services.inventory_snapshot import init_inventory_snapshot
+    init_inventory_snapshot(app)
+
     # ブループリント登録
     from app.routes import main_bp, api_bp
     app.register_blueprint(main_bp)
@@ -1,11 +1,64 @@
+import sys
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Iterable, Tuple
 
+# 旧来のプロバイダー別キー名と共通フィールドの対応
+LEGACY_ALIASES: Dict[str, str] = {
+    'state': 'status',
+    'location': 'region',
+    'size': 'type',
+    'class': 'type',
+    'tier': 'type',
+}
 
-@dataclass
+# 作成日時を表す旧来のキー名（ISO 8601 文字列で返す）
+TIMESTAMP_ALIASES = ('launch_time', 'creation_date')
+
+_MISSING = object()
+
+
+def _intern(value: Any) -> str:
+    """
+    件数の多い値（リージョン・種別・状態など）を共有文字列にする
+    """
+    if value is None or value == 'N/A':
+        return ''
+    return sys.intern(str(value))
+
+
+def to_epoch(value: Any) -> int:
+    """
+    datetime・ISO 8601 文字列・数値を UNIX 時刻（秒）に変換する。変換できない場合は 0
+    """
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value:
+        try:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            return 0
+    return 0
+
+
+def format_epoch(value: int) -> Optional[str]:
+    """
+    UNIX 時刻（秒）を ISO 8601 形式（UTC）に変換する
+    """
+    if not value:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+@dataclass(slots=True)
 class Resource:
     """
     クラウドリソースのデータモデル
+
+    プロバイダーごとに異なる取得結果を共通の項目に正規化して保持する。
+    旧来の辞書形式との互換のため get()・[] で 'state' や 'location' などのキー名も参照できる
     """
     id: str
     name: str
@@ -14,6 +67,60 @@ class Resource:
     region: str
     status: str
     metadata: Optional[Dict[str, Any]] = None
+    service: str = ''
+    created_at: int = 0  # UNIX 時刻（秒）。不明な場合は 0
+    # (キー, 値) の組のタプル。辞書より小さいため大量のリソースを保持する際のメモリを抑えられる
+    tags: Optional[Tuple[Tuple[str, str], ...]] = None
+
+    def __post_init__(self):
+        self.type = _intern(self.type)
+        self.provider = _intern(self.provider)
+        self.region = _intern(self.region)
+        self.status = _intern(self.status)
+        self.service = _intern(self.service)
+        if self.tags:
+            pairs = self.tags.items() if isinstance(self.tags, dict) else self.tags
+            self.tags = tuple((sys.intern(str(k)), v) for k, v in pairs)
+        else:
+            self.tags = None
+        if not self.metadata:
+            self.metadata = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        辞書と同様にキー名で値を取得（旧来のキー名・metadata の項目も参照する）
+        """
+        value = self._lookup(key)
+        if value is _MISSING or value is None or value == '':
+            return default
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def tag_dict(self) -> Dict[str, str]:
+        """
+        タグを辞書形式で取得
+        """
+        return dict(self.tags) if self.tags else {}
+
+    def _lookup(self, key: str) -> Any:
+        if key == 'tags':
+            return self.tag_dict()
+        if key in TIMESTAMP_ALIASES:
+            return format_epoch(self.created_at) or _MISSING
+        if self.metadata and key in self.metadata:
+            return self.metadata[key]
+        key = LEGACY_ALIASES.get(key, key)
+        if key in self.__slots__:
+            return getattr(self, key)
+        return _MISSING
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -24,22 +131,68 @@ class Resource:
             'name': self.name,
             'type': self.type,
             'provider': self.provider,
+            'service': self.service,
             'region': self.region,
             'status': self.status,
+            'created_at': format_epoch(self.created_at),
+            'tags': self.tag_dict(),
             'metadata': self.metadata or {}
         }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'Resource':
+    def from_dict(cls, data: Dict[str, Any], provider: str = '', service: str = '') -> 'Resource':
         """
         辞書からインスタンスを作成
+
+        旧来のプロバイダー別のキー名（state・location・size など）も受け付け、
+        共通項目に当てはまらない値は metadata に格納する
         """
+        known = {'id', 'name', 'type', 'provider', 'service', 'region', 'status',
+                 'created_at', 'tags', 'metadata'}
+        values: Dict[str, Any] = {}
+        metadata = dict(data.get('metadata') or {})
+        for key, value in data.items():
+            if key in known:
+                values.setdefault(key, value)
+            elif key in TIMESTAMP_ALIASES:
+                values.setdefault('created_at', value)
+            elif key in LEGACY_ALIASES and LEGACY_ALIASES[key] not in values:
+                values[LEGACY_ALIASES[key]] = value
+            elif value not in (None, 'N/A'):
+                metadata[key] = value
+
+        name = values.get('name') or values.get('id') or ''
         return cls(
-            id=data['id'],
-            name=data['name'],
-            type=data['type'],
-            provider=data['provider'],
-            region=data['region'],
-            status=data['status'],
-            metadata=data.get('metadata')
+            id=values.get('id') or name,
+            name=name,
+            type=values.get('type'),
+            provider=values.get('provider') or provider,
+            region=values.get('region'),
+            status=values.get('status'),
+            metadata=metadata,
+            service=values.get('service') or service,
+            created_at=to_epoch(values.get('created_at')),
+            tags=values.get('tags')
         )
+
+    @classmethod
+    def coerce(cls, value: Any, provider: str = '', service: str = '') -> 'Resource':
+        """
+        辞書または Resource を Resource に揃える
+        """
+        if isinstance(value, cls):
+            return value
+        return cls.from_dict(value, provider, service)
+
+
+class ResourcePage(list):
+    """
+    件数の上限を指定して取得したリソース一覧
+
+    has_more は上限を超えて一致するリソースが（少なくとも1件）残っている可能性を表す。
+    正確な総数を数えるための追加の取得は行わない。
+    """
+
+    def __init__(self, items: Iterable[Any] = (), has_more: bool = False):
+        super().__init__(items)
+        self.has_more = has_more
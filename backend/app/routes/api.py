@@ -1,13 +1,32 @@
-from flask import Blueprint, request, jsonify, current_app
-from app.services.chat_service import ChatService
-from app.services.mcp_service import MCPService
+import time
+from typing import Optional
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from app.models.resource import Resource, ResourcePage, to_epoch
+from app.services.chat_service import LOG_SUMMARY_CLUSTERS, LOG_SUMMARY_LINES, ChatService
+from app.services.mcp_service import METRIC_DEFINITIONS, MCPService
+from app.services.metric_analysis import METRIC_LOOKBACK_HOURS, METRIC_PERIOD, detect_anomalies
+from app.services.llm_service import LLMService
+from app.services.llm_cache import get_llm_cache
+from app.services.session_store import get_session_store
+from app.services.inventory_cache import INVENTORY_SERVICES, get_inventory_cache, record_id
+from app.services.columnar_store import StatsQueryError, get_columnar_inventory
+from app.services.resource_query import ResourceQuery, ResourceQueryError, slice_records
+from app.services.inventory_export import PYARROW_AVAILABLE, iter_csv, iter_parquet
+from app.services.llm_scheduler import LLMQueueTimeoutError
+from app.services.log_pipeline import LogQueryError, normalize_level
+from app.services.log_miner import mine_templates
 from app.utils.logger import get_logger
+from app.utils.rate_limiter import rate_limited
+from app.utils.compression import compress_response
+from app.utils.conditional import inventory_validators, not_modified, set_validators
 
 api_bp = Blueprint('api', __name__)
+api_bp.after_request(compress_response)
 logger = get_logger(__name__)
 
 
 @api_bp.route('/chat', methods=['POST'])
+@rate_limited('chat')
 def chat():
     try:
         data = request.get_json()
@@ -15,19 +34,33 @@ def chat():
             return jsonify({'error': 'メッセージが必要です'}), 400
 
         user_message = data['message']
-        logger.info(f"受信メッセージ: {user_message}")
+        logger.info("受信メッセージ: %d 文字", len(user_message))
+        logger.debug("受信メッセージ本文: %s", user_message)
+
+        # セッション（会話履歴）を取得。未指定の場合は新規に発行する
+        session = get_session_store().get_or_create(data.get('session_id'))
 
         # チャットサービスでメッセージを処理
-        chat_service = ChatService()
+        chat_service = ChatService(session=session)
         response = chat_service.process_message(user_message)
 
-        logger.info(f"応答生成完了: {len(response)} 文字")
+        logger.info("応答生成完了: %d 文字", len(response))
 
         return jsonify({
             'response': response,
+            'session_id': session.id,
             'timestamp': '2024-01-01T00:00:00Z'
         })
 
+    except LLMQueueTimeoutError as e:
+        logger.warning(f"LLM 混雑のためリクエストを拒否: {str(e)}")
+        response = jsonify({
+            'error': 'サーバーが混雑しています。しばらくしてから再度お試しください',
+            'retry_after': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+
     except Exception as e:
         logger.error(f"チャット処理エラー: {str(e)}")
         return jsonify({
@@ -37,18 +70,24 @@ def chat():
 
 
 @api_bp.route('/resources/aws', methods=['GET'])
+@rate_limited('inventory')
 def get_aws_resources():
     try:
         resource_type = request.args.get('type', 'ec2')
+        query = ResourceQuery.from_args(request.args)
+        options = _fetch_options(query)
         mcp_service = MCPService()
-        resources = mcp_service.get_aws_resources(resource_type)
+        if 'limit' in options and not get_inventory_cache().fresh('aws', resource_type):
+            # キャッシュがない場合は件数の上限まで取得して打ち切る（部分的な結果はキャッシュしない）
+            page = mcp_service.get_aws_resources(resource_type, **options)
+            resources = _apply_query(query, page, 'aws', resource_type)
+            return jsonify(_resource_list_body(resources, resource_type, page, options))
 
-        return jsonify({
-            'resources': resources,
-            'type': resource_type,
-            'count': len(resources)
-        })
+        return _cached_resource_list('aws', resource_type, query, options.get('limit'),
+                                     lambda: mcp_service.get_aws_resources(resource_type))
 
+    except ResourceQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"AWS リソース取得エラー: {str(e)}")
         return jsonify({
@@ -58,43 +97,410 @@ def get_aws_resources():
 
 
 @api_bp.route('/resources/azure', methods=['GET'])
+@rate_limited('inventory')
 def get_azure_resources():
     try:
         resource_type = request.args.get('type', 'vm')
+        query = ResourceQuery.from_args(request.args)
+        options = _fetch_options(query)
         mcp_service = MCPService()
-        resources = mcp_service.get_azure_resources(resource_type)
+        if 'limit' in options and not get_inventory_cache().fresh('azure', resource_type):
+            # キャッシュがない場合は件数の上限まで取得して打ち切る（部分的な結果はキャッシュしない）
+            page = mcp_service.get_azure_resources(resource_type, **options)
+            resources = _apply_query(query, page, 'azure', resource_type)
+            return jsonify(_resource_list_body(resources, resource_type, page, options))
+
+        return _cached_resource_list('azure', resource_type, query, options.get('limit'),
+                                     lambda: mcp_service.get_azure_resources(resource_type))
 
+    except ResourceQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Azure リソース取得エラー: {str(e)}")
         return jsonify({
-            'resources': resources,
-            'type': resource_type,
-            'count': len(resources)
+            'error': '内部サーバーエラーが発生しました',
+            'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
+        }), 500
+
+
+@api_bp.route('/resources/stats', methods=['GET'])
+@rate_limited('inventory')
+def get_resource_stats():
+    try:
+        targets = _inventory_targets()
+        if not targets:
+            return jsonify({'error': '未対応のプロバイダーまたはサービスです'}), 400
+        query = ResourceQuery.from_args(request.args)
+        if query.tags:
+            return jsonify({'error': '集計ではタグ条件は指定できません'}), 400
+
+        slices = _load_inventory(targets)
+        validators = _slice_validators(slices)
+        if validators is not None:
+            cached_response = not_modified(*validators)
+            if cached_response is not None:
+                return cached_response
+
+        filters = dict(query.filters)
+        filters['provider'] = sorted({p for p, _ in targets})
+        filters['service'] = sorted({s for _, s in targets})
+        result = get_columnar_inventory().aggregate(
+            group_by=_split_arg('group_by'), filters=filters, metrics=_split_arg('metrics'))
+
+        response = jsonify({
+            'total': result['total'],
+            'groups': result['groups'],
+            'group_by': _split_arg('group_by'),
+            'metrics': _split_arg('metrics')
         })
+        if validators is not None:
+            set_validators(response, *validators)
+        return response
 
+    except (StatsQueryError, ResourceQueryError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Azure リソース取得エラー: {str(e)}")
+        logger.error(f"リソース集計エラー: {str(e)}")
         return jsonify({
             'error': '内部サーバーエラーが発生しました',
             'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
         }), 500
 
 
+@api_bp.route('/export/resources', methods=['GET'])
+@rate_limited('inventory')
+def export_resources():
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'parquet'):
+            return jsonify({'error': '未対応の形式です（csv または parquet）'}), 400
+        if export_format == 'parquet' and not PYARROW_AVAILABLE:
+            return jsonify({'error': 'Parquet 形式は利用できません（pyarrow が必要です）'}), 501
+        targets = _inventory_targets()
+        if not targets:
+            return jsonify({'error': '未対応のプロバイダーまたはサービスです'}), 400
+        query = ResourceQuery.from_args(request.args)
+
+        # 取得済みのスライス（リストへの参照）から1件ずつ変換して送出する
+        resources = slice_records(_load_inventory(targets), query)
+        if export_format == 'csv':
+            body, mimetype = iter_csv(resources, query), 'text/csv'
+        else:
+            body, mimetype = iter_parquet(resources, query), 'application/vnd.apache.parquet'
+
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="resources.{export_format}"'
+        return response
+
+    except ResourceQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"リソースエクスポートエラー: {str(e)}")
+        return jsonify({
+            'error': '内部サーバーエラーが発生しました',
+            'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
+        }), 500
+
+
+def _fetch_options(query: ResourceQuery) -> dict:
+    """
+    リソース取得に渡す絞り込み条件と件数の上限（limit パラメータ。指定されたものだけ渡す）
+    """
+    options = {}
+    if query.filters or query.tags:
+        options['query'] = query
+    if request.args.get('limit'):
+        try:
+            limit = int(request.args['limit'])
+        except ValueError:
+            raise ResourceQueryError(f"limit が不正です: {request.args['limit']}")
+        if limit < 1:
+            raise ResourceQueryError("limit には1以上を指定してください")
+        options['limit'] = limit
+    return options
+
+
+def _resource_list_body(resources: list, resource_type: str, page: list, options: dict) -> dict:
+    """
+    リソース一覧 API の応答（limit を指定した場合は続きの有無 has_more を含める）
+    """
+    body = {
+        'resources': resources,
+        'type': resource_type,
+        'count': len(resources)
+    }
+    if 'limit' in options:
+        body['has_more'] = bool(getattr(page, 'has_more', False))
+    return body
+
+
+def _cached_resource_list(provider: str, service: str, query: ResourceQuery,
+                          limit: Optional[int], loader) -> Response:
+    """
+    インベントリキャッシュ経由のリソース一覧応答
+
+    ETag・Last-Modified を付け、If-None-Match が一致すれば本文を作らずに 304 を返す。
+    since_version を指定した場合はその版より後に変わったリソースと削除されたリソースの ID のみ返す
+    """
+    since_version = request.args.get('since_version')
+    if since_version is not None and not since_version.isdigit():
+        raise ResourceQueryError(f"since_version が不正です: {since_version}")
+
+    inventory_cache = get_inventory_cache()
+    records = inventory_cache.get(provider, service, loader)
+    inventory_slice = inventory_cache.peek(provider, service)
+    if inventory_slice is None or inventory_slice.records is not records:
+        # 結果が空でキャッシュされなかった場合
+        inventory_slice = None
+    else:
+        etag, last_modified = inventory_validators([inventory_slice])
+        cached_response = not_modified(etag, last_modified)
+        if cached_response is not None:
+            return cached_response
+
+    delta = inventory_slice.changes_since(int(since_version)) if inventory_slice and since_version else None
+    removed: list = []
+    if delta is not None:
+        records, removed = delta
+        if query.filters or query.tags:
+            # 変更により条件に一致しなくなったリソースは削除として扱う
+            removed = removed + [record_id(r, provider, service) for r in records
+                                 if not query.matches(Resource.coerce(r, provider, service))]
+
+    matched = _apply_query(query, records, provider, service)
+    page = ResourcePage(matched[:limit] if limit else matched,
+                        has_more=bool(limit) and len(matched) > limit)
+    body = _resource_list_body(page, service, page, {'limit': limit} if limit else {})
+    if inventory_slice is not None:
+        body['version'] = inventory_slice.version
+        if inventory_slice.restored:
+            # 起動時にスナップショットから復元した内容（バックグラウンドで取得し直し中）
+            body['stale'] = True
+            body['age'] = int(inventory_slice.age())
+    if since_version is not None:
+        body['delta'] = delta is not None
+        if delta is not None:
+            body['removed'] = removed
+
+    response = jsonify(body)
+    if inventory_slice is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def _apply_query(query: ResourceQuery, resources: list, provider: str, service: str) -> list:
+    """
+    リソース一覧に絞り込み条件・列指定を適用する
+    """
+    if query.is_empty:
+        return resources
+    return [query.project(r) for r in query.apply(resources, provider, service)]
+
+
+def _inventory_targets() -> list:
+    """
+    provider・service パラメータから対象の (provider, service) の一覧を求める
+    """
+    provider = request.args.get('provider')
+    service = request.args.get('service')
+    return [(p, s) for p, services in INVENTORY_SERVICES.items() if not provider or p == provider
+            for s in services if not service or s == service]
+
+
+def _load_inventory(targets: list) -> list:
+    """
+    対象のスライスをインベントリキャッシュ経由で（未取得・期限切れの場合のみ）取得する
+    """
+    mcp_service = MCPService()
+    inventory_cache = get_inventory_cache()
+    slices = []
+    for provider, service in targets:
+        if provider == 'aws':
+            loader = lambda s=service: mcp_service.get_aws_resources(s)
+        else:
+            loader = lambda s=service: mcp_service.get_azure_resources(s)
+        slices.append((provider, service, inventory_cache.get(provider, service, loader)))
+    return slices
+
+
+def _slice_validators(slices: list) -> Optional[tuple]:
+    """
+    _load_inventory の結果に対応するキャッシュのスライスから (ETag, Last-Modified) を求める
+
+    いずれかのスライスがキャッシュされていない（結果が空だった）場合は None
+    """
+    inventory_cache = get_inventory_cache()
+    cached = []
+    for provider, service, records in slices:
+        inventory_slice = inventory_cache.peek(provider, service)
+        if inventory_slice is None or inventory_slice.records is not records:
+            return None
+        cached.append(inventory_slice)
+    return inventory_validators(cached) if cached else None
+
+
+def _split_arg(name: str) -> list:
+    """
+    カンマ区切りのクエリパラメータをリストに変換
+    """
+    return [value.strip() for value in request.args.get(name, '').split(',') if value.strip()]
+
+
+def _log_filters() -> dict:
+    """
+    ログ取得の絞り込み条件（level・keyword・start・end パラメータ。指定されたものだけ渡す）
+    """
+    filters = {}
+    if request.args.get('level'):
+        level = normalize_level(request.args['level'])
+        if level is None:
+            raise LogQueryError(f"level が不正です: {request.args['level']}")
+        filters['level'] = level
+    if request.args.get('keyword'):
+        filters['keyword'] = request.args['keyword']
+    for name, option in (('start', 'start_time'), ('end', 'end_time')):
+        value = request.args.get(name)
+        if not value:
+            continue
+        # UNIX 時刻（秒）または ISO 8601。CloudWatch Logs にはミリ秒で渡す
+        seconds = int(value) if value.isdigit() else to_epoch(value)
+        if not seconds:
+            raise LogQueryError(f"{name} が不正です: {value}")
+        filters[option] = seconds * 1000
+    return filters
+
+
 @api_bp.route('/logs', methods=['GET'])
+@rate_limited('inventory')
 def get_logs():
     try:
         cloud_provider = request.args.get('provider', 'aws')
         service = request.args.get('service', 'ec2')
+        limit = request.args.get('limit', type=int)
+        options = {'limit': limit} if limit and limit > 0 else {}
+        options.update(_log_filters())
         mcp_service = MCPService()
-        logs = mcp_service.get_logs(cloud_provider, service)
 
-        return jsonify({
+        if request.args.get('format') == 'ndjson' or \
+                request.accept_mimetypes.best == 'application/x-ndjson':
+            # 1行1イベントで送出する。クライアントが切断すると以降のページは取得しない
+            events = mcp_service.iter_logs(cloud_provider, service, **options)
+            body = (current_app.json.dumps(event) + '\n' for event in events)
+            return Response(stream_with_context(body), mimetype='application/x-ndjson')
+
+        logs = mcp_service.get_logs(cloud_provider, service, **options)
+
+        response = jsonify({
             'logs': logs,
             'provider': cloud_provider,
             'service': service
         })
+        # ログはキャッシュしないため、本文のハッシュを ETag にして転送のみ省く
+        response.add_etag(weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
+    except LogQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"ログ取得エラー: {str(e)}")
         return jsonify({
             'error': '内部サーバーエラーが発生しました',
             'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
         }), 500
+
+
+@api_bp.route('/logs/templates', methods=['GET'])
+@rate_limited('inventory')
+def get_log_templates():
+    try:
+        cloud_provider = request.args.get('provider', 'aws')
+        service = request.args.get('service', 'ec2')
+        limit = request.args.get('limit', type=int)
+        options = {'limit': limit if limit and limit > 0 else LOG_SUMMARY_LINES}
+        options.update(_log_filters())
+        top = request.args.get('top', type=int) or LOG_SUMMARY_CLUSTERS
+
+        # 読み込んだログは保持せず、テンプレートの件数・例のみ残す
+        miner = mine_templates(MCPService().iter_logs(cloud_provider, service, **options))
+        return jsonify({
+            'templates': [cluster.to_dict() for cluster in miner.top(top)],
+            'total': miner.total,
+            'template_count': len(miner.clusters()),
+            'unmatched': miner.unmatched,
+            'provider': cloud_provider,
+            'service': service
+        })
+
+    except LogQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"ログのテンプレート分類エラー: {str(e)}")
+        return jsonify({
+            'error': '内部サーバーエラーが発生しました',
+            'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
+        }), 500
+
+
+@api_bp.route('/metrics/anomalies', methods=['GET'])
+@rate_limited('inventory')
+def get_metric_anomalies():
+    try:
+        targets = [target for target in _inventory_targets() if target in METRIC_DEFINITIONS]
+        if not targets:
+            return jsonify({'error': 'メトリクスの異常検知は aws/ec2・aws/rds・azure/vm に対応しています'}), 400
+        hours = request.args.get('hours', type=int) or METRIC_LOOKBACK_HOURS
+        period = request.args.get('period', type=int) or METRIC_PERIOD
+        if hours < 1 or period < 60 or period % 60:
+            return jsonify({'error': 'hours は1以上、period は60の倍数を指定してください'}), 400
+        options = {}
+        if request.args.get('threshold', type=float) is not None:
+            options['threshold'] = request.args.get('threshold', type=float)
+
+        mcp_service = MCPService()
+        end = time.time()
+        checked = 0
+        anomalies = []
+        for provider, service, resources in _load_inventory(targets):
+            by_id = {resource.id: resource for resource in resources}
+            series = mcp_service.get_metric_series(
+                provider, service, list(by_id), end - hours * 3600, end, period)
+            checked += len(series)
+            for anomaly in detect_anomalies(series, end, period, hours, **options):
+                resource = by_id[anomaly['key']]
+                anomalies.append({'id': resource.id, 'name': resource.name, 'provider': provider,
+                                  'service': service, **{k: v for k, v in anomaly.items() if k != 'key'}})
+        anomalies.sort(key=lambda anomaly: anomaly['score'], reverse=True)
+
+        return jsonify({
+            'anomalies': anomalies,
+            'checked': checked,
+            'hours': hours,
+            'period': period
+        })
+
+    except Exception as e:
+        logger.error(f"メトリクスの異常検知エラー: {str(e)}")
+        return jsonify({
+            'error': '内部サーバーエラーが発生しました',
+            'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
+        }), 500
+
+
+@api_bp.route('/llm/backends', methods=['GET'])
+def get_llm_backends():
+    try:
+        llm_service = LLMService()
+        llm_cache = get_llm_cache()
+
+        return jsonify({
+            'backends': llm_service.backend_stats(),
+            'cache': llm_cache.stats() if llm_cache else None
+        })
+
+    except Exception as e:
+        logger.error(f"LLM バックエンド情報取得エラー: {str(e)}")
+        return jsonify({
+            'error': '内部サーバーエラーが発生しました',
+            'debug_info': str(e) if current_app.config.get('DEBUG', False) else None
+        }), 500
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
 
 main_bp = Blueprint('main', __name__)
 
@@ -18,3 +19,11 @@ def health():
         'status': 'healthy',
         'timestamp': '2024-01-01T00:00:00Z'
     })
+
+
+@main_bp.route('/metrics')
+def metrics():
+    """
+    Prometheus 形式のメトリクス（このワーカープロセスの値）
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -1,28 +1,111 @@
+import os
 import re
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
+from app.models.resource import Resource
 from app.services.llm_service import LLMService
-from app.services.mcp_service import MCPService
+from app.services.llm_scheduler import LLMQueueTimeoutError
+from app.services.intent_schema import (
+    INTENT_SCHEMA, INTENT_MAX_TOKENS, build_intent_prompt, normalize_intent
+)
+from app.services.mcp_service import METRIC_DEFINITIONS, MCPService
+from app.services.metric_analysis import METRIC_LOOKBACK_HOURS, METRIC_PERIOD, detect_anomalies
+from app.services.log_miner import format_clusters, mine_templates
+from app.services.inventory_cache import format_age, get_inventory_cache
+from app.services.columnar_store import get_columnar_inventory
+from app.services.query_planner import extract_filters, query_from_parameters
+from app.services.resource_query import ResourceQuery
+from app.services.embedding_index import get_embedding_index, get_embedding_sync
+from app.services.session_store import ChatSession, get_session_store
+from app.services.context_builder import (
+    detect_services, detect_states, select_relevant_resources, pack_resources, resource_field, resource_rows
+)
+from app.utils import tracing
 from app.utils.logger import get_logger
+from app.utils.metrics import CHAT_STAGE_SECONDS
+from app.utils.tokens import estimate_tokens
 
 logger = get_logger(__name__)
 
+# 一般的な質問に添付するインベントリ情報のトークン予算
+INVENTORY_CONTEXT_TOKENS = int(os.getenv('INVENTORY_CONTEXT_TOKENS', 1500))
+# 全体の要約を求める質問の語句（予算に収まらないインベントリは分割して要約する）
+OVERVIEW_KEYWORDS = ('全体', 'すべて', '全て', '全部', 'まとめ', '要約', '傾向', '概要', 'overview', 'summar')
+# セマンティック検索で採用する件数と最低類似度
+SEMANTIC_TOP_K = 10
+SEMANTIC_MIN_SCORE = float(os.getenv('SEMANTIC_MIN_SCORE', 0.3))
+# プロンプトに含める会話履歴のトークン予算
+HISTORY_CONTEXT_TOKENS = int(os.getenv('HISTORY_CONTEXT_TOKENS', 500))
+# 前回の結果に対する追質問とみなす語句
+FOLLOW_UP_MARKERS = ('その中', 'そのうち', 'それら', 'さっきの', '前回の')
+# 件数を尋ねる質問とみなす表現
+COUNT_QUESTION_PATTERN = re.compile(r'何台|何個|何件|いくつ|幾つ|how many|number of', re.IGNORECASE)
+# 一覧・ログとして表示する件数（取得もこの件数で打ち切る）
+RESOURCE_LIST_LIMIT = 10
+LOG_DISPLAY_LIMIT = 5
+# メトリクスの異常についての質問とみなす語句
+METRIC_KEYWORDS = ('異常', 'anomal', 'メトリクス', 'metric', 'cpu', '負荷')
+# ログについての質問とみなす語句
+LOG_KEYWORDS = ('ログ', 'log', 'エラー', 'error')
+# エラーログの要約で分類する行数と、LLM に渡すテンプレート数
+LOG_SUMMARY_LINES = int(os.getenv('LOG_SUMMARY_LINES', 5000))
+LOG_SUMMARY_CLUSTERS = int(os.getenv('LOG_SUMMARY_CLUSTERS', 200))
+
 
 class ChatService:
-    def __init__(self):
+    def __init__(self, session: Optional[ChatSession] = None):
         self.llm_service = LLMService()
         self.mcp_service = MCPService()
+        self.inventory_cache = get_inventory_cache()
+        self.session = session
 
     def process_message(self, user_message: str) -> str:
         """
         ユーザーメッセージを処理し、適切な応答を生成する
         """
+        response = self._process_message(user_message)
+
+        if self.session is not None:
+            session_store = get_session_store()
+            session_store.append(self.session, 'user', user_message)
+            session_store.append(self.session, 'bot', response)
+        return response
+
+    def _process_message(self, user_message: str) -> str:
+        """
+        意図を解析し、意図に応じた処理へ振り分ける
+        """
+        started = time.perf_counter()
+        handler_started = None
+        intent_type = 'error'
         try:
+            # 前回の結果に対する追質問はクラウドへ再取得せずに絞り込む
+            follow_up = self._handle_follow_up(user_message)
+            if follow_up is not None:
+                intent_type = 'follow_up'
+                return follow_up
+
+            # 件数の質問は一覧を整形せず、列指向インベントリの集計で回答する
+            count_answer = self._handle_count_question(user_message)
+            if count_answer is not None:
+                intent_type = 'count'
+                return count_answer
+
             # メッセージを解析して意図を特定
-            intent = self._analyze_intent(user_message)
-            logger.info(f"解析された意図: {intent}")
+            analysis_started = time.perf_counter()
+            with tracing.span('chat.intent') as intent_span:
+                intent = self._analyze_intent(user_message)
+                intent_type = intent['type']
+                if intent_span is not None:
+                    intent_span.set(**{'chat.intent': intent_type, 'chat.provider': intent.get('provider'),
+                                       'chat.service': intent.get('service')})
+            handler_started = time.perf_counter()
+            CHAT_STAGE_SECONDS.labels('intent', intent_type).observe(handler_started - analysis_started)
+            logger.info("解析された意図: %s", intent_type, extra={'intent': intent})
 
             # 意図に基づいて適切な処理を実行
             if intent['type'] == 'resource_list':
+                self._attach_filters(user_message, intent)
                 return self._handle_resource_list_request(intent)
             elif intent['type'] == 'log_query':
                 return self._handle_log_query(intent)
@@ -35,9 +118,17 @@ class ChatService:
             else:
                 return self._handle_unknown_request(user_message)
 
+        except LLMQueueTimeoutError:
+            # 混雑時は API 層で 503 を返すため、そのまま伝播させる
+            raise
         except Exception as e:
             logger.error(f"メッセージ処理エラー: {str(e)}")
             return "申し訳ございません。処理中にエラーが発生しました。"
+        finally:
+            finished = time.perf_counter()
+            if handler_started is not None:
+                CHAT_STAGE_SECONDS.labels('handler', intent_type).observe(finished - handler_started)
+            CHAT_STAGE_SECONDS.labels('total', intent_type).observe(finished - started)
 
     def _analyze_intent(self, message: str) -> Dict[str, Any]:
         """
@@ -93,14 +184,30 @@ class ChatService:
                     "parameters": {}
                 }
 
+        # メトリクスの異常についての質問の検出（ログについての質問は除く）
+        if any(keyword in message_lower for keyword in METRIC_KEYWORDS) and \
+                not any(keyword in message_lower for keyword in ['ログ', 'log']):
+            targets = [target for target in detect_services(message) if target in METRIC_DEFINITIONS]
+            provider, service = targets[0] if len(targets) == 1 else ('both', 'unknown')
+            return {
+                "type": "metric_query",
+                "provider": provider,
+                "service": service,
+                "confidence": 0.8,
+                "parameters": {"anomaly": True}
+            }
+
         # ログクエリの検出
-        if any(keyword in message_lower for keyword in ['ログ', 'log', 'エラー', 'error']):
+        if any(keyword in message_lower for keyword in LOG_KEYWORDS):
+            parameters = {}
+            if any(keyword in message_lower for keyword in ['エラー', 'error']):
+                parameters['level'] = 'ERROR'
             return {
                 "type": "log_query",
                 "provider": "both",
                 "service": "unknown",
                 "confidence": 0.8,
-                "parameters": {}
+                "parameters": parameters
             }
 
         # デフォルト
@@ -116,40 +223,10 @@ class ChatService:
         """
         LLMを使用してメッセージの意図を解析する
         """
-        prompt = f"""
-        以下のユーザーメッセージを解析し、意図を特定してください。
-        
-        メッセージ: {message}
-        
-        以下の形式でJSONを返してください:
-        {{
-            "type": "resource_list|log_query|metric_query|general_question|iam_policy_creation",
-            "provider": "aws|azure|both",
-            "service": "ec2|s3|vm|storage|iam|etc",
-            "confidence": 0.0-1.0,
-            "parameters": {{}}
-        }}
-        
-        利用可能なタイプ:
-        - resource_list: リソース一覧の取得
-        - log_query: ログの検索・参照
-        - metric_query: メトリクスの取得
-        - iam_policy_creation: IAMポリシーの作成
-        - general_question: 一般的な質問
-        """
-
-        response = self.llm_service.generate_response(prompt, max_tokens=200)
-
-        # JSONレスポンスをパース
-        try:
-            import json
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                intent = json.loads(json_match.group())
-                return intent
-        except Exception as e:
-            logger.error(f"LLM意図解析のJSONパースエラー: {str(e)}")
+        intent = self.llm_service.generate_json(
+            build_intent_prompt(message), INTENT_SCHEMA, max_tokens=INTENT_MAX_TOKENS)
+        if intent:
+            return normalize_intent(intent)
 
         # パースに失敗した場合はデフォルトの意図を返す
         return {
@@ -166,22 +243,26 @@ class ChatService:
         """
         provider = intent.get('provider', 'aws')
         service = intent.get('service', 'ec2')
+        query = query_from_parameters(intent.get('parameters') or {})
+        entries = []
 
         try:
             if provider in ['aws', 'both']:
-                resources = self.mcp_service.get_aws_resources(service)
-                aws_response = f"AWS {service.upper()} リソース一覧:\n\n"
-                for resource in resources[:10]:  # 最初の10件のみ表示
-                    aws_response += f"- {resource.get('name', 'N/A')}: {resource.get('state', 'N/A')}\n"
+                resources = self._get_resources('aws', service, query, limit=RESOURCE_LIST_LIMIT)
+                entries.extend(('aws', service, resource) for resource in resources)
+                self._remember_result(intent, entries)
+                aws_response = self._format_resource_list(f"AWS {service.upper()}", resources, query) \
+                    + self._staleness_note([('aws', service)])
 
                 if provider == 'aws':
                     return aws_response
 
             if provider in ['azure', 'both']:
-                resources = self.mcp_service.get_azure_resources(service)
-                azure_response = f"Azure {service.upper()} リソース一覧:\n\n"
-                for resource in resources[:10]:  # 最初の10件のみ表示
-                    azure_response += f"- {resource.get('name', 'N/A')}: {resource.get('state', 'N/A')}\n"
+                resources = self._get_resources('azure', service, query, limit=RESOURCE_LIST_LIMIT)
+                entries.extend(('azure', service, resource) for resource in resources)
+                self._remember_result(intent, entries)
+                azure_response = self._format_resource_list(f"Azure {service.upper()}", resources, query) \
+                    + self._staleness_note([('azure', service)])
 
                 if provider == 'azure':
                     return azure_response
@@ -192,6 +273,62 @@ class ChatService:
             logger.error(f"リソース一覧取得エラー: {str(e)}")
             return "申し訳ございません。リソース一覧の取得中にエラーが発生しました。"
 
+    def _format_resource_list(self, title: str, resources: List[Resource],
+                              query: Optional[ResourceQuery] = None) -> str:
+        """
+        リソース一覧を表示用の文字列に整形（最初の10件のみ表示）
+
+        件数の上限を指定して取得した一覧（has_more）の場合、総数は数えずに続きがあることだけを示す
+        """
+        lines = [f"{title} リソース一覧:", ""]
+        if query is not None:
+            conditions = [f"{column}={'|'.join(values)}" for column, values in query.filters.items()]
+            conditions += [f"tag:{key}" + (f"={value}" if value is not None else '')
+                           for key, value in query.tags.items()]
+            lines[0] = f"{title} リソース一覧（条件: {', '.join(conditions)}）:"
+        lines.extend(f"- {resource.get('name', 'N/A')}: {resource_field(resource, 'state', 'N/A')}"
+                     for resource in resources[:RESOURCE_LIST_LIMIT])
+        if len(resources) > RESOURCE_LIST_LIMIT:
+            lines.append(f"... 他 {len(resources) - RESOURCE_LIST_LIMIT} 件")
+        elif getattr(resources, 'has_more', False):
+            lines.append("... 他にも該当するリソースがあります")
+        return "\n".join(lines) + "\n"
+
+    def _staleness_note(self, keys) -> str:
+        """
+        起動時にスナップショットから復元し、まだ取得し直していない情報を使った場合の注記（なければ空文字列）
+        """
+        ages = [inventory_slice.age() for inventory_slice in
+                (self.inventory_cache.peek(provider, service) for provider, service in keys)
+                if inventory_slice is not None and inventory_slice.restored]
+        if not ages:
+            return ""
+        return f"※ {format_age(max(ages))}前に取得した情報です（最新の情報を取得中）\n"
+
+    def _get_resources(self, provider: str, service: str,
+                       query: Optional[ResourceQuery] = None,
+                       limit: Optional[int] = None) -> List[Resource]:
+        """
+        インベントリキャッシュ経由でリソース一覧を取得
+
+        キャッシュが期限内ならそこから（絞り込み条件があれば絞り込んで）返す。
+        なければ条件と件数の上限をサーバー側に渡して一致するものだけを取得する（部分的な結果はキャッシュしない）
+        """
+        cached = self.inventory_cache.fresh(provider, service)
+        if query is None and (limit is None or cached is not None):
+            if provider == 'aws':
+                return self.inventory_cache.get(
+                    provider, service, lambda: self.mcp_service.get_aws_resources(service))
+            return self.inventory_cache.get(
+                provider, service, lambda: self.mcp_service.get_azure_resources(service))
+
+        if cached is not None:
+            return list(query.apply(cached.records, provider, service))
+        options = {name: value for name, value in (('query', query), ('limit', limit)) if value is not None}
+        if provider == 'aws':
+            return self.mcp_service.get_aws_resources(service, **options)
+        return self.mcp_service.get_azure_resources(service, **options)
+
     def _handle_log_query(self, intent: Dict[str, Any]) -> str:
         """
         ログクエリを処理
@@ -200,10 +337,15 @@ class ChatService:
         service = intent.get('service', 'ec2')
 
         try:
-            logs = self.mcp_service.get_logs(provider, service)
+            # レベルの絞り込みは取得側で行い、表示件数そろった時点で取得を打ち切る
+            filters = {name: value for name, value in (intent.get('parameters') or {}).items()
+                       if name in ('level', 'keyword') and value}
+            if filters.get('level'):
+                return self._summarize_logs(provider, service, filters)
+            logs = self.mcp_service.get_logs(provider, service, limit=LOG_DISPLAY_LIMIT, **filters)
             response = f"{provider.upper()} {service.upper()} のログ:\n\n"
 
-            for log in logs[:5]:  # 最初の5件のみ表示
+            for log in logs:
                 response += f"**{log.get('timestamp', 'N/A')}**\n"
                 response += f"{log.get('message', 'N/A')}\n\n"
 
@@ -213,12 +355,67 @@ class ChatService:
             logger.error(f"ログ取得エラー: {str(e)}")
             return "申し訳ございません。ログの取得中にエラーが発生しました。"
 
+    def _summarize_logs(self, provider: str, service: str, filters: Dict[str, Any]) -> str:
+        """
+        エラーログをテンプレートごとに分類し、件数の多いものだけを LLM に渡して要約する
+        """
+        events = self.mcp_service.iter_logs(provider, service, limit=LOG_SUMMARY_LINES, **filters)
+        miner = mine_templates(events)
+        title = f"{provider.upper()} {service.upper()} のログ"
+        if not miner.total:
+            return f"{title}に該当するものは見つかりませんでした。"
+
+        clusters = miner.top(LOG_SUMMARY_CLUSTERS)
+        response = f"{title} {miner.total} 件を {len(miner.clusters())} 種類に分類しました（件数の多い順）:\n\n"
+        for cluster in clusters[:LOG_DISPLAY_LIMIT]:
+            response += f"- **{cluster.count} 件**: `{cluster.pattern()}`\n"
+
+        # テンプレートが多く予算に収まらない場合はチャンクに分けて要約する
+        prompt = "次のログの傾向を要約し、考えられる原因と対処方法を説明してください。"
+        summary = self.llm_service.summarize_map_reduce(prompt, [format_clusters([c]) for c in clusters])
+        return f"{response}\n{summary}"
+
     def _handle_metric_query(self, intent: Dict[str, Any]) -> str:
         """
-        メトリクスクエリを処理
+        メトリクスクエリを処理（直近のメトリクスに異常のあるリソースを異常度の高い順に答える）
         """
-        # メトリクス取得の実装
-        return "メトリクス取得機能は現在開発中です。"
+        provider = intent.get('provider', 'both')
+        service = intent.get('service', 'unknown')
+        targets = [(p, s) for p, s in METRIC_DEFINITIONS
+                   if provider in (p, 'both') and service in (s, 'unknown', '')]
+        if not targets:
+            return "メトリクスの異常検知は AWS EC2・RDS と Azure VM に対応しています。"
+
+        try:
+            end = time.time()
+            start = end - METRIC_LOOKBACK_HOURS * 3600
+            checked = 0
+            flagged = []
+            for target_provider, target_service in targets:
+                resources = {resource.id: resource for resource in self._get_resources(target_provider, target_service)}
+                if not resources:
+                    continue
+                series = self.mcp_service.get_metric_series(
+                    target_provider, target_service, list(resources), start, end, METRIC_PERIOD)
+                checked += len(series)
+                for anomaly in detect_anomalies(series, end, top=RESOURCE_LIST_LIMIT):
+                    flagged.append((target_provider, target_service, resources[anomaly['key']], anomaly))
+        except Exception as e:
+            logger.error(f"メトリクス取得エラー: {str(e)}")
+            return "申し訳ございません。メトリクスの取得中にエラーが発生しました。"
+
+        if not flagged:
+            return f"直近 {METRIC_LOOKBACK_HOURS} 時間の CPU 使用率に異常は見られませんでした（{checked} 件を確認）。"
+
+        # 異常と判定したリソースのみを回答に含める
+        flagged.sort(key=lambda entry: entry[3]['score'], reverse=True)
+        lines = [f"CPU 使用率に異常が見られるリソース（{checked} 件中 {len(flagged)} 件、異常度の高い順）:", ""]
+        for target_provider, target_service, resource, anomaly in flagged[:RESOURCE_LIST_LIMIT]:
+            change = '上昇' if anomaly['direction'] == 'up' else '低下'
+            lines.append(f"- **{resource.name}** ({target_provider.upper()} {target_service.upper()}): "
+                         f"{anomaly['value']:.1f}%（通常 {anomaly['baseline']:.1f}% 前後から{change}、"
+                         f"異常度 {anomaly['score']:.1f}）")
+        return "\n".join(lines)
 
     def _handle_general_question(self, message: str) -> str:
         """
@@ -226,13 +423,164 @@ class ChatService:
         """
         prompt = f"""
         以下の質問に、AWSやAzureのクラウドインフラに関する専門的な観点から回答してください。
+        参考情報としてクラウドインベントリが与えられた場合は、その内容に基づいて正確に回答してください。
         
         質問: {message}
         
         回答は日本語で、分かりやすく、実用的な内容にしてください。
         """
 
-        return self.llm_service.generate_response(prompt)
+        # 追質問に対応できるよう、直近の会話履歴を前置する
+        history = self.session.prompt_history(HISTORY_CONTEXT_TOKENS) if self.session else ''
+        if history:
+            prompt = f"これまでの会話:\n{history}\n{prompt}"
+
+        context, relevant = self._build_inventory_context(message)
+        self._remember_result({'type': 'general_question'}, relevant)
+        if any(keyword in message.lower() for keyword in OVERVIEW_KEYWORDS):
+            header, rows = resource_rows(relevant)
+            if sum(estimate_tokens(row) + 1 for row in rows) > INVENTORY_CONTEXT_TOKENS:
+                return self.llm_service.summarize_map_reduce(message, rows, header=header, prompt=prompt)
+        return self.llm_service.generate_response(prompt, context=context)
+
+    def _build_inventory_context(self, message: str):
+        """
+        質問に関係するリソースをインベントリから選び、トークン予算内の表にまとめる
+
+        (コンテキスト文字列, 関連度順のリソース) を返す
+        """
+        targets = detect_services(message)
+        entries = []
+        try:
+            if targets:
+                for provider, service in targets:
+                    entries.extend((provider, service, resource)
+                                   for resource in self._get_resources(provider, service))
+            else:
+                # 対象が特定できない場合は取得済みのキャッシュのみを参照する
+                targets = []
+                for inventory_slice in self.inventory_cache.slices():
+                    provider, service = inventory_slice.key
+                    targets.append((provider, service))
+                    entries.extend((provider, service, resource)
+                                   for resource in inventory_slice.records)
+        except Exception as e:
+            logger.warning(f"インベントリ参照エラー: {str(e)}")
+            return "", []
+
+        boosts, faq_entries = self._semantic_lookup(message)
+        relevant = select_relevant_resources(message, entries, boosts)
+        context = pack_resources(relevant, INVENTORY_CONTEXT_TOKENS)
+        note = self._staleness_note(targets)
+        if context and note:
+            context = f"{note}{context}"
+        if faq_entries:
+            faq_block = "\n".join(f"Q: {faq['question']}\nA: {faq['answer']}" for faq in faq_entries)
+            context = f"{context}\n\n{faq_block}" if context else faq_block
+        return context, relevant
+
+    def _handle_follow_up(self, message: str) -> Optional[str]:
+        """
+        「その中で停止中のものは？」のような追質問を前回の結果から回答する（該当しなければ None）
+        """
+        if not self.session or not self.session.last_entries:
+            return None
+        if not any(marker in message for marker in FOLLOW_UP_MARKERS):
+            return None
+
+        previous = self.session.last_entries
+        matched = select_relevant_resources(message, previous)
+        self._remember_result(self.session.last_intent or {}, matched)
+
+        lines = [f"前回の結果 {len(previous)} 件のうち、条件に一致するリソースは {len(matched)} 件です。", ""]
+        lines.extend(
+            f"- [{provider.upper()} {service.upper()}] {resource.get('name', 'N/A')}: "
+            f"{resource_field(resource, 'state', 'N/A')}"
+            for provider, service, resource in matched[:RESOURCE_LIST_LIMIT])
+        if len(matched) > RESOURCE_LIST_LIMIT:
+            lines.append(f"... 他 {len(matched) - RESOURCE_LIST_LIMIT} 件")
+        return "\n".join(lines)
+
+    def _attach_filters(self, message: str, intent: Dict[str, Any]):
+        """
+        質問文から読み取った絞り込み条件を意図の parameters に加える（LLM が抽出した値を優先）
+        """
+        parameters = intent.setdefault('parameters', {})
+        for name, value in extract_filters(message).items():
+            parameters.setdefault(name, value)
+
+    def _handle_count_question(self, message: str) -> Optional[str]:
+        """
+        「EC2 は何台？」のような件数の質問を集計結果から回答する（該当しなければ None）
+
+        メトリクスの異常・ログについての件数（「異常なインスタンスはいくつ？」「エラーログは何件？」）は
+        リソースの件数ではないため対象外とし、意図の解析に任せる
+        """
+        if not COUNT_QUESTION_PATTERN.search(message):
+            return None
+        message_lower = message.lower()
+        if any(keyword in message_lower for keyword in METRIC_KEYWORDS + LOG_KEYWORDS):
+            return None
+        targets = detect_services(message)
+        if not targets:
+            return None
+
+        for provider, service in targets:
+            self._get_resources(provider, service)
+
+        filters = {
+            'provider': sorted({provider for provider, _ in targets}),
+            'service': sorted({service for _, service in targets})
+        }
+        states = detect_states(message)
+        if states:
+            filters['status'] = list(states)
+        result = get_columnar_inventory().aggregate(
+            group_by=['provider', 'service', 'status'], filters=filters)
+
+        lines = [f"{'条件に一致する' if states else ''}リソースは合計 {result['total']} 件です。", ""]
+        for provider, service in targets:
+            groups = [g for g in result['groups']
+                      if g['provider'] == provider and g['service'] == service]
+            total = sum(g['count'] for g in groups)
+            breakdown = ", ".join(f"{g['status'] or '不明'}: {g['count']}" for g in groups)
+            lines.append(f"- {provider.upper()} {service.upper()}: {total} 件"
+                         + (f"（{breakdown}）" if breakdown else ""))
+        note = self._staleness_note(targets)
+        if note:
+            lines.extend(["", note.rstrip()])
+        return "\n".join(lines)
+
+    def _remember_result(self, intent: Dict[str, Any], entries: List[Any]):
+        """
+        追質問に備えて結果をセッションに保持する
+        """
+        if self.session is not None:
+            get_session_store().set_last_result(self.session, intent, entries)
+
+    def _semantic_lookup(self, message: str):
+        """
+        埋め込みインデックスで質問に近いリソースと FAQ を探す
+
+        リソースは {id(resource): 類似度} として、FAQ は項目のリストとして返す。
+        インベントリの同期はバックグラウンドに依頼するだけで待たず、同期済みの範囲を検索する
+        """
+        try:
+            get_embedding_sync().schedule(self.inventory_cache.slices())
+            index = get_embedding_index()
+            hits = index.search(message, k=SEMANTIC_TOP_K, min_score=SEMANTIC_MIN_SCORE)
+        except Exception as e:
+            logger.warning(f"セマンティック検索エラー: {str(e)}")
+            return {}, []
+
+        boosts = {}
+        faq_entries = []
+        for item_id, score, payload in hits:
+            if item_id.startswith('faq:'):
+                faq_entries.append(payload)
+            else:
+                boosts[id(payload)] = score
+        return boosts, faq_entries[:2]
 
     def _handle_iam_policy_creation(self, message: str, intent: Dict[str, Any]) -> str:
         """
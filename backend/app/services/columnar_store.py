@@ -0,0 +1,241 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.models.resource import Resource
+from app.services.inventory_cache import InventoryCache, InventorySlice, get_inventory_cache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 辞書エンコードする分類列
+CATEGORICAL_COLUMNS = ('provider', 'service', 'region', 'type', 'status')
+# 集計できる数値列（age_days は集計時に created_at から算出する）
+NUMERIC_COLUMNS = ('created_at', 'age_days')
+
+# グループ数（各列の種類数の積）がこの値以下なら bincount で集計する
+_DENSE_GROUP_LIMIT = 1 << 20
+
+
+class StatsQueryError(ValueError):
+    """
+    集計条件が不正な場合のエラー
+    """
+
+
+def _encode(values: Iterable[str], count: int) -> Tuple[np.ndarray, List[str]]:
+    """
+    文字列の列を (コード配列, 辞書) に変換する
+    """
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in values),
+                        dtype=np.int32, count=count)
+    return codes, list(lookup)
+
+
+class EncodedSlice:
+    """
+    キャッシュの1スライスを列ごとに変換したもの
+    """
+
+    def __init__(self, inventory_slice: InventorySlice):
+        provider, service = inventory_slice.key
+        self.version = inventory_slice.version
+        self.size = len(inventory_slice.records)
+        columns = getattr(inventory_slice.records, 'column', None)
+        if columns is not None:
+            # スナップショットの列をリソースに復元せずにそのまま使う
+            self.categorical = {column: columns(column) for column in CATEGORICAL_COLUMNS}
+            self.created_at = np.asarray(inventory_slice.records.table['created_at'], dtype=np.int64)
+            return
+
+        records = [Resource.coerce(r, provider, service) for r in inventory_slice.records]
+        self.categorical = {
+            column: _encode((getattr(r, column) for r in records), self.size)
+            for column in CATEGORICAL_COLUMNS
+        }
+        self.created_at = np.fromiter((r.created_at for r in records),
+                                      dtype=np.int64, count=self.size)
+
+
+class ColumnTable:
+    """
+    全スライスを結合した列指向のテーブル（分類列は辞書エンコード済み）
+    """
+
+    def __init__(self, parts: Sequence[EncodedSlice]):
+        self.size = sum(part.size for part in parts)
+        self.categorical: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        for column in CATEGORICAL_COLUMNS:
+            lookup: Dict[str, int] = {}
+            chunks = []
+            for part in parts:
+                codes, dictionary = part.categorical[column]
+                mapping = np.array([lookup.setdefault(v, len(lookup)) for v in dictionary],
+                                   dtype=np.int32)
+                chunks.append(mapping[codes] if len(dictionary) else codes)
+            merged = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+            self.categorical[column] = (merged, list(lookup))
+        self.created_at = (np.concatenate([part.created_at for part in parts])
+                           if parts else np.empty(0, dtype=np.int64))
+
+    def numeric(self, column: str, now: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        数値列と、値が有効な行のマスクを返す
+        """
+        valid = self.created_at > 0
+        if column == 'created_at':
+            return self.created_at.astype(np.float64), valid
+        return (now - self.created_at) / 86400.0, valid
+
+    def filter_mask(self, filters: Dict[str, Sequence[str]]) -> np.ndarray:
+        """
+        分類列の値による絞り込み条件を行マスクに変換する（大文字小文字は区別しない）
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for column, wanted in filters.items():
+            codes, dictionary = self.categorical[column]
+            wanted_lower = {str(v).lower() for v in wanted}
+            matched = [i for i, value in enumerate(dictionary) if value.lower() in wanted_lower]
+            mask &= np.isin(codes, np.array(matched, dtype=np.int32))
+        return mask
+
+    def aggregate(self, group_by: Sequence[str], filters: Dict[str, Sequence[str]],
+                  metrics: Sequence[str], now: float) -> Dict[str, Any]:
+        mask = self.filter_mask(filters)
+        total = int(mask.sum())
+
+        # 各グループ列のコードを1つの整数キーにまとめる
+        cardinalities = [len(self.categorical[column][1]) for column in group_by]
+        keys = np.zeros(self.size, dtype=np.int64)
+        for column, cardinality in zip(group_by, cardinalities):
+            keys = keys * max(cardinality, 1) + self.categorical[column][0]
+        keys = keys[mask]
+
+        group_count = int(np.prod(cardinalities, dtype=np.int64)) if group_by else 1
+        if group_count <= _DENSE_GROUP_LIMIT:
+            # キーをそのまま添字として使う（ソート不要）
+            slot_of_row, slots = keys, group_count
+            counts = np.bincount(keys, minlength=slots)
+            present = group_keys = np.flatnonzero(counts)
+        else:
+            group_keys, slot_of_row = np.unique(keys, return_inverse=True)
+            slots = len(group_keys)
+            counts = np.bincount(slot_of_row, minlength=slots)
+            present = np.arange(slots)
+
+        metric_values = {}
+        for column in metrics:
+            values, valid = self.numeric(column, now)
+            values, valid = values[mask], valid[mask]
+            metric_values[column] = self._aggregate_metric(
+                values[valid], slot_of_row[valid], slots)
+
+        groups = []
+        for slot, key in zip(present, group_keys):
+            # 整数キーを各列のコードに戻す
+            codes = []
+            remainder = int(key)
+            for cardinality in reversed(cardinalities):
+                remainder, code = divmod(remainder, max(cardinality, 1))
+                codes.append(code)
+            group: Dict[str, Any] = {
+                column: self.categorical[column][1][code]
+                for column, code in zip(group_by, reversed(codes))
+            }
+            group['count'] = int(counts[slot])
+            for column, stats in metric_values.items():
+                group[column] = {name: (None if np.isnan(v[slot]) else round(float(v[slot]), 3))
+                                 for name, v in stats.items()}
+            groups.append(group)
+        groups.sort(key=lambda g: g['count'], reverse=True)
+
+        return {'total': total, 'groups': groups}
+
+    @staticmethod
+    def _aggregate_metric(values: np.ndarray, slots: np.ndarray, size: int) -> Dict[str, np.ndarray]:
+        """
+        グループ（slots）ごとの最小・最大・平均・合計
+        """
+        counts = np.bincount(slots, minlength=size)
+        sums = np.bincount(slots, weights=values, minlength=size)
+        minimums = np.full(size, np.inf)
+        maximums = np.full(size, -np.inf)
+        np.minimum.at(minimums, slots, values)
+        np.maximum.at(maximums, slots, values)
+        empty = counts == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        for array in (minimums, maximums, means, sums):
+            array[empty] = np.nan
+        return {'min': minimums, 'max': maximums, 'mean': means, 'sum': sums}
+
+
+class ColumnarInventory:
+    """
+    インベントリキャッシュの列指向コピー。スライスが更新された場合のみ再変換する
+    """
+
+    def __init__(self, cache: InventoryCache):
+        self.cache = cache
+        self._parts: Dict[Tuple[str, str], EncodedSlice] = {}
+        self._table: Optional[ColumnTable] = None
+        self._signature: Tuple = ()
+        self._lock = threading.Lock()
+
+    def table(self) -> ColumnTable:
+        """
+        最新のキャッシュ内容に対応する列指向テーブル
+        """
+        slices = sorted(self.cache.slices(), key=lambda s: s.key)
+        # 再取得しても内容が変わっていなければ版は変わらないため、変換し直さない
+        signature = tuple((s.key, s.version) for s in slices)
+        with self._lock:
+            if self._table is not None and signature == self._signature:
+                return self._table
+
+            started = time.perf_counter()
+            parts = {}
+            for inventory_slice in slices:
+                part = self._parts.get(inventory_slice.key)
+                if part is None or part.version != inventory_slice.version:
+                    part = EncodedSlice(inventory_slice)
+                parts[inventory_slice.key] = part
+            self._parts = parts
+            self._table = ColumnTable(list(parts.values()))
+            self._signature = signature
+            logger.info(f"列指向インベントリを再構築: {self._table.size} 件 "
+                        f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+            return self._table
+
+    def aggregate(self, group_by: Sequence[str] = (), filters: Optional[Dict[str, Sequence[str]]] = None,
+                  metrics: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        分類列でグループ化した件数と数値列の集計値を返す
+        """
+        filters = filters or {}
+        for column in list(group_by) + list(filters):
+            if column not in CATEGORICAL_COLUMNS:
+                raise StatsQueryError(f"未対応の列です: {column}")
+        for column in metrics:
+            if column not in NUMERIC_COLUMNS:
+                raise StatsQueryError(f"未対応の数値列です: {column}")
+        if len(set(group_by)) != len(group_by):
+            raise StatsQueryError("group_by に同じ列が重複しています")
+
+        return self.table().aggregate(list(group_by), filters, list(metrics), time.time())
+
+
+_columnar_inventory: Optional[ColumnarInventory] = None
+_columnar_inventory_lock = threading.Lock()
+
+
+def get_columnar_inventory() -> ColumnarInventory:
+    """
+    プロセス内で共有する列指向インベントリを取得
+    """
+    global _columnar_inventory
+    with _columnar_inventory_lock:
+        if _columnar_inventory is None:
+            _columnar_inventory = ColumnarInventory(get_inventory_cache())
+        return _columnar_inventory
@@ -0,0 +1,144 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.resource import Resource
+from app.utils.tokens import estimate_tokens
+
+# 質問中の語句と、対象となるプロバイダー・サービスの対応
+SERVICE_KEYWORDS: List[Tuple[Tuple[str, ...], List[Tuple[str, str]]]] = [
+    (('ec2',), [('aws', 'ec2')]),
+    (('s3', 'バケット', 'bucket'), [('aws', 's3')]),
+    (('rds', 'データベース', 'database', 'db'), [('aws', 'rds')]),
+    (('仮想マシン', 'vm'), [('azure', 'vm')]),
+    (('ストレージ', 'storage'), [('azure', 'storage')]),
+    (('インスタンス', 'サーバー', 'instance', 'server'), [('aws', 'ec2'), ('azure', 'vm')]),
+]
+
+# 質問中の語句と、該当するリソース状態の対応
+STATE_KEYWORDS: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = [
+    (('停止', 'stopped', 'stop'), ('stopped', 'stopping', 'deallocated', 'deallocating')),
+    (('実行中', '稼働', '起動中', 'running'), ('running', 'available', 'succeeded')),
+    (('終了', 'terminated'), ('terminated', 'shutting-down', 'deleting')),
+]
+
+# 正規化前の辞書形式のリソースについて、プロバイダーごとに異なるキー名を共通の列名に読み替える
+FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'state': ('state', 'status'),
+    'type': ('type', 'size', 'class', 'tier', 'engine'),
+    'region': ('region', 'location'),
+}
+
+CONTEXT_COLUMNS = ('name', 'state', 'type', 'region')
+
+# (provider, service, resource) の組
+Entry = Tuple[str, str, Any]
+
+
+def resource_field(resource: Any, field: str, default: str = '') -> Any:
+    """
+    別名を考慮してリソースの項目値を取得
+    """
+    if isinstance(resource, Resource):
+        return resource.get(field, default)
+    for key in FIELD_ALIASES.get(field, (field,)):
+        value = resource.get(key)
+        if value not in (None, '', 'N/A'):
+            return value
+    return default
+
+
+def detect_services(message: str) -> List[Tuple[str, str]]:
+    """
+    質問文から対象となる (provider, service) を推定する
+    """
+    message_lower = message.lower()
+    targets = []
+    for keywords, services in SERVICE_KEYWORDS:
+        if any(keyword in message_lower for keyword in keywords):
+            for target in services:
+                if target not in targets:
+                    targets.append(target)
+
+    if 'azure' in message_lower and 'aws' not in message_lower:
+        targets = [t for t in targets if t[0] == 'azure']
+    elif 'aws' in message_lower and 'azure' not in message_lower:
+        targets = [t for t in targets if t[0] == 'aws']
+    return targets
+
+
+def detect_states(message: str) -> Optional[Tuple[str, ...]]:
+    """
+    質問文から状態の条件を推定する（条件がなければ None）
+    """
+    message_lower = message.lower()
+    for keywords, states in STATE_KEYWORDS:
+        if any(keyword in message_lower for keyword in keywords):
+            return states
+    return None
+
+
+def select_relevant_resources(message: str, entries: List[Entry],
+                              boosts: Optional[Dict[int, float]] = None) -> List[Entry]:
+    """
+    質問に関係するリソースを選び、関連度の高い順に並べる
+
+    boosts にはセマンティック検索の類似度を id(resource) をキーに渡す
+    """
+    states = detect_states(message)
+    if states:
+        entries = [e for e in entries
+                   if str(resource_field(e[2], 'state')).lower() in states]
+
+    terms = [t for t in re.split(r'[\s、。,.?？!！「」]+', message.lower()) if len(t) >= 2]
+    boosts = boosts or {}
+    if not terms and not boosts:
+        return list(entries)
+
+    def score(entry: Entry) -> float:
+        name = str(entry[2].get('name', '')).lower()
+        keyword_score = sum(1 for term in terms if term in name or name and name in term)
+        return keyword_score + boosts.get(id(entry[2]), 0.0)
+
+    return sorted(entries, key=score, reverse=True)
+
+
+def _header_row(columns: Tuple[str, ...]) -> str:
+    return '\t'.join(('provider', 'service') + columns)
+
+
+def _resource_row(entry: Entry, columns: Tuple[str, ...]) -> str:
+    provider, service, resource = entry
+    return '\t'.join([provider, service] + [str(resource_field(resource, column)) for column in columns])
+
+
+def resource_rows(entries: List[Entry],
+                  columns: Tuple[str, ...] = CONTEXT_COLUMNS) -> Tuple[str, List[str]]:
+    """
+    リソースをタブ区切りの表の行にする（予算で切り詰めない）。(列名の行, 各リソースの行) を返す
+    """
+    return _header_row(columns), [_resource_row(entry, columns) for entry in entries]
+
+
+def pack_resources(entries: List[Entry], token_budget: int,
+                   columns: Tuple[str, ...] = CONTEXT_COLUMNS) -> str:
+    """
+    リソースをタブ区切りの表に詰め、トークン予算を超えない範囲で返す
+    """
+    if not entries:
+        return ''
+
+    lines = [_header_row(columns)]
+    used = estimate_tokens(lines[0])
+    packed = 0
+    for entry in entries:
+        row = _resource_row(entry, columns)
+        cost = estimate_tokens(row) + 1
+        if used + cost > token_budget:
+            break
+        lines.append(row)
+        used += cost
+        packed += 1
+
+    remaining = len(entries) - packed
+    if remaining > 0:
+        lines.append(f"... 他 {remaining} 件（全 {len(entries)} 件）")
+    return '\n'.join(lines)
@@ -0,0 +1,427 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.context_builder import resource_field
+from app.services.llm_scheduler import PRIORITY_HIGH
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Ollama の埋め込み API に1回で渡すテキスト数
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[^\sa-z0-9]+')
+
+
+class HashingEmbedder:
+    """
+    単語と文字 n-gram を特徴ハッシュで固定次元に写像する決定的な埋め込み（オフライン・テスト用）
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in _TOKEN_PATTERN.findall(text.lower()):
+            features.append(token)
+            # 日本語や複合語にも効くよう文字 2-gram / 3-gram を加える
+            padded = f"#{token}#"
+            for n in (2, 3):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode('utf-8'))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class OllamaEmbedder:
+    """
+    Ollama の埋め込み API を利用する埋め込み
+
+    batch_size 件ずつ embed API でまとめて埋め込む（embed API のない古いクライアントでは1件ずつ）。
+    router を指定した場合は、生成と同じく Ollama バックエンドの実行枠（スケジューラ）の中で
+    選択したバックエンドのクライアントを使う（client は使わない）
+    """
+
+    def __init__(self, client: Any, model: str, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 router: Any = None, priority: int = PRIORITY_HIGH):
+        self.client = client
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.router = router
+        self.priority = priority
+        self.dim: Optional[int] = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            rows.extend(self._embed_batch(list(texts[start:start + self.batch_size])))
+        vectors = np.asarray(rows, dtype=np.float32).reshape(len(texts), -1)
+        self.dim = vectors.shape[1] if len(texts) else self.dim
+        return _normalize(vectors)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if self.router is None:
+            return self._embed_with(self.client, texts)
+        return self.router.call(lambda backend: self._embed_with(backend.client, texts),
+                                priority=self.priority, llm_type='ollama')
+
+    def _embed_with(self, client: Any, texts: List[str]) -> List[List[float]]:
+        embed = getattr(client, 'embed', None)
+        if embed is None:
+            return [client.embeddings(model=self.model, prompt=text)['embedding'] for text in texts]
+        return list(embed(model=self.model, input=texts)['embeddings'])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingIndex:
+    """
+    float32 の連続行列に埋め込みを保持し、コサイン類似度で上位 k 件を検索するインデックス
+
+    path を指定すると行列をメモリマップしたファイルに保存し、再起動後も再計算を省略する
+    """
+
+    def __init__(self, embedder: Any, dim: Optional[int] = None, path: Optional[str] = None,
+                 initial_capacity: int = 1024):
+        self.embedder = embedder
+        self.dim = dim or getattr(embedder, 'dim', None)
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._hashes: Dict[str, str] = {}
+        self._payloads: Dict[str, Any] = {}
+        self._sources: Dict[str, Any] = {}
+        self._capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        if path and os.path.exists(self._meta_path()):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, items: Sequence[Tuple[str, str, Any]]) -> int:
+        """
+        (id, text, payload) を追加・更新する。テキストが変わっていない項目は再埋め込みしない
+
+        埋め込みの計算中はロックを保持しない（計算中も検索できる）
+        """
+        with self._lock:
+            changed = []
+            for item_id, text, payload in items:
+                self._payloads[item_id] = payload
+                digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+                if self._hashes.get(item_id) != digest:
+                    changed.append((item_id, text, digest))
+
+        if not changed:
+            return 0
+
+        vectors = self.embedder.embed([text for _, text, _ in changed])
+        with self._lock:
+            self._ensure_matrix(vectors.shape[1], len(self._ids) + len(changed))
+            for (item_id, _, digest), vector in zip(changed, vectors):
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(item_id)
+                    self._rows[item_id] = row
+                self._matrix[row] = vector
+                self._hashes[item_id] = digest
+            return len(changed)
+
+    def remove(self, item_ids: Sequence[str]):
+        """
+        項目を削除（末尾の行を空いた位置へ移動して行列を詰める）
+        """
+        with self._lock:
+            for item_id in item_ids:
+                row = self._rows.pop(item_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+                self._hashes.pop(item_id, None)
+                self._payloads.pop(item_id, None)
+
+    def sync(self, prefix: str, items: Sequence[Tuple[str, str, Any]]) -> int:
+        """
+        prefix で始まる項目を items と一致させる（差分のみ埋め込み・削除）
+        """
+        with self._lock:
+            keep = {item_id for item_id, _, _ in items}
+            stale = [i for i in self._ids if i.startswith(prefix) and i not in keep]
+            self.remove(stale)
+        return self.upsert(items)
+
+    def sync_source(self, prefix: str, source: Any,
+                    build_items: Callable[[], Sequence[Tuple[str, str, Any]]]) -> int:
+        """
+        source（リソース一覧など）が前回と同じオブジェクトなら何もしない。変わっていれば差分同期する
+        """
+        with self._lock:
+            if self._sources.get(prefix) is source:
+                return 0
+        updated = self.sync(prefix, build_items())
+        with self._lock:
+            self._sources[prefix] = source
+        return updated
+
+    def search(self, query: str, k: int = 5, prefix: Optional[str] = None,
+               min_score: float = 0.0) -> List[Tuple[str, float, Any]]:
+        """
+        クエリに類似する上位 k 件を (id, score, payload) で返す
+        """
+        return self.search_batch([query], k, prefix, min_score)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = 5, prefix: Optional[str] = None,
+                     min_score: float = 0.0) -> List[List[Tuple[str, float, Any]]]:
+        """
+        複数クエリをまとめて行列積で検索する
+        """
+        if not queries or not self._ids:
+            return [[] for _ in queries]
+        query_vectors = self.embedder.embed(list(queries))
+        with self._lock:
+            count = len(self._ids)
+            if not count:
+                return [[] for _ in queries]
+            scores = query_vectors @ self._matrix[:count].T
+            if prefix:
+                mask = np.fromiter((i.startswith(prefix) for i in self._ids),
+                                   dtype=bool, count=count)
+                scores[:, ~mask] = -np.inf
+
+            top = min(k, count)
+            results = []
+            for row_scores in scores:
+                candidates = np.argpartition(-row_scores, top - 1)[:top]
+                ordered = candidates[np.argsort(-row_scores[candidates])]
+                results.append([
+                    (self._ids[i], float(row_scores[i]), self._payloads.get(self._ids[i]))
+                    for i in ordered
+                    if row_scores[i] > min_score and self._ids[i] in self._payloads
+                ])
+            return results
+
+    def flush(self):
+        """
+        メモリマップ行列とメタデータをディスクへ書き出す
+        """
+        if not self.path or self._matrix is None:
+            return
+        with self._lock:
+            self._matrix.flush()
+            meta = {'embedder': self._signature(), 'dim': self.dim, 'capacity': self._capacity,
+                    'ids': self._ids, 'hashes': [self._hashes[i] for i in self._ids]}
+            tmp_path = self._meta_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path())
+
+    def _ensure_matrix(self, dim: int, required: int):
+        if self._matrix is None:
+            self.dim = dim
+            self._capacity = max(self._capacity, required)
+            self._matrix = self._allocate(self._capacity, mode='w+')
+            return
+        if required <= self._capacity:
+            return
+
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+        old = np.array(self._matrix[:len(self._ids)])
+        self._capacity = capacity
+        self._matrix = self._allocate(capacity, mode='w+')
+        self._matrix[:len(old)] = old
+
+    def _allocate(self, capacity: int, mode: str) -> np.ndarray:
+        if self.path:
+            return np.memmap(self.path, dtype=np.float32, mode=mode,
+                             shape=(capacity, self.dim))
+        return np.zeros((capacity, self.dim), dtype=np.float32)
+
+    def _load(self):
+        try:
+            with open(self._meta_path(), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('embedder') != self._signature():
+                logger.info("埋め込みの設定が変わったため、インデックスを再構築します")
+                return
+            self.dim = meta['dim']
+            self._capacity = meta['capacity']
+            self._matrix = self._allocate(self._capacity, mode='r+')
+            self._ids = meta['ids']
+            self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._hashes = dict(zip(self._ids, meta['hashes']))
+            logger.info(f"埋め込みインデックスを読み込みました ({len(self._ids)} 件)")
+        except Exception as e:
+            logger.warning(f"埋め込みインデックスの読み込みに失敗: {str(e)}")
+            self._ids, self._rows, self._hashes, self._matrix = [], {}, {}, None
+
+    def _signature(self) -> str:
+        return f"{type(self.embedder).__name__}:{getattr(self.embedder, 'model', '')}"
+
+    def _meta_path(self) -> str:
+        return f"{self.path}.meta.json"
+
+
+def resource_text(resource: Dict[str, Any]) -> str:
+    """
+    リソースの埋め込み対象テキスト（名前・タグ・種別など）
+    """
+    parts = [str(resource.get('name', '')), str(resource_field(resource, 'type')),
+             str(resource.get('engine', ''))]
+    tags = resource.get('tags') or {}
+    parts.extend(f"{key} {value}" for key, value in tags.items())
+    return ' '.join(p for p in parts if p)
+
+
+def inventory_items(provider: str, service: str, records: Sequence[Any]) -> List[Tuple[str, str, Any]]:
+    """
+    インベントリのスライスをインデックス登録用の (id, text, payload) に変換
+    """
+    return [(f"{provider}:{service}:{resource.get('id') or resource.get('name')}",
+             resource_text(resource), resource)
+            for resource in records]
+
+
+class EmbeddingSyncWorker:
+    """
+    インベントリのスライスをバックグラウンドのスレッドで埋め込みインデックスへ同期する
+
+    schedule() は同期を依頼するだけで埋め込みの計算を待たない。同じスライスへの依頼は最新のものにまとめる
+    """
+
+    def __init__(self, index_factory: Optional[Callable[[], EmbeddingIndex]] = None):
+        self._index_factory = index_factory or get_embedding_index
+        self._pending: Dict[str, Tuple[str, str, Any]] = {}
+        self._scheduled: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, slices: Sequence[Any]) -> int:
+        """
+        前回の依頼から内容（リソース一覧のオブジェクト）が変わったスライスの同期を依頼し、依頼した数を返す
+        """
+        count = 0
+        with self._lock:
+            for inventory_slice in slices:
+                provider, service = inventory_slice.key
+                prefix = f"{provider}:{service}:"
+                if self._scheduled.get(prefix) is inventory_slice.records:
+                    continue
+                self._scheduled[prefix] = inventory_slice.records
+                self._pending[prefix] = (provider, service, inventory_slice.records)
+                count += 1
+            if count and self._thread is None:
+                self._idle.clear()
+                self._thread = threading.Thread(target=self._run, name='embedding-sync', daemon=True)
+                self._thread.start()
+        return count
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        依頼済みの同期が終わるまで待つ（テスト・終了時用）
+        """
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    self._idle.set()
+                    return
+                pending, self._pending = self._pending, {}
+            self._sync(pending)
+
+    def _sync(self, pending: Dict[str, Tuple[str, str, Any]]):
+        try:
+            index = self._index_factory()
+            updated = 0
+            for prefix, (provider, service, records) in pending.items():
+                updated += index.sync_source(
+                    prefix, records, lambda p=provider, s=service, r=records: inventory_items(p, s, r))
+            if updated:
+                index.flush()
+                logger.info("埋め込みインデックスを更新しました: %d 件", updated)
+        except Exception as e:
+            logger.warning(f"埋め込みインデックスの同期に失敗: {str(e)}")
+            with self._lock:
+                # 次の依頼で同じ内容を再度同期できるようにする
+                for prefix, (_, _, records) in pending.items():
+                    if self._scheduled.get(prefix) is records:
+                        del self._scheduled[prefix]
+
+
+_embedding_index: Optional[EmbeddingIndex] = None
+_embedding_index_lock = threading.Lock()
+_embedding_sync: Optional[EmbeddingSyncWorker] = None
+_embedding_sync_lock = threading.Lock()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """
+    プロセス内で共有する埋め込みインデックスを取得（FAQ コーパスを登録済み）
+
+    FAQ の登録に失敗した場合は例外を送出し、次回の呼び出しで作成し直す
+    """
+    global _embedding_index
+    with _embedding_index_lock:
+        if _embedding_index is None:
+            index = EmbeddingIndex(_create_embedder(), path=os.getenv('EMBEDDING_INDEX_PATH'))
+            from app.services.faq_corpus import FAQ_ENTRIES
+            index.sync('faq:', [
+                (f"faq:{entry['id']}", entry['question'], entry) for entry in FAQ_ENTRIES
+            ])
+            _embedding_index = index
+        return _embedding_index
+
+
+def get_embedding_sync() -> EmbeddingSyncWorker:
+    """
+    プロセス内で共有する埋め込みインデックスの同期ワーカーを取得
+    """
+    global _embedding_sync
+    with _embedding_sync_lock:
+        if _embedding_sync is None:
+            _embedding_sync = EmbeddingSyncWorker()
+        return _embedding_sync
+
+
+def _create_embedder() -> Any:
+    """
+    EMBEDDING_BACKEND に応じて埋め込みを作成（Ollama が使えない場合はハッシュ埋め込み）
+    """
+    if os.getenv('EMBEDDING_BACKEND', 'ollama') == 'ollama':
+        from app.services.llm_service import get_router
+        router = get_router()
+        if any(backend.llm_type == 'ollama' for backend in router.backends):
+            return OllamaEmbedder(None, os.getenv('EMBEDDING_MODEL', 'nomic-embed-text'), router=router)
+        logger.info("Ollama バックエンドがないため、ハッシュ埋め込みを使用します")
+    return HashingEmbedder(int(os.getenv('EMBEDDING_DIM', 256)))
@@ -0,0 +1,37 @@
+# セマンティック検索で参照する FAQ コーパス
+FAQ_ENTRIES = [
+    {
+        'id': 'ec2-stopped-billing',
+        'question': '停止中のEC2インスタンスに料金はかかりますか？',
+        'answer': '停止中のインスタンス自体のコンピューティング料金はかかりませんが、'
+                  'アタッチされた EBS ボリュームと Elastic IP には料金が発生します。'
+    },
+    {
+        'id': 'azure-vm-deallocated',
+        'question': 'Azure VM の停止と割り当て解除の違いは？',
+        'answer': 'OS からの停止ではコンピューティング料金が継続します。'
+                  'ポータルや CLI で割り当て解除（deallocated）するとコンピューティング料金は停止します。'
+    },
+    {
+        'id': 's3-public-access',
+        'question': 'S3 バケットが公開されていないか確認するには？',
+        'answer': 'バケットのブロックパブリックアクセス設定とバケットポリシー、ACL を確認してください。'
+                  'アカウント単位のブロックパブリックアクセスの有効化を推奨します。'
+    },
+    {
+        'id': 'rds-backup',
+        'question': 'RDS のバックアップはどう設定しますか？',
+        'answer': '自動バックアップの保持期間（1〜35日）を設定し、必要に応じて手動スナップショットを取得します。'
+    },
+    {
+        'id': 'storage-tier',
+        'question': 'Azure ストレージのアクセス層の選び方は？',
+        'answer': '頻繁にアクセスするデータはホット、30日以上保持する低頻度データはクール、'
+                  '長期保管はアーカイブ層を選択します。'
+    },
+    {
+        'id': 'readonly-iam',
+        'question': '読み取り専用の権限を付与するには？',
+        'answer': 'AWS では ReadOnlyAccess 管理ポリシー、Azure では閲覧者（Reader）ロールを割り当てます。'
+    },
+]
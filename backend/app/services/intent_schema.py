@@ -0,0 +1,47 @@
+from typing import Any, Dict
+
+INTENT_TYPES = ['resource_list', 'log_query', 'metric_query',
+                'iam_policy_creation', 'general_question']
+PROVIDERS = ['aws', 'azure', 'both']
+
+# 意図解析の構造化出力に使用する JSON スキーマ
+INTENT_SCHEMA: Dict[str, Any] = {
+    'type': 'object',
+    'properties': {
+        'type': {'type': 'string', 'enum': INTENT_TYPES},
+        'provider': {'type': 'string', 'enum': PROVIDERS},
+        'service': {'type': 'string'},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'parameters': {'type': 'object'}
+    },
+    'required': ['type', 'provider', 'service', 'confidence']
+}
+
+# 意図解析の出力トークン上限（JSON 1 オブジェクト分。絞り込み条件を含む場合を考慮）
+INTENT_MAX_TOKENS = 128
+
+
+def build_intent_prompt(message: str) -> str:
+    """
+    意図解析用の簡潔なプロンプトを組み立てる
+    """
+    return (
+        "Classify the cloud request. Reply with one JSON object only.\n"
+        f"type: {'|'.join(INTENT_TYPES)}\n"
+        f"provider: {'|'.join(PROVIDERS)}\n"
+        "service: ec2|s3|rds|vm|storage|iam|unknown\n"
+        "confidence: 0-1\n"
+        "parameters: object; for resource_list add state, instance_type, tag (Key:Value), "
+        "vpc_id, resource_group only if mentioned\n"
+        f"message: {message}"
+    )
+
+
+def normalize_intent(intent: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    検証済みの意図を後続処理で扱いやすい形に整える
+    """
+    intent['service'] = intent['service'].lower() or 'unknown'
+    intent['confidence'] = float(intent['confidence'])
+    intent.setdefault('parameters', {})
+    return intent
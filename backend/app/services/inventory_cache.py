@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models.resource import Resource
+from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
+
+logger = get_logger(__name__)
+
+# 条件付きインポート
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+SliceKey = Tuple[str, str]  # (provider, service)
+
+# 差分取得のために保持する削除済みリソース（トゥームストーン）の件数の上限
+TOMBSTONE_LIMIT = int(os.getenv('INVENTORY_TOMBSTONE_LIMIT', 10_000))
+
+# プロバイダーごとに取得できるサービス
+INVENTORY_SERVICES: Dict[str, Tuple[str, ...]] = {
+    'aws': ('ec2', 's3', 'rds'),
+    'azure': ('vm', 'storage'),
+}
+
+
+def record_id(record: Any, provider: str = '', service: str = '') -> str:
+    """
+    差分の単位とするリソースの識別子（ID がなければ名前）
+    """
+    resource = Resource.coerce(record, provider, service)
+    return resource.id or resource.name
+
+
+def _fingerprint(record: Any, provider: str, service: str) -> bytes:
+    """
+    リソースの内容のハッシュ（共通形式の辞書をキー順に直列化したもの）
+    """
+    data = Resource.coerce(record, provider, service).to_dict()
+    if ORJSON_AVAILABLE:
+        encoded = orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS)
+    else:
+        encoded = json.dumps(data, default=str, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).digest()
+
+
+def format_age(seconds: float) -> str:
+    """
+    経過時間を「N 分」のような表示用の文字列に変換
+    """
+    seconds = max(int(seconds), 0)
+    for unit, label in ((86400, '日'), (3600, '時間'), (60, '分')):
+        if seconds >= unit:
+            return f"{seconds // unit} {label}"
+    return f"{seconds} 秒"
+
+
+class InventorySlice:
+    """
+    プロバイダー・サービス単位でキャッシュしたリソース一覧
+
+    version は内容が変わった時点で増える版番号、digest は内容全体のハッシュ、
+    record_versions は各リソースが最後に変わった版を表す
+    """
+
+    def __init__(self, key: SliceKey, records: List[Any], fetched_at: float,
+                 version: int = 0, modified_at: Optional[float] = None, digest: str = '',
+                 record_ids: Optional[List[str]] = None,
+                 fingerprints: Optional[Dict[str, bytes]] = None,
+                 record_versions: Optional[Dict[str, int]] = None,
+                 removed: Optional[Dict[str, int]] = None, base_version: int = 0):
+        self.key = key
+        self.records = records
+        self.fetched_at = fetched_at
+        self.version = version
+        self.modified_at = fetched_at if modified_at is None else modified_at
+        self.digest = digest
+        self.record_ids = record_ids or []  # records と同じ並び
+        self.fingerprints = fingerprints or {}
+        self.record_versions = record_versions or {}
+        self.removed = removed or {}  # 削除されたリソースの識別子 -> 削除を検出した版
+        self.base_version = base_version  # 差分を返せる最も古い版
+        self.restored = False  # スナップショットから復元し、まだ取得し直していない
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def changes_since(self, version: int) -> Optional[Tuple[List[Any], List[str]]]:
+        """
+        指定した版より後に変わったリソースと、削除されたリソースの識別子を返す
+
+        指定した版がトゥームストーンの保持範囲より古い（または未知の）場合は None（全件の取得が必要）
+        """
+        if version < self.base_version or version > self.version:
+            return None
+        changed = [record for record, rid in zip(self.records, self.record_ids)
+                   if self.record_versions.get(rid, self.version) > version]
+        removed = [rid for rid, removed_at in self.removed.items() if removed_at > version]
+        return changed, removed
+
+
+class InventoryCache:
+    """
+    クラウドから取得したリソース一覧を TTL 付きでプロセス内に保持するキャッシュ
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = float(os.getenv('INVENTORY_CACHE_TTL', 300)) if ttl is None else ttl
+        self._slices: Dict[SliceKey, InventorySlice] = {}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[SliceKey, threading.Lock] = {}
+        self._refreshing: set = set()
+        self._version = 0
+
+    def get(self, provider: str, service: str, loader: Callable[[], List[Any]]) -> List[Any]:
+        """
+        キャッシュ済みのリソース一覧を返す。期限切れまたは未取得の場合は loader で取得する
+
+        スナップショットから復元したスライスは期限切れでもそのまま返し、バックグラウンドで取得し直す
+        """
+        key = (provider, service)
+        cached = self._fresh(key)
+        record_cache('inventory', cached is not None)
+        if cached is not None:
+            if cached.restored and cached.age() >= self.ttl:
+                self._refresh_in_background(provider, service, loader)
+            return cached.records
+
+        # 同じスライスへの同時取得はまとめて1回にする
+        with self._fetch_lock(key):
+            cached = self._fresh(key)
+            if cached is not None:
+                return cached.records
+            records = loader()
+            if records:
+                self.put(provider, service, records)
+            return records
+
+    def refresh(self, provider: str, service: str,
+                loader: Callable[[], List[Any]]) -> Optional[InventorySlice]:
+        """
+        期限に関わらず loader で取得し直す（結果が空の場合は格納せず None）
+        """
+        key = (provider, service)
+        with self._lock:
+            self._refreshing.add(key)
+        try:
+            with self._fetch_lock(key):
+                records = loader()
+                return self.put(provider, service, records) if records else None
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def restore(self, provider: str, service: str, records: List[Any], fetched_at: float,
+                version: int, modified_at: float, digest: str) -> InventorySlice:
+        """
+        スナップショットから読み込んだリソース一覧を格納（取得時刻・版は保存時のまま）
+        """
+        key = (provider, service)
+        inventory_slice = InventorySlice(key, records, fetched_at, version, modified_at, digest,
+                                         base_version=version)
+        inventory_slice.restored = True
+        with self._lock:
+            self._slices[key] = inventory_slice
+            self._version = max(self._version, version)
+        return inventory_slice
+
+    def put(self, provider: str, service: str, records: List[Any]) -> InventorySlice:
+        """
+        リソース一覧をキャッシュに格納
+
+        前回の内容と比べて変わったリソースにだけ新しい版番号を付ける（内容が同じなら版は変わらない）
+        """
+        key = (provider, service)
+        ids = [record_id(r, provider, service) for r in records]
+        fingerprints = {rid: _fingerprint(r, provider, service) for rid, r in zip(ids, records)}
+        digest = hashlib.blake2b(b''.join(fingerprints[rid] for rid in ids), digest_size=12).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            previous = self._slices.get(key)
+            if previous is not None and previous.digest == digest:
+                inventory_slice = InventorySlice(
+                    key, records, now, previous.version, previous.modified_at, digest, ids,
+                    fingerprints, previous.record_versions, previous.removed, previous.base_version)
+                self._slices[key] = inventory_slice
+                return inventory_slice
+
+            version = self._next_version()
+            if previous is None or previous.restored:
+                # 復元したスライスはリソースごとの版を持たないため、差分はこの版から数え直す
+                record_versions = dict.fromkeys(fingerprints, version)
+                removed: Dict[str, int] = {}
+                base_version = version
+            else:
+                record_versions = {
+                    rid: (previous.record_versions.get(rid, version)
+                          if previous.fingerprints.get(rid) == fingerprint else version)
+                    for rid, fingerprint in fingerprints.items()
+                }
+                removed = {rid: at for rid, at in previous.removed.items() if rid not in fingerprints}
+                removed.update((rid, version) for rid in previous.fingerprints if rid not in fingerprints)
+                base_version = previous.base_version
+                if len(removed) > TOMBSTONE_LIMIT:
+                    # 古いトゥームストーンを捨て、それより前の版からの差分は返さないようにする
+                    dropped = sorted(removed.items(), key=lambda item: item[1])[:len(removed) - TOMBSTONE_LIMIT]
+                    for rid, _ in dropped:
+                        del removed[rid]
+                    base_version = max(base_version, dropped[-1][1])
+
+            inventory_slice = InventorySlice(
+                key, records, now, version, now, digest, ids,
+                fingerprints, record_versions, removed, base_version)
+            self._slices[key] = inventory_slice
+        return inventory_slice
+
+    def peek(self, provider: str, service: str) -> Optional[InventorySlice]:
+        """
+        期限に関わらずキャッシュ済みのスライスを返す（取得は行わない）
+        """
+        with self._lock:
+            return self._slices.get((provider, service))
+
+    def fresh(self, provider: str, service: str) -> Optional[InventorySlice]:
+        """
+        期限内（またはスナップショットから復元した）キャッシュ済みスライスを返す（なければ None。取得は行わない）
+        """
+        return self._fresh((provider, service))
+
+    def slices(self) -> List[InventorySlice]:
+        """
+        キャッシュ済みのスライス一覧
+        """
+        with self._lock:
+            return list(self._slices.values())
+
+    def clear(self):
+        """
+        キャッシュを破棄
+        """
+        with self._lock:
+            self._slices.clear()
+
+    def _next_version(self) -> int:
+        # プロセスの再起動後も以前の版番号より大きくなるよう、ミリ秒単位の時刻を下限にする
+        self._version = max(self._version + 1, int(time.time() * 1000))
+        return self._version
+
+    def _fresh(self, key: SliceKey) -> Optional[InventorySlice]:
+        with self._lock:
+            cached = self._slices.get(key)
+        if cached is not None and (cached.age() < self.ttl or cached.restored):
+            return cached
+        return None
+
+    def _refresh_in_background(self, provider: str, service: str, loader: Callable[[], List[Any]]):
+        key = (provider, service)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.refresh(provider, service, loader)
+            except Exception as e:
+                logger.warning(f"インベントリの再取得に失敗 ({provider}/{service}): {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"inventory-refresh-{provider}-{service}", daemon=True).start()
+
+    def _fetch_lock(self, key: SliceKey) -> threading.Lock:
+        with self._lock:
+            return self._fetch_locks.setdefault(key, threading.Lock())
+
+
+_inventory_cache: Optional[InventoryCache] = None
+_inventory_cache_lock = threading.Lock()
+
+
+def get_inventory_cache() -> InventoryCache:
+    """
+    プロセス内で共有するインベントリキャッシュを取得
+    """
+    global _inventory_cache
+    with _inventory_cache_lock:
+        if _inventory_cache is None:
+            _inventory_cache = InventoryCache()
+        return _inventory_cache
@@ -0,0 +1,136 @@
+import csv
+import io
+import os
+from typing import Any, Iterable, Iterator, List
+from app.models.resource import Resource
+from app.services.resource_query import ResourceQuery, field_value
+from app.utils.lazy_import import LazyImports, module_available
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 条件付き（pyarrow は Parquet を出力する時点で読み込む）
+PYARROW_AVAILABLE = module_available('pyarrow')
+_sdk = LazyImports(__name__, {'pa': 'pyarrow', 'pq': 'pyarrow.parquet'}, optional=('pa', 'pq'))
+__getattr__ = _sdk.resolve
+
+# CSV をまとめて送出する行数
+CSV_CHUNK_ROWS = int(os.getenv('EXPORT_CSV_CHUNK_ROWS', 500))
+# Parquet の1行グループあたりの行数（メモリ上に保持するのはこの行数まで）
+PARQUET_ROW_GROUP_SIZE = int(os.getenv('EXPORT_PARQUET_ROW_GROUP_SIZE', 10_000))
+
+
+def _csv_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return ';'.join(f"{k}={v}" for k, v in value.items())
+    return str(value)
+
+
+def iter_csv(resources: Iterable[Resource], query: ResourceQuery) -> Iterator[str]:
+    """
+    リソースを CSV として少しずつ出力する（ヘッダー行を含む）
+    """
+    columns = query.output_fields()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    rows = 0
+    for resource in resources:
+        writer.writerow([_csv_value(field_value(resource, name)) for name in columns])
+        rows += 1
+        if rows % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+    logger.info(f"CSV エクスポート完了: {rows} 件")
+
+
+class _ChunkSink:
+    """
+    ParquetWriter の出力先。書き込まれたバイト列を送出するまで保持する
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _parquet_type(name: str):
+    pa = _sdk.pa
+    if name == 'created_at':
+        return pa.timestamp('s', tz='UTC')
+    if name == 'tags':
+        return pa.map_(pa.string(), pa.string())
+    return pa.string()
+
+
+def _parquet_value(resource: Resource, name: str) -> Any:
+    if name == 'created_at':
+        return resource.created_at or None
+    if name == 'tags':
+        return list(resource.tags or ())
+    value = field_value(resource, name)
+    return None if value is None else str(value)
+
+
+def iter_parquet(resources: Iterable[Resource], query: ResourceQuery) -> Iterator[bytes]:
+    """
+    リソースを Parquet として行グループ単位で出力する
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow がインストールされていないため Parquet は出力できません")
+
+    pa, pq = _sdk.pa, _sdk.pq
+    columns = query.output_fields()
+    schema = pa.schema([(name, _parquet_type(name)) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    rows = 0
+    batch: List[Resource] = []
+
+    def write_batch():
+        arrays = [pa.array([_parquet_value(r, name) for r in batch], type=schema.field(name).type)
+                  for name in columns]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        batch.clear()
+
+    try:
+        for resource in resources:
+            batch.append(resource)
+            rows += 1
+            if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+                write_batch()
+                yield sink.drain()
+        if batch:
+            write_batch()
+    finally:
+        writer.close()
+    yield sink.drain()
+    logger.info(f"Parquet エクスポート完了: {rows} 件")
@@ -0,0 +1,333 @@
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.models.resource import Resource
+from app.services.inventory_cache import InventoryCache, get_inventory_cache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# スナップショットを書き出す間隔（秒）
+SNAPSHOT_INTERVAL = float(os.getenv('INVENTORY_SNAPSHOT_INTERVAL', 300))
+
+_MAGIC = b'INVSNAP1'
+_PREAMBLE = struct.Struct('<8sQ')  # マジック, ヘッダー（JSON）の長さ
+_ALIGNMENT = 8
+
+# 1リソース分の固定長レコード。文字列は文字列表の添字、タグ・metadata は (キー, 値) 表の範囲
+RECORD_DTYPE = np.dtype([
+    ('id', '<u4'), ('name', '<u4'), ('type', '<u4'), ('region', '<u4'), ('status', '<u4'),
+    ('created_at', '<i8'),
+    ('tags_start', '<u4'), ('tags_count', '<u4'),
+    ('metadata_start', '<u4'), ('metadata_count', '<u4'),
+])
+
+
+class _SnapshotBuilder:
+    """
+    キャッシュの内容を文字列表・(キー, 値) 表・レコード表に変換する
+    """
+
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.pairs: List[Tuple[int, int]] = []
+
+    def string(self, value: Any) -> int:
+        value = '' if value is None else str(value)
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def pair_range(self, items) -> Tuple[int, int]:
+        start = len(self.pairs)
+        for key, value in items:
+            if value is not None:
+                self.pairs.append((self.string(key), self.string(value)))
+        return start, len(self.pairs) - start
+
+    def records(self, records: List[Any], provider: str, service: str) -> np.ndarray:
+        table = np.zeros(len(records), dtype=RECORD_DTYPE)
+        for i, record in enumerate(records):
+            resource = Resource.coerce(record, provider, service)
+            tags_start, tags_count = self.pair_range(resource.tags or ())
+            metadata_start, metadata_count = self.pair_range((resource.metadata or {}).items())
+            table[i] = (self.string(resource.id), self.string(resource.name), self.string(resource.type),
+                        self.string(resource.region), self.string(resource.status), resource.created_at,
+                        tags_start, tags_count, metadata_start, metadata_count)
+        return table
+
+
+def save_snapshot(cache: InventoryCache, path: str) -> int:
+    """
+    キャッシュ済みのリソース一覧をスナップショットファイルに書き出す（書き出した件数を返す）
+
+    一時ファイルに書いてから置き換えるため、読み込み中（メモリマップ中）のファイルは壊れない
+    """
+    builder = _SnapshotBuilder()
+    slices = []
+    tables = []
+    for inventory_slice in sorted(cache.slices(), key=lambda s: s.key):
+        provider, service = inventory_slice.key
+        tables.append(builder.records(inventory_slice.records, provider, service))
+        slices.append({
+            'provider': provider, 'service': service,
+            'fetched_at': inventory_slice.fetched_at, 'modified_at': inventory_slice.modified_at,
+            'version': inventory_slice.version, 'digest': inventory_slice.digest,
+        })
+
+    encoded = [value.encode('utf-8') for value in builder.strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    sections = [offsets.tobytes(), b''.join(encoded),
+                np.array(builder.pairs, dtype='<u4').reshape(-1, 2).tobytes()]
+    sections.extend(table.tobytes() for table in tables)
+
+    # 各セクションの開始位置（ヘッダーの直後から 8 バイト境界に揃える）
+    layout = []
+    position = 0
+    for section in sections:
+        layout.append((position, len(section)))
+        position += len(section) + (-len(section) % _ALIGNMENT)
+    for entry, (offset, length) in zip(slices, layout[3:]):
+        entry['offset'], entry['count'] = offset, length // RECORD_DTYPE.itemsize
+    header = json.dumps({
+        'saved_at': time.time(),
+        'strings': {'count': len(encoded), 'offsets': layout[0][0], 'data': layout[1][0]},
+        'pairs': {'offset': layout[2][0], 'count': len(builder.pairs)},
+        'slices': slices,
+    }).encode('utf-8')
+    header += b' ' * (-(_PREAMBLE.size + len(header)) % _ALIGNMENT)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_PREAMBLE.pack(_MAGIC, len(header)))
+        f.write(header)
+        for section in sections:
+            f.write(section)
+            f.write(b'\0' * (-len(section) % _ALIGNMENT))
+    os.replace(temporary, path)
+    return sum(len(table) for table in tables)
+
+
+class Snapshot:
+    """
+    メモリマップしたスナップショット。文字列・レコードは参照されるまで復元しない
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _PREAMBLE.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"スナップショットの形式が不正です: {path}")
+        base = _PREAMBLE.size + header_length
+        self.header = json.loads(bytes(self._map[_PREAMBLE.size:base]))
+        self.saved_at: float = self.header['saved_at']
+
+        buffer = memoryview(self._map)
+        strings = self.header['strings']
+        self._offsets = np.frombuffer(buffer, dtype='<u8', count=strings['count'] + 1,
+                                      offset=base + strings['offsets'])
+        self._data_offset = base + strings['data']
+        pairs = self.header['pairs']
+        self.pairs = np.frombuffer(buffer, dtype='<u4', count=pairs['count'] * 2,
+                                   offset=base + pairs['offset']).reshape(-1, 2)
+        self._base = base
+        self._buffer = buffer
+        self._strings: Dict[int, str] = {}
+
+    def string(self, index: int) -> str:
+        value = self._strings.get(index)
+        if value is None:
+            start = self._data_offset + int(self._offsets[index])
+            end = self._data_offset + int(self._offsets[index + 1])
+            value = self._strings[index] = str(self._map[start:end], 'utf-8')
+        return value
+
+    def slices(self) -> List[Tuple[Dict[str, Any], 'SnapshotRecords']]:
+        """
+        (スライスの情報, リソース一覧) の一覧
+        """
+        result = []
+        for entry in self.header['slices']:
+            table = np.frombuffer(self._buffer, dtype=RECORD_DTYPE, count=entry['count'],
+                                  offset=self._base + entry['offset'])
+            result.append((entry, SnapshotRecords(self, table, entry['provider'], entry['service'])))
+        return result
+
+
+class SnapshotRecords(Sequence):
+    """
+    スナップショット内のリソース一覧。リストと同様に扱え、参照されたリソースのみ Resource に復元する
+    """
+
+    def __init__(self, snapshot: Snapshot, table: np.ndarray, provider: str, service: str):
+        self.snapshot = snapshot
+        self.table = table
+        self.provider = provider
+        self.service = service
+        self._resources: List[Optional[Resource]] = [None] * len(table)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        resource = self._resources[index]
+        if resource is None:
+            resource = self._resources[index] = self._decode(self.table[index])
+        return resource
+
+    def _decode(self, row) -> Resource:
+        string = self.snapshot.string
+
+        def pairs(start, count):
+            start = int(start)
+            return [(string(int(k)), string(int(v)))
+                    for k, v in self.snapshot.pairs[start:start + int(count)]]
+
+        return Resource(
+            id=string(row['id']),
+            name=string(row['name']),
+            type=string(row['type']),
+            provider=self.provider,
+            service=self.service,
+            region=string(row['region']),
+            status=string(row['status']),
+            created_at=int(row['created_at']),
+            tags=pairs(row['tags_start'], row['tags_count']),
+            metadata=dict(pairs(row['metadata_start'], row['metadata_count']))
+        )
+
+    def column(self, name: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        分類列を (コード配列, 辞書) で返す（リソースを復元せずに列指向の集計に使う）
+        """
+        if name in ('provider', 'service'):
+            value = self.provider if name == 'provider' else self.service
+            return np.zeros(len(self), dtype=np.int32), [value]
+        indexes, codes = np.unique(self.table[name], return_inverse=True)
+        return codes.astype(np.int32), [self.snapshot.string(int(i)) for i in indexes]
+
+
+def restore_snapshot(cache: InventoryCache, path: str) -> List[Tuple[str, str]]:
+    """
+    スナップショットをメモリマップしてキャッシュに復元する（復元したスライスのキーを返す）
+    """
+    if not os.path.exists(path):
+        return []
+    started = time.perf_counter()
+    snapshot = Snapshot(path)
+    restored = []
+    for entry, records in snapshot.slices():
+        if cache.peek(entry['provider'], entry['service']) is not None:
+            continue
+        cache.restore(entry['provider'], entry['service'], records, entry['fetched_at'],
+                      entry['version'], entry['modified_at'], entry['digest'])
+        restored.append((entry['provider'], entry['service']))
+    logger.info(f"インベントリのスナップショットを復元: {len(restored)} スライス "
+                f"({(time.perf_counter() - started) * 1000:.1f} ms, "
+                f"{int(time.time() - snapshot.saved_at)} 秒前に保存)")
+    return restored
+
+
+class SnapshotWriter:
+    """
+    キャッシュの内容が変わっていれば一定間隔でスナップショットを書き出すバックグラウンドスレッド
+    """
+
+    def __init__(self, cache: InventoryCache, path: str, interval: float = SNAPSHOT_INTERVAL):
+        self.cache = cache
+        self.path = path
+        self.interval = interval
+        self._signature: Tuple = self._current_signature()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='inventory-snapshot', daemon=True)
+
+    def start(self) -> 'SnapshotWriter':
+        self._thread.start()
+        atexit.register(self.save)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def save(self) -> bool:
+        """
+        前回の書き出し以降にキャッシュが更新されていれば書き出す
+        """
+        signature = self._current_signature()
+        if not signature or signature == self._signature:
+            return False
+        try:
+            count = save_snapshot(self.cache, self.path)
+            self._signature = signature
+            logger.info(f"インベントリのスナップショットを保存: {count} 件 ({self.path})")
+            return True
+        except Exception as e:
+            logger.error(f"インベントリのスナップショット保存エラー: {str(e)}")
+            return False
+
+    def _current_signature(self) -> Tuple:
+        return tuple(sorted((s.key, s.version) for s in self.cache.slices()))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save()
+
+
+def _refresh_restored(cache: InventoryCache, keys: List[Tuple[str, str]]):
+    """
+    復元したスライスをクラウドから取得し直す（起動直後のバックグラウンド処理）
+    """
+    from app.services.mcp_service import MCPService
+
+    mcp_service = MCPService()
+    for provider, service in keys:
+        if provider == 'aws':
+            cache.refresh(provider, service, lambda s=service: mcp_service.get_aws_resources(s))
+        else:
+            cache.refresh(provider, service, lambda s=service: mcp_service.get_azure_resources(s))
+
+
+_writer: Optional[SnapshotWriter] = None
+_writer_lock = threading.Lock()
+
+
+def init_inventory_snapshot(app):
+    """
+    INVENTORY_SNAPSHOT_PATH が設定されている場合、起動時にスナップショットから復元し、
+    バックグラウンドでの再取得と定期的な書き出しを開始する
+    """
+    global _writer
+    path = os.getenv('INVENTORY_SNAPSHOT_PATH')
+    if not path:
+        return
+
+    cache = get_inventory_cache()
+    with _writer_lock:
+        if _writer is not None:
+            app.extensions['inventory_snapshot'] = _writer
+            return
+        try:
+            restored = restore_snapshot(cache, path)
+        except Exception as e:
+            logger.error(f"インベントリのスナップショットを復元できません ({path}): {str(e)}")
+            restored = []
+        if restored:
+            threading.Thread(target=_refresh_restored, args=(cache, restored),
+                             name='inventory-warm-start', daemon=True).start()
+        _writer = SnapshotWriter(cache, path).start()
+        app.extensions['inventory_snapshot'] = _writer
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 何回の書き込みごとに容量を確認して古いエントリを削除するか
+_EVICTION_INTERVAL = 32
+# 参照日時の更新を省略する間隔（秒）。ヒットのたびに書き込まないようにする
+_TOUCH_INTERVAL = 60
+# 容量超過時、上限のこの割合まで削除する
+_EVICTION_TARGET = 0.9
+
+_WHITESPACE = re.compile(r'\s+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    キャッシュキー用にプロンプトを正規化（全角・半角の統一と空白の圧縮）
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def cache_key(kind: str, model: str, system_prompt: str, prompt: str, max_tokens: int) -> str:
+    """
+    生成の種類・モデル・プロンプト・最大トークン数からキャッシュキーを求める
+    """
+    payload = json.dumps([kind, model, normalize_prompt(system_prompt), normalize_prompt(prompt), max_tokens],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    LLM の生成結果を SQLite に保存するディスクキャッシュ
+
+    WAL モードで開くため、gunicorn の複数ワーカーから同じファイルを同時に読み書きできる。
+    容量の上限を超えた場合は最後に参照された日時の古いものから削除する（LRU）
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None, ttl: Optional[float] = None):
+        self.path = path
+        if max_bytes is None:
+            max_bytes = int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl is not None else float(os.getenv('LLM_CACHE_TTL', 7 * 86400))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._model: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        self._evict()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        スレッドごとの接続（fork 後の子プロセスでは開き直す）
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA busy_timeout=5000')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def use_model(self, model: str):
+        """
+        使用するモデルを設定する。以前と異なるモデルで作られたエントリは破棄する
+        """
+        if model == self._model:
+            return
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM meta WHERE name = 'model'").fetchone()
+        if row is None or row[0] != model:
+            deleted = connection.execute('DELETE FROM entries WHERE model != ?', (model,)).rowcount
+            connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('model', ?)", (model,))
+            if row is not None:
+                logger.info(f"LLM キャッシュ: モデルが {row[0]} から {model} に変わったため {deleted} 件を破棄")
+        self._model = model
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュ済みの生成結果を返す（なければ None）
+        """
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT value, created_at, accessed_at FROM entries WHERE key = ?', (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            if now - row[2] > _TOUCH_INTERVAL:
+                connection.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"LLM キャッシュの読み込みに失敗: {str(e)}")
+            return None
+
+    def put(self, key: str, value: str, model: str = ''):
+        """
+        生成結果を保存する
+        """
+        now = time.time()
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO entries (key, model, value, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model or self._model or '', value, len(value.encode('utf-8')), now, now))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM キャッシュへの書き込みに失敗: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % _EVICTION_INTERVAL == 0
+        if evict:
+            self._evict()
+
+    def size(self) -> int:
+        """
+        保存しているエントリの合計バイト数
+        """
+        return self._connection().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        件数・容量・このプロセスでのヒット数
+        """
+        entries, total = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """
+        すべてのエントリを削除
+        """
+        self._connection().execute('DELETE FROM entries')
+
+    def _evict(self):
+        """
+        期限切れのエントリと、容量の上限を超えた分の参照日時の古いエントリを削除する
+        """
+        try:
+            connection = self._connection()
+            if self.ttl:
+                connection.execute('DELETE FROM entries WHERE created_at < ?', (time.time() - self.ttl,))
+            total = self.size()
+            if total <= self.max_bytes:
+                return
+
+            excess = total - int(self.max_bytes * _EVICTION_TARGET)
+            keys = []
+            for key, size in connection.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            connection.executemany('DELETE FROM entries WHERE key = ?', keys)
+            logger.info(f"LLM キャッシュ: 容量上限のため {len(keys)} 件を削除")
+        except sqlite3.Error as e:
+            logger.warning(f"LLM キャッシュの整理に失敗: {str(e)}")
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_path: Optional[str] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    プロセス内で共有する LLM キャッシュを取得（LLM_CACHE_PATH が未設定の場合は None）
+    """
+    global _llm_cache, _llm_cache_path
+    path = os.getenv('LLM_CACHE_PATH')
+    if not path:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None or _llm_cache_path != path:
+            try:
+                _llm_cache = LLMCache(path)
+                _llm_cache_path = path
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"LLM キャッシュを開けません ({path}): {str(e)}")
+                return None
+        return _llm_cache
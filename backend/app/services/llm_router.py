@@ -0,0 +1,254 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from app.services.llm_scheduler import (CancelToken, LLMCancelledError, LLMScheduler, LLMQueueTimeoutError,
+                                       PRIORITY_NORMAL)
+from app.utils import tracing
+from app.utils.logger import get_logger
+from app.utils.metrics import LLM_QUEUE_WAIT_SECONDS, LLM_REQUEST_SECONDS, LLM_REQUESTS_IN_FLIGHT
+
+logger = get_logger(__name__)
+
+# ヘッジ（予備バックエンドへの並行リクエスト）用のワーカー
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm-hedge')
+
+
+@dataclass
+class LLMBackend:
+    """
+    LLM バックエンド1台分の接続情報と観測統計
+    """
+    name: str
+    llm_type: str  # 'ollama' or 'openai'
+    model: str
+    client: Any
+    scheduler: LLMScheduler
+    host: Optional[str] = None
+    outstanding: int = 0
+    ewma_latency: float = 1.0
+    requests: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def score(self) -> float:
+        """
+        未完了リクエスト数と平均レイテンシから負荷を見積もる（小さいほど空いている）
+        """
+        return (self.outstanding + self.scheduler.queued + 1) * self.ewma_latency
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        辞書形式に変換
+        """
+        return {
+            'name': self.name,
+            'type': self.llm_type,
+            'model': self.model,
+            'host': self.host,
+            'outstanding': self.outstanding,
+            'ewma_latency': round(self.ewma_latency, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.requests, 3) if self.requests else 0.0,
+            'ejections': self.ejections,
+            'ejected': self.ejected_until > time.monotonic(),
+            'scheduler': self.scheduler.stats()
+        }
+
+
+class LLMRouter:
+    """
+    複数の LLM バックエンドへ負荷分散し、必要に応じてヘッジリクエストを行うルーター
+    """
+
+    def __init__(self, backends: List[LLMBackend], hedge_delay: float = 0.0,
+                 eject_threshold: int = 3, eject_duration: float = 30.0,
+                 ewma_alpha: float = 0.3):
+        self.backends = backends
+        self.hedge_delay = hedge_delay
+        self.eject_threshold = eject_threshold
+        self.eject_duration = eject_duration
+        self.ewma_alpha = ewma_alpha
+
+    def select(self, exclude: Optional[List[LLMBackend]] = None,
+               llm_type: Optional[str] = None) -> Optional[LLMBackend]:
+        """
+        最も空いているバックエンドを選択（全台排除中の場合は排除中のものも候補にする）
+
+        llm_type を指定した場合はその種類のバックエンドのみを候補にする
+        """
+        exclude = exclude or []
+        candidates = [b for b in self.backends
+                      if b not in exclude and (llm_type is None or b.llm_type == llm_type)]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        available = [b for b in candidates if b.is_available(now)] or candidates
+        return min(available, key=lambda b: b.score())
+
+    def call(self, fn: Callable[[LLMBackend], Any], priority: int = PRIORITY_NORMAL,
+             hedge: bool = False, llm_type: Optional[str] = None) -> Any:
+        """
+        選択したバックエンドで fn を実行する。失敗時は別のバックエンドで1回だけ再試行する
+
+        llm_type を指定した場合はその種類のバックエンドのみを使う（埋め込みなど種類に依存する処理用）
+        """
+        primary = self.select(llm_type=llm_type)
+        if primary is None:
+            raise RuntimeError("利用可能なLLMバックエンドがありません")
+
+        if hedge and self.hedge_delay > 0 and len(self.backends) > 1:
+            return self._call_hedged(fn, primary, priority, llm_type)
+
+        try:
+            return self._invoke(primary, fn, priority)
+        except LLMQueueTimeoutError:
+            raise
+        except Exception as e:
+            fallback = self.select(exclude=[primary], llm_type=llm_type)
+            if fallback is None:
+                raise
+            logger.warning(f"LLMバックエンド {primary.name} が失敗したため {fallback.name} で再試行: {str(e)}")
+            return self._invoke(fallback, fn, priority)
+
+    def _call_hedged(self, fn: Callable[[LLMBackend], Any], primary: LLMBackend,
+                     priority: int, llm_type: Optional[str] = None) -> Any:
+        """
+        一次バックエンドが hedge_delay 以内に応答しない場合、二次バックエンドにも同じリクエストを送る。
+        hedge_delay 以内に一次バックエンドが失敗した場合も、call() と同様に二次バックエンドで1回だけ再試行する
+
+        キュー待ちの期限はワーカーへ投入した時点から数え、結果が返った時点で残りのリクエストは
+        実行待ちであれば取り消す
+        """
+        invoke = tracing.propagate(self._invoke)
+        futures = {}
+
+        def submit(backend: LLMBackend):
+            cancel = CancelToken()
+            future = _hedge_executor.submit(invoke, backend, fn, priority, time.monotonic(), cancel)
+            futures[future] = cancel
+
+        submit(primary)
+        try:
+            done, _ = wait(futures, timeout=self.hedge_delay)
+
+            error = next(iter(done)).exception() if done else None
+            if isinstance(error, LLMQueueTimeoutError):
+                raise error
+            if not done or error is not None:
+                secondary = self.select(exclude=[primary], llm_type=llm_type)
+                if secondary is not None:
+                    if error is not None:
+                        logger.warning("LLMバックエンド %s が失敗したため %s で再試行: %s",
+                                       primary.name, secondary.name, error)
+                    else:
+                        logger.info("LLMヘッジリクエストを送信: %s", secondary.name)
+                    submit(secondary)
+
+            pending = set(futures)
+            last_error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        last_error = e
+            raise last_error
+        finally:
+            for future, cancel in futures.items():
+                if not future.done():
+                    future.cancel()
+                    cancel.cancel()
+
+    def _invoke(self, backend: LLMBackend, fn: Callable[[LLMBackend], str], priority: int,
+                queued_at: Optional[float] = None, cancel: Optional[CancelToken] = None) -> str:
+        """
+        スケジューラの実行枠内で fn を実行し、レイテンシとエラーを記録する
+
+        queued_at を指定した場合は、その時点からの経過時間もキュー待ちの期限に含める
+        """
+        timeout = None
+        if queued_at is None:
+            queued_at = time.monotonic()
+        else:
+            timeout = max(0.0, backend.scheduler.queue_timeout - (time.monotonic() - queued_at))
+        with backend.scheduler.slot(priority, timeout, cancel):
+            if cancel is not None and cancel.cancelled:
+                raise LLMCancelledError(f"LLM の実行を取り消しました ({backend.name})")
+            started = time.monotonic()
+            LLM_QUEUE_WAIT_SECONDS.labels(backend.name).observe(started - queued_at)
+            in_flight = LLM_REQUESTS_IN_FLIGHT.labels(backend.name)
+            in_flight.inc()
+            with backend._lock:
+                backend.outstanding += 1
+                backend.requests += 1
+            try:
+                with tracing.span('llm.generate', **{'llm.backend': backend.name, 'llm.model': backend.model,
+                                                     'llm.queue_wait': round(started - queued_at, 6)}):
+                    result = fn(backend)
+            except Exception:
+                LLM_REQUEST_SECONDS.labels(backend.name, 'error').observe(time.monotonic() - started)
+                self._record_failure(backend)
+                raise
+            else:
+                latency = time.monotonic() - started
+                LLM_REQUEST_SECONDS.labels(backend.name, 'success').observe(latency)
+                self._record_success(backend, latency)
+                return result
+            finally:
+                in_flight.dec()
+                with backend._lock:
+                    backend.outstanding -= 1
+
+    def _record_success(self, backend: LLMBackend, latency: float):
+        with backend._lock:
+            backend.ewma_latency = (self.ewma_alpha * latency
+                                    + (1 - self.ewma_alpha) * backend.ewma_latency)
+            backend.consecutive_errors = 0
+
+    def _record_failure(self, backend: LLMBackend):
+        with backend._lock:
+            backend.errors += 1
+            backend.consecutive_errors += 1
+            if backend.consecutive_errors >= self.eject_threshold:
+                backend.ejected_until = time.monotonic() + self.eject_duration
+                backend.ejections += 1
+                backend.consecutive_errors = 0
+                logger.warning(f"LLMバックエンド {backend.name} を {self.eject_duration} 秒間除外します")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        バックエンドごとの統計を取得
+        """
+        return [backend.to_dict() for backend in self.backends]
+
+
+def parse_backend_specs(value: str) -> List[Dict[str, Optional[str]]]:
+    """
+    LLM_BACKENDS の設定値を解析する
+
+    形式: "<type>:<model>[@<host>]" をカンマ区切りで列挙
+    例: "ollama:llama2@http://ollama-1:11434,ollama:llama2@http://ollama-2:11434,openai:gpt-4o-mini"
+    """
+    specs = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        llm_type, _, rest = item.partition(':')
+        model, _, host = rest.partition('@')
+        specs.append({
+            'type': llm_type.strip().lower(),
+            'model': model.strip() or None,
+            'host': host.strip() or None
+        })
+    return specs
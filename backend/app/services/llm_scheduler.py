@@ -0,0 +1,229 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 優先度（値が小さいほど先に処理される）
+PRIORITY_HIGH = 0     # 意図解析などの短いプロンプト
+PRIORITY_NORMAL = 10  # 一般的な質問への回答など
+
+
+class LLMQueueTimeoutError(Exception):
+    """
+    LLM の実行待ちが期限内に開始できなかったことを表す例外
+    """
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMCancelledError(Exception):
+    """
+    実行を開始する前に取り消されたことを表す例外
+    """
+
+
+class CancelToken:
+    """
+    実行待ちの取り消しを伝えるトークン
+
+    cancel() すると、このトークンで待機中の acquire() はキューから外れて LLMCancelledError になる
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _on_cancel(self, callback: Callable[[], None]):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+class _Waiter:
+    """
+    キューで実行枠を待っているリクエスト
+    """
+    __slots__ = ('event', 'granted', 'cancelled')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """
+    バックエンドごとの同時実行数を制限し、超過分を優先度付きキューで待機させるスケジューラ
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 1,
+                 max_queue_size: int = 32, queue_timeout: float = 30.0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._queued = 0
+        self._avg_service_time = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None,
+                cancel: Optional[CancelToken] = None):
+        """
+        実行枠を取得する。期限内に取得できない場合は LLMQueueTimeoutError、
+        待機中に cancel が取り消された場合は LLMCancelledError を送出
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._queued:
+                self._in_flight += 1
+                return
+            if self._queued >= self.max_queue_size:
+                raise LLMQueueTimeoutError(
+                    f"LLM キューが満杯です ({self.name})", self._retry_after())
+            waiter = _Waiter()
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self._queued += 1
+
+        if cancel is not None:
+            cancel._on_cancel(lambda: self._abandon(waiter))
+        if waiter.event.wait(timeout):
+            if waiter.granted:
+                return
+            raise LLMCancelledError(f"LLM の実行待ちを取り消しました ({self.name})")
+
+        with self._lock:
+            if waiter.granted:
+                # タイムアウトと同時に枠が割り当てられた場合はそのまま実行する
+                return
+            if waiter.cancelled:
+                raise LLMCancelledError(f"LLM の実行待ちを取り消しました ({self.name})")
+            waiter.cancelled = True
+            self._queued -= 1
+
+        logger.warning(f"LLM キュー待ちがタイムアウトしました ({self.name})")
+        raise LLMQueueTimeoutError(
+            f"LLM の実行待ちがタイムアウトしました ({self.name})", self._retry_after())
+
+    def _abandon(self, waiter: _Waiter):
+        """
+        枠が割り当てられていなければ待機者をキューから外して起こす
+        """
+        with self._lock:
+            if waiter.granted or waiter.cancelled:
+                return
+            waiter.cancelled = True
+            self._queued -= 1
+        waiter.event.set()
+
+    def release(self, service_time: Optional[float] = None):
+        """
+        実行枠を返却し、待機中のリクエストがあれば優先度順に引き渡す
+        """
+        with self._lock:
+            if service_time is not None:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                # 実行枠をそのまま待機者へ引き渡す（in_flight は変化しない）
+                waiter.granted = True
+                self._queued -= 1
+                waiter.event.set()
+                return
+            self._in_flight -= 1
+
+    def slot(self, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None,
+             cancel: Optional[CancelToken] = None):
+        """
+        with 文で利用するための実行枠コンテキスト
+        """
+        return _SchedulerSlot(self, priority, timeout, cancel)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        スケジューラの状態を取得
+        """
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self._in_flight,
+            'queued': self._queued,
+            'avg_service_time': round(self._avg_service_time, 3)
+        }
+
+    def _retry_after(self) -> int:
+        """
+        待ち行列の長さと平均処理時間から再試行までの秒数を見積もる
+        """
+        backlog = self._queued + self._in_flight
+        estimate = backlog * self._avg_service_time / self.max_concurrency
+        return max(1, int(estimate + 0.999))
+
+
+class _SchedulerSlot:
+    def __init__(self, scheduler: LLMScheduler, priority: int, timeout: Optional[float],
+                 cancel: Optional[CancelToken] = None):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.timeout = timeout
+        self.cancel = cancel
+        self._started = None
+
+    def __enter__(self):
+        self.scheduler.acquire(self.priority, self.timeout, self.cancel)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.scheduler.release(time.monotonic() - self._started)
+        return False
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str) -> LLMScheduler:
+    """
+    バックエンド名に対応するスケジューラを取得（プロセス内で共有）
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            scheduler = LLMScheduler(
+                name,
+                max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 1)),
+                max_queue_size=int(os.getenv('LLM_MAX_QUEUE_SIZE', 32)),
+                queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', 30))
+            )
+            _schedulers[name] = scheduler
+        return scheduler
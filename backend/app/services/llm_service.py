@@ -1,198 +1,468 @@
 import os
 import json
-import re
-from typing import Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+from app.services.llm_cache import cache_key, get_llm_cache
+from app.services.llm_router import LLMBackend, LLMRouter, parse_backend_specs
+from app.services.llm_scheduler import (
+    get_scheduler, LLMQueueTimeoutError, PRIORITY_HIGH, PRIORITY_NORMAL
+)
+from app.services.intent_schema import (
+    INTENT_SCHEMA, INTENT_MAX_TOKENS, build_intent_prompt, normalize_intent
+)
+from app.services.context_builder import resource_field
+from app.utils.json_schema import validate_json
+from app.utils.tokens import chunk_by_tokens, estimate_tokens
+from app.utils import tracing
+from app.utils.lazy_import import LazyImports, module_available
 from app.utils.logger import get_logger
+from app.utils.metrics import record_cache
 
 logger = get_logger(__name__)
 
-# 条件付きインポート
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
-    logger.warning("Ollama がインストールされていません。ローカルLLM機能は利用できません。")
-
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI がインストールされていません。クラウドLLM機能は利用できません。")
+# 条件付き（SDK は使うプロバイダーのクライアントを作る時点で読み込む。未インストールの場合は None）
+OLLAMA_AVAILABLE = module_available('ollama')
+OPENAI_AVAILABLE = module_available('openai')
+_sdk = LazyImports(__name__, {'ollama': 'ollama', 'OpenAI': 'openai:OpenAI'}, optional=('ollama', 'OpenAI'))
+__getattr__ = _sdk.resolve
+
+# バックエンドが1台も初期化できなかった場合に再初期化を試みる間隔（秒）
+_ROUTER_RETRY_INTERVAL = 30
+
+# 分割要約（map-reduce）で1つのチャンクに含める入力のトークン予算
+MAP_REDUCE_CHUNK_TOKENS = int(os.getenv('MAP_REDUCE_CHUNK_TOKENS', 1500))
+# チャンクごとの要約の最大トークン数
+MAP_REDUCE_SUMMARY_TOKENS = int(os.getenv('MAP_REDUCE_SUMMARY_TOKENS', 300))
+# チャンクの要約をプロセス内に保持する件数（内容のハッシュをキーとする）
+MAP_REDUCE_CACHE_SIZE = int(os.getenv('MAP_REDUCE_CACHE_SIZE', 1024))
+
+_chunk_summaries: OrderedDict = OrderedDict()
+_chunk_summaries_lock = threading.Lock()
+
+_router: Optional[LLMRouter] = None
+_router_config: Optional[tuple] = None
+_router_built_at = 0.0
+_router_lock = threading.Lock()
+
+
+def _router_config_key() -> tuple:
+    return tuple(os.getenv(name, '') for name in (
+        'LLM_BACKENDS', 'LLM_TYPE', 'LLM_MODEL', 'OLLAMA_HOST', 'OPENAI_MODEL'))
+
+
+def get_router() -> LLMRouter:
+    """
+    プロセス内で共有する LLM ルーターを取得（設定が変わった場合は再構築）
+    """
+    global _router, _router_config, _router_built_at
+
+    with _router_lock:
+        config = _router_config_key()
+        stale = (_router is not None and not _router.backends
+                 and time.monotonic() - _router_built_at > _ROUTER_RETRY_INTERVAL)
+        if _router is None or config != _router_config or stale:
+            _router = LLMRouter(
+                _build_backends(),
+                hedge_delay=float(os.getenv('LLM_HEDGE_DELAY_MS', 0)) / 1000,
+                eject_threshold=int(os.getenv('LLM_EJECT_THRESHOLD', 3)),
+                eject_duration=float(os.getenv('LLM_EJECT_SECONDS', 30))
+            )
+            _router_config = config
+            _router_built_at = time.monotonic()
+        return _router
+
+
+def _build_backends() -> List[LLMBackend]:
+    """
+    LLM_BACKENDS（未設定の場合は LLM_TYPE / LLM_MODEL）からバックエンド一覧を構築
+    """
+    backends_env = os.getenv('LLM_BACKENDS')
+    if backends_env:
+        specs = parse_backend_specs(backends_env)
+    else:
+        specs = [{
+            'type': os.getenv('LLM_TYPE', 'ollama'),  # 'ollama' or 'openai'
+            'model': None,
+            'host': None
+        }]
+
+    backends = []
+    for spec in specs:
+        if spec['type'] == 'ollama' and OLLAMA_AVAILABLE:
+            backend = _initialize_ollama(
+                spec['host'] or os.getenv('OLLAMA_HOST', 'http://localhost:11434'),
+                spec['model'] or os.getenv('LLM_MODEL', 'tinyllama'))
+        elif spec['type'] == 'openai' and OPENAI_AVAILABLE:
+            backend = _initialize_openai(
+                spec['model'] or os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'))
+        else:
+            if spec['type'] == 'ollama':
+                logger.warning("Ollama がインストールされていません。ローカルLLM機能は利用できません。")
+            elif spec['type'] == 'openai':
+                logger.warning("OpenAI がインストールされていません。クラウドLLM機能は利用できません。")
+            logger.error(f"指定されたLLMタイプ '{spec['type']}' は利用できません")
+            backend = None
+        if backend:
+            backends.append(backend)
+    return backends
+
+
+def _initialize_ollama(host: str, model_name: str) -> Optional[LLMBackend]:
+    """
+    Ollama クライアントを初期化
+    """
+    try:
+        client = _sdk.ollama.Client(host=host)
+        # モデルの存在確認
+        models = client.list()
+        model_names = [model['name'] for model in models['models']]
+
+        if model_name not in model_names:
+            logger.warning(
+                f"モデル '{model_name}' が見つかりません。利用可能なモデル: {model_names}")
+            if model_names:
+                model_name = model_names[0]
+                logger.info(f"デフォルトモデル '{model_name}' を使用します")
+            else:
+                logger.error("利用可能なモデルがありません。Ollamaでモデルをプルしてください。")
+                return None
+
+        logger.info(f"Ollama クライアントが初期化されました (ホスト: {host}, モデル: {model_name})")
+        name = f"ollama:{model_name}@{host}"
+        return LLMBackend(name=name, llm_type='ollama', model=model_name, client=client,
+                          scheduler=get_scheduler(name), host=host)
+    except Exception as e:
+        logger.error(f"Ollama クライアントの初期化に失敗: {str(e)}")
+        return None
+
+
+def _initialize_openai(model_name: str) -> Optional[LLMBackend]:
+    """
+    OpenAI クライアントを初期化
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        logger.warning("OPENAI_API_KEY が設定されていません")
+        return None
+
+    try:
+        client = _sdk.OpenAI(api_key=api_key)
+        logger.info(f"OpenAI クライアントが初期化されました (モデル: {model_name})")
+        name = f"openai:{model_name}"
+        return LLMBackend(name=name, llm_type='openai', model=model_name, client=client,
+                          scheduler=get_scheduler(name))
+    except Exception as e:
+        logger.error(f"OpenAI クライアントの初期化に失敗: {str(e)}")
+        return None
 
 
 class LLMService:
     def __init__(self):
         self.llm_type = os.getenv('LLM_TYPE', 'ollama')  # 'ollama' or 'openai'
-        self.ollama_client = None
-        self.openai_client = None
-        self.model_name = os.getenv('LLM_MODEL', 'tinyllama')
         # 日本語固定の仕様に変更
-        self._initialize_client()
+        self.router = get_router()
 
-    def _initialize_client(self):
+    @property
+    def model_name(self) -> Optional[str]:
         """
-        LLM クライアントを初期化
+        現在最も空いているバックエンドのモデル名
         """
-        if self.llm_type == 'ollama' and OLLAMA_AVAILABLE:
-            self._initialize_ollama()
-        elif self.llm_type == 'openai' and OPENAI_AVAILABLE:
-            self._initialize_openai()
-        else:
-            logger.error(f"指定されたLLMタイプ '{self.llm_type}' は利用できません")
+        backend = self.router.select()
+        return backend.model if backend else None
 
-    def _initialize_ollama(self):
+    def backend_stats(self) -> List[Dict[str, Any]]:
         """
-        Ollama クライアントを初期化
+        バックエンドごとのレイテンシ・エラー率・除外状況を取得
         """
-        try:
-            self.ollama_client = ollama.Client(
-                host=os.getenv('OLLAMA_HOST', 'http://localhost:11434'))
-            # モデルの存在確認
-            models = self.ollama_client.list()
-            model_names = [model['name'] for model in models['models']]
-
-            if self.model_name not in model_names:
-                logger.warning(
-                    f"モデル '{self.model_name}' が見つかりません。利用可能なモデル: {model_names}")
-                if model_names:
-                    self.model_name = model_names[0]
-                    logger.info(f"デフォルトモデル '{self.model_name}' を使用します")
-                else:
-                    logger.error("利用可能なモデルがありません。Ollamaでモデルをプルしてください。")
-                    return
-
-            logger.info(f"Ollama クライアントが初期化されました (モデル: {self.model_name})")
-        except Exception as e:
-            logger.error(f"Ollama クライアントの初期化に失敗: {str(e)}")
+        return self.router.stats()
+
+    def _cache_lookup(self, kind: str, system_prompt: str, prompt: str,
+                      max_tokens: int) -> Tuple[Optional[str], Optional[str]]:
+        """
+        ディスクキャッシュから生成結果を探す。(キャッシュキー, 結果) を返す（キャッシュ無効時はキーも None）
 
-    def _initialize_openai(self):
+        キーには設定中のモデル一覧を含め、モデルが変わった場合は以前のエントリを破棄する
         """
-        OpenAI クライアントを初期化
+        cache = get_llm_cache()
+        if cache is None:
+            return None, None
+        model = self._model_signature()
+        cache.use_model(model)
+        key = cache_key(kind, model, system_prompt, prompt, max_tokens)
+        cached = cache.get(key)
+        record_cache('llm', cached is not None)
+        return key, cached
+
+    def _model_signature(self) -> str:
         """
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            logger.warning("OPENAI_API_KEY が設定されていません")
-            return
+        設定中のモデル一覧（キャッシュキー用）
+        """
+        return ','.join(sorted({f"{b.llm_type}:{b.model}" for b in self.router.backends}))
 
-        try:
-            self.openai_client = OpenAI(api_key=api_key)
-            logger.info("OpenAI クライアントが初期化されました")
-        except Exception as e:
-            logger.error(f"OpenAI クライアントの初期化に失敗: {str(e)}")
+    def _cache_store(self, key: Optional[str], value: str):
+        cache = get_llm_cache()
+        if key is not None and cache is not None:
+            cache.put(key, value)
 
-    def generate_response(self, prompt: str, max_tokens: int = 1000, context: str = "") -> str:
+    def generate_response(self, prompt: str, max_tokens: int = 1000, context: str = "",
+                          priority: int = PRIORITY_NORMAL, hedge: bool = False) -> str:
         """
         LLMを使用してレスポンスを生成
+
+        実行枠が空くまで優先度順に待機し、待機期限を過ぎた場合は LLMQueueTimeoutError を送出する
         """
         # 日本語固定のシステムプロンプト
         system_prompt = """You are an expert in AWS and Azure cloud infrastructure."""
 
+        # 参考情報（インベントリ等）があれば質問の前に添付する
+        context_block = f"参考情報:\n{context}\n\n" if context else ""
+
         # ユーザープロンプトに日本語指示を追加
         japanese_prompt = f"""日本語で回答してください。
 
-質問: {prompt}
+{context_block}質問: {prompt}
 
 上記の質問について、日本語で分かりやすく回答してください。"""
 
-        if self.llm_type == 'ollama' and self.ollama_client:
-            return self._generate_ollama_response(system_prompt, japanese_prompt, max_tokens)
-        elif self.llm_type == 'openai' and self.openai_client:
-            return self._generate_openai_response(system_prompt, japanese_prompt, max_tokens)
-        else:
+        if not self.router.backends:
             return "LLMサービスが利用できません。設定を確認してください。"
 
-    def _generate_ollama_response(self, system_prompt: str, user_prompt: str, max_tokens: int) -> str:
+        key, cached = self._cache_lookup('text', system_prompt, japanese_prompt, max_tokens)
+        if cached is not None:
+            return cached
+
+        try:
+            text = self.router.call(
+                lambda backend: self._generate(backend, system_prompt, japanese_prompt, max_tokens),
+                priority=priority, hedge=hedge)
+        except LLMQueueTimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"レスポンス生成エラー: {str(e)}")
+            return f"レスポンス生成中にエラーが発生しました: {str(e)}"
+
+        # エラー時の文言はキャッシュしない
+        self._cache_store(key, text)
+        return text
+
+    def summarize_map_reduce(self, question: str, items: List[str], header: str = '',
+                             prompt: Optional[str] = None, max_tokens: int = 1000,
+                             chunk_tokens: int = MAP_REDUCE_CHUNK_TOKENS) -> str:
         """
-        Ollamaを使用してレスポンスを生成
+        トークン予算に収まらない量のデータ（行の並び）を分割して要約し、最終的な回答を生成する
+
+        items をチャンクに分けて並列に要約（map）し、部分要約が予算に収まるまでまとめ直した後（reduce）、
+        部分要約を参考情報として回答する。header は各チャンクの先頭に付ける（表の列名など）。
+        チャンクの要約は内容のハッシュでキャッシュするため、同じ質問ではデータの変わったチャンクのみ要約し直す。
+        prompt を省略した場合は question で回答を生成する
+        """
+        if not self.router.backends:
+            return "LLMサービスが利用できません。設定を確認してください。"
+
+        chunks = chunk_by_tokens(items, max(1, chunk_tokens - estimate_tokens(header)))
+        if header:
+            chunks = [f"{header}\n{chunk}" for chunk in chunks]
+        if len(chunks) <= 1:
+            return self.generate_response(prompt or question, max_tokens, context=''.join(chunks))
+
+        summaries = self._map_chunks(question, chunks)
+        while len(summaries) > 1 and sum(estimate_tokens(s) + 1 for s in summaries) > chunk_tokens:
+            regrouped = chunk_by_tokens(summaries, chunk_tokens)
+            if len(regrouped) >= len(summaries):
+                break
+            summaries = self._map_chunks(question, regrouped)
+        if not summaries:
+            return "要約の生成中にエラーが発生しました。"
+
+        logger.info("分割要約: %d 件を %d チャンクに分けて要約", len(items), len(chunks))
+        context = "\n\n".join(f"[{i + 1}] {summary}" for i, summary in enumerate(summaries))
+        return self.generate_response(prompt or question, max_tokens, context=context)
+
+    def _map_chunks(self, question: str, chunks: List[str]) -> List[str]:
+        """
+        チャンクをバックエンドの同時実行数まで並列に要約する（失敗したチャンクは除く）
+        """
+        workers = min(len(chunks), sum(b.scheduler.max_concurrency for b in self.router.backends))
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='llm-map') as executor:
+            summarize = tracing.propagate(lambda chunk: self._summarize_chunk(question, chunk))
+            summaries = list(executor.map(summarize, chunks))
+        return [summary for summary in summaries if summary]
+
+    def _summarize_chunk(self, question: str, chunk: str) -> Optional[str]:
+        """
+        1つのチャンクを質問に沿って要約する（プロセス内 → ディスクキャッシュの順に探し、なければ生成）
         """
+        system_prompt = "You are an expert in AWS and Azure cloud infrastructure. Summarize data concisely."
+        user_prompt = f"""質問: {question}
+
+次のデータのうち質問に関係する内容を、日本語で簡潔に要約してください。件数・名前・数値は省略しないでください。
+
+{chunk}"""
+        max_tokens = MAP_REDUCE_SUMMARY_TOKENS
+        memory_key = cache_key('map', self._model_signature(), system_prompt, user_prompt, max_tokens)
+        with _chunk_summaries_lock:
+            summary = _chunk_summaries.get(memory_key)
+            if summary is not None:
+                _chunk_summaries.move_to_end(memory_key)
+        record_cache('llm_chunk', summary is not None)
+        if summary is not None:
+            return summary
+
+        key, summary = self._cache_lookup('map', system_prompt, user_prompt, max_tokens)
+        if summary is None:
+            try:
+                summary = self.router.call(
+                    lambda backend: self._generate(backend, system_prompt, user_prompt, max_tokens))
+            except LLMQueueTimeoutError:
+                raise
+            except Exception as e:
+                logger.warning(f"チャンクの要約エラー: {str(e)}")
+                return None
+            self._cache_store(key, summary)
+
+        with _chunk_summaries_lock:
+            _chunk_summaries[memory_key] = summary
+            while len(_chunk_summaries) > MAP_REDUCE_CACHE_SIZE:
+                _chunk_summaries.popitem(last=False)
+        return summary
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], max_tokens: int = 256,
+                      priority: int = PRIORITY_HIGH, hedge: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        構造化出力モードで JSON を生成し、スキーマで検証する
+
+        日本語回答用のラッパーは付けず、Ollama は format=json、OpenAI は JSON モードを使用する。
+        生成・パース・検証のいずれかに失敗した場合は None を返す
+        """
+        if not self.router.backends:
+            return None
+
+        system_prompt = "You are a classifier. Output only JSON that matches the schema:\n" \
+            + json.dumps(schema, separators=(',', ':'))
+
+        key, text = self._cache_lookup('json', system_prompt, prompt, max_tokens)
         try:
-            response = self.ollama_client.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ],
-                options={
-                    "num_predict": max_tokens,
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1
-                }
+            if text is None:
+                text = self.router.call(
+                    lambda backend: self._generate_json(backend, system_prompt, prompt, max_tokens),
+                    priority=priority, hedge=hedge)
+            else:
+                key = None  # キャッシュから取得した結果は保存し直さない
+        except LLMQueueTimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"構造化出力の生成エラー: {str(e)}")
+            return None
+
+        try:
+            data = json.loads(text)
+        except (TypeError, ValueError) as e:
+            logger.error(f"構造化出力のJSONパースエラー: {str(e)}")
+            return None
+
+        errors = validate_json(data, schema)
+        if errors:
+            logger.warning(f"構造化出力がスキーマに一致しません: {errors}")
+            return None
+        # スキーマに一致した結果のみキャッシュする
+        self._cache_store(key, text)
+        return data
+
+    def _generate_json(self, backend: LLMBackend, system_prompt: str, user_prompt: str,
+                       max_tokens: int) -> str:
+        """
+        バックエンドの JSON 出力モードで生成する
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        if backend.llm_type == 'ollama':
+            response = backend.client.chat(
+                model=backend.model,
+                messages=messages,
+                format='json',
+                options={"num_predict": max_tokens, "temperature": 0}
             )
             return response['message']['content']
 
-        except Exception as e:
-            logger.error(f"Ollama レスポンス生成エラー: {str(e)}")
-            return f"レスポンス生成中にエラーが発生しました: {str(e)}"
+        response = backend.client.chat.completions.create(
+            model=backend.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            max_tokens=max_tokens,
+            temperature=0
+        )
+        return response.choices[0].message.content
+
+    def _generate(self, backend: LLMBackend, system_prompt: str, user_prompt: str,
+                  max_tokens: int) -> str:
+        """
+        バックエンドの種類に応じて生成処理を振り分ける
+        """
+        if backend.llm_type == 'ollama':
+            return self._generate_ollama_response(backend, system_prompt, user_prompt, max_tokens)
+        return self._generate_openai_response(backend, system_prompt, user_prompt, max_tokens)
 
-    def _generate_openai_response(self, system_prompt: str, user_prompt: str, max_tokens: int) -> str:
+    def _generate_ollama_response(self, backend: LLMBackend, system_prompt: str,
+                                  user_prompt: str, max_tokens: int) -> str:
+        """
+        Ollamaを使用してレスポンスを生成
+        """
+        response = backend.client.chat(
+            model=backend.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": user_prompt
+                }
+            ],
+            options={
+                "num_predict": max_tokens,
+                "temperature": 0.3,
+                "top_p": 0.9,
+                "repeat_penalty": 1.1
+            }
+        )
+        return response['message']['content']
+
+    def _generate_openai_response(self, backend: LLMBackend, system_prompt: str,
+                                  user_prompt: str, max_tokens: int) -> str:
         """
         OpenAIを使用してレスポンスを生成
         """
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-
-        except Exception as e:
-            logger.error(f"OpenAI レスポンス生成エラー: {str(e)}")
-            return f"レスポンス生成中にエラーが発生しました: {str(e)}"
+        response = backend.client.chat.completions.create(
+            model=backend.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": user_prompt
+                }
+            ],
+            max_tokens=max_tokens,
+            temperature=0.7
+        )
+        return response.choices[0].message.content
 
     def analyze_user_intent(self, user_message: str) -> dict:
         """
         ユーザーメッセージの意図を解析
         """
-        prompt = f"""
-        以下のユーザーメッセージを解析し、意図を特定してください。
-        
-        メッセージ: {user_message}
-        
-        以下の形式でJSONを返してください:
-        {{
-            "type": "resource_list|log_query|metric_query|general_question",
-            "provider": "aws|azure|both",
-            "service": "ec2|s3|vm|storage|etc",
-            "confidence": 0.0-1.0,
-            "parameters": {{}}
-        }}
-        
-        利用可能なタイプ:
-        - resource_list: リソース一覧の取得
-        - log_query: ログの検索・参照
-        - metric_query: メトリクスの取得
-        - general_question: 一般的な質問
-        """
-
-        response = self.generate_response(prompt, max_tokens=200)
-
-        try:
-            # JSONレスポンスを抽出
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-        except Exception as e:
-            logger.error(f"意図解析のJSONパースエラー: {str(e)}")
+        intent = self.generate_json(
+            build_intent_prompt(user_message), INTENT_SCHEMA, max_tokens=INTENT_MAX_TOKENS)
+        if intent:
+            return normalize_intent(intent)
 
         # デフォルトの意図を返す
         return {
@@ -215,10 +485,11 @@ class LLMService:
 
         for i, resource in enumerate(resources[:10], 1):  # 最初の10件のみ表示
             response += f"### {i}. {resource.get('name', 'N/A')}\n"
-            response += f"- **状態**: {resource.get('state', 'N/A')}\n"
-            response += f"- **タイプ**: {resource.get('type', 'N/A')}\n"
-            if resource.get('region'):
-                response += f"- **リージョン**: {resource.get('region')}\n"
+            response += f"- **状態**: {resource_field(resource, 'state', 'N/A')}\n"
+            response += f"- **タイプ**: {resource_field(resource, 'type', 'N/A')}\n"
+            region = resource_field(resource, 'region')
+            if region:
+                response += f"- **リージョン**: {region}\n"
             response += "\n"
 
         if len(resources) > 10:
@@ -0,0 +1,181 @@
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 1つのテンプレートにまとめる類似度の下限（一致するトークンの割合）
+LOG_MINER_SIMILARITY = float(os.getenv('LOG_MINER_SIMILARITY', 0.5))
+# 保持するテンプレート数の上限（超えた場合、どれにも一致しない行は unmatched として数えるのみ）
+LOG_MINER_MAX_CLUSTERS = int(os.getenv('LOG_MINER_MAX_CLUSTERS', 1000))
+# テンプレートごとに保持する実際の行の数
+LOG_MINER_SAMPLES = 3
+
+WILDCARD = '<*>'
+# 数字を含むトークン（ID・IP アドレス・時刻・サイズなど）は変数として扱う
+_VARIABLE = re.compile(r'(?<!\S)[^\s\d]*\d\S*')
+# 同じ変数置換後の行を木の探索なしで引くための表の上限
+_EXACT_CACHE_SIZE = 10_000
+# 木の探索に使う先頭のトークン数
+_PREFIX_DEPTH = 2
+
+
+class LogCluster:
+    """
+    同じテンプレートにまとめたログ行の集まり
+    """
+
+    __slots__ = ('template', 'count', 'first_seen', 'last_seen', 'level', 'samples')
+
+    def __init__(self, tokens: List[str]):
+        self.template = tokens
+        self.count = 0
+        self.first_seen: Any = None
+        self.last_seen: Any = None
+        self.level: Optional[str] = None
+        self.samples: List[str] = []
+
+    def merge(self, tokens: List[str]):
+        """
+        一致しない位置を変数に置き換える
+        """
+        template = self.template
+        for i, token in enumerate(tokens):
+            if template[i] != token:
+                template[i] = WILDCARD
+
+    def similarity(self, tokens: List[str]) -> Tuple[float, int]:
+        """
+        (一致するトークンの割合, 変数の数)
+        """
+        matched = 0
+        wildcards = 0
+        for template_token, token in zip(self.template, tokens):
+            if template_token == WILDCARD:
+                wildcards += 1
+            elif template_token == token:
+                matched += 1
+        return matched / len(tokens), wildcards
+
+    def observe(self, message: str, timestamp: Any = None):
+        self.count += 1
+        if timestamp is not None:
+            if self.first_seen is None or timestamp < self.first_seen:
+                self.first_seen = timestamp
+            if self.last_seen is None or timestamp > self.last_seen:
+                self.last_seen = timestamp
+        if len(self.samples) < LOG_MINER_SAMPLES and message not in self.samples:
+            self.samples.append(message)
+
+    def pattern(self) -> str:
+        return ' '.join(self.template)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'template': self.pattern(),
+            'count': self.count,
+            'level': self.level,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'samples': list(self.samples)
+        }
+
+
+class LogTemplateMiner:
+    """
+    Drain 方式でログ行をテンプレートごとに分類する
+
+    数字を含むトークンを変数に置き換えた後、トークン数と先頭のトークンで候補を絞り、
+    候補の中で最も似たテンプレートにまとめる（似たものがなければ新しいテンプレートを作る）。
+    1行あたりの処理は候補数に比例するのみで、全体として行数に対して線形に動作する
+    """
+
+    def __init__(self, similarity: float = LOG_MINER_SIMILARITY, max_clusters: int = LOG_MINER_MAX_CLUSTERS):
+        self.similarity = similarity
+        self.max_clusters = max_clusters
+        self.total = 0
+        self.unmatched = 0
+        self._clusters: List[LogCluster] = []
+        self._tree: Dict[Tuple, List[LogCluster]] = {}
+        self._exact: Dict[str, LogCluster] = {}
+
+    def add(self, message: str, timestamp: Any = None, level: Optional[str] = None) -> Optional[LogCluster]:
+        """
+        ログ行を分類して、まとめた先のテンプレートを返す（上限のため分類できなかった場合は None）
+        """
+        self.total += 1
+        masked = _VARIABLE.sub(WILDCARD, message)
+        cluster = self._exact.get(masked)
+        if cluster is None:
+            cluster = self._match(masked)
+            if cluster is None:
+                self.unmatched += 1
+                return None
+            if len(self._exact) >= _EXACT_CACHE_SIZE:
+                self._exact.clear()
+            self._exact[masked] = cluster
+        cluster.observe(message, timestamp)
+        if cluster.level is None:
+            cluster.level = level
+        return cluster
+
+    def add_events(self, events: Iterable[Dict[str, Any]]) -> 'LogTemplateMiner':
+        """
+        ログイベント（message・timestamp・level を持つ辞書）をまとめて分類する
+        """
+        for event in events:
+            self.add(str(event.get('message') or ''), event.get('timestamp'), event.get('level'))
+        return self
+
+    def clusters(self) -> List[LogCluster]:
+        return list(self._clusters)
+
+    def top(self, count: int) -> List[LogCluster]:
+        """
+        件数の多い順のテンプレート
+        """
+        return sorted(self._clusters, key=lambda c: c.count, reverse=True)[:count]
+
+    def _match(self, masked: str) -> Optional[LogCluster]:
+        tokens = masked.split()
+        if not tokens:
+            tokens = ['']
+        # 変数を含む先頭トークンでは分岐しない（変数ごとに別の枝になるのを防ぐ）
+        prefix = tuple(token if WILDCARD not in token else WILDCARD for token in tokens[:_PREFIX_DEPTH])
+        candidates = self._tree.setdefault((len(tokens), prefix), [])
+
+        best = None
+        best_score = (-1.0, -1)
+        for candidate in candidates:
+            score = candidate.similarity(tokens)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score[0] >= self.similarity:
+            best.merge(tokens)
+            return best
+
+        if len(self._clusters) >= self.max_clusters:
+            return None
+        cluster = LogCluster(tokens)
+        candidates.append(cluster)
+        self._clusters.append(cluster)
+        return cluster
+
+
+def mine_templates(events: Iterable[Dict[str, Any]], **options: Any) -> LogTemplateMiner:
+    """
+    ログイベントをテンプレートごとに分類する
+    """
+    return LogTemplateMiner(**options).add_events(events)
+
+
+def format_clusters(clusters: List[LogCluster]) -> str:
+    """
+    テンプレートの一覧を LLM に渡す参考情報の形式にする
+    """
+    lines = []
+    for cluster in clusters:
+        period = ''
+        if cluster.first_seen is not None:
+            period = f", {cluster.first_seen} 〜 {cluster.last_seen}"
+        lines.append(f"- {cluster.count} 件 ({cluster.level or '不明'}{period}): {cluster.pattern()}")
+        lines.extend(f"  例: {sample}" for sample in cluster.samples[:1])
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+import os
+import re
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 1回のログ取得で読み込むイベント数の上限（条件に一致しない場合でも取得をここで打ち切る）
+LOG_SCAN_LIMIT = int(os.getenv('LOG_SCAN_LIMIT', 10_000))
+# 重複判定のために覚えておくイベント数
+LOG_DEDUPE_WINDOW = int(os.getenv('LOG_DEDUPE_WINDOW', 1000))
+
+# 重要度の低い順
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+_LEVEL_ALIASES = {'WARN': 'WARNING', 'ERR': 'ERROR', 'FATAL': 'CRITICAL'}
+_LEVEL_PATTERN = re.compile(r'\b(DEBUG|INFO|WARN(?:ING)?|ERR(?:OR)?|CRITICAL|FATAL)\b', re.IGNORECASE)
+
+
+class LogQueryError(ValueError):
+    """
+    ログの絞り込み条件の誤り
+    """
+
+
+def normalize_level(value: Any) -> Optional[str]:
+    """
+    ログレベルの表記を LOG_LEVELS のいずれかにそろえる（判別できない場合は None）
+    """
+    if not value:
+        return None
+    level = str(value).upper()
+    level = _LEVEL_ALIASES.get(level, level)
+    return level if level in LOG_LEVELS else None
+
+
+def parse_events(events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    メッセージ末尾の改行を除き、レベルがなければメッセージから推定して付ける
+    """
+    for event in events:
+        message = str(event.get('message') or '').rstrip('\r\n')
+        level = normalize_level(event.get('level'))
+        if level is None:
+            match = _LEVEL_PATTERN.search(message)
+            level = normalize_level(match.group(1)) if match else None
+        yield {**event, 'message': message, 'level': level}
+
+
+def filter_events(events: Iterable[Dict[str, Any]], level: Optional[str] = None,
+                  keyword: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    指定したレベル以上・キーワード（大文字小文字を区別しない）を含むイベントのみ通す
+    """
+    minimum = LOG_LEVELS.index(level) if level else None
+    keyword = keyword.lower() if keyword else None
+    for event in events:
+        if minimum is not None and (event['level'] is None or LOG_LEVELS.index(event['level']) < minimum):
+            continue
+        if keyword and keyword not in event['message'].lower():
+            continue
+        yield event
+
+
+def dedupe_events(events: Iterable[Dict[str, Any]],
+                  window: int = LOG_DEDUPE_WINDOW) -> Iterator[Dict[str, Any]]:
+    """
+    直近 window 件の中に同じ時刻・メッセージのイベントがあれば除く（保持する件数は window まで）
+    """
+    seen: OrderedDict = OrderedDict()
+    for event in events:
+        key = (event.get('timestamp'), event['message'])
+        if key in seen:
+            seen.move_to_end(key)
+            continue
+        seen[key] = None
+        if len(seen) > window:
+            seen.popitem(last=False)
+        yield event
+
+
+def log_pipeline(source: Iterator[Dict[str, Any]], limit: Optional[int] = None,
+                 level: Optional[str] = None, keyword: Optional[str] = None,
+                 scan_limit: int = LOG_SCAN_LIMIT) -> Iterator[Dict[str, Any]]:
+    """
+    取得 → 解析 → 絞り込み → 重複除去 → 件数上限 の順にイベントを1件ずつ流す
+
+    source はページ単位で取得するジェネレーターとし、上限に達した場合や呼び出し側が
+    読むのをやめた場合（close()）は source を閉じて以降のページを取得しない
+    """
+    events = dedupe_events(filter_events(parse_events(islice(source, scan_limit)),
+                                         normalize_level(level), keyword))
+    count = 0
+    try:
+        if limit is not None and limit <= 0:
+            return
+        for event in events:
+            yield event
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    finally:
+        events.close()
+        close = getattr(source, 'close', None)
+        if close is not None:
+            close()
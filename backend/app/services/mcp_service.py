@@ -1,14 +1,252 @@
+import heapq
+import inspect
 import os
-import boto3
-from typing import List, Dict, Any, Optional
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.storage import StorageManagementClient
+import sys
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.models.resource import Resource, ResourcePage, to_epoch
+from app.services.inventory_cache import INVENTORY_SERVICES
+from app.services.log_pipeline import log_pipeline
+from app.services.query_planner import QueryPlan, plan_query
+from app.services.resource_query import ResourceQuery
+from app.utils.lazy_import import LazyImports
 from app.utils.logger import get_logger
+from app.utils import tracing
+from app.utils.metrics import CLOUD_API_CALLS, OTHER_LABEL, track_cloud_fetch
 
 logger = get_logger(__name__)
 
+# 遅延インポート（boto3・Azure SDK は読み込みに時間がかかるため、最初に使う時点で読み込む）
+# Resource Graph・Azure Monitor は条件付き（未インストールの場合は None）
+_sdk = LazyImports(__name__, {
+    'boto3': 'boto3',
+    'SansIOHTTPPolicy': 'azure.core.pipeline.policies:SansIOHTTPPolicy',
+    'DefaultAzureCredential': 'azure.identity:DefaultAzureCredential',
+    'ResourceManagementClient': 'azure.mgmt.resource:ResourceManagementClient',
+    'ComputeManagementClient': 'azure.mgmt.compute:ComputeManagementClient',
+    'StorageManagementClient': 'azure.mgmt.storage:StorageManagementClient',
+    'ResourceGraphClient': 'azure.mgmt.resourcegraph:ResourceGraphClient',
+    'QueryRequest': 'azure.mgmt.resourcegraph.models:QueryRequest',
+    'QueryRequestOptions': 'azure.mgmt.resourcegraph.models:QueryRequestOptions',
+    'MonitorManagementClient': 'azure.mgmt.monitor:MonitorManagementClient',
+}, optional=('ResourceGraphClient', 'QueryRequest', 'QueryRequestOptions', 'MonitorManagementClient'))
+__getattr__ = _sdk.resolve
+
+# 件数上限を指定した場合の1ページあたりの要求件数（API ごとの許容範囲）
+EC2_MIN_RESULTS, EC2_MAX_RESULTS = 5, 1000
+RDS_MIN_RECORDS, RDS_MAX_RECORDS = 20, 100
+GRAPH_MAX_TOP = 1000
+# ログの取得件数の既定値と、参照するロググループ数・ロググループごとのストリーム数
+LOG_FETCH_LIMIT = 20
+LOG_GROUP_LIMIT = 5
+LOG_STREAM_LIMIT = 3
+# 期間を指定しない場合に1つのストリームから読むイベント数の上限
+LOG_STREAM_EVENT_LIMIT = int(os.getenv('LOG_STREAM_EVENT_LIMIT', 100))
+# ログイベントを1回の API 呼び出しで取得する件数（保持するのは1ページ分のみ）
+LOG_PAGE_SIZE = int(os.getenv('LOG_PAGE_SIZE', 100))
+
+# メトリクスの取得対象: (名前空間, ディメンション名, 既定のメトリクス名)
+METRIC_DEFINITIONS = {
+    ('aws', 'ec2'): ('AWS/EC2', 'InstanceId', 'CPUUtilization'),
+    ('aws', 'rds'): ('AWS/RDS', 'DBInstanceIdentifier', 'CPUUtilization'),
+    ('azure', 'vm'): ('Microsoft.Compute/virtualMachines', None, 'Percentage CPU'),
+}
+# GetMetricData の1回の呼び出しに含められるクエリ数
+METRIC_QUERIES_PER_CALL = 500
+
+# ページの区切りで次のページが存在することを表す目印
+_MORE = object()
+
+# メトリクスのラベルに使う (プロバイダー, サービス) の組（それ以外は OTHER_LABEL にまとめる）
+_FETCH_LABELS = {(p, s) for p, services in INVENTORY_SERVICES.items() for s in services} | set(METRIC_DEFINITIONS)
+
+
+def _fetch_labels(provider: Any, service: Any) -> Tuple[str, str]:
+    """
+    取得処理のメトリクスのラベル（リクエストで指定された未知のプロバイダー・サービスは OTHER_LABEL にする）
+    """
+    if (provider, service) in _FETCH_LABELS:
+        return provider, service
+    if provider in INVENTORY_SERVICES:
+        return provider, OTHER_LABEL
+    return OTHER_LABEL, OTHER_LABEL
+
+
+def _timed_fetch(fetcher: str, provider: Optional[str] = None):
+    """
+    取得処理の時間と実行中の件数を記録するデコレーター
+
+    provider を指定した場合は最初の引数を、省略した場合は最初の2つの引数を (プロバイダー, サービス) とする
+    """
+    def decorator(func):
+        parameters = list(inspect.signature(func).parameters.values())[1:]
+
+        def argument(position: int, args: tuple, kwargs: dict) -> Any:
+            if position < len(args):
+                return args[position]
+            parameter = parameters[position]
+            return kwargs.get(parameter.name, parameter.default)
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if provider is not None:
+                labels = (provider, argument(0, args, kwargs))
+            else:
+                labels = (argument(0, args, kwargs), argument(1, args, kwargs))
+            with track_cloud_fetch(*_fetch_labels(*labels), fetcher), \
+                    tracing.span(f"cloud.{fetcher}", **{'cloud.provider': labels[0], 'cloud.service': labels[1]}):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_aws_call(model=None, context=None, **kwargs):
+    """
+    AWS API の呼び出しを数え、スパンを開始する（botocore のイベントフック。ページ送りの各呼び出しも対象）
+    """
+    if model is None:
+        return
+    service = model.service_model.service_name
+    CLOUD_API_CALLS.labels('aws', service, model.name).inc()
+    if context is not None:
+        context['trace_call'] = (service, model.name)
+        context['trace_span'] = tracing.start_span(
+            f"aws.{service}.{model.name}", **{'cloud.provider': 'aws', 'rpc.service': service,
+                                               'rpc.method': model.name})
+
+
+def _after_aws_call(model=None, parsed=None, context=None, http_response=None, **kwargs):
+    """
+    AWS API の呼び出しのスパンを終了し、リクエストごとの呼び出し回数・再試行回数に加える
+    """
+    if model is None or context is None:
+        return
+    metadata = (parsed or {}).get('ResponseMetadata', {})
+    retries = metadata.get('RetryAttempts', 0) or 0
+    context.pop('trace_call', None)
+    span = context.pop('trace_span', None)
+    if span is not None:
+        span.set(**{'http.status_code': getattr(http_response, 'status_code', None),
+                    'rpc.retries': retries, 'aws.request_id': metadata.get('RequestId')})
+        span.finish()
+    trace = tracing.current_trace()
+    if trace is not None:
+        trace.record_api_call('aws', model.service_model.service_name, model.name, retries)
+
+
+def _after_aws_call_error(exception=None, context=None, **kwargs):
+    """
+    接続エラーなどで応答を得られなかった AWS API の呼び出しのスパンを例外付きで終了し、呼び出し回数に加える
+    """
+    if context is None:
+        return
+    call = context.pop('trace_call', None)
+    span = context.pop('trace_span', None)
+    if span is not None:
+        span.finish(exception)
+    trace = tracing.current_trace()
+    if trace is not None and call is not None:
+        trace.record_api_call('aws', *call)
+
+
+class _AzureCallPolicy:
+    """
+    Azure SDK の呼び出しを数え、スパンとして記録するパイプラインポリシー（再試行をまとめた1回の呼び出し単位）
+    """
+
+    def __init__(self, service: str, operation: str):
+        self.service = service
+        self.operation = operation
+        self.calls = CLOUD_API_CALLS.labels('azure', service, operation)
+
+    def on_request(self, request):
+        self.calls.inc()
+        request.context['trace'] = tracing.current_trace()
+        request.context['trace_span'] = tracing.start_span(
+            f"azure.{self.service}.{self.operation}", **{'cloud.provider': 'azure', 'rpc.service': self.service,
+                                                         'rpc.method': self.operation})
+
+    def on_response(self, request, response):
+        self._finish(request, status_code=response.http_response.status_code)
+
+    def on_exception(self, request):
+        self._finish(request, error=sys.exc_info()[1])
+
+    def _finish(self, request, status_code: Optional[int] = None, error: Optional[BaseException] = None):
+        retries = max(0, request.context.get('attempts', 1) - 1)
+        span = request.context.pop('trace_span', None)
+        if span is not None:
+            span.set(**{'http.status_code': status_code, 'rpc.retries': retries})
+            span.finish(error)
+        trace = request.context.pop('trace', None)
+        if trace is not None:
+            trace.record_api_call('azure', self.service, self.operation, retries)
+
+
+class _AzureAttemptPolicy:
+    """
+    再試行を含めた送信回数を数えるパイプラインポリシー（再試行ごとに呼ばれる位置に置く）
+    """
+
+    def on_request(self, request):
+        request.context['attempts'] = request.context.get('attempts', 0) + 1
+
+
+def _azure_client_options(service: str, operation: str) -> Dict[str, Any]:
+    """
+    Azure SDK のクライアントに渡すオプション（呼び出し回数・再試行回数の計測とスパンの記録）
+    """
+    return {'per_call_policies': [_azure_policy(_AzureCallPolicy)(service, operation)],
+            'per_retry_policies': [_azure_policy(_AzureAttemptPolicy)()]}
+
+
+@lru_cache(maxsize=None)
+def _azure_policy(policy: type) -> type:
+    """
+    ポリシーを SansIOHTTPPolicy の派生クラスにする（azure-core は Azure のクライアントを作る時点で読み込む）
+    """
+    return type(policy.__name__, (policy, _sdk.SansIOHTTPPolicy), {})
+
+
+def _take(items: Iterable[Any], limit: Optional[int] = None,
+          predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
+    """
+    条件に一致するリソースを limit 件まで集める
+
+    limit 件そろった後は、取得済みのページ内で次に一致するリソースが見つかるか、
+    次のページの目印が現れた時点で打ち切って has_more を立てる（次のページは取得しない）
+    """
+    page = ResourcePage()
+    for item in items:
+        full = limit is not None and len(page) >= limit
+        if item is _MORE:
+            if full:
+                page.has_more = True
+                break
+            continue
+        if predicate is not None and not predicate(item):
+            continue
+        if full:
+            page.has_more = True
+            break
+        page.append(item)
+    return page
+
+
+def _iter_pages(pager: Iterable[Any]) -> Iterator[Any]:
+    """
+    Azure SDK の一覧をページ単位で列挙し、続きのページがある場合は区切りに _MORE を挟む
+    """
+    if not hasattr(pager, 'by_page'):
+        yield from pager
+        return
+    pages = pager.by_page()
+    for page in pages:
+        yield from page
+        if pages.continuation_token:
+            yield _MORE
+
 
 class MCPService:
     def __init__(self):
@@ -22,206 +260,390 @@ class MCPService:
         """
         # AWS クライアントの初期化
         try:
-            self.aws_session = boto3.Session(
+            self.aws_session = _sdk.boto3.Session(
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
                 region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
             )
+            self.aws_session.events.register('before-parameter-build', _before_aws_call)
+            self.aws_session.events.register('after-call', _after_aws_call)
+            self.aws_session.events.register('after-call-error', _after_aws_call_error)
             logger.info("AWS セッションが初期化されました")
         except Exception as e:
             logger.error(f"AWS セッションの初期化に失敗: {str(e)}")
 
         # Azure クライアントの初期化
         try:
-            self.azure_credential = DefaultAzureCredential()
+            self.azure_credential = _sdk.DefaultAzureCredential()
             logger.info("Azure 認証情報が初期化されました")
         except Exception as e:
             logger.error(f"Azure 認証情報の初期化に失敗: {str(e)}")
 
-    def get_aws_resources(self, resource_type: str = 'ec2') -> List[Dict[str, Any]]:
+    @_timed_fetch('resources', provider='aws')
+    def get_aws_resources(self, resource_type: str = 'ec2',
+                          query: Optional[ResourceQuery] = None,
+                          limit: Optional[int] = None) -> ResourcePage:
         """
         AWS リソース一覧を取得
+
+        query を指定した場合、API で表現できる条件はサーバー側で絞り込み、残りは取得後に適用する。
+        limit を指定した場合、一致するリソースが limit 件そろった時点でページの取得を打ち切る
         """
         if not self.aws_session:
             logger.error("AWS セッションが初期化されていません")
-            return []
+            return ResourcePage()
 
         try:
+            plan = plan_query('aws', resource_type, query)
+            options = self._limit_options(plan, limit)
             if resource_type == 'ec2':
-                return self._get_aws_ec2_instances()
+                resources = self._get_aws_ec2_instances(**plan.native, **options)
             elif resource_type == 's3':
-                return self._get_aws_s3_buckets()
+                resources = self._get_aws_s3_buckets(**options)
             elif resource_type == 'rds':
-                return self._get_aws_rds_instances()
+                resources = self._get_aws_rds_instances(**plan.native, **options)
             else:
                 logger.warning(f"未対応のAWSリソースタイプ: {resource_type}")
-                return []
+                return ResourcePage()
+
+            return self._residual_page(plan, resources, limit)
 
         except Exception as e:
             logger.error(f"AWS リソース取得エラー: {str(e)}")
-            return []
+            return ResourcePage()
+
+    def _limit_options(self, plan: QueryPlan, limit: Optional[int]) -> Dict[str, Any]:
+        """
+        取得処理に渡す件数上限（上限がなければ何も渡さない）
 
-    def _get_aws_ec2_instances(self) -> List[Dict[str, Any]]:
+        取得後に適用する条件が残る場合は、その条件に一致したものだけを件数に数える
+        """
+        if limit is None:
+            return {}
+        residual = plan.residual
+        predicate = residual.matches if residual.filters or residual.tags else None
+        return {'limit': limit, 'predicate': predicate}
+
+    def _residual_page(self, plan: QueryPlan, resources: List[Resource],
+                       limit: Optional[int]) -> ResourcePage:
+        page = _take(plan.residual.apply(resources, plan.provider, plan.service), limit)
+        page.has_more = page.has_more or getattr(resources, 'has_more', False)
+        return page
+
+    def _get_aws_ec2_instances(self, filters: Optional[List[Dict[str, Any]]] = None,
+                               limit: Optional[int] = None,
+                               predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
         """
-        EC2 インスタンス一覧を取得
+        EC2 インスタンス一覧を取得（filters は describe_instances の Filters）
         """
         try:
-            ec2 = self.aws_session.client('ec2')
-            response = ec2.describe_instances()
-
-            instances = []
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instances.append({
-                        'id': instance['InstanceId'],
-                        'name': self._get_instance_name(instance),
-                        'type': instance['InstanceType'],
-                        'state': instance['State']['Name'],
-                        'region': self.aws_session.region_name,
-                        'launch_time': instance['LaunchTime'].isoformat(),
-                        'public_ip': instance.get('PublicIpAddress', 'N/A'),
-                        'private_ip': instance.get('PrivateIpAddress', 'N/A')
-                    })
-
-            return instances
+            return _take(self._iter_ec2_instances(filters, limit), limit, predicate)
 
         except Exception as e:
             logger.error(f"EC2 インスタンス取得エラー: {str(e)}")
-            return []
-
-    def _get_aws_s3_buckets(self) -> List[Dict[str, Any]]:
+            return ResourcePage()
+
+    def _iter_ec2_instances(self, filters: Optional[List[Dict[str, Any]]],
+                            limit: Optional[int]) -> Iterator[Any]:
+        ec2 = self.aws_session.client('ec2')
+        region = self.aws_session.region_name
+        params: Dict[str, Any] = {}
+        if filters:
+            params['Filters'] = filters
+        if limit is not None:
+            # 1件多く要求し、次のページを取得せずに続きの有無を判断できるようにする
+            params['MaxResults'] = min(EC2_MAX_RESULTS, max(EC2_MIN_RESULTS, limit + 1))
+
+        while True:
+            response = ec2.describe_instances(**params)
+            for reservation in response['Reservations']:
+                for instance in reservation['Instances']:
+                    yield self._ec2_resource(instance, region)
+            token = response.get('NextToken')
+            if not token:
+                return
+            yield _MORE
+            params['NextToken'] = token
+
+    def _ec2_resource(self, instance: Dict[str, Any], region: str) -> Resource:
+        metadata = {}
+        if instance.get('PublicIpAddress'):
+            metadata['public_ip'] = instance['PublicIpAddress']
+        if instance.get('PrivateIpAddress'):
+            metadata['private_ip'] = instance['PrivateIpAddress']
+        if instance.get('VpcId'):
+            metadata['vpc_id'] = instance['VpcId']
+        return Resource(
+            id=instance['InstanceId'],
+            name=self._get_instance_name(instance),
+            type=instance['InstanceType'],
+            provider='aws',
+            service='ec2',
+            region=region,
+            status=instance['State']['Name'],
+            created_at=to_epoch(instance.get('LaunchTime')),
+            tags={tag['Key']: tag['Value'] for tag in instance.get('Tags', [])},
+            metadata=metadata
+        )
+
+    def _get_aws_s3_buckets(self, limit: Optional[int] = None,
+                            predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
         """
         S3 バケット一覧を取得
+
+        list_buckets はページ分割されないため、上限を超えた分は変換せずに打ち切る
         """
         try:
             s3 = self.aws_session.client('s3')
             response = s3.list_buckets()
+            region = self.aws_session.region_name
 
-            buckets = []
-            for bucket in response['Buckets']:
-                buckets.append({
-                    'name': bucket['Name'],
-                    'creation_date': bucket['CreationDate'].isoformat(),
-                    'region': self.aws_session.region_name
-                })
+            buckets = (Resource(
+                id=bucket['Name'],
+                name=bucket['Name'],
+                type='bucket',
+                provider='aws',
+                service='s3',
+                region=region,
+                status='available',
+                created_at=to_epoch(bucket.get('CreationDate'))
+            ) for bucket in response['Buckets'])
 
-            return buckets
+            return _take(buckets, limit, predicate)
 
         except Exception as e:
             logger.error(f"S3 バケット取得エラー: {str(e)}")
-            return []
+            return ResourcePage()
 
-    def _get_aws_rds_instances(self) -> List[Dict[str, Any]]:
+    def _get_aws_rds_instances(self, filters: Optional[List[Dict[str, Any]]] = None,
+                               limit: Optional[int] = None,
+                               predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
         """
-        RDS インスタンス一覧を取得
+        RDS インスタンス一覧を取得（filters は describe_db_instances の Filters）
         """
         try:
-            rds = self.aws_session.client('rds')
-            response = rds.describe_db_instances()
-
-            instances = []
-            for db_instance in response['DBInstances']:
-                instances.append({
-                    'id': db_instance['DBInstanceIdentifier'],
-                    'name': db_instance['DBInstanceIdentifier'],
-                    'engine': db_instance['Engine'],
-                    'status': db_instance['DBInstanceStatus'],
-                    'class': db_instance['DBInstanceClass'],
-                    'region': self.aws_session.region_name
-                })
-
-            return instances
+            return _take(self._iter_rds_instances(filters, limit), limit, predicate)
 
         except Exception as e:
             logger.error(f"RDS インスタンス取得エラー: {str(e)}")
-            return []
-
-    def get_azure_resources(self, resource_type: str = 'vm') -> List[Dict[str, Any]]:
+            return ResourcePage()
+
+    def _iter_rds_instances(self, filters: Optional[List[Dict[str, Any]]],
+                            limit: Optional[int]) -> Iterator[Any]:
+        rds = self.aws_session.client('rds')
+        region = self.aws_session.region_name
+        params: Dict[str, Any] = {}
+        if filters:
+            params['Filters'] = filters
+        if limit is not None:
+            params['MaxRecords'] = min(RDS_MAX_RECORDS, max(RDS_MIN_RECORDS, limit + 1))
+
+        while True:
+            response = rds.describe_db_instances(**params)
+            for db_instance in response['DBInstances']:
+                yield Resource(
+                    id=db_instance['DBInstanceIdentifier'],
+                    name=db_instance['DBInstanceIdentifier'],
+                    type=db_instance['DBInstanceClass'],
+                    provider='aws',
+                    service='rds',
+                    region=region,
+                    status=db_instance['DBInstanceStatus'],
+                    created_at=to_epoch(db_instance.get('InstanceCreateTime')),
+                    metadata={'engine': sys.intern(db_instance['Engine'])}
+                )
+            marker = response.get('Marker')
+            if not marker:
+                return
+            yield _MORE
+            params['Marker'] = marker
+
+    @_timed_fetch('resources', provider='azure')
+    def get_azure_resources(self, resource_type: str = 'vm',
+                            query: Optional[ResourceQuery] = None,
+                            limit: Optional[int] = None) -> ResourcePage:
         """
         Azure リソース一覧を取得
+
+        query を指定した場合、リソースグループの指定または Resource Graph でサーバー側で絞り込む。
+        limit を指定した場合、一致するリソースが limit 件そろった時点でページの取得を打ち切る
         """
         if not self.azure_credential:
             logger.error("Azure 認証情報が初期化されていません")
-            return []
+            return ResourcePage()
 
         try:
             subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
             if not subscription_id:
                 logger.error("AZURE_SUBSCRIPTION_ID が設定されていません")
-                return []
-
-            if resource_type == 'vm':
-                return self._get_azure_vms(subscription_id)
+                return ResourcePage()
+
+            plan = plan_query('azure', resource_type, query)
+            options = self._limit_options(plan, limit)
+            if 'graph_query' in plan.native and resource_type in ('vm', 'storage'):
+                resources = self._query_resource_graph(
+                    subscription_id, resource_type, plan.native['graph_query'], **options)
+            elif resource_type == 'vm':
+                resources = self._get_azure_vms(subscription_id, **plan.native, **options)
             elif resource_type == 'storage':
-                return self._get_azure_storage_accounts(subscription_id)
+                resources = self._get_azure_storage_accounts(subscription_id, **plan.native, **options)
             else:
                 logger.warning(f"未対応のAzureリソースタイプ: {resource_type}")
-                return []
+                return ResourcePage()
+
+            return self._residual_page(plan, resources, limit)
 
         except Exception as e:
             logger.error(f"Azure リソース取得エラー: {str(e)}")
-            return []
+            return ResourcePage()
 
-    def _get_azure_vms(self, subscription_id: str) -> List[Dict[str, Any]]:
+    def _get_azure_vms(self, subscription_id: str, resource_group: Optional[str] = None,
+                       limit: Optional[int] = None,
+                       predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
         """
-        Azure VM 一覧を取得
+        Azure VM 一覧を取得（resource_group を指定した場合はそのリソースグループのみ）
         """
         try:
-            compute_client = ComputeManagementClient(
-                self.azure_credential, subscription_id
+            compute_client = _sdk.ComputeManagementClient(
+                self.azure_credential, subscription_id, **_azure_client_options('compute', 'virtual_machines.list')
             )
 
-            vms = []
-            for vm in compute_client.virtual_machines.list_all():
-                vms.append({
-                    'id': vm.id,
-                    'name': vm.name,
-                    'location': vm.location,
-                    'status': vm.provisioning_state,
-                    'size': vm.hardware_profile.vm_size if vm.hardware_profile else 'N/A',
-                    'os_type': vm.storage_profile.os_disk.os_type.value if vm.storage_profile and vm.storage_profile.os_disk else 'N/A'
-                })
+            if resource_group:
+                vm_pages = compute_client.virtual_machines.list(resource_group)
+            else:
+                vm_pages = compute_client.virtual_machines.list_all()
 
-            return vms
+            vms = (vm if vm is _MORE else self._vm_resource(vm) for vm in _iter_pages(vm_pages))
+            return _take(vms, limit, predicate)
 
         except Exception as e:
             logger.error(f"Azure VM 取得エラー: {str(e)}")
-            return []
-
-    def _get_azure_storage_accounts(self, subscription_id: str) -> List[Dict[str, Any]]:
+            return ResourcePage()
+
+    def _vm_resource(self, vm: Any) -> Resource:
+        os_disk = vm.storage_profile.os_disk if vm.storage_profile else None
+        return Resource(
+            id=vm.id,
+            name=vm.name,
+            type=vm.hardware_profile.vm_size if vm.hardware_profile else '',
+            provider='azure',
+            service='vm',
+            region=vm.location,
+            status=vm.provisioning_state,
+            created_at=to_epoch(getattr(vm, 'time_created', None)),
+            tags=vm.tags,
+            metadata=self._azure_metadata(
+                vm.id, os_type=os_disk.os_type.value if os_disk and os_disk.os_type else None)
+        )
+
+    def _get_azure_storage_accounts(self, subscription_id: str,
+                                    resource_group: Optional[str] = None,
+                                    limit: Optional[int] = None,
+                                    predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
         """
-        Azure ストレージアカウント一覧を取得
+        Azure ストレージアカウント一覧を取得（resource_group を指定した場合はそのリソースグループのみ）
         """
         try:
-            storage_client = StorageManagementClient(
-                self.azure_credential, subscription_id
+            storage_client = _sdk.StorageManagementClient(
+                self.azure_credential, subscription_id, **_azure_client_options('storage', 'storage_accounts.list')
             )
 
-            accounts = []
-            for account in storage_client.storage_accounts.list():
-                accounts.append({
-                    'id': account.id,
-                    'name': account.name,
-                    'location': account.location,
-                    'status': account.status_of_primary.value if account.status_of_primary else 'N/A',
-                    'tier': account.sku.tier.value if account.sku else 'N/A'
-                })
+            if resource_group:
+                account_pages = storage_client.storage_accounts.list_by_resource_group(resource_group)
+            else:
+                account_pages = storage_client.storage_accounts.list()
 
-            return accounts
+            accounts = (account if account is _MORE else self._storage_resource(account)
+                        for account in _iter_pages(account_pages))
+            return _take(accounts, limit, predicate)
 
         except Exception as e:
             logger.error(f"Azure ストレージアカウント取得エラー: {str(e)}")
-            return []
+            return ResourcePage()
+
+    def _storage_resource(self, account: Any) -> Resource:
+        return Resource(
+            id=account.id,
+            name=account.name,
+            type=account.sku.tier.value if account.sku else '',
+            provider='azure',
+            service='storage',
+            region=account.location,
+            status=account.status_of_primary.value if account.status_of_primary else '',
+            created_at=to_epoch(account.creation_time),
+            tags=account.tags,
+            metadata=self._azure_metadata(account.id)
+        )
+
+    def _query_resource_graph(self, subscription_id: str, resource_type: str, kql: str,
+                              limit: Optional[int] = None,
+                              predicate: Optional[Callable[[Resource], bool]] = None) -> ResourcePage:
+        """
+        Resource Graph で絞り込み済みのリソース一覧を取得
+        """
+        try:
+            return _take(self._iter_resource_graph(subscription_id, resource_type, kql, limit),
+                         limit, predicate)
 
-    def get_logs(self, provider: str, service: str) -> List[Dict[str, Any]]:
+        except Exception as e:
+            logger.error(f"Resource Graph 取得エラー: {str(e)}")
+            return ResourcePage()
+
+    def _iter_resource_graph(self, subscription_id: str, resource_type: str, kql: str,
+                             limit: Optional[int]) -> Iterator[Any]:
+        graph_client = _sdk.ResourceGraphClient(self.azure_credential,
+                                                **_azure_client_options('resourcegraph', 'resources'))
+        top = min(GRAPH_MAX_TOP, limit + 1) if limit is not None else None
+        skip_token = None
+        while True:
+            response = graph_client.resources(_sdk.QueryRequest(
+                subscriptions=[subscription_id], query=kql,
+                options=_sdk.QueryRequestOptions(result_format='objectArray', skip_token=skip_token, top=top)))
+            for row in response.data:
+                yield Resource(
+                    id=row['id'],
+                    name=row['name'],
+                    type=row.get('size'),
+                    provider='azure',
+                    service=resource_type,
+                    region=row.get('location'),
+                    status=row.get('status'),
+                    created_at=to_epoch(row.get('created_at')),
+                    tags=row.get('tags'),
+                    metadata={'resource_group': row['resourceGroup']} if row.get('resourceGroup') else None
+                )
+            skip_token = response.skip_token
+            if not skip_token:
+                return
+            yield _MORE
+
+    def _azure_metadata(self, resource_id: Optional[str], **values: Any) -> Dict[str, Any]:
+        """
+        Azure リソースの metadata（リソース ID から求めたリソースグループを含む）
         """
-        ログを取得
+        metadata = {key: sys.intern(value) for key, value in values.items() if value}
+        parts = (resource_id or '').split('/')
+        for i, part in enumerate(parts[:-1]):
+            if part.lower() == 'resourcegroups':
+                metadata['resource_group'] = parts[i + 1]
+                break
+        return metadata
+
+    @_timed_fetch('logs')
+    def get_logs(self, provider: str, service: str, limit: Optional[int] = None,
+                 **filters: Any) -> List[Dict[str, Any]]:
+        """
+        ログを取得（limit を指定した場合は limit 件そろった時点で取得を打ち切る）
+
+        filters には level・keyword・start_time・end_time（UNIX 時刻のミリ秒）を指定できる
         """
+        options = {'limit': limit} if limit is not None else {}
+        options.update((name, value) for name, value in filters.items() if value is not None)
         try:
             if provider == 'aws':
-                return self._get_aws_logs(service)
+                return self._get_aws_logs(service, **options)
             elif provider == 'azure':
-                return self._get_azure_logs(service)
+                return self._get_azure_logs(service, **options)
             else:
                 logger.warning(f"未対応のプロバイダー: {provider}")
                 return []
@@ -230,71 +652,223 @@ class MCPService:
             logger.error(f"ログ取得エラー: {str(e)}")
             return []
 
-    def _get_aws_logs(self, service: str) -> List[Dict[str, Any]]:
+    def iter_logs(self, provider: str, service: str, limit: Optional[int] = None,
+                  level: Optional[str] = None, keyword: Optional[str] = None,
+                  start_time: Optional[int] = None, end_time: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        ログを1件ずつ返すジェネレーター。読むのをやめる（close() する）と以降のページは取得しない
+        """
+        if provider == 'aws':
+            if not self.aws_session:
+                logger.error("AWS セッションが初期化されていません")
+                return iter(())
+            page_size = LOG_PAGE_SIZE if level or keyword or limit is None else min(limit, LOG_PAGE_SIZE)
+            source = self._iter_aws_log_events(page_size, start_time, end_time)
+        elif provider == 'azure':
+            source = self._iter_azure_log_events(service)
+        else:
+            logger.warning(f"未対応のプロバイダー: {provider}")
+            return iter(())
+        return log_pipeline(source, limit=limit, level=level, keyword=keyword)
+
+    def _get_aws_logs(self, service: str, limit: int = LOG_FETCH_LIMIT, **filters: Any) -> List[Dict[str, Any]]:
         """
         AWS ログを取得
         """
         try:
-            logs_client = self.aws_session.client('logs')
-
-            # CloudWatch Logs からログを取得
-            log_groups = logs_client.describe_log_groups()
-
-            logs = []
-            for log_group in log_groups['logGroups'][:5]:  # 最初の5つのロググループ
-                try:
-                    log_streams = logs_client.describe_log_streams(
-                        logGroupName=log_group['logGroupName'],
-                        orderBy='LastEventTime',
-                        descending=True,
-                        limit=3
-                    )
-
-                    for stream in log_streams['logStreams']:
-                        events = logs_client.get_log_events(
-                            logGroupName=log_group['logGroupName'],
-                            logStreamName=stream['logStreamName'],
-                            limit=5
-                        )
-
-                        for event in events['events']:
-                            logs.append({
-                                'timestamp': event['timestamp'],
-                                'message': event['message'],
-                                'log_group': log_group['logGroupName'],
-                                'log_stream': stream['logStreamName']
-                            })
-
-                except Exception as e:
-                    logger.warning(f"ログストリーム取得エラー: {str(e)}")
-                    continue
-
-            return logs[:20]  # 最大20件
-
+            return list(self.iter_logs('aws', service, limit=limit, **filters))
         except Exception as e:
             logger.error(f"AWS ログ取得エラー: {str(e)}")
             return []
 
-    def _get_azure_logs(self, service: str) -> List[Dict[str, Any]]:
+    def _iter_aws_log_events(self, page_size: int, start_time: Optional[int] = None,
+                             end_time: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        CloudWatch Logs のイベントをページ単位で取得しながら1件ずつ返す
+
+        期間を指定しない場合は各ロググループの最近更新されたストリームから新しい順に、
+        指定した場合は filter_log_events で期間内のイベントを返す（ロググループは先頭の LOG_GROUP_LIMIT 個）。
+        メモリ上に保持するのは取得中の1ページ（page_size 件）のみ
+        """
+        logs_client = self.aws_session.client('logs')
+        for log_group in self._iter_log_groups(logs_client):
+            group_name = log_group['logGroupName']
+            try:
+                if start_time is not None or end_time is not None:
+                    yield from self._iter_filtered_log_events(logs_client, group_name, page_size,
+                                                              start_time, end_time)
+                else:
+                    yield from self._iter_recent_log_events(logs_client, group_name, page_size)
+            except Exception as e:
+                logger.warning(f"ログストリーム取得エラー: {str(e)}")
+                continue
+
+    def _iter_log_groups(self, logs_client) -> Iterator[Dict[str, Any]]:
+        # 参照するのは先頭の LOG_GROUP_LIMIT 個のロググループのみ
+        response = logs_client.describe_log_groups(limit=LOG_GROUP_LIMIT)
+        yield from response.get('logGroups', [])[:LOG_GROUP_LIMIT]
+
+    def _iter_recent_log_events(self, logs_client, group_name: str, page_size: int) -> Iterator[Dict[str, Any]]:
+        """
+        最近更新された LOG_STREAM_LIMIT 個のストリームのイベントを、ストリームをまたいで新しい順に返す
+
+        各ストリームから読むのは新しい方から LOG_STREAM_EVENT_LIMIT 件まで
+        """
+        streams = logs_client.describe_log_streams(logGroupName=group_name, orderBy='LastEventTime',
+                                                   descending=True, limit=LOG_STREAM_LIMIT)
+        sources = [self._iter_stream_events(logs_client, group_name, stream['logStreamName'], page_size)
+                   for stream in streams.get('logStreams', [])[:LOG_STREAM_LIMIT]]
+        yield from heapq.merge(*sources, key=lambda event: event['timestamp'], reverse=True)
+
+    def _iter_stream_events(self, logs_client, group_name: str, stream_name: str,
+                            page_size: int) -> Iterator[Dict[str, Any]]:
+        remaining = LOG_STREAM_EVENT_LIMIT
+        kwargs = {'logGroupName': group_name, 'logStreamName': stream_name,
+                  'limit': min(page_size, remaining)}
+        while remaining > 0:
+            events = logs_client.get_log_events(**kwargs)
+            # 1ページ内は古い順のため、逆順にして新しい順に返す
+            for event in list(reversed(events.get('events', [])))[:remaining]:
+                yield {
+                    'timestamp': event['timestamp'],
+                    'message': event['message'],
+                    'log_group': group_name,
+                    'log_stream': stream_name
+                }
+                remaining -= 1
+            token = events.get('nextBackwardToken')
+            if not events.get('events') or not token or token == kwargs.get('nextToken'):
+                return
+            kwargs['nextToken'] = token
+            kwargs['limit'] = min(page_size, remaining)
+
+    def _iter_filtered_log_events(self, logs_client, group_name: str, page_size: int,
+                                  start_time: Optional[int], end_time: Optional[int]) -> Iterator[Dict[str, Any]]:
+        kwargs = {'logGroupName': group_name, 'limit': page_size}
+        if start_time is not None:
+            kwargs['startTime'] = start_time
+        if end_time is not None:
+            kwargs['endTime'] = end_time
+        while True:
+            response = logs_client.filter_log_events(**kwargs)
+            for event in response.get('events', []):
+                yield {
+                    'timestamp': event['timestamp'],
+                    'message': event['message'],
+                    'log_group': group_name,
+                    'log_stream': event.get('logStreamName')
+                }
+            token = response.get('nextToken')
+            if not token:
+                return
+            kwargs['nextToken'] = token
+
+    def _get_azure_logs(self, service: str, limit: int = LOG_FETCH_LIMIT, **filters: Any) -> List[Dict[str, Any]]:
         """
         Azure ログを取得
         """
+        return list(self.iter_logs('azure', service, limit=limit, **filters))
+
+    def _iter_azure_log_events(self, service: str) -> Iterator[Dict[str, Any]]:
         # Azure Monitor Logs の実装
         # 現在はモックデータを返す
-        return [
-            {
-                'timestamp': '2024-01-01T00:00:00Z',
-                'message': 'Azure VM の起動が完了しました',
-                'level': 'INFO',
-                'service': service
-            },
-            {
-                'timestamp': '2024-01-01T00:01:00Z',
-                'message': 'ストレージアカウントへの接続が確立されました',
-                'level': 'INFO',
-                'service': service
+        yield {
+            'timestamp': '2024-01-01T00:00:00Z',
+            'message': 'Azure VM の起動が完了しました',
+            'level': 'INFO',
+            'service': service
+        }
+        yield {
+            'timestamp': '2024-01-01T00:01:00Z',
+            'message': 'ストレージアカウントへの接続が確立されました',
+            'level': 'INFO',
+            'service': service
+        }
+
+    @_timed_fetch('metrics')
+    def get_metric_series(self, provider: str, service: str, resource_ids: List[str], start_time: float,
+                          end_time: float, period: int = 300,
+                          metric: Optional[str] = None) -> Dict[str, Tuple[List[int], List[float]]]:
+        """
+        リソースごとのメトリクスの系列を取得する（リソース ID -> (UNIX 時刻（秒）の列, 値の列)）
+
+        AWS は GetMetricData に最大 500 リソース分のクエリをまとめて渡し、呼び出し回数を抑える
+        """
+        definition = METRIC_DEFINITIONS.get((provider, service))
+        if definition is None:
+            logger.warning(f"メトリクスの取得に未対応のサービス: {provider}/{service}")
+            return {}
+        namespace, dimension, default_metric = definition
+        metric = metric or default_metric
+        try:
+            if provider == 'aws':
+                return self._get_cloudwatch_metrics(namespace, dimension, metric, resource_ids,
+                                                    start_time, end_time, period)
+            return self._get_azure_metrics(metric, resource_ids, start_time, end_time, period)
+        except Exception as e:
+            logger.error(f"メトリクス取得エラー: {str(e)}")
+            return {}
+
+    def _get_cloudwatch_metrics(self, namespace: str, dimension: str, metric: str, resource_ids: List[str],
+                                start_time: float, end_time: float,
+                                period: int) -> Dict[str, Tuple[List[int], List[float]]]:
+        if not self.aws_session:
+            logger.error("AWS セッションが初期化されていません")
+            return {}
+        cloudwatch = self.aws_session.client('cloudwatch')
+        series: Dict[str, Tuple[List[int], List[float]]] = {}
+        for offset in range(0, len(resource_ids), METRIC_QUERIES_PER_CALL):
+            batch = resource_ids[offset:offset + METRIC_QUERIES_PER_CALL]
+            kwargs = {
+                'MetricDataQueries': [{
+                    'Id': f"m{i}",
+                    'MetricStat': {
+                        'Metric': {'Namespace': namespace, 'MetricName': metric,
+                                   'Dimensions': [{'Name': dimension, 'Value': resource_id}]},
+                        'Period': period,
+                        'Stat': 'Average'
+                    },
+                    'ReturnData': True
+                } for i, resource_id in enumerate(batch)],
+                'StartTime': datetime.fromtimestamp(start_time, timezone.utc),
+                'EndTime': datetime.fromtimestamp(end_time, timezone.utc),
+                'ScanBy': 'TimestampAscending'
             }
-        ]
+            while True:
+                response = cloudwatch.get_metric_data(**kwargs)
+                for result in response.get('MetricDataResults', []):
+                    timestamps, values = series.setdefault(batch[int(result['Id'][1:])], ([], []))
+                    timestamps.extend(to_epoch(timestamp) for timestamp in result.get('Timestamps', []))
+                    values.extend(result.get('Values', []))
+                token = response.get('NextToken')
+                if not token:
+                    break
+                kwargs['NextToken'] = token
+        return series
+
+    def _get_azure_metrics(self, metric: str, resource_ids: List[str], start_time: float, end_time: float,
+                           period: int) -> Dict[str, Tuple[List[int], List[float]]]:
+        subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
+        if _sdk.MonitorManagementClient is None or not self.azure_credential or not subscription_id:
+            logger.warning("Azure Monitor のメトリクスは利用できません（azure-mgmt-monitor と認証情報が必要です）")
+            return {}
+        monitor_client = _sdk.MonitorManagementClient(self.azure_credential, subscription_id,
+                                                      **_azure_client_options('monitor', 'metrics.list'))
+        timespan = '/'.join(datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+                            for t in (start_time, end_time))
+        series: Dict[str, Tuple[List[int], List[float]]] = {}
+        # Azure Monitor はリソースごとの取得のみ
+        for resource_id in resource_ids:
+            result = monitor_client.metrics.list(resource_id, timespan=timespan, interval=f"PT{period // 60}M",
+                                                 metricnames=metric, aggregation='Average')
+            timestamps, values = series.setdefault(resource_id, ([], []))
+            for item in result.value:
+                for timeseries in item.timeseries:
+                    for point in timeseries.data:
+                        if point.average is not None:
+                            timestamps.append(to_epoch(point.time_stamp))
+                            values.append(point.average)
+        return series
 
     def _get_instance_name(self, instance: Dict[str, Any]) -> str:
         """
@@ -0,0 +1,180 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 異常とみなすスコア（ロバスト z スコア）の下限
+METRIC_ANOMALY_THRESHOLD = float(os.getenv('METRIC_ANOMALY_THRESHOLD', 3.5))
+# 直前の何点を基準に異常度を求めるか
+METRIC_ROLLING_WINDOW = int(os.getenv('METRIC_ROLLING_WINDOW', 36))
+# 直近の何点を異常の判定対象とするか
+METRIC_RECENT_POINTS = int(os.getenv('METRIC_RECENT_POINTS', 3))
+# ばらつきの下限（メトリクスの単位。CPU 使用率であれば % ）。値がほぼ一定の系列の小さな揺れを異常としない
+METRIC_MIN_SCALE = float(os.getenv('METRIC_MIN_SCALE', 1.0))
+
+# メトリクスの集計間隔（秒）と、異常の判定に使う期間（時間）。1 日分より長ければ前日以前の同じ時刻とも比べる
+METRIC_PERIOD = int(os.getenv('METRIC_PERIOD', 300))
+METRIC_LOOKBACK_HOURS = int(os.getenv('METRIC_LOOKBACK_HOURS', 48))
+
+# MAD を正規分布の標準偏差に換算する係数
+_MAD_TO_SIGMA = 1.4826
+
+MetricSeries = Tuple[Sequence[float], Sequence[float]]  # (UNIX 時刻（秒）の列, 値の列)
+
+
+def align_series(series: Dict[str, MetricSeries], start: float, period: int,
+                 length: int) -> Tuple[List[str], np.ndarray]:
+    """
+    時刻と値の組の系列を、start から period 秒ごと length 点の 2 次元配列（系列 × 時刻）にそろえる
+
+    値のない時刻は NaN とする。(系列のキー, 配列) を返す
+    """
+    keys = list(series)
+    matrix = np.full((len(keys), length), np.nan)
+    for row, key in enumerate(keys):
+        timestamps, values = series[key]
+        if not len(timestamps):
+            continue
+        slots = ((np.asarray(timestamps, dtype=np.float64) - start) // period).astype(np.int64)
+        valid = (slots >= 0) & (slots < length)
+        matrix[row, slots[valid]] = np.asarray(values, dtype=np.float64)[valid]
+    return keys, matrix
+
+
+def fill_gaps(matrix: np.ndarray) -> np.ndarray:
+    """
+    欠損（NaN）を直前の値で埋める（先頭の欠損は最初の値で埋める。すべて欠損の系列は NaN のまま）
+    """
+    valid = ~np.isnan(matrix)
+    columns = np.arange(matrix.shape[1])
+    last = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+    last = np.where(last < 0, first[:, None], last)
+    return np.take_along_axis(matrix, last, axis=1)
+
+
+def _trailing_windows(matrix: np.ndarray, window: int, points: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    判定する各点の値と、その直前 window 点の窓（系列 × 点 × window）
+    """
+    length = matrix.shape[1]
+    points = length - window if points is None else min(points, length - window)
+    windows = sliding_window_view(matrix, window, axis=1)[:, length - window - points:length - window]
+    return matrix[:, length - points:], windows
+
+
+def rolling_zscores(matrix: np.ndarray, window: int = METRIC_ROLLING_WINDOW,
+                    points: Optional[int] = None, min_scale: float = METRIC_MIN_SCALE) -> np.ndarray:
+    """
+    各点の直前 window 点の平均・標準偏差に対する z スコア（末尾 points 点分。省略時は求められる全点）
+    """
+    if matrix.shape[1] <= window:
+        return np.empty((matrix.shape[0], 0))
+    values, windows = _trailing_windows(matrix, window, points)
+    scale = np.maximum(windows.std(axis=-1), min_scale)
+    return (values - windows.mean(axis=-1)) / scale
+
+
+def rolling_mad_scores(matrix: np.ndarray, window: int = METRIC_ROLLING_WINDOW,
+                       points: Optional[int] = None,
+                       min_scale: float = METRIC_MIN_SCALE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    各点の直前 window 点の中央値・MAD に対するロバスト z スコア
+
+    (スコア, 中央値, ばらつき) をそれぞれ 系列 × 末尾 points 点 の配列で返す
+    """
+    if matrix.shape[1] <= window:
+        empty = np.empty((matrix.shape[0], 0))
+        return empty, empty, empty
+    values, windows = _trailing_windows(matrix, window, points)
+    median = np.median(windows, axis=-1)
+    mad = np.median(np.abs(windows - median[..., None]), axis=-1)
+    scale = np.maximum(mad * _MAD_TO_SIGMA, min_scale)
+    return (values - median) / scale, median, scale
+
+
+def seasonal_baseline(matrix: np.ndarray, season: int, points: int) -> Optional[np.ndarray]:
+    """
+    末尾 points 点それぞれについて、過去の同じ時刻（season 点前・2 season 点前 …）の中央値
+
+    1 周期分以上の履歴がない場合は None
+    """
+    length = matrix.shape[1]
+    seasons = (length - points) // season
+    if season <= 0 or seasons < 1:
+        return None
+    offsets = np.arange(length - points, length)
+    history = np.stack([matrix[:, offsets - season * k] for k in range(1, seasons + 1)], axis=-1)
+    return np.median(history, axis=-1)
+
+
+def anomaly_scores(matrix: np.ndarray, window: int = METRIC_ROLLING_WINDOW, points: int = METRIC_RECENT_POINTS,
+                   season: Optional[int] = None, min_scale: float = METRIC_MIN_SCALE) -> Dict[str, np.ndarray]:
+    """
+    末尾 points 点の異常度をまとめて求める
+
+    直前の窓に対するロバスト z スコアを基本とし、season を指定して履歴が足りる場合は
+    過去の同じ時刻の値との差（窓のばらつき単位）も求め、両方で外れている度合い（小さいほう）を採る。
+    日次の定期的な増減は同じ時刻の値との差が小さいため異常としない
+    """
+    matrix = fill_gaps(matrix)
+    robust, median, scale = rolling_mad_scores(matrix, window, points, min_scale)
+    score = np.abs(robust)
+    baseline = median
+    if season:
+        seasonal = seasonal_baseline(matrix, season, robust.shape[1])
+        if seasonal is not None:
+            values = matrix[:, matrix.shape[1] - robust.shape[1]:]
+            score = np.minimum(score, np.abs(values - seasonal) / scale)
+            baseline = seasonal
+    return {'score': score, 'robust': robust, 'baseline': baseline,
+            'zscore': rolling_zscores(matrix, window, points, min_scale)}
+
+
+def rank_anomalies(keys: Sequence[Any], matrix: np.ndarray, threshold: float = METRIC_ANOMALY_THRESHOLD,
+                   window: int = METRIC_ROLLING_WINDOW, points: int = METRIC_RECENT_POINTS,
+                   season: Optional[int] = None, min_scale: float = METRIC_MIN_SCALE,
+                   top: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    系列ごとの異常度（直近 points 点の最大値）が threshold 以上のものを異常度の高い順に返す
+    """
+    if not len(keys) or matrix.shape[1] <= window:
+        return []
+    result = anomaly_scores(matrix, window, points, season, min_scale)
+    score = np.where(np.isnan(result['score']), -np.inf, result['score'])
+    worst = score.argmax(axis=1)
+    rows = np.arange(len(keys))
+    series_score = score[rows, worst]
+    flagged = np.flatnonzero(series_score >= threshold)
+    flagged = flagged[np.argsort(-series_score[flagged], kind='stable')]
+    if top is not None:
+        flagged = flagged[:top]
+
+    offset = matrix.shape[1] - score.shape[1]
+    filled = fill_gaps(matrix[flagged])
+    anomalies = []
+    for position, row in enumerate(flagged):
+        column = worst[row]
+        anomalies.append({
+            'key': keys[row],
+            'score': round(float(series_score[row]), 2),
+            'value': round(float(filled[position, offset + column]), 3),
+            'baseline': round(float(result['baseline'][row, column]), 3),
+            'direction': 'up' if result['robust'][row, column] > 0 else 'down',
+            'zscore': round(float(result['zscore'][row, column]), 2),
+            'index': int(offset + column)
+        })
+    return anomalies
+
+
+def detect_anomalies(series: Dict[str, MetricSeries], end: float, period: int = METRIC_PERIOD,
+                     hours: int = METRIC_LOOKBACK_HOURS, **options: Any) -> List[Dict[str, Any]]:
+    """
+    end までの hours 時間分の系列（キーはリソース ID）をそろえ、異常のある系列を異常度の高い順に返す
+
+    日次の周期（1 日前・2 日前 … の同じ時刻）との比較は、履歴が 1 日分を超える場合のみ行う
+    """
+    length = hours * 3600 // period
+    keys, matrix = align_series(series, end - length * period, period, length)
+    options.setdefault('season', 86400 // period)
+    return rank_anomalies(keys, matrix, **options)
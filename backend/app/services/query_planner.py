@@ -0,0 +1,217 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.services.context_builder import detect_states
+from app.services.resource_query import ResourceQuery
+from app.utils.lazy_import import module_available
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 条件付き（SDK の読み込みは実際に使う時点まで遅らせ、ここではインストールの有無のみ調べる）
+AZURE_RESOURCE_GRAPH_AVAILABLE = module_available('azure.mgmt.resourcegraph')
+
+# Resource Graph で Azure の絞り込みをまとめて実行するか（azure-mgmt-resourcegraph が必要）
+AZURE_RESOURCE_GRAPH_ENABLED = os.getenv('AZURE_RESOURCE_GRAPH', 'false').lower() == 'true'
+
+# Resource Graph のリソース種別と、共通項目に対応するプロパティ
+AZURE_GRAPH_TYPES = {
+    'vm': 'microsoft.compute/virtualmachines',
+    'storage': 'microsoft.storage/storageaccounts',
+}
+AZURE_GRAPH_COLUMNS = {
+    'vm': {
+        'type': 'tostring(properties.hardwareProfile.vmSize)',
+        'status': 'tostring(properties.provisioningState)',
+        'created_at': 'tostring(properties.timeCreated)',
+    },
+    'storage': {
+        'type': 'tostring(sku.tier)',
+        'status': 'tostring(properties.statusOfPrimary)',
+        'created_at': 'tostring(properties.creationTime)',
+    },
+}
+
+# 質問文から絞り込み条件を読み取るパターン
+_INSTANCE_TYPE_PATTERN = re.compile(
+    r'\b([a-z][0-9][a-z0-9-]*\.(?:nano|micro|small|medium|\d*x?large|metal))\b'
+    r'|\b(db\.[a-z][0-9][a-z0-9-]*\.(?:micro|small|medium|\d*x?large))\b'
+    r'|\b(Standard_[A-Za-z0-9_]+)\b', re.ASCII)
+_VPC_PATTERN = re.compile(r'\b(vpc-[0-9a-f]{8,17})\b', re.ASCII)
+# 「タグ Env:prod」または「Env=prod」
+_TAG_PATTERN = re.compile(
+    r'(?:タグ|tag)\s*[:：]?\s*([A-Za-z][\w.-]*)\s*[=:＝：]\s*([\w.-]+)'
+    r'|\b([A-Za-z][\w.-]*)\s*[=＝]\s*([\w.-]+)', re.IGNORECASE | re.ASCII)
+_RESOURCE_GROUP_PATTERN = re.compile(
+    r'(?:リソースグループ|resource\s*group)\s*[:：]?\s*([\w.()-]+)', re.IGNORECASE | re.ASCII)
+
+
+@dataclass
+class QueryPlan:
+    """
+    絞り込み条件のうち、API 側で実行する部分（native）と取得後に適用する部分（residual）
+    """
+    provider: str
+    service: str
+    native: Dict[str, Any] = field(default_factory=dict)
+    residual: ResourceQuery = field(default_factory=ResourceQuery)
+    pushed: List[str] = field(default_factory=list)
+
+
+def plan_query(provider: str, service: str, query: Optional[ResourceQuery]) -> QueryPlan:
+    """
+    絞り込み条件をプロバイダーの API で表現できる部分とそれ以外に分ける
+    """
+    if query is None or (not query.filters and not query.tags):
+        return QueryPlan(provider, service)
+
+    if provider == 'aws' and service == 'ec2':
+        plan = _plan_ec2(query)
+    elif provider == 'aws' and service == 'rds':
+        plan = _plan_rds(query)
+    elif provider == 'azure' and service in AZURE_GRAPH_TYPES:
+        plan = _plan_azure(service, query)
+    else:
+        plan = QueryPlan(provider, service, residual=query.without())
+
+    if plan.pushed:
+        logger.info("サーバー側で絞り込み (%s/%s): %s", provider, service, ', '.join(plan.pushed))
+    return plan
+
+
+def _plan_ec2(query: ResourceQuery) -> QueryPlan:
+    # EC2 の Filters はいずれも完全一致（状態・タイプは小文字）
+    names = {'status': 'instance-state-name', 'type': 'instance-type', 'vpc_id': 'vpc-id'}
+    filters = [{'Name': names[column], 'Values': [v.lower() for v in values]}
+               for column, values in query.filters.items() if column in names]
+    for key, value in query.tags.items():
+        if value is None:
+            filters.append({'Name': 'tag-key', 'Values': [key]})
+        else:
+            filters.append({'Name': f"tag:{key}", 'Values': [value]})
+
+    pushed = [f['Name'] for f in filters]
+    return QueryPlan('aws', 'ec2', native={'filters': filters} if filters else {},
+                     residual=query.without(names, tags=True), pushed=pushed)
+
+
+def _plan_rds(query: ResourceQuery) -> QueryPlan:
+    # describe_db_instances の Filters は engine などに限られ、状態・クラスは指定できない
+    if 'engine' not in query.filters:
+        return QueryPlan('aws', 'rds', residual=query.without())
+    filters = [{'Name': 'engine', 'Values': [v.lower() for v in query.filters['engine']]}]
+    return QueryPlan('aws', 'rds', native={'filters': filters},
+                     residual=query.without(('engine',)), pushed=['engine'])
+
+
+def _plan_azure(service: str, query: ResourceQuery) -> QueryPlan:
+    if AZURE_RESOURCE_GRAPH_AVAILABLE and AZURE_RESOURCE_GRAPH_ENABLED:
+        graph_query = build_resource_graph_query(service, query)
+        # KQL に変換しない条件（VPC・エンジンなど）は取得後に適用する
+        return QueryPlan('azure', service, native={'graph_query': graph_query},
+                         residual=query.without(tuple(_graph_expressions(service)), tags=True),
+                         pushed=['resource-graph'])
+
+    # 管理 API ではリソースグループ単位の列挙のみ指定できる
+    groups = query.filters.get('resource_group', [])
+    if len(groups) == 1:
+        return QueryPlan('azure', service, native={'resource_group': groups[0]},
+                         residual=query.without(('resource_group',)), pushed=['resource_group'])
+    return QueryPlan('azure', service, residual=query.without())
+
+
+def _kql_string(value: str) -> str:
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _kql_in(expression: str, values: List[str]) -> str:
+    return f"{expression} in~ ({', '.join(_kql_string(v) for v in values)})"
+
+
+def _graph_expressions(service: str) -> Dict[str, str]:
+    """
+    KQL で絞り込める共通項目と、対応する Resource Graph の式
+    """
+    columns = AZURE_GRAPH_COLUMNS[service]
+    return {'region': 'location', 'resource_group': 'resourceGroup',
+            'type': columns['type'], 'status': columns['status']}
+
+
+def build_resource_graph_query(service: str, query: ResourceQuery) -> str:
+    """
+    絞り込み条件を Resource Graph の KQL に変換する（共通項目の列名で project する）
+    """
+    columns = AZURE_GRAPH_COLUMNS[service]
+    expressions = _graph_expressions(service)
+
+    clauses = ["Resources", f"where type =~ {_kql_string(AZURE_GRAPH_TYPES[service])}"]
+    for column, values in query.filters.items():
+        if column in expressions:
+            clauses.append(f"where {_kql_in(expressions[column], values)}")
+    for key, value in query.tags.items():
+        if value is None:
+            clauses.append(f"where isnotempty(tags[{_kql_string(key)}])")
+        else:
+            clauses.append(f"where tags[{_kql_string(key)}] == {_kql_string(value)}")
+    clauses.append(
+        f"project id, name, location, resourceGroup, tags, "
+        f"size = {columns['type']}, status = {columns['status']}, created_at = {columns['created_at']}")
+    return ' | '.join(clauses)
+
+
+def extract_filters(message: str) -> Dict[str, Any]:
+    """
+    質問文から絞り込み条件（state・instance_type・tag・vpc_id・resource_group）を読み取る
+    """
+    parameters: Dict[str, Any] = {}
+    states = detect_states(message)
+    if states:
+        parameters['state'] = list(states)
+
+    match = _INSTANCE_TYPE_PATTERN.search(message)
+    if match:
+        parameters['instance_type'] = next(g for g in match.groups() if g)
+
+    match = _VPC_PATTERN.search(message)
+    if match:
+        parameters['vpc_id'] = match.group(1)
+
+    match = _RESOURCE_GROUP_PATTERN.search(message)
+    if match:
+        parameters['resource_group'] = match.group(1)
+    else:
+        match = _TAG_PATTERN.search(message)
+        if match:
+            key, value = (match.group(1), match.group(2)) if match.group(1) else match.group(3, 4)
+            parameters['tag'] = f"{key}:{value}"
+    return parameters
+
+
+def query_from_parameters(parameters: Dict[str, Any]) -> Optional[ResourceQuery]:
+    """
+    意図解析の parameters から絞り込み条件を作る（条件がなければ None）
+    """
+    def as_list(value) -> List[str]:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return [str(v) for v in values if v]
+
+    mapping = {'state': 'status', 'status': 'status', 'instance_type': 'type',
+               'vpc_id': 'vpc_id', 'resource_group': 'resource_group',
+               'region': 'region', 'engine': 'engine'}
+    filters: Dict[str, List[str]] = {}
+    for name, column in mapping.items():
+        values = as_list(parameters.get(name))
+        if values:
+            filters.setdefault(column, []).extend(values)
+
+    tags: Dict[str, Optional[str]] = {}
+    for tag in as_list(parameters.get('tag')):
+        key, sep, value = tag.partition(':')
+        if key:
+            tags[key] = value if sep else None
+
+    if not filters and not tags:
+        return None
+    return ResourceQuery(filters=filters, tags=tags)
+
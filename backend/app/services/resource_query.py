@@ -0,0 +1,127 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from app.models.resource import Resource, format_epoch
+
+# 列を指定しない場合に出力する項目
+DEFAULT_FIELDS = ('id', 'name', 'provider', 'service', 'type', 'region', 'status', 'created_at', 'tags')
+
+# クエリパラメータ名と絞り込み対象の列の対応
+# （リソース一覧 API では type がサービス種別を表すため、タイプの条件は instance_type で指定する）
+FILTER_PARAMS: Dict[str, str] = {
+    'region': 'region',
+    'status': 'status',
+    'instance_type': 'type',
+    'vpc_id': 'vpc_id',
+    'resource_group': 'resource_group',
+    'engine': 'engine',
+}
+
+
+class ResourceQueryError(ValueError):
+    """
+    絞り込み条件・列指定が不正な場合のエラー
+    """
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+@dataclass
+class ResourceQuery:
+    """
+    リソース一覧・集計・エクスポートで共通の絞り込み条件と出力列
+    """
+    filters: Dict[str, List[str]] = field(default_factory=dict)  # 列名 -> 値のリスト（いずれかに一致）
+    tags: Dict[str, Optional[str]] = field(default_factory=dict)  # タグ名 -> 値（None は存在のみ）
+    fields: Optional[List[str]] = None
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, Any]) -> 'ResourceQuery':
+        """
+        クエリパラメータから作成（fields・region・status・instance_type・tag=キー:値）
+        """
+        filters = {column: _split(args.get(param, ''))
+                   for param, column in FILTER_PARAMS.items() if args.get(param)}
+
+        tags: Dict[str, Optional[str]] = {}
+        tag_args = args.getlist('tag') if hasattr(args, 'getlist') else [args.get('tag', '')]
+        for tag in tag_args:
+            if not tag:
+                continue
+            key, sep, value = tag.partition(':')
+            if not key:
+                raise ResourceQueryError(f"タグ条件が不正です: {tag}")
+            tags[key] = value if sep else None
+
+        fields = _split(args.get('fields', '')) or None
+        return cls(filters=filters, tags=tags, fields=fields)
+
+    def without(self, columns=(), tags: bool = False) -> 'ResourceQuery':
+        """
+        指定した列（と tags=True の場合はタグ）の条件を除いた絞り込み条件
+        """
+        return ResourceQuery(
+            filters={c: v for c, v in self.filters.items() if c not in columns},
+            tags={} if tags else dict(self.tags))
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.filters and not self.tags and not self.fields
+
+    def output_fields(self) -> List[str]:
+        return list(self.fields or DEFAULT_FIELDS)
+
+    def matches(self, resource: Resource) -> bool:
+        """
+        リソースが絞り込み条件に一致するか（値の比較は大文字小文字を区別しない）
+        """
+        for column, wanted in self.filters.items():
+            value = str(resource.get(column) or '').lower()
+            if value not in (w.lower() for w in wanted):
+                return False
+        if self.tags:
+            resource_tags = resource.tag_dict()
+            for key, value in self.tags.items():
+                if key not in resource_tags:
+                    return False
+                if value is not None and resource_tags[key] != value:
+                    return False
+        return True
+
+    def apply(self, records: Iterable[Any], provider: str = '', service: str = '') -> Iterator[Resource]:
+        """
+        条件に一致するリソースを順に返す（辞書形式の結果も Resource に揃える）
+        """
+        for record in records:
+            resource = Resource.coerce(record, provider, service)
+            if self.matches(resource):
+                yield resource
+
+    def project(self, resource: Resource) -> Dict[str, Any]:
+        """
+        指定された列のみの辞書に変換
+        """
+        if not self.fields:
+            return resource.to_dict()
+        return {name: field_value(resource, name) for name in self.fields}
+
+
+def field_value(resource: Resource, name: str) -> Any:
+    """
+    出力用の項目値（作成日時は ISO 8601、タグは辞書、それ以外は metadata も含めて参照）
+    """
+    if name == 'created_at':
+        return format_epoch(resource.created_at)
+    if name == 'tags':
+        return resource.tag_dict()
+    return resource.get(name)
+
+
+def slice_records(slices: Iterable[Tuple[str, str, List[Any]]],
+                  query: ResourceQuery) -> Iterator[Resource]:
+    """
+    (provider, service, records) の並びから条件に一致するリソースを順に返す
+    """
+    for provider, service, records in slices:
+        yield from query.apply(records, provider, service)
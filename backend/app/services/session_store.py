@@ -0,0 +1,168 @@
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, List, Optional
+from app.models.message import Message
+from app.utils.tokens import estimate_tokens
+
+# 要約に残す1ターンあたりの文字数と要約全体の上限
+SUMMARY_TURN_CHARS = 40
+SUMMARY_MAX_CHARS = 400
+# 追質問用に保持する前回結果の最大件数と、1件あたりのメモリ量の見積もり（文字数換算）
+MAX_LAST_ENTRIES = 500
+LAST_ENTRY_CHARS = 200
+# クライアントから受け付けるセッション ID（uuid4().hex の形式）
+SESSION_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class ChatSession:
+    """
+    1つの会話セッション（直近のメッセージと、前回の結果を保持する）
+    """
+
+    def __init__(self, session_id: str, max_messages: int):
+        self.id = session_id
+        self.messages: Deque[Message] = deque(maxlen=max_messages)
+        self.summary = ''
+        self.last_intent: Optional[dict] = None
+        self.last_entries: List[Any] = []
+        self.size = 0
+        self.updated_at = time.time()
+
+    def set_last_result(self, intent: dict, entries: List[Any]):
+        """
+        追質問で再利用するため、直前の意図と結果を保持する
+        """
+        self.last_intent = intent
+        self.last_entries = list(entries[:MAX_LAST_ENTRIES])
+
+    def prompt_history(self, token_budget: int) -> str:
+        """
+        トークン予算内に収まる直近の会話履歴（古い部分は要約）を返す
+        """
+        lines = []
+        used = 0
+        for message in reversed(self.messages):
+            speaker = 'ユーザー' if message.sender == 'user' else 'アシスタント'
+            line = f"{speaker}: {message.content}"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        lines.reverse()
+
+        if self.summary and used + estimate_tokens(self.summary) <= token_budget:
+            lines.insert(0, f"（以前の会話の要約）{self.summary}")
+        return '\n'.join(lines)
+
+    def _summarize(self, message: Message):
+        """
+        リングバッファから押し出されたターンを要約に取り込む
+        """
+        if message.sender != 'user':
+            return
+        self.summary = (self.summary + f" / {message.content[:SUMMARY_TURN_CHARS]}").strip(' /')
+        if len(self.summary) > SUMMARY_MAX_CHARS:
+            self.summary = self.summary[-SUMMARY_MAX_CHARS:]
+
+
+class SessionStore:
+    """
+    セッションを LRU で管理し、件数と全体のメモリ量に上限を設けるストア
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_messages: Optional[int] = None,
+                 max_total_chars: Optional[int] = None):
+        self.max_sessions = max_sessions or int(os.getenv('SESSION_MAX_SESSIONS', 1000))
+        self.max_messages = max_messages or int(os.getenv('SESSION_MAX_MESSAGES', 20))
+        self.max_total_chars = max_total_chars or int(os.getenv('SESSION_MAX_TOTAL_CHARS', 5_000_000))
+        self._sessions: 'OrderedDict[str, ChatSession]' = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def total_chars(self) -> int:
+        return self._total_chars
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        """
+        セッションを取得（存在しなければ作成）し、最近使用したものとして記録する
+
+        session_id が 32 桁の16進数の文字列でない場合は新しい ID を発行する
+        """
+        if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+            session_id = None
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex, self.max_messages)
+                self._sessions[session.id] = session
+                self._evict()
+            else:
+                self._sessions.move_to_end(session.id)
+            return session
+
+    def append(self, session: ChatSession, sender: str, content: str,
+               metadata: Optional[dict] = None) -> Message:
+        """
+        セッションにメッセージを追加し、上限を超えた分を要約・破棄する
+        """
+        message = Message(id=uuid.uuid4().hex, content=content, sender=sender,
+                          timestamp=datetime.now(timezone.utc), metadata=metadata)
+        with self._lock:
+            if len(session.messages) == session.messages.maxlen:
+                dropped = session.messages[0]
+                session._summarize(dropped)
+                self._resize(session, -len(dropped.content))
+            session.messages.append(message)
+            session.updated_at = time.time()
+            self._resize(session, len(content))
+            self._evict()
+        return message
+
+    def set_last_result(self, session: ChatSession, intent: dict, entries: List[Any]):
+        """
+        追質問用の前回結果を保持し、その見積もりのメモリ量を全体の上限に含める
+        """
+        with self._lock:
+            previous = len(session.last_entries)
+            session.set_last_result(intent, entries)
+            self._resize(session, (len(session.last_entries) - previous) * LAST_ENTRY_CHARS)
+            self._evict()
+
+    def _resize(self, session: ChatSession, delta: int):
+        session.size += delta
+        if session.id in self._sessions:
+            self._total_chars += delta
+
+    def _evict(self):
+        """
+        セッション数・メモリ量の上限を超えている間、最も古く使われたセッションを破棄
+        """
+        while self._sessions and (len(self._sessions) > self.max_sessions
+                                  or self._total_chars > self.max_total_chars):
+            _, evicted = self._sessions.popitem(last=False)
+            self._total_chars -= evicted.size
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """
+    プロセス内で共有するセッションストアを取得
+    """
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore()
+        return _session_store
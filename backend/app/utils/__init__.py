@@ -1,3 +1,4 @@
 from .logger import get_logger
+from .json_schema import validate_json
 
-__all__ = ['get_logger']
+__all__ = ['get_logger', 'validate_json']
@@ -0,0 +1,47 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+from flask import Response, current_app, request
+
+
+def inventory_validators(slices: Iterable[Any]) -> tuple:
+    """
+    インベントリキャッシュのスライスから (ETag, Last-Modified) を求める
+
+    ETag は内容のハッシュから作るため、再取得しても内容が同じなら変わらない。
+    圧縮の有無で本文が変わるため弱い ETag とする
+    """
+    slices = list(slices)
+    if len(slices) == 1:
+        etag = slices[0].digest
+    else:
+        joined = ','.join(f"{s.key[0]}/{s.key[1]}:{s.digest}" for s in sorted(slices, key=lambda s: s.key))
+        etag = hashlib.blake2b(joined.encode('utf-8'), digest_size=12).hexdigest()
+    last_modified = max((s.modified_at for s in slices), default=None)
+    return etag, last_modified
+
+
+def not_modified(etag: str, last_modified: Optional[float] = None) -> Optional[Response]:
+    """
+    If-None-Match（なければ If-Modified-Since）が一致する場合に 304 応答を返す（一致しなければ None）
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = int(last_modified) <= request.if_modified_since.timestamp()
+    else:
+        matched = False
+    if not matched:
+        return None
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[float] = None) -> Response:
+    """
+    応答に ETag・Last-Modified を付ける（クライアントには毎回再検証させる）
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
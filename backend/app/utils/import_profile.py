@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+# 起動時に読み込まないモジュール（最初に使う時点で読み込む SDK など）
+# azure.mgmt は名前空間パッケージのみのため、インストールの有無を調べる際に読み込まれてもよい
+DEFERRED_MODULES = (
+    'boto3', 'botocore', 'azure.core', 'azure.identity', 'azure.mgmt.resource', 'azure.mgmt.compute',
+    'azure.mgmt.storage', 'azure.mgmt.resourcegraph', 'azure.mgmt.monitor', 'ollama', 'openai', 'pyarrow',
+)
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 新しいプロセスで create_app() までの時間と、読み込まれた対象モジュールを JSON で出力するコード
+_STARTUP_CODE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    elapsed: float
+    imports: List[ImportEntry] = field(default_factory=list)
+    modules: List[str] = field(default_factory=list)
+
+    def top(self, count: int = 20, key: str = 'cumulative_us') -> List[ImportEntry]:
+        """
+        読み込み時間（既定は配下のモジュールを含む時間）の長い順に count 件
+        """
+        return sorted(self.imports, key=lambda entry: getattr(entry, key), reverse=True)[:count]
+
+    def loaded(self, prefixes: Iterable[str] = DEFERRED_MODULES) -> List[str]:
+        """
+        読み込まれたモジュールのうち prefixes（パッケージ名）に含まれるもの
+        """
+        prefixes = tuple(prefixes)
+        return [name for name in self.modules
+                if any(name == prefix or name.startswith(prefix + '.') for prefix in prefixes)]
+
+    def format(self, count: int = 20) -> str:
+        lines = [f"create_app() までの時間: {self.elapsed * 1000:.1f} ms",
+                 f"{'累積 (ms)':>10} {'自身 (ms)':>10}  モジュール"]
+        for entry in self.top(count):
+            lines.append(f"{entry.cumulative_us / 1000:10.1f} {entry.self_us / 1000:10.1f}  "
+                         f"{'  ' * entry.depth}{entry.module}")
+        deferred = self.loaded()
+        if deferred:
+            lines.append(f"起動時に読み込まれた遅延対象のモジュール: {', '.join(deferred)}")
+        return '\n'.join(lines)
+
+
+def parse_importtime(text: str) -> List[ImportEntry]:
+    """
+    python -X importtime の出力（標準エラー）を解析する。他の行は無視する
+
+    行の形式: "import time: 自身の時間(µs) | 累積の時間(µs) | 字下げ付きのモジュール名"
+    """
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # 見出し行
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip(' ')
+        entries.append(ImportEntry(module=stripped, self_us=int(parts[0]), cumulative_us=int(parts[1]),
+                                   depth=max(0, (len(name) - len(stripped) - 1) // 2)))
+    return entries
+
+
+def measure_startup(cwd: str = _BASE_DIR, env: Optional[Dict[str, str]] = None,
+                    timeout: float = 120) -> StartupReport:
+    """
+    新しいプロセスで create_app() を実行し、起動時間と -X importtime による読み込み時間を計測する
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _STARTUP_CODE], cwd=cwd,
+                            env=env if env is not None else os.environ.copy(),
+                            capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"起動時間の計測に失敗しました: {result.stderr[-2000:]}")
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return StartupReport(elapsed=data['elapsed'], imports=parse_importtime(result.stderr),
+                         modules=data['modules'])
@@ -0,0 +1,67 @@
+import decimal
+from collections.abc import Sequence
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+from app.utils.logger import get_logger
+from app.utils.metrics import SERIALIZATION_SECONDS
+
+logger = get_logger(__name__)
+
+# 条件付きインポート
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_JSON_SERIALIZATION = SERIALIZATION_SECONDS.labels('json')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    orjson が利用可能な場合は orjson でエンコード・デコードする JSON プロバイダー
+
+    orjson がない場合や、標準 json 固有のオプションが指定された場合は Flask 標準の処理に戻す
+    """
+
+    ensure_ascii = False
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        to_dict = getattr(o, 'to_dict', None)
+        if callable(to_dict):
+            return to_dict()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        if isinstance(o, Sequence) and not isinstance(o, (str, bytes)):
+            # スナップショットから復元したリソース一覧など、list 以外のシーケンス
+            return list(o)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if ORJSON_AVAILABLE and not kwargs:
+            return self._dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if not ORJSON_AVAILABLE or self._app.debug:
+            # デバッグ時はインデント付きの標準出力を維持する
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        with _JSON_SERIALIZATION.time():
+            body = self._dumps_bytes(obj)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj: Any) -> bytes:
+        # dataclass も to_dict() を経由させるため、orjson 組み込みの変換は使わない
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS)
@@ -0,0 +1,48 @@
+from typing import Any, Dict, List
+
+_TYPE_CHECKS = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def validate_json(value: Any, schema: Dict[str, Any], path: str = '$') -> List[str]:
+    """
+    JSON Schema のサブセット（type / enum / properties / required / items / minimum / maximum）で検証し、
+    エラーメッセージの一覧を返す（空なら妥当）
+    """
+    errors = []
+
+    expected = schema.get('type')
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_TYPE_CHECKS[t](value) for t in types):
+            return [f"{path}: {expected} が必要です"]
+
+    if 'enum' in schema and value not in schema['enum']:
+        errors.append(f"{path}: {schema['enum']} のいずれかが必要です")
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if 'minimum' in schema and value < schema['minimum']:
+            errors.append(f"{path}: {schema['minimum']} 以上が必要です")
+        if 'maximum' in schema and value > schema['maximum']:
+            errors.append(f"{path}: {schema['maximum']} 以下が必要です")
+
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}.{key}: 必須項目です")
+        for key, sub_schema in schema.get('properties', {}).items():
+            if key in value:
+                errors.extend(validate_json(value[key], sub_schema, f"{path}.{key}"))
+
+    if isinstance(value, list) and 'items' in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_json(item, schema['items'], f"{path}[{i}]"))
+
+    return errors
@@ -0,0 +1,67 @@
+import importlib
+import importlib.util
+import sys
+import threading
+from typing import Any, Dict, Iterable
+
+
+def module_available(name: str) -> bool:
+    """
+    モジュールがインストールされているか（読み込まずに調べる）
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyImports:
+    """
+    SDK などの重いモジュールを最初に参照した時点で読み込む
+
+    names は「公開名: 'モジュール' または 'モジュール:属性'」。読み込んだ値は対象モジュールの属性として保持するため、
+    2回目以降は通常の属性の参照になり、unittest.mock.patch による差し替えもそのまま反映される。
+    optional に含めた名前は、未インストールの場合に ImportError ではなく None になる
+
+    使い方（対象モジュール内）:
+        _sdk = LazyImports(__name__, {'boto3': 'boto3'})
+        __getattr__ = _sdk.resolve   # mcp_service.boto3 のような参照を可能にする
+        ...
+        _sdk.boto3.Session()
+    """
+
+    def __init__(self, module_name: str, names: Dict[str, str], optional: Iterable[str] = ()):
+        self._module_name = module_name
+        self._names = dict(names)
+        self._optional = frozenset(optional)
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Any:
+        namespace = sys.modules[self._module_name].__dict__
+        if name in namespace:
+            return namespace[name]
+        spec = self._names.get(name)
+        if spec is None:
+            raise AttributeError(f"module {self._module_name!r} has no attribute {name!r}")
+        with self._lock:
+            if name in namespace:
+                return namespace[name]
+            module_path, _, attribute = spec.partition(':')
+            try:
+                value = importlib.import_module(module_path)
+                if attribute:
+                    value = getattr(value, attribute)
+            except ImportError:
+                if name not in self._optional:
+                    raise
+                value = None
+            namespace[name] = value
+            return value
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.resolve(name)
+
+    def __dir__(self):
+        return list(self._names)
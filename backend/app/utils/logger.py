@@ -1,34 +1,227 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 
+# 出力形式: json（1行1レコードの構造化ログ）または text
+LOG_FORMAT_ENV = 'LOG_FORMAT'
+# 出力待ちのレコード数の上限（超えた場合は破棄して数える）
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# 同じ INFO 以下のログ（同じロガー・同じ書式）を LOG_SAMPLE_INTERVAL 秒あたり何件まで出力するか（0 は無制限）
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 20))
+LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', 1.0))
+# サンプリングのために覚えておく書式の数
+_SAMPLE_KEYS = 10_000
 
-def get_logger(name: str) -> logging.Logger:
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord の標準の属性（これ以外は extra で渡された項目として JSON に含める）
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id',
+                                                                          'sampled_out'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_configure_lock = threading.Lock()
+
+
+def get_request_id() -> Optional[str]:
+    """
+    処理中のリクエストの ID（リクエスト外では None）
+    """
+    return _request_id.get()
+
+
+def set_request_id(value: Optional[str]) -> contextvars.Token:
+    return _request_id.set(value)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    1行1レコードの JSON に整形する（extra で渡された項目もそのまま含める）
     """
-    ロガーを取得・設定
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        sampled_out = getattr(record, 'sampled_out', 0)
+        if sampled_out:
+            data['sampled_out'] = sampled_out
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
     """
-    logger = logging.getLogger(name)
+    同じロガー・同じ書式の INFO 以下のログを一定時間あたり burst 件までに間引く
+
+    WARNING 以上は常に通す。間引いた件数は次に通したレコードの sampled_out に記録する
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, interval: float = LOG_SAMPLE_INTERVAL):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno > logging.INFO:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) >= _SAMPLE_KEYS:
+                    self._windows.clear()
+                window = self._windows[key] = [now, 0, 0]  # [区間の開始, 通した件数, 間引いた件数]
+            elif now - window[0] >= self.interval:
+                window[0], window[1] = now, 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            record.sampled_out, window[2] = window[2], 0
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    レコードを整形せずにキューへ入れる QueueHandler（整形と I/O は QueueListener のスレッドで行う）
+
+    呼び出し元のスレッドではリクエスト ID のみを記録する。キューが満杯の場合は待たずに破棄する
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-    if not logger.handlers:
-        # ログレベルを設定
-        log_level = os.getenv('LOG_LEVEL', 'INFO')
-        logger.setLevel(getattr(logging, log_level.upper()))
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, 'request_id'):
+            record.request_id = _request_id.get()
+        return record
 
-        # フォーマッターを設定
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
-        # コンソールハンドラーを追加
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
 
-        # ファイルハンドラーを追加（オプション）
+def _formatter() -> logging.Formatter:
+    if os.getenv(LOG_FORMAT_ENV, 'json').lower() == 'text':
+        return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return JSONFormatter()
+
+
+def configure_logging(force: bool = False):
+    """
+    ルートロガーに QueueHandler を1つだけ設定し、出力（コンソール・LOG_FILE）は QueueListener のスレッドで行う
+
+    2回目以降の呼び出しは何もしない（force=True の場合は設定し直す）
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _queue_handler is not None and not force:
+            return
+        root = logging.getLogger()
+        if _queue_handler is not None:
+            root.removeHandler(_queue_handler)
+            _listener.stop()
+
+        formatter = _formatter()
+        handlers = [logging.StreamHandler()]
         log_file = os.getenv('LOG_FILE')
         if log_file:
-            file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            directory = os.path.dirname(log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter())
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+        root.addHandler(_queue_handler)
+        root.setLevel(getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+
+
+def flush_logging():
+    """
+    キューに残ったレコードを出力し終えるまで待つ（終了時・テスト用）
+    """
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+@atexit.register
+def _shutdown():
+    if _listener is not None:
+        _listener.stop()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    ロガーを取得（出力の設定は configure_logging でルートロガーにまとめて行う）
+    """
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def init_request_logging(app):
+    """
+    リクエストごとに ID（X-Request-ID があればその値）を割り当て、ログとレスポンスヘッダーに付ける
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _assign_request_id():
+        value = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _REQUEST_ID_PATTERN.match(value):
+            value = uuid.uuid4().hex
+        g._request_id_token = _request_id.set(value)
+
+    @app.after_request
+    def _request_id_header(response):
+        request_id = _request_id.get()
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
 
-    return logger
+    @app.teardown_request
+    def _clear_request_id(exc):
+        token = g.pop('_request_id_token', None)
+        if token is not None:
+            try:
+                _request_id.reset(token)
+            except ValueError:
+                # ストリーミング応答で別のコンテキストから終了した場合
+                pass
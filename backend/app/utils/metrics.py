@@ -0,0 +1,365 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 処理時間のヒストグラムの既定のバケット（秒）。LLM の生成を含めて 1 分までを区別する
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 既知の値以外をまとめるラベルの値（リクエストから受け取った値ごとに系列が増え続けないようにする）
+OTHER_LABEL = 'other'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """
+    ラベルの値の組ごとに値を持つメトリクスの共通部分
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lookup: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **labels: str):
+        """
+        ラベルの値の組に対応する子を返す（同じ組には同じ子を返すため、呼び出し側で保持してもよい）
+        """
+        if labels:
+            values = tuple([labels.get(name, '') for name in self.labelnames])
+        child = self._lookup.get(values)
+        if child is None:
+            # 文字列以外の値は文字列にそろえて登録する（以降は同じ値の組で直接引ける）
+            key = tuple([str(value) for value in values])
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        family = f'{self.name}_total' if self.kind == 'counter' else self.name
+        return [f'# HELP {family} {self.documentation}', f'# TYPE {family} {self.kind}'] + self._samples()
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+            self._lookup.clear()
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def track(self) -> '_InFlight':
+        """
+        with ブロックの実行中だけ値を 1 増やす
+        """
+        return _InFlight(self)
+
+
+class Counter(_Metric):
+    """
+    増加のみする値（呼び出し回数など）
+    """
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self.labels(**labels).inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}_total{_label_text(self.labelnames, values)} {_format_value(child.value)}'
+                for values, child in list(self._children.items())]
+
+
+class Gauge(_Metric):
+    """
+    増減する値（実行中の件数など）
+    """
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def track(self, **labels: str) -> '_InFlight':
+        return self.labels(**labels).track()
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}{_label_text(self.labelnames, values)} {_format_value(child.value)}'
+                for values, child in list(self._children.items())]
+
+
+class _InFlight:
+    __slots__ = ('child',)
+
+    def __init__(self, child: _Value):
+        self.child = child
+
+    def __enter__(self):
+        self.child.inc()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.dec()
+        return False
+
+
+class _Buckets:
+    """
+    ヒストグラムの1つのラベルの組の値（バケットごとの件数は累積せずに持ち、出力時に累積する）
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """
+        with ブロックの処理時間（秒）を記録する
+        """
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('target', 'started')
+
+    def __init__(self, target: _Buckets):
+        self.target = target
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.target.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    処理時間などの分布（バケットごとの件数・合計・件数）
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float, **labels: str):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels: str) -> _Timer:
+        return self.labels(**labels).time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}')
+            labels = _label_text(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    メトリクスを登録し、Prometheus のテキスト形式で出力する
+
+    値はプロセス内で保持する（gunicorn の複数ワーカーではワーカーごとの値になる）
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"メトリクス {metric.name} は異なる定義で登録済みです")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        登録済みのメトリクスを Prometheus のテキスト形式（0.0.4）にする
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """
+        すべての値を消去する（定義は残す）
+        """
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP リクエスト
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP リクエストの処理時間', ('endpoint', 'method', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'http_requests_in_flight', '処理中の HTTP リクエスト数')
+# チャットの処理段階（intent: 意図の解析、handler: 意図ごとの処理、total: 全体）
+CHAT_STAGE_SECONDS = REGISTRY.histogram(
+    'chat_stage_duration_seconds', 'チャットの処理段階ごとの処理時間', ('stage', 'intent'))
+# クラウドからの取得
+CLOUD_FETCH_SECONDS = REGISTRY.histogram(
+    'cloud_fetch_duration_seconds', 'クラウドからの取得処理の時間', ('provider', 'service', 'fetcher'))
+CLOUD_FETCHES_IN_FLIGHT = REGISTRY.gauge(
+    'cloud_fetches_in_flight', '実行中のクラウドからの取得処理数', ('provider',))
+CLOUD_API_CALLS = REGISTRY.counter(
+    'cloud_api_calls', 'クラウド API の呼び出し回数', ('provider', 'service', 'operation'))
+# LLM
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    'llm_request_duration_seconds', 'LLM の生成時間（実行枠の待機を除く）', ('backend', 'outcome'))
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'llm_queue_wait_seconds', 'LLM の実行枠が空くまでの待機時間', ('backend',))
+LLM_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'llm_requests_in_flight', '実行中の LLM の生成数', ('backend',))
+# キャッシュ（ヒット率は hit / (hit + miss) で求める）
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests', 'キャッシュの参照回数', ('cache', 'result'))
+# レスポンスの直列化
+SERIALIZATION_SECONDS = REGISTRY.histogram(
+    'serialization_duration_seconds', 'レスポンスの直列化時間', ('format',),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    キャッシュの参照結果（ヒット・ミス）を数える
+    """
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def init_metrics(app):
+    """
+    HTTP リクエストの処理時間・処理中の件数を記録するフックを登録する
+    """
+    from flask import g, request
+
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels()
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        in_flight.inc()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            in_flight.dec()
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def _release(exc):
+        # 例外で after_request が呼ばれなかった場合も処理中の件数を戻す
+        if g.pop('_metrics_started', None) is not None:
+            in_flight.dec()
+
+
+@contextmanager
+def track_cloud_fetch(provider: str, service: str, fetcher: str):
+    """
+    クラウドからの取得処理の時間と実行中の件数を記録する
+    """
+    with CLOUD_FETCHES_IN_FLIGHT.labels(provider).track(), \
+            CLOUD_FETCH_SECONDS.labels(provider, service, fetcher).time():
+        yield
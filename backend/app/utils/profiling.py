@@ -0,0 +1,218 @@
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# プロファイルを許可する管理者トークン（未設定の場合はプロファイル機能を無効にする）
+PROFILE_ADMIN_TOKEN_ENV = 'PROFILE_ADMIN_TOKEN'
+# プロファイルの出力先・保持するファイル数・サンプリング間隔（秒）・出力形式（collapsed または speedscope）
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 20))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_FORMAT = os.getenv('PROFILE_FORMAT', 'collapsed')
+# 同時にプロファイルするリクエスト数（サンプリングのスレッドが増え続けないようにする）
+PROFILE_MAX_CONCURRENT = 1
+
+PROFILE_FLAG_HEADER = 'X-Profile'
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+_EXTENSIONS = {'collapsed': '.folded', 'speedscope': '.speedscope.json'}
+_UNSAFE = re.compile(r'[^A-Za-z0-9_-]+')
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_slots = threading.BoundedSemaphore(PROFILE_MAX_CONCURRENT)
+
+Stack = Tuple[str, ...]
+
+
+def _frame_name(code) -> str:
+    path = code.co_filename
+    if path.startswith(_BASE_DIR):
+        path = os.path.relpath(path, _BASE_DIR)
+    # 折りたたみ形式の区切り文字（; と空白）を含めない
+    return f"{code.co_name}({path}:{code.co_firstlineno})".replace(';', ':').replace(' ', '_')
+
+
+class SamplingProfiler:
+    """
+    対象のスレッドのスタックを一定間隔で採取するサンプリングプロファイラー
+
+    別スレッドから sys._current_frames() で採取するため、対象のスレッドの処理には計測用のフックを入れない
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SamplingProfiler':
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        names: Dict[object, str] = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code)
+                stack.append(name)
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        折りたたみ形式（flamegraph.pl・speedscope などで読める「関数;関数;… 件数」の行）
+        """
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+    def speedscope(self, name: str) -> str:
+        """
+        speedscope の JSON 形式
+        """
+        frames: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.samples.most_common():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval)
+        return json.dumps({
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'app.utils.profiling',
+            'shared': {'frames': [{'name': frame} for frame in frames]},
+            'profiles': [{
+                'type': 'sampled', 'name': name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': sum(weights),
+                'samples': samples, 'weights': weights
+            }]
+        }, ensure_ascii=False)
+
+    def write(self, directory: str, name: str, output_format: str = PROFILE_FORMAT,
+              max_files: int = PROFILE_MAX_FILES) -> str:
+        """
+        プロファイルをファイルに書き出し、古いものから削除して max_files 件までにする。ファイル名を返す
+        """
+        output_format = output_format if output_format in _EXTENSIONS else 'collapsed'
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-" \
+                   f"{_UNSAFE.sub('_', name).strip('_')[:60]}{_EXTENSIONS[output_format]}"
+        body = self.collapsed() if output_format == 'collapsed' else self.speedscope(name)
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            f.write(body)
+        prune_profiles(directory, max_files)
+        return filename
+
+
+def prune_profiles(directory: str, max_files: int):
+    """
+    プロファイルのファイルを新しいものから max_files 件だけ残す
+    """
+    try:
+        entries = [entry for entry in os.scandir(directory)
+                   if entry.is_file() and entry.name.endswith(tuple(_EXTENSIONS.values()))]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: (entry.stat().st_mtime, entry.name), reverse=True)
+    for entry in entries[max(0, max_files):]:
+        try:
+            os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"プロファイルの削除に失敗: {str(e)}")
+
+
+def profile_requested(headers, args) -> bool:
+    """
+    ヘッダー（X-Profile: 1）またはクエリ（profile=1）でプロファイルが要求されているか
+    """
+    flag = headers.get(PROFILE_FLAG_HEADER) or args.get('profile')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def profile_authorized(headers) -> bool:
+    """
+    X-Profile-Token が PROFILE_ADMIN_TOKEN と一致するか（未設定の場合は常に不許可）
+    """
+    expected = os.getenv(PROFILE_ADMIN_TOKEN_ENV)
+    given = headers.get(PROFILE_TOKEN_HEADER)
+    if not expected or not given:
+        return False
+    return hmac.compare_digest(given.encode('utf-8'), expected.encode('utf-8'))
+
+
+def init_profiling(app):
+    """
+    管理者トークン付きで要求された /api へのリクエストをプロファイルするフックを登録する
+
+    要求がトークンなし・不一致の場合はプロファイルせずに通常どおり処理する。
+    ストリーミング応答は本文の送出前（ビュー関数の終了時）までを対象とする
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        if not request.path.startswith('/api') or not profile_requested(request.headers, request.args):
+            return
+        if not profile_authorized(request.headers):
+            logger.warning(f"管理者トークンのないプロファイル要求を無視しました: {request.path}")
+            return
+        if not _slots.acquire(blocking=False):
+            g._profile_busy = True
+            return
+        g._profiler = SamplingProfiler(interval=float(os.getenv('PROFILE_INTERVAL', PROFILE_INTERVAL))).start()
+
+    @app.after_request
+    def _write_profile(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            if g.pop('_profile_busy', False):
+                response.headers['X-Profile-Status'] = 'busy'
+            return response
+        try:
+            profiler.stop()
+            name = f"{request.method}-{request.path}"
+            filename = profiler.write(os.getenv('PROFILE_DIR', PROFILE_DIR), name,
+                                      os.getenv('PROFILE_FORMAT', PROFILE_FORMAT),
+                                      int(os.getenv('PROFILE_MAX_FILES', PROFILE_MAX_FILES)))
+            response.headers['X-Profile-File'] = filename
+            logger.info(f"プロファイルを出力しました: {filename}（{profiler.duration * 1000:.1f} ms, "
+                        f"{sum(profiler.samples.values())} サンプル）")
+        except OSError as e:
+            logger.error(f"プロファイルの出力に失敗: {str(e)}")
+        finally:
+            _slots.release()
+        return response
+
+    @app.teardown_request
+    def _release_profile(exc):
+        # 例外で after_request が呼ばれなかった場合もサンプリングを止める
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            _slots.release()
@@ -0,0 +1,245 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Dict, Optional, Tuple
+from flask import Response, current_app, jsonify, request
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 条件付きインポート
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+@dataclass
+class RouteLimit:
+    """
+    ルート区分ごとの制限値
+    """
+    rate: float          # 1秒あたりに補充されるトークン数
+    burst: int           # バケットの容量
+    max_concurrency: int  # 区分全体の同時実行数
+
+
+class InMemoryRateLimitBackend:
+    """
+    プロセス内で状態を保持するトークンバケット・同時実行数カウンタ
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        """
+        トークンを1つ消費する。(許可されたか, 再試行までの秒数) を返す
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def acquire(self, key: str, limit: int) -> bool:
+        with self._lock:
+            current = self._in_flight.get(key, 0)
+            if current >= limit:
+                return False
+            self._in_flight[key] = current + 1
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._in_flight[key] = max(0, self._in_flight.get(key, 0) - 1)
+
+
+class RedisRateLimitBackend:
+    """
+    Redis に状態を保持し、複数ワーカー間で制限を共有するバックエンド
+    """
+
+    _TOKEN_BUCKET_SCRIPT = """
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+    # ワーカーが異常終了してもカウンタが残り続けないようにする有効期限（秒）
+    _IN_FLIGHT_TTL = 300
+
+    def __init__(self, url: str, prefix: str = 'ratelimit:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self._TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        allowed, retry_after = self._script(
+            keys=[f"{self.prefix}bucket:{key}"], args=[rate, burst, time.time()])
+        return bool(int(allowed)), float(retry_after)
+
+    def acquire(self, key: str, limit: int) -> bool:
+        redis_key = f"{self.prefix}inflight:{key}"
+        pipeline = self.client.pipeline()
+        pipeline.incr(redis_key)
+        pipeline.expire(redis_key, self._IN_FLIGHT_TTL)
+        current, _ = pipeline.execute()
+        if current > limit:
+            self.client.decr(redis_key)
+            return False
+        return True
+
+    def release(self, key: str):
+        self.client.decr(f"{self.prefix}inflight:{key}")
+
+
+class RateLimiter:
+    """
+    クライアント単位のトークンバケットと、ルート区分単位の同時実行数上限を適用する
+    """
+
+    def __init__(self, limits: Dict[str, RouteLimit], backend=None, proxy_count: int = 0):
+        self.limits = limits
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.proxy_count = proxy_count
+
+    def client_id(self) -> str:
+        """
+        リクエスト元のクライアント識別子（IP アドレス）
+
+        proxy_count 段のリバースプロキシ配下では、X-Forwarded-For の右から proxy_count 番目を使う
+        （それより左はクライアントが自由に書けるため使わない）
+        """
+        if self.proxy_count > 0:
+            forwarded = [value.strip() for value in request.headers.get('X-Forwarded-For', '').split(',')]
+            if len(forwarded) >= self.proxy_count and forwarded[-self.proxy_count]:
+                return forwarded[-self.proxy_count]
+        return request.remote_addr or 'unknown'
+
+    def check(self, route_class: str):
+        """
+        制限を超えていればエラーレスポンスを返す。通過した場合は None
+        """
+        limit = self.limits.get(route_class)
+        if limit is None:
+            return None
+
+        allowed, retry_after = self.backend.consume(
+            f"{route_class}:{self.client_id()}", limit.rate, limit.burst)
+        if not allowed:
+            return _reject(429, 'リクエストが多すぎます。しばらくしてから再度お試しください', retry_after)
+
+        if not self.backend.acquire(route_class, limit.max_concurrency):
+            return _reject(503, 'サーバーが混雑しています。しばらくしてから再度お試しください', 1)
+        return None
+
+    def release(self, route_class: str):
+        if route_class in self.limits:
+            self.backend.release(route_class)
+
+
+def _reject(status: int, message: str, retry_after: float):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limited(route_class: str):
+    """
+    ルートにレート制限・同時実行数制限を適用するデコレータ
+
+    ストリーミング応答の同時実行数の枠は、ビュー関数の終了時ではなく応答を閉じた時点で解放する
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter: Optional[RateLimiter] = current_app.extensions.get('rate_limiter')
+            if limiter is None:
+                return view(*args, **kwargs)
+
+            rejected = limiter.check(route_class)
+            if rejected is not None:
+                logger.warning(f"レート制限によりリクエストを拒否 ({route_class}, {rejected.status_code})")
+                return rejected
+            try:
+                result = view(*args, **kwargs)
+            except BaseException:
+                limiter.release(route_class)
+                raise
+            if isinstance(result, Response) and result.is_streamed:
+                # ストリーミング応答は本文を送り終える（またはクライアントが切断する）まで枠を保持する
+                result.call_on_close(lambda: limiter.release(route_class))
+            else:
+                limiter.release(route_class)
+            return result
+        return wrapper
+    return decorator
+
+
+def _route_limit(name: str, rate_per_minute: int, burst: int, max_concurrency: int) -> RouteLimit:
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return RouteLimit(
+        rate=float(os.getenv(f"{prefix}_PER_MINUTE", rate_per_minute)) / 60,
+        burst=int(os.getenv(f"{prefix}_BURST", burst)),
+        max_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", max_concurrency))
+    )
+
+
+def init_rate_limiter(app):
+    """
+    環境変数の設定に従ってレート制限をアプリケーションに登録する
+    """
+    if os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'true':
+        return
+
+    limits = {
+        'chat': _route_limit('chat', rate_per_minute=30, burst=10, max_concurrency=8),
+        'inventory': _route_limit('inventory', rate_per_minute=120, burst=30, max_concurrency=16),
+    }
+
+    backend = None
+    redis_url = os.getenv('RATE_LIMIT_REDIS_URL')
+    if redis_url:
+        if REDIS_AVAILABLE:
+            backend = RedisRateLimitBackend(redis_url)
+            logger.info("レート制限の状態を Redis で共有します")
+        else:
+            logger.warning("redis がインストールされていないため、レート制限はプロセス内で管理します")
+
+    app.extensions['rate_limiter'] = RateLimiter(
+        limits, backend,
+        proxy_count=int(os.getenv('RATE_LIMIT_PROXY_COUNT', 0)))
@@ -0,0 +1,38 @@
+from typing import Iterable, List
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する
+
+    ASCII は約4文字で1トークン、日本語などの非ASCII文字は1文字で約1トークンとして数える。
+    UTF-8 のバイト長との差分から非ASCII文字数を求めるため、文字単位のループは行わない
+    """
+    if not text:
+        return 0
+    chars = len(text)
+    # 日本語の大半は UTF-8 で3バイトのため、(バイト数 - 文字数) / 2 で非ASCII文字数を近似する
+    non_ascii = (len(text.encode('utf-8')) - chars) // 2
+    ascii_chars = chars - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+def chunk_by_tokens(items: Iterable[str], budget: int) -> List[str]:
+    """
+    テキストを先頭から順に、1チャンクあたり budget トークン以内になるよう改行で連結してまとめる
+
+    1件で budget を超えるものは、そのまま単独のチャンクとする
+    """
+    chunks = []
+    lines: List[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item) + 1
+        if lines and used + cost > budget:
+            chunks.append('\n'.join(lines))
+            lines, used = [], 0
+        lines.append(item)
+        used += cost
+    if lines:
+        chunks.append('\n'.join(lines))
+    return chunks
@@ -0,0 +1,381 @@
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from collections import Counter as CallCounter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# トレースの出力先: 空（出力しない）・json（TRACE_FILE に1行1トレースで追記）・otlp（OTLP/HTTP の JSON で送信）
+TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', '').lower()
+TRACE_FILE = os.getenv('TRACE_FILE', 'data/traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'multi-cloud-info-agent')
+# 1トレースに記録するスパン数の上限（超えた分は数のみ数える）
+TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 1000))
+# 出力待ちのトレース数の上限（出力が追いつかない場合は破棄する）
+_EXPORT_QUEUE_SIZE = 1000
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """
+    トレース内の1つの処理（開始・終了時刻と属性）
+    """
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace: 'Trace', name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        """
+        スパンを終了する（2回目以降の呼び出しは無視する）
+        """
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class Trace:
+    """
+    1つのリクエストのスパンと、クラウド API の呼び出し回数・再試行回数
+    """
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.api_calls: CallCounter = CallCounter()
+        self.api_retries = 0
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None, attributes or {})
+
+    def start_span(self, name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Optional[Span]:
+        with self._lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return None
+            span = Span(self, name, parent.span_id if parent else None, attributes)
+            self.spans.append(span)
+            return span
+
+    def record_api_call(self, provider: str, service: str, operation: str, retries: int = 0):
+        """
+        クラウド API の呼び出しを数える（同じ呼び出しが何度も行われる N+1 の発見用）
+        """
+        with self._lock:
+            self.api_calls[f"{provider}.{service}.{operation}"] += 1
+            self.api_retries += retries
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'api_calls': sum(self.api_calls.values()),
+            'api_retries': self.api_retries,
+            'calls': dict(self.api_calls.most_common()),
+            'spans': len(self.spans),
+            'dropped_spans': self.dropped
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """
+    現在のスパンの子としてスパンを開始する（トレース外では None）。終了は呼び出し側で finish() する
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    return trace.start_span(name, _current_span.get() or trace.root, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    with ブロックの処理をスパンとして記録し、ブロック内で開始したスパンの親とする（トレース外では何もしない）
+    """
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """
+    トレースを開始し、終了時に設定した出力先へ送る
+    """
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.finish(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        finish_trace(trace)
+
+
+def finish_trace(trace: Trace):
+    trace.root.finish()
+    trace.root.set(**{f"api.{key}": value for key, value in trace.summary().items()
+                      if key in ('api_calls', 'api_retries')})
+    exporter = get_exporter()
+    if exporter is not None:
+        exporter.submit(trace)
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    fn を呼び出し時点のトレース・スパンの中で実行する関数にする（スレッドプールへ渡す処理用）
+    """
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # 同じ Context は同時に複数のスレッドで実行できないため、呼び出しごとに複製する
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, dict):
+        return {'stringValue': json.dumps(value, ensure_ascii=False)}
+    return {'stringValue': str(value)}
+
+
+def _span_kind(trace: Trace, item: Span) -> int:
+    if item is trace.root:
+        return 2  # SERVER
+    if 'rpc.service' in item.attributes:
+        return 3  # CLIENT（クラウド API の呼び出し）
+    return 1  # INTERNAL
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """
+    トレースを OTLP/HTTP の JSON 形式（ExportTraceServiceRequest）にする
+    """
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            record = {
+                'traceId': trace.trace_id,
+                'spanId': item.span_id,
+                'name': item.name,
+                'kind': _span_kind(trace, item),
+                'startTimeUnixNano': str(item.start_ns),
+                'endTimeUnixNano': str(item.end_ns or item.start_ns),
+                'attributes': [{'key': key, 'value': _otlp_value(value)}
+                               for key, value in item.attributes.items() if value is not None],
+                'status': {'code': 2, 'message': item.error} if item.error else {'code': 1}
+            }
+            if item.parent_id:
+                record['parentSpanId'] = item.parent_id
+            spans.append(record)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': TRACE_SERVICE_NAME}}]},
+        'scopeSpans': [{'scope': {'name': 'app.utils.tracing'}, 'spans': spans}]
+    }]}
+
+
+class TraceExporter:
+    """
+    終了したトレースをバックグラウンドのスレッドで出力する（リクエストのスレッドでは I/O を行わない）
+    """
+
+    def __init__(self, write: Callable[[List[Trace]], None], batch_size: int = 50):
+        self.write = write
+        self.batch_size = batch_size
+        self._queue: 'queue.Queue[Trace]' = queue.Queue(maxsize=_EXPORT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            logger.warning("トレースの出力が追いつかないため破棄しました")
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                    self._thread.start()
+
+    def flush(self, timeout: float = 5.0):
+        """
+        出力待ちのトレースをすべて出力し終えるまで待つ（テスト・終了処理用）
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                logger.warning(f"トレースの出力に失敗: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def write_json_file(path: str) -> Callable[[List[Trace]], None]:
+    """
+    トレースを OTLP の JSON 形式で1行1トレースずつファイルに追記する（コレクターの代わり）
+    """
+    def write(traces: List[Trace]):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for trace in traces:
+                f.write(json.dumps(to_otlp([trace]), ensure_ascii=False) + '\n')
+    return write
+
+
+def send_otlp(endpoint: str, timeout: float = 5.0) -> Callable[[List[Trace]], None]:
+    """
+    トレースを OTLP/HTTP（JSON）でコレクターへ送る
+    """
+    def write(traces: List[Trace]):
+        request = urllib.request.Request(endpoint, data=json.dumps(to_otlp(traces)).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    return write
+
+
+_exporter: Optional[TraceExporter] = None
+_exporter_config: Optional[Tuple[str, str]] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[TraceExporter]:
+    """
+    設定に応じたトレースの出力先（TRACE_EXPORTER が未設定の場合は None）
+    """
+    global _exporter, _exporter_config
+    kind = os.getenv('TRACE_EXPORTER', TRACE_EXPORTER).lower()
+    if kind not in ('json', 'otlp'):
+        return None
+    target = os.getenv('TRACE_FILE', TRACE_FILE) if kind == 'json' \
+        else os.getenv('TRACE_OTLP_ENDPOINT', TRACE_OTLP_ENDPOINT)
+    with _exporter_lock:
+        if _exporter is None or _exporter_config != (kind, target):
+            _exporter = TraceExporter(write_json_file(target) if kind == 'json' else send_otlp(target))
+            _exporter_config = (kind, target)
+        return _exporter
+
+
+def init_tracing(app):
+    """
+    /api へのリクエストごとにトレースを開始し、デバッグ時はクラウド API の呼び出し回数をヘッダーに付ける
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_trace():
+        if not request.path.startswith('/api'):
+            return
+        trace = Trace('http.request', {'http.method': request.method, 'http.path': request.path})
+        g._trace = trace
+        g._trace_tokens = (_current_trace.set(trace), _current_span.set(trace.root))
+
+    @app.after_request
+    def _trace_headers(response):
+        trace = g.get('_trace')
+        if trace is None:
+            return response
+        trace.root.set(**{'http.route': request.url_rule.rule if request.url_rule is not None else None,
+                          'http.status_code': response.status_code})
+        if app.config.get('DEBUG', False):
+            summary = trace.summary()
+            response.headers['X-Trace-Id'] = trace.trace_id
+            response.headers['X-Cloud-API-Calls'] = str(summary['api_calls'])
+            response.headers['X-Cloud-API-Retries'] = str(summary['api_retries'])
+            if summary['calls']:
+                response.headers['X-Cloud-API-Calls-Detail'] = ', '.join(
+                    f"{name}={count}" for name, count in summary['calls'].items())
+        return response
+
+    @app.teardown_request
+    def _finish_trace(exc):
+        trace = g.pop('_trace', None)
+        tokens = g.pop('_trace_tokens', None)
+        if trace is None:
+            return
+        if tokens is not None:
+            try:
+                _current_span.reset(tokens[1])
+                _current_trace.reset(tokens[0])
+            except ValueError:
+                # ストリーミング応答で別のコンテキストから終了した場合
+                pass
+        trace.root.finish(exc)
+        finish_trace(trace)
@@ -0,0 +1,56 @@
+"""
+列指向インベントリの集計ベンチマーク
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_aggregate [件数]
+"""
+import sys
+import time
+
+from app.models.resource import Resource
+from app.services.columnar_store import ColumnarInventory
+from app.services.inventory_cache import InventoryCache
+
+RESOURCE_COUNT = 100_000
+STATES = ['running', 'stopped', 'pending', 'terminated']
+TYPES = ['t3.micro', 't3.small', 'm5.large', 'c5.xlarge']
+REGIONS = ['ap-northeast-1', 'us-east-1', 'eu-west-1']
+QUERIES = [
+    ('件数（状態別）', dict(group_by=['status'])),
+    ('件数（リージョン×タイプ別）', dict(group_by=['region', 'type'])),
+    ('稼働中のみ・経過日数の集計', dict(group_by=['region'], filters={'status': ['running']},
+                                       metrics=['age_days'])),
+    ('全列でグループ化', dict(group_by=['provider', 'service', 'region', 'type', 'status'],
+                              metrics=['created_at'])),
+]
+
+
+def build_cache(count: int) -> InventoryCache:
+    cache = InventoryCache(ttl=3600)
+    cache.put('aws', 'ec2', [Resource(
+        id=f"i-{i:017x}", name=f"web-{i}", type=TYPES[i % len(TYPES)], provider='aws',
+        service='ec2', region=REGIONS[i % len(REGIONS)], status=STATES[i % len(STATES)],
+        created_at=1704067200 + i * 60
+    ) for i in range(count)])
+    return cache
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RESOURCE_COUNT
+    inventory = ColumnarInventory(build_cache(count))
+
+    started = time.perf_counter()
+    inventory.table()
+    print(f"リソース件数: {count}（列変換 {(time.perf_counter() - started) * 1000:.1f} ms）")
+
+    for label, query in QUERIES:
+        best = float('inf')
+        for _ in range(20):
+            started = time.perf_counter()
+            inventory.aggregate(**query)
+            best = min(best, time.perf_counter() - started)
+        print(f"{label:<24} {best * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
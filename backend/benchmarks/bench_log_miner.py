@@ -0,0 +1,59 @@
+"""
+ログのテンプレート分類のベンチマーク
+
+合成したエラーログを LogTemplateMiner で分類し、1秒あたりの処理行数と
+まとめたテンプレート数を計測する（目標: 10 万行/秒以上）
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_log_miner [行数]
+"""
+import random
+import sys
+import time
+
+from app.services.log_miner import LogTemplateMiner
+
+LINE_COUNTS = [10_000, 100_000, 1_000_000]
+
+TEMPLATES = [
+    "ERROR Connection to 10.0.{a}.{b}:5432 timed out after {ms}ms",
+    "ERROR Failed to process request {uuid} for user u-{n}: upstream returned 503",
+    "ERROR Disk usage on /dev/xvda{a} is {pct}% (threshold 90%)",
+    "WARN Retrying job job-{n} (attempt {a} of 5)",
+    "ERROR OutOfMemoryError in worker-{a} heap={n}MB",
+    "ERROR Instance i-{hex} failed status check",
+    "ERROR Lambda function order-handler exceeded timeout of {a} seconds",
+    "CRITICAL Replication lag on db-{a} is {n} seconds",
+]
+
+
+def make_lines(count: int):
+    rng = random.Random(0)
+    lines = []
+    for i in range(count):
+        template = TEMPLATES[rng.randrange(len(TEMPLATES))]
+        lines.append(template.format(a=rng.randrange(256), b=rng.randrange(256), ms=rng.randrange(10_000),
+                                     uuid=f"{rng.getrandbits(64):016x}", n=rng.randrange(100_000),
+                                     pct=rng.randrange(90, 100), hex=f"{rng.getrandbits(64):017x}"))
+    return lines
+
+
+def measure(count: int):
+    lines = make_lines(count)
+    miner = LogTemplateMiner()
+    started = time.perf_counter()
+    for i, line in enumerate(lines):
+        miner.add(line, i)
+    elapsed = time.perf_counter() - started
+    print(f"{count:>10,} 行  {elapsed * 1000:8.1f} ms  {count / elapsed:>12,.0f} 行/秒  "
+          f"テンプレート {len(miner.clusters())} 種類")
+
+
+def main():
+    counts = [int(sys.argv[1])] if len(sys.argv) > 1 else LINE_COUNTS
+    for count in counts:
+        measure(count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+メトリクス記録のオーバーヘッドのベンチマーク
+
+チャット1件あたりに記録する程度の計測（HTTP リクエスト・処理段階・クラウド取得・LLM・
+キャッシュ参照）を繰り返し、1リクエストあたりの記録時間と /metrics の出力時間を計測する
+（目標: 1リクエストあたり 0.1 ms 未満）
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_metrics [リクエスト数]
+"""
+import sys
+import time
+
+from app.utils.metrics import (
+    CHAT_STAGE_SECONDS, CLOUD_API_CALLS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT,
+    LLM_REQUEST_SECONDS, LLM_REQUESTS_IN_FLIGHT, REGISTRY, record_cache, track_cloud_fetch
+)
+
+REQUEST_COUNTS = [10_000, 100_000]
+INTENTS = ['resource_list', 'log_query', 'general_question']
+
+
+def record_request(i: int):
+    intent = INTENTS[i % len(INTENTS)]
+    with HTTP_REQUESTS_IN_FLIGHT.track():
+        CHAT_STAGE_SECONDS.labels('intent', intent).observe(0.002)
+        record_cache('inventory', i % 4 != 0)
+        with track_cloud_fetch('aws', 'ec2', 'resources'):
+            CLOUD_API_CALLS.labels('aws', 'ec2', 'DescribeInstances').inc()
+        with LLM_REQUESTS_IN_FLIGHT.track(backend='ollama-1'):
+            LLM_REQUEST_SECONDS.labels('ollama-1', 'success').observe(1.5)
+        CHAT_STAGE_SECONDS.labels('handler', intent).observe(1.6)
+        CHAT_STAGE_SECONDS.labels('total', intent).observe(1.6)
+    HTTP_REQUEST_SECONDS.labels('/api/chat', 'POST', '200').observe(1.6)
+
+
+def measure(count: int):
+    REGISTRY.clear()
+    started = time.perf_counter()
+    for i in range(count):
+        record_request(i)
+    elapsed = time.perf_counter() - started
+
+    render_started = time.perf_counter()
+    text = REGISTRY.render()
+    render_elapsed = time.perf_counter() - render_started
+    print(f"{count:>10,} リクエスト  {elapsed * 1000:8.1f} ms  "
+          f"1リクエストあたり {elapsed / count * 1e6:6.1f} µs  "
+          f"/metrics 出力 {render_elapsed * 1000:.2f} ms ({len(text):,} バイト)")
+
+
+def main():
+    counts = [int(sys.argv[1])] if len(sys.argv) > 1 else REQUEST_COUNTS
+    for count in counts:
+        measure(count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+リソース表現ごとのメモリ使用量ベンチマーク（辞書 vs Resource）
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_resource_memory [件数]
+"""
+import sys
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from app.models.resource import Resource
+
+RESOURCE_COUNT = 100_000
+STATES = ['running', 'stopped', 'pending', 'terminated']
+TYPES = ['t3.micro', 't3.small', 'm5.large', 'c5.xlarge']
+REGIONS = ['ap-northeast-1', 'us-east-1', 'eu-west-1']
+
+
+def raw_instances(count: int):
+    """
+    describe_instances の結果を模したレコード（文字列は API 応答ごとに別オブジェクト）
+    """
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        yield {
+            'InstanceId': f"i-{i:017x}",
+            'InstanceType': ''.join(TYPES[i % len(TYPES)]),
+            'State': {'Name': ''.join(STATES[i % len(STATES)])},
+            'Region': ''.join(REGIONS[i % len(REGIONS)]),
+            'LaunchTime': base + timedelta(minutes=i),
+            'Tags': [{'Key': 'Name', 'Value': f"web-{i}"}],
+        }
+
+
+def as_dict(raw) -> dict:
+    return {
+        'id': raw['InstanceId'],
+        'name': raw['Tags'][0]['Value'],
+        'type': raw['InstanceType'],
+        'state': raw['State']['Name'],
+        'region': raw['Region'],
+        'launch_time': raw['LaunchTime'].isoformat(),
+        'public_ip': 'N/A',
+        'private_ip': 'N/A',
+        'tags': {tag['Key']: tag['Value'] for tag in raw['Tags']}
+    }
+
+
+def as_resource(raw) -> Resource:
+    return Resource(
+        id=raw['InstanceId'],
+        name=raw['Tags'][0]['Value'],
+        type=raw['InstanceType'],
+        provider='aws',
+        service='ec2',
+        region=raw['Region'],
+        status=raw['State']['Name'],
+        created_at=int(raw['LaunchTime'].timestamp()),
+        tags={tag['Key']: tag['Value'] for tag in raw['Tags']}
+    )
+
+
+def measure(label: str, build, count: int) -> int:
+    tracemalloc.start()
+    records = [build(raw) for raw in raw_instances(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {current / 1024 / 1024:8.1f} MiB  ({current / len(records):6.0f} bytes/件)")
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RESOURCE_COUNT
+    print(f"リソース件数: {count}")
+    dict_bytes = measure('dict', as_dict, count)
+    resource_bytes = measure('Resource', as_resource, count)
+    print(f"削減率: {dict_bytes / resource_bytes:.1f} 倍")
+
+
+if __name__ == '__main__':
+    main()
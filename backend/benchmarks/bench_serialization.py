@@ -0,0 +1,80 @@
+"""
+大規模なインベントリ応答のシリアライズ・圧縮ベンチマーク
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_serialization [件数]
+"""
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.utils import compression
+
+RESOURCE_COUNT = 50_000
+STATES = ['running', 'stopped', 'pending', 'terminated']
+TYPES = ['t3.micro', 't3.small', 'm5.large', 'c5.xlarge']
+REGIONS = ['ap-northeast-1', 'us-east-1', 'eu-west-1']
+
+
+def build_payload(count: int) -> dict:
+    """
+    EC2 の取得結果を模したリソース一覧を生成する
+    """
+    base = datetime(2024, 1, 1)
+    resources = [{
+        'id': f"i-{i:017x}",
+        'name': f"web-server-{i}",
+        'type': TYPES[i % len(TYPES)],
+        'state': STATES[i % len(STATES)],
+        'region': REGIONS[i % len(REGIONS)],
+        'launch_time': (base + timedelta(minutes=i)).isoformat(),
+        'tags': {'Name': f"web-server-{i}", 'Env': 'prod' if i % 2 else 'dev'}
+    } for i in range(count)]
+    return {'resources': resources, 'count': count, 'provider': 'aws', 'service': 'ec2'}
+
+
+def measure(label: str, fn, repeat: int = 5):
+    """
+    最良値（ミリ秒）を表示して最後の結果を返す
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<32} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RESOURCE_COUNT
+    payload = build_payload(count)
+    app = create_app()
+
+    print(f"リソース件数: {count}")
+    stdlib = measure('json.dumps (Flask 標準相当)', lambda: json.dumps(
+        payload, ensure_ascii=True, sort_keys=True).encode())
+    fast = measure('FastJSONProvider', lambda: app.json.dumps(payload).encode())
+
+    with app.test_request_context('/api/resources/aws'):
+        measure('jsonify 全体', lambda: app.json.response(payload).get_data())
+
+    print(f"{'サイズ: 標準 / 高速':<32} {len(stdlib):,} / {len(fast):,} bytes")
+    gzipped = measure(f"gzip (level {compression.GZIP_LEVEL})", lambda: gzip.compress(
+        fast, compresslevel=compression.GZIP_LEVEL))
+    print(f"{'gzip 圧縮後':<32} {len(gzipped):,} bytes")
+    if compression.BROTLI_AVAILABLE:
+        brotli_data = measure(f"brotli (quality {compression.BROTLI_QUALITY})",
+                              lambda: compression.brotli.compress(
+                                  fast, quality=compression.BROTLI_QUALITY))
+        print(f"{'brotli 圧縮後':<32} {len(brotli_data):,} bytes")
+    else:
+        print('brotli はインストールされていないためスキップ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+インベントリスナップショットからの起動（ウォームスタート）ベンチマーク
+
+スナップショットの書き出し時間・ファイルサイズと、起動直後に復元して
+最初の件数の質問（列指向の集計）と一覧表示に答えるまでの時間を計測する
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_snapshot [件数]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from app.models.resource import Resource
+from app.services.columnar_store import ColumnarInventory
+from app.services.inventory_cache import InventoryCache
+from app.services.inventory_snapshot import restore_snapshot, save_snapshot
+
+RESOURCE_COUNTS = [10_000, 100_000, 500_000]
+STATES = ['running', 'stopped', 'pending', 'terminated']
+TYPES = ['t3.micro', 't3.small', 'm5.large', 'c5.xlarge']
+REGIONS = ['ap-northeast-1', 'us-east-1', 'eu-west-1']
+
+
+def build_cache(count: int) -> InventoryCache:
+    cache = InventoryCache(ttl=3600)
+    cache.put('aws', 'ec2', [Resource(
+        id=f"i-{i:017x}", name=f"web-{i}", type=TYPES[i % len(TYPES)], provider='aws',
+        service='ec2', region=REGIONS[i % len(REGIONS)], status=STATES[i % len(STATES)],
+        created_at=1704067200 + i * 60, tags={'Name': f"web-{i}", 'Env': 'prod'},
+        metadata={'private_ip': f"10.0.{i // 256 % 256}.{i % 256}"}
+    ) for i in range(count)])
+    return cache
+
+
+def measure(count: int, directory: str):
+    path = os.path.join(directory, f"inventory-{count}.snapshot")
+    cache = build_cache(count)
+    started = time.perf_counter()
+    save_snapshot(cache, path)
+    save_ms = (time.perf_counter() - started) * 1000
+
+    # 起動直後を想定し、空のキャッシュに復元して最初の回答を得るまで
+    started = time.perf_counter()
+    restored = InventoryCache(ttl=3600)
+    restore_snapshot(restored, path)
+    restore_ms = (time.perf_counter() - started) * 1000
+    ColumnarInventory(restored).aggregate(group_by=['status'], filters={'service': ['ec2']})
+    count_ms = (time.perf_counter() - started) * 1000
+    first_ten = restored.peek('aws', 'ec2').records[:10]
+    assert len(first_ten) == 10
+    list_ms = (time.perf_counter() - started) * 1000
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"{count:>9,} 件  書き出し {save_ms:8.1f} ms  {size_mb:6.1f} MiB  "
+          f"復元 {restore_ms:6.2f} ms  件数の回答まで {count_ms:7.1f} ms  一覧の回答まで {list_ms:7.1f} ms")
+
+
+def main():
+    counts = [int(sys.argv[1])] if len(sys.argv) > 1 else RESOURCE_COUNTS
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            measure(count, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+起動時間（create_app() まで）とモジュールの読み込み時間のベンチマーク
+
+新しいプロセスで python -X importtime を使って create_app() を実行し、読み込みに時間のかかる
+モジュールを累積時間の長い順に表示する。boto3・Azure SDK・ollama・openai・pyarrow は
+最初に使う時点で読み込むため、起動時には現れない
+（目標: 1 秒未満。tests/backend/test_startup.py では STARTUP_BUDGET_SECONDS（既定 5 秒）以内であることを確認する）
+
+実行方法（backend ディレクトリで）:
+    python -m benchmarks.bench_startup [表示するモジュール数] [繰り返し回数]
+"""
+import statistics
+import sys
+
+from app.utils.import_profile import measure_startup
+
+MODULE_COUNT = 25
+REPEAT = 3
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MODULE_COUNT
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    reports = [measure_startup() for _ in range(repeat)]
+    fastest = min(reports, key=lambda report: report.elapsed)
+    print(fastest.format(count))
+    print(f"\n{repeat} 回の中央値: {statistics.median(r.elapsed for r in reports) * 1000:.1f} ms  "
+          f"最小: {fastest.elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,15 @@ import pytest
 import os
 from unittest.mock import Mock, patch
 from app import create_app
+from app.models.resource import Resource
+
+
+def make_resource(i, status='running', provider='aws', service='ec2', region='us-east-1', **fields):
+    """テスト用のリソース（fields で他の項目を指定する）"""
+    values = dict(id=f'i-{i}', name=f'web-{i}', type='t3.micro', provider=provider, service=service,
+                  region=region, status=status, created_at=1704067200 + i)
+    values.update(fields)
+    return Resource(**values)
 
 
 @pytest.fixture
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from app import create_app
+from app.services.inventory_cache import get_inventory_cache
 
 
 class TestAPIRoutes:
@@ -12,6 +13,7 @@ class TestAPIRoutes:
         self.app.config['TESTING'] = True
         self.app.config['DEBUG'] = False  # デバッグモードを無効にする
         self.client = self.app.test_client()
+        get_inventory_cache().clear()
 
     def test_health_endpoint(self):
         """ヘルスチェックエンドポイントのテスト"""
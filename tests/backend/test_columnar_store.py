@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.chat_service import ChatService
+from app.services.columnar_store import ColumnarInventory, StatsQueryError
+from app.services.inventory_cache import InventoryCache, get_inventory_cache
+from tests.backend.conftest import make_resource
+
+
+class TestColumnarInventory:
+    """ColumnarInventory のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.cache = InventoryCache(ttl=300)
+        self.cache.put('aws', 'ec2', [
+            make_resource(0), make_resource(1),
+            make_resource(2, status='stopped', region='ap-northeast-1')
+        ])
+        self.cache.put('azure', 'vm', [
+            make_resource(3, provider='azure', service='vm', status='Succeeded', region='japaneast')
+        ])
+        self.inventory = ColumnarInventory(self.cache)
+
+    def test_group_by_counts(self):
+        """複数列でのグループ化件数のテスト"""
+        result = self.inventory.aggregate(group_by=['provider', 'status'])
+
+        assert result['total'] == 4
+        assert result['groups'][0] == {'provider': 'aws', 'status': 'running', 'count': 2}
+        assert {'provider': 'azure', 'status': 'Succeeded', 'count': 1} in result['groups']
+
+    def test_filters_are_case_insensitive(self):
+        """絞り込み条件が大文字小文字を区別しないことのテスト"""
+        result = self.inventory.aggregate(filters={'status': ['succeeded', 'stopped']})
+
+        assert result['total'] == 2
+
+    def test_numeric_aggregates(self):
+        """数値列の集計値のテスト"""
+        result = self.inventory.aggregate(
+            group_by=['provider'], filters={'provider': ['aws']}, metrics=['created_at'])
+
+        stats = result['groups'][0]['created_at']
+        assert stats['min'] == 1704067200
+        assert stats['max'] == 1704067200 + 2
+        assert stats['mean'] == 1704067200 + 1
+
+    def test_rebuilds_when_slice_changes(self):
+        """キャッシュのスライスが更新された場合に列が再構築されることのテスト"""
+        first = self.inventory.table()
+        assert self.inventory.table() is first
+
+        self.cache.put('aws', 'ec2', [make_resource(10)])
+
+        assert self.inventory.aggregate()['total'] == 2
+
+    def test_rejects_unknown_column(self):
+        """未対応の列を指定した場合のテスト"""
+        with pytest.raises(StatsQueryError):
+            self.inventory.aggregate(group_by=['name'])
+
+
+class TestResourceStatsAPI:
+    """リソース集計 API のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_stats(self, mock_mcp_service):
+        """指定サービスの状態別件数を返すことのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = [
+            make_resource(0), make_resource(1, status='stopped'), make_resource(2)
+        ]
+
+        response = self.client.get('/api/resources/stats?provider=aws&service=ec2&group_by=status')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total'] == 3
+        assert data['groups'][0] == {'status': 'running', 'count': 2}
+        mock_mcp_service.return_value.get_aws_resources.assert_called_once_with('ec2')
+
+    def test_invalid_group_by(self):
+        """未対応の列を指定した場合に 400 を返すことのテスト"""
+        get_inventory_cache().put('aws', 'ec2', [make_resource(0)])
+
+        response = self.client.get('/api/resources/stats?provider=aws&service=ec2&group_by=name')
+
+        assert response.status_code == 400
+
+
+class TestCountQuestions:
+    """件数の質問のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.chat_service = ChatService()
+        self.chat_service.llm_service = Mock()
+        self.chat_service.mcp_service = Mock()
+        self.chat_service.mcp_service.get_aws_resources.return_value = [
+            {'name': 'web-1', 'state': 'running'},
+            {'name': 'web-2', 'state': 'running'},
+            {'name': 'batch-1', 'state': 'stopped'}
+        ]
+        self.chat_service.mcp_service.get_azure_resources.return_value = []
+
+    def test_count_by_state(self):
+        """件数の質問に状態別の内訳で回答し、LLM を使わないことのテスト"""
+        result = self.chat_service.process_message("EC2は何台ありますか？")
+
+        assert "合計 3 件" in result
+        assert "running: 2" in result and "stopped: 1" in result
+        self.chat_service.llm_service.generate_response.assert_not_called()
+
+    def test_anomaly_count_is_not_resource_count(self):
+        """異常の件数の質問は件数の集計ではなくメトリクスの異常の処理に回すことのテスト"""
+        self.chat_service._handle_metric_query = Mock(return_value='異常なし')
+
+        result = self.chat_service.process_message("異常なインスタンスはいくつ？")
+
+        assert result == '異常なし'
+        self.chat_service.mcp_service.get_aws_resources.assert_not_called()
+
+    def test_error_log_count_is_not_resource_count(self):
+        """エラーログの件数の質問は件数の集計ではなくログの処理に回すことのテスト"""
+        self.chat_service._handle_log_query = Mock(return_value='ログ')
+
+        result = self.chat_service.process_message("EC2のエラーログは何件？")
+
+        assert result == 'ログ'
+        assert self.chat_service._handle_log_query.call_args[0][0]['parameters'] == {'level': 'ERROR'}
+        self.chat_service.mcp_service.get_aws_resources.assert_not_called()
+
+    def test_count_with_state_filter(self):
+        """状態の条件付きの件数の質問のテスト"""
+        result = self.chat_service.process_message("停止中のEC2インスタンスはいくつ？")
+
+        assert "条件に一致するリソースは合計 1 件" in result
@@ -0,0 +1,149 @@
+import pytest
+from unittest.mock import patch
+from app import create_app
+from app.services import inventory_cache as inventory_cache_module
+from app.services.inventory_cache import InventoryCache, get_inventory_cache
+from tests.backend.conftest import make_resource
+
+
+class TestInventoryVersions:
+    """インベントリキャッシュの版番号のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.cache = InventoryCache(ttl=300)
+
+    def test_same_content_keeps_version(self):
+        """内容が同じであれば再取得しても版と ETag が変わらないことのテスト"""
+        first = self.cache.put('aws', 'ec2', [make_resource(0), make_resource(1)])
+        second = self.cache.put('aws', 'ec2', [make_resource(0), make_resource(1)])
+
+        assert second.version == first.version
+        assert second.digest == first.digest
+        assert second.modified_at == first.modified_at
+
+    def test_changes_since(self):
+        """変わったリソースと削除されたリソースだけが差分として返ることのテスト"""
+        first = self.cache.put('aws', 'ec2', [make_resource(0), make_resource(1), make_resource(2)])
+        second = self.cache.put('aws', 'ec2', [make_resource(0), make_resource(1, 'stopped'), make_resource(3)])
+
+        assert second.version > first.version
+        assert second.digest != first.digest
+        changed, removed = second.changes_since(first.version)
+        assert [r.id for r in changed] == ['i-1', 'i-3']
+        assert removed == ['i-2']
+        assert second.changes_since(second.version) == ([], [])
+
+    def test_unknown_version_requires_full_fetch(self):
+        """保持範囲外の版を指定した場合は差分を返さないことのテスト"""
+        first = self.cache.put('aws', 'ec2', [make_resource(0)])
+
+        assert first.changes_since(first.version - 1) is None
+        assert first.changes_since(first.version + 1) is None
+
+    def test_tombstones_are_bounded(self, monkeypatch):
+        """トゥームストーンが上限を超えた場合、古い版からの差分は返さないことのテスト"""
+        monkeypatch.setattr(inventory_cache_module, 'TOMBSTONE_LIMIT', 1)
+        first = self.cache.put('aws', 'ec2', [make_resource(i) for i in range(3)])
+        second = self.cache.put('aws', 'ec2', [make_resource(0), make_resource(1)])
+        third = self.cache.put('aws', 'ec2', [make_resource(0)])
+
+        assert len(third.removed) == 1
+        assert third.changes_since(first.version) is None
+        assert third.changes_since(second.version) == ([], ['i-1'])
+
+
+class TestConditionalGetAPI:
+    """ETag による条件付き GET のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_if_none_match_returns_304(self, mock_mcp_service):
+        """If-None-Match が一致する場合は本文なしの 304 を返すことのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = [make_resource(0)]
+
+        first = self.client.get('/api/resources/aws?type=ec2')
+        etag = first.headers['ETag']
+        second = self.client.get('/api/resources/aws?type=ec2', headers={'If-None-Match': etag})
+
+        assert first.status_code == 200
+        assert etag.startswith('W/')
+        assert first.headers['Last-Modified']
+        assert first.get_json()['version'] == get_inventory_cache().peek('aws', 'ec2').version
+        assert second.status_code == 304
+        assert second.get_data() == b''
+        assert second.headers['ETag'] == etag
+        mock_mcp_service.return_value.get_aws_resources.assert_called_once_with('ec2')
+
+    @patch('app.routes.api.MCPService')
+    def test_changed_content_returns_200(self, mock_mcp_service):
+        """内容が変わった場合は新しい ETag で本文を返すことのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = [make_resource(0)]
+        etag = self.client.get('/api/resources/aws?type=ec2').headers['ETag']
+
+        get_inventory_cache().put('aws', 'ec2', [make_resource(0, 'stopped')])
+        response = self.client.get('/api/resources/aws?type=ec2', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    @patch('app.routes.api.MCPService')
+    def test_delta_mode(self, mock_mcp_service):
+        """since_version を指定すると変わったリソースと削除された ID のみ返すことのテスト"""
+        first = get_inventory_cache().put('aws', 'ec2', [make_resource(0), make_resource(1)])
+        get_inventory_cache().put('aws', 'ec2', [make_resource(0), make_resource(2)])
+
+        data = self.client.get(f'/api/resources/aws?type=ec2&since_version={first.version}').get_json()
+
+        assert data['delta'] is True
+        assert [r['id'] for r in data['resources']] == ['i-2']
+        assert data['removed'] == ['i-1']
+
+        data = self.client.get('/api/resources/aws?type=ec2&since_version=1').get_json()
+        assert data['delta'] is False
+        assert data['count'] == 2
+
+    @patch('app.routes.api.MCPService')
+    def test_delta_with_filter_reports_unmatched_as_removed(self, mock_mcp_service):
+        """条件に一致しなくなったリソースは削除として返すことのテスト"""
+        first = get_inventory_cache().put('aws', 'ec2', [make_resource(0), make_resource(1)])
+        get_inventory_cache().put('aws', 'ec2', [make_resource(0), make_resource(1, 'stopped')])
+
+        data = self.client.get(
+            f'/api/resources/aws?type=ec2&status=running&since_version={first.version}').get_json()
+
+        assert data['resources'] == []
+        assert data['removed'] == ['i-1']
+
+    def test_invalid_since_version(self):
+        """不正な since_version は 400 になることのテスト"""
+        response = self.client.get('/api/resources/aws?since_version=abc')
+
+        assert response.status_code == 400
+
+    @patch('app.routes.api.MCPService')
+    def test_logs_etag(self, mock_mcp_service):
+        """ログは本文のハッシュを ETag とし、一致すれば 304 を返すことのテスト"""
+        mock_mcp_service.return_value.get_logs.return_value = [{'timestamp': 1, 'message': 'started'}]
+
+        etag = self.client.get('/api/logs?provider=aws').headers['ETag']
+        response = self.client.get('/api/logs?provider=aws', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+    @patch('app.routes.api.MCPService')
+    def test_stats_etag(self, mock_mcp_service):
+        """集計 API も ETag が一致すれば 304 を返すことのテスト"""
+        get_inventory_cache().put('aws', 'ec2', [make_resource(0)])
+
+        etag = self.client.get('/api/resources/stats?provider=aws&service=ec2').headers['ETag']
+        response = self.client.get('/api/resources/stats?provider=aws&service=ec2',
+                                   headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
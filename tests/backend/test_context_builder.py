@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import Mock
+from app.services.chat_service import ChatService
+from app.services.context_builder import (
+    detect_services, detect_states, select_relevant_resources, pack_resources
+)
+from app.services.inventory_cache import InventoryCache, get_inventory_cache
+from app.utils.tokens import estimate_tokens
+
+
+class TestContextBuilder:
+    """インベントリコンテキスト構築のテストクラス"""
+
+    def test_estimate_tokens(self):
+        """トークン数概算のテスト"""
+        assert estimate_tokens('') == 0
+        assert estimate_tokens('abcdefgh') == 2
+        assert estimate_tokens('停止中') == 3
+
+    def test_detect_services_and_states(self):
+        """質問文からサービスと状態を推定するテスト"""
+        assert detect_services("停止中のインスタンスはある？") == [('aws', 'ec2'), ('azure', 'vm')]
+        assert detect_services("AWSのインスタンス") == [('aws', 'ec2')]
+        assert 'stopped' in detect_states("停止中のインスタンスはある？")
+        assert detect_states("料金について") is None
+
+    def test_select_relevant_resources_by_state(self):
+        """状態による絞り込みのテスト（プロバイダーごとのキー名の違いを吸収）"""
+        entries = [
+            ('aws', 'ec2', {'name': 'web-1', 'state': 'running'}),
+            ('aws', 'ec2', {'name': 'batch-1', 'state': 'stopped'}),
+            ('azure', 'vm', {'name': 'vm-1', 'status': 'deallocated'}),
+        ]
+
+        result = select_relevant_resources("停止中のインスタンスはある？", entries)
+
+        assert [e[2]['name'] for e in result] == ['batch-1', 'vm-1']
+
+    def test_pack_resources_respects_budget(self):
+        """トークン予算を超えない範囲で表に詰めることのテスト"""
+        entries = [('aws', 'ec2', {'name': f'instance-{i}', 'state': 'running',
+                                   'type': 't3.micro', 'region': 'us-east-1'})
+                   for i in range(1000)]
+
+        context = pack_resources(entries, token_budget=200)
+
+        assert estimate_tokens(context) < 260
+        assert context.splitlines()[0] == 'provider\tservice\tname\tstate\ttype\tregion'
+        assert 'aws\tec2\tinstance-0\trunning\tt3.micro\tus-east-1' in context
+        assert '全 1000 件' in context
+
+
+class TestInventoryCache:
+    """InventoryCache のテストクラス"""
+
+    def test_get_uses_cache(self):
+        """TTL 内は再取得しないことのテスト"""
+        cache = InventoryCache(ttl=60)
+        loader = Mock(return_value=[{'name': 'a'}])
+
+        cache.get('aws', 'ec2', loader)
+        result = cache.get('aws', 'ec2', loader)
+
+        assert result == [{'name': 'a'}]
+        loader.assert_called_once()
+
+    def test_get_refreshes_after_ttl(self):
+        """TTL 経過後は再取得することのテスト"""
+        cache = InventoryCache(ttl=0)
+        loader = Mock(return_value=[{'name': 'a'}])
+
+        cache.get('aws', 'ec2', loader)
+        cache.get('aws', 'ec2', loader)
+
+        assert loader.call_count == 2
+
+
+class TestInventoryGroundedAnswer:
+    """インベントリに基づく回答のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.chat_service = ChatService()
+        self.chat_service.llm_service = Mock()
+        self.chat_service.llm_service.generate_response.return_value = "batch-1 が停止中です"
+        self.chat_service.mcp_service = Mock()
+        self.chat_service.mcp_service.get_aws_resources.return_value = [
+            {'name': 'web-1', 'state': 'running', 'type': 't3.micro', 'region': 'us-east-1'},
+            {'name': 'batch-1', 'state': 'stopped', 'type': 'm5.large', 'region': 'us-east-1'}
+        ]
+        self.chat_service.mcp_service.get_azure_resources.return_value = []
+
+    def test_general_question_passes_inventory_context(self):
+        """一般的な質問にインベントリのコンテキストが渡されることのテスト"""
+        result = self.chat_service._handle_general_question("停止中のインスタンスはある？")
+
+        assert result == "batch-1 が停止中です"
+        context = self.chat_service.llm_service.generate_response.call_args.kwargs['context']
+        assert 'batch-1\tstopped' in context
+        assert 'web-1' not in context
@@ -0,0 +1,191 @@
+import threading
+import time
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from app.services import embedding_index
+from app.services.embedding_index import (
+    EmbeddingIndex, EmbeddingSyncWorker, HashingEmbedder, OllamaEmbedder, get_embedding_index, resource_text
+)
+from app.services.inventory_cache import InventoryCache
+from app.services.llm_router import LLMBackend, LLMRouter
+from app.services.llm_scheduler import LLMScheduler
+
+
+def resource_items(resources):
+    """リソースをインデックス登録用の項目に変換"""
+    return [(f"aws:ec2:{r['id']}", resource_text(r), r) for r in resources]
+
+
+class TestEmbeddingIndex:
+    """EmbeddingIndex のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.resources = [
+            {'id': 'i-1', 'name': 'payments-db', 'type': 'db.r5.large',
+             'tags': {'Service': 'payments'}},
+            {'id': 'i-2', 'name': 'prod-web-server', 'type': 't3.micro',
+             'tags': {'Environment': '本番', 'Role': 'ウェブサーバー'}},
+            {'id': 'i-3', 'name': 'batch-worker', 'type': 'm5.large', 'tags': {}},
+        ]
+
+    def test_hashing_embedder_is_deterministic(self):
+        """ハッシュ埋め込みが決定的かつ正規化されていることのテスト"""
+        embedder = HashingEmbedder(dim=64)
+
+        first = embedder.embed(['payments database'])
+        second = embedder.embed(['payments database'])
+
+        assert first.dtype == np.float32
+        assert np.array_equal(first, second)
+        assert np.isclose(np.linalg.norm(first[0]), 1.0)
+
+    def test_search_fuzzy_description(self):
+        """あいまいな説明から該当リソースを検索するテスト"""
+        index = EmbeddingIndex(HashingEmbedder())
+        index.upsert(resource_items(self.resources))
+
+        assert index.search('the payments database', k=1)[0][0] == 'aws:ec2:i-1'
+        assert index.search('本番のウェブサーバー', k=1)[0][0] == 'aws:ec2:i-2'
+
+    def test_search_batch(self):
+        """複数クエリの一括検索テスト"""
+        index = EmbeddingIndex(HashingEmbedder())
+        index.upsert(resource_items(self.resources))
+
+        results = index.search_batch(['payments', 'batch worker'], k=2)
+
+        assert len(results) == 2
+        assert results[1][0][0] == 'aws:ec2:i-3'
+
+    def test_incremental_sync(self):
+        """変更された項目のみ再埋め込みされることのテスト"""
+        embedder = Mock(wraps=HashingEmbedder())
+        index = EmbeddingIndex(embedder)
+        assert index.sync('aws:ec2:', resource_items(self.resources)) == 3
+
+        assert index.sync('aws:ec2:', resource_items(self.resources)) == 0
+
+        updated = self.resources[:2]
+        updated[0] = dict(updated[0], name='billing-db')
+        assert index.sync('aws:ec2:', resource_items(updated)) == 1
+        assert len(index) == 2
+        assert embedder.embed.call_count == 2
+
+    def test_memory_mapped_persistence(self, tmp_path):
+        """メモリマップしたインデックスが再読み込みできることのテスト"""
+        path = str(tmp_path / 'index.f32')
+        index = EmbeddingIndex(HashingEmbedder(), path=path, initial_capacity=2)
+        index.upsert(resource_items(self.resources))
+        index.flush()
+
+        reloaded = EmbeddingIndex(HashingEmbedder(), path=path)
+
+        assert len(reloaded) == 3
+        assert reloaded.upsert(resource_items(self.resources)) == 0
+        assert reloaded.search('payments', k=1)[0][0] == 'aws:ec2:i-1'
+
+    def test_ollama_embedder(self):
+        """Ollama 埋め込みが batch_size 件ずつまとめて embed API を呼ぶことのテスト"""
+        client = Mock()
+        client.embed.side_effect = lambda model, input: {'embeddings': [[3.0, 4.0]] * len(input)}
+        embedder = OllamaEmbedder(client, 'nomic-embed-text', batch_size=2)
+
+        vectors = embedder.embed(['payments', 'web', 'batch'])
+
+        assert np.allclose(vectors, [[0.6, 0.8]] * 3)
+        assert [c.kwargs['input'] for c in client.embed.call_args_list] == [['payments', 'web'], ['batch']]
+        client.embeddings.assert_not_called()
+
+    def test_ollama_embedder_without_batch_api(self):
+        """embed API のない古いクライアントでは1件ずつ埋め込むことのテスト"""
+        client = Mock(spec=['embeddings'])
+        client.embeddings.return_value = {'embedding': [3.0, 4.0]}
+        embedder = OllamaEmbedder(client, 'nomic-embed-text')
+
+        vectors = embedder.embed(['payments'])
+
+        assert np.allclose(vectors, [[0.6, 0.8]])
+        client.embeddings.assert_called_once_with(model='nomic-embed-text', prompt='payments')
+
+
+    def test_ollama_embedder_uses_router(self):
+        """router を指定した場合は Ollama バックエンドの実行枠の中で埋め込むことのテスト"""
+        ollama = LLMBackend(name='ollama-1', llm_type='ollama', model='llama2', client=Mock(),
+                            scheduler=LLMScheduler('ollama-1'))
+        ollama.client.embed.return_value = {'embeddings': [[3.0, 4.0]]}
+        openai = LLMBackend(name='openai-1', llm_type='openai', model='gpt-4o-mini', client=Mock(),
+                            scheduler=LLMScheduler('openai-1'), ewma_latency=0.01)
+        embedder = OllamaEmbedder(None, 'nomic-embed-text', router=LLMRouter([openai, ollama]))
+
+        assert np.allclose(embedder.embed(['payments']), [[0.6, 0.8]])
+        assert ollama.requests == 1 and openai.requests == 0
+        openai.client.embed.assert_not_called()
+
+    def test_shared_index_retries_faq_sync(self):
+        """FAQ の登録に失敗した場合は共有インデックスを保持せず、次回作成し直すことのテスト"""
+        broken = Mock()
+        broken.embed.side_effect = ConnectionError('connection refused')
+        with patch.object(embedding_index, '_embedding_index', None), \
+                patch.object(embedding_index, '_create_embedder', side_effect=[broken, HashingEmbedder()]):
+            with pytest.raises(ConnectionError):
+                get_embedding_index()
+            assert embedding_index._embedding_index is None
+
+            index = get_embedding_index()
+            assert len(index) > 0
+            assert get_embedding_index() is index
+
+class BlockingEmbedder(HashingEmbedder):
+    """release されるまで埋め込みの計算を止めるハッシュ埋め込み"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def embed(self, texts):
+        if len(texts) > 1:
+            assert self.release.wait(5)
+        return super().embed(texts)
+
+
+class TestEmbeddingSyncWorker:
+    """埋め込みインデックスのバックグラウンド同期のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.cache = InventoryCache(ttl=300)
+        self.cache.put('aws', 'ec2', [
+            {'id': 'i-1', 'name': 'payments-db', 'type': 'db.r5.large', 'tags': {'Service': 'payments'}},
+            {'id': 'i-2', 'name': 'prod-web-server', 'type': 't3.micro', 'tags': {}},
+        ])
+
+    def test_schedule_does_not_wait_for_embedding(self):
+        """同期の依頼は埋め込みの計算を待たず、検索は同期済みの範囲で行われることのテスト"""
+        embedder = BlockingEmbedder()
+        index = EmbeddingIndex(embedder)
+        worker = EmbeddingSyncWorker(lambda: index)
+
+        started = time.perf_counter()
+        assert worker.schedule(self.cache.slices()) == 1
+        assert index.search('payments') == []
+        assert time.perf_counter() - started < 1
+
+        embedder.release.set()
+        assert worker.wait(5)
+        assert index.search('payments database', k=1)[0][0] == 'aws:ec2:i-1'
+
+    def test_unchanged_slices_are_not_rescheduled(self):
+        """内容が変わっていないスライスは再度同期しないことのテスト"""
+        index = EmbeddingIndex(HashingEmbedder())
+        worker = EmbeddingSyncWorker(lambda: index)
+
+        assert worker.schedule(self.cache.slices()) == 1
+        assert worker.wait(5)
+        assert worker.schedule(self.cache.slices()) == 0
+
+        self.cache.put('aws', 'ec2', [{'id': 'i-3', 'name': 'batch-worker', 'type': 'm5.large', 'tags': {}}])
+        assert worker.schedule(self.cache.slices()) == 1
+        assert worker.wait(5)
+        assert len(index) == 1
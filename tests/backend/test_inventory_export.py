@@ -0,0 +1,111 @@
+import csv
+import io
+import pytest
+from unittest.mock import patch
+from werkzeug.datastructures import MultiDict
+from app import create_app
+from app.services import inventory_export
+from app.services.inventory_cache import get_inventory_cache
+from app.services.resource_query import ResourceQuery, ResourceQueryError
+from tests.backend.conftest import make_resource
+
+
+class TestResourceQuery:
+    """ResourceQuery のテストクラス"""
+
+    def test_from_args(self):
+        """クエリパラメータから条件・列が読み取られることのテスト"""
+        query = ResourceQuery.from_args(MultiDict([
+            ('status', 'running,stopped'), ('instance_type', 't3.micro'),
+            ('tag', 'Env:prod'), ('tag', 'Owner'), ('fields', 'name,status')
+        ]))
+
+        assert query.filters == {'status': ['running', 'stopped'], 'type': ['t3.micro']}
+        assert query.tags == {'Env': 'prod', 'Owner': None}
+        assert query.fields == ['name', 'status']
+
+    def test_invalid_tag(self):
+        """キーのないタグ条件がエラーになることのテスト"""
+        with pytest.raises(ResourceQueryError):
+            ResourceQuery.from_args(MultiDict([('tag', ':prod')]))
+
+    def test_apply_and_project(self):
+        """絞り込み・列指定の適用のテスト（辞書形式の結果も対象）"""
+        query = ResourceQuery(filters={'status': ['RUNNING']}, tags={'Env': 'prod'},
+                              fields=['name', 'created_at'])
+        records = [make_resource(0, tags={'Env': 'prod'}), make_resource(1, tags={'Env': 'dev'}),
+                   {'name': 'web-2', 'state': 'running', 'tags': {'Env': 'prod'}}]
+
+        result = [query.project(r) for r in query.apply(records, 'aws', 'ec2')]
+
+        assert result == [{'name': 'web-0', 'created_at': '2024-01-01T00:00:00Z'},
+                          {'name': 'web-2', 'created_at': None}]
+
+
+class TestInventoryExport:
+    """インベントリエクスポートのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_csv_is_emitted_in_chunks(self):
+        """CSV が一定行数ごとに分割して出力されることのテスト"""
+        resources = (make_resource(i) for i in range(25))
+
+        with patch.object(inventory_export, 'CSV_CHUNK_ROWS', 10):
+            chunks = list(inventory_export.iter_csv(resources, ResourceQuery(fields=['id'])))
+
+        assert len(chunks) == 3
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        assert rows[0] == ['id'] and len(rows) == 26
+
+    @patch('app.routes.api.MCPService')
+    def test_export_csv(self, mock_mcp_service):
+        """絞り込み条件・列指定を適用した CSV を返すことのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = [
+            make_resource(0, tags={'Env': 'prod', 'Team': 'web'}), make_resource(1, status='stopped')
+        ]
+
+        response = self.client.get(
+            '/api/export/resources?provider=aws&service=ec2&status=running&fields=name,status,tags')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'resources.csv' in response.headers['Content-Disposition']
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows == [['name', 'status', 'tags'], ['web-0', 'running', 'Env=prod;Team=web']]
+
+    def test_export_parquet(self):
+        """Parquet 形式での出力のテスト"""
+        pq = pytest.importorskip('pyarrow.parquet')
+        get_inventory_cache().put('aws', 'ec2', [make_resource(i) for i in range(5)])
+
+        response = self.client.get('/api/export/resources?format=parquet&provider=aws&service=ec2')
+
+        table = pq.read_table(io.BytesIO(response.get_data()))
+        assert table.num_rows == 5
+        assert table.column('name').to_pylist()[0] == 'web-0'
+
+    def test_export_parquet_unavailable(self):
+        """pyarrow がない場合に 501 を返すことのテスト"""
+        with patch('app.routes.api.PYARROW_AVAILABLE', False):
+            response = self.client.get('/api/export/resources?format=parquet')
+
+        assert response.status_code == 501
+
+    @patch('app.routes.api.MCPService')
+    def test_resource_list_fields(self, mock_mcp_service):
+        """リソース一覧 API でも同じ絞り込み条件・列指定が使えることのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = [
+            make_resource(0), make_resource(1, status='stopped')
+        ]
+
+        response = self.client.get('/api/resources/aws?type=ec2&status=stopped&fields=id,status')
+
+        data = response.get_json()
+        assert data['resources'] == [{'id': 'i-1', 'status': 'stopped'}]
+        assert data['count'] == 1
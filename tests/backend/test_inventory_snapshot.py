@@ -0,0 +1,174 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.models.resource import Resource
+from app.services.chat_service import ChatService
+from app.services.columnar_store import ColumnarInventory
+from app.services.inventory_cache import InventoryCache, format_age, get_inventory_cache
+from app.services.inventory_snapshot import (
+    Snapshot, SnapshotRecords, SnapshotWriter, restore_snapshot, save_snapshot
+)
+from tests.backend.conftest import make_resource
+
+
+class TestInventorySnapshot:
+    """インベントリのスナップショットの書き出し・復元のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.cache = InventoryCache(ttl=300)
+        self.cache.put('aws', 'ec2', [
+            make_resource(i, 'running' if i % 2 else 'stopped', tags={'Name': f'web-{i}', 'Env': 'prod'},
+                          metadata={'private_ip': f'10.0.0.{i}'})
+            for i in range(5)
+        ])
+        self.cache.put('azure', 'vm', [Resource(id='/vm/1', name='vm-1', type='Standard_B1s',
+                                                provider='azure', region='japaneast', status='running')])
+
+    def test_round_trip(self, tmp_path):
+        """書き出した内容が版・ETag 用のハッシュを含めて復元されることのテスト"""
+        path = str(tmp_path / 'inventory.snapshot')
+        assert save_snapshot(self.cache, path) == 6
+
+        restored = InventoryCache(ttl=300)
+        keys = restore_snapshot(restored, path)
+
+        assert sorted(keys) == [('aws', 'ec2'), ('azure', 'vm')]
+        original, copy = self.cache.peek('aws', 'ec2'), restored.peek('aws', 'ec2')
+        assert copy.restored is True
+        assert copy.version == original.version
+        assert copy.digest == original.digest
+        assert [r.to_dict() for r in copy.records] == [r.to_dict() for r in original.records]
+        assert restored.peek('azure', 'vm').records[0].tags is None
+
+    def test_records_are_decoded_lazily(self, tmp_path):
+        """参照したリソースのみ復元し、同じ添字には同じオブジェクトを返すことのテスト"""
+        path = str(tmp_path / 'inventory.snapshot')
+        save_snapshot(self.cache, path)
+        records = dict(((entry['provider'], entry['service']), records)
+                       for entry, records in Snapshot(path).slices())[('aws', 'ec2')]
+
+        assert isinstance(records, SnapshotRecords)
+        assert len(records) == 5
+        assert records._resources.count(None) == 5
+        assert records[1] is records[1]
+        assert [r.id for r in records[:2]] == ['i-0', 'i-1']
+        assert records._resources.count(None) == 3
+
+    def test_aggregate_without_decoding(self, tmp_path):
+        """復元直後の件数集計はリソースを復元せずに列から求めることのテスト"""
+        path = str(tmp_path / 'inventory.snapshot')
+        save_snapshot(self.cache, path)
+        restored = InventoryCache(ttl=300)
+        restore_snapshot(restored, path)
+
+        result = ColumnarInventory(restored).aggregate(group_by=['status'], filters={'service': ['ec2']})
+
+        assert {g['status']: g['count'] for g in result['groups']} == {'running': 2, 'stopped': 3}
+        assert restored.peek('aws', 'ec2').records._resources.count(None) == 5
+
+    def test_missing_snapshot(self, tmp_path):
+        """スナップショットがなければ何も復元しないことのテスト"""
+        assert restore_snapshot(InventoryCache(), str(tmp_path / 'missing.snapshot')) == []
+
+    def test_invalid_snapshot(self, tmp_path):
+        """形式の異なるファイルは読み込まないことのテスト"""
+        path = tmp_path / 'broken.snapshot'
+        path.write_bytes(b'not a snapshot file')
+
+        with pytest.raises(ValueError):
+            Snapshot(str(path))
+
+    def test_writer_saves_only_when_changed(self, tmp_path):
+        """キャッシュの版が変わった場合のみ書き出すことのテスト"""
+        writer = SnapshotWriter(self.cache, str(tmp_path / 'inventory.snapshot'), interval=3600)
+
+        assert writer.save() is False
+        self.cache.put('aws', 'ec2', [make_resource(0)])
+        assert writer.save() is True
+        assert writer.save() is False
+
+
+class TestStaleWhileRevalidate:
+    """復元したスライスを返しつつ取得し直すことのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.cache = InventoryCache(ttl=300)
+        self.cache.restore('aws', 'ec2', [make_resource(0)], time.time() - 3600, 1, time.time() - 3600, 'old')
+
+    def test_get_returns_restored_and_refreshes(self):
+        """期限切れの復元スライスはすぐに返し、バックグラウンドで取得し直すことのテスト"""
+        loaded = threading.Event()
+
+        def loader():
+            loaded.set()
+            return [make_resource(0), make_resource(1)]
+
+        records = self.cache.get('aws', 'ec2', loader)
+
+        assert [r.id for r in records] == ['i-0']
+        assert loaded.wait(5)
+        for _ in range(100):
+            if not self.cache.peek('aws', 'ec2').restored:
+                break
+            time.sleep(0.01)
+        refreshed = self.cache.peek('aws', 'ec2')
+        assert refreshed.restored is False
+        assert len(refreshed.records) == 2
+        assert refreshed.version > 1
+
+    def test_format_age(self):
+        """経過時間の表示のテスト"""
+        assert format_age(30) == '30 秒'
+        assert format_age(3600) == '1 時間'
+        assert format_age(2 * 86400 + 5) == '2 日'
+
+
+class TestStaleResponses:
+    """復元した情報を使った応答の注記のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        get_inventory_cache().restore('aws', 'ec2', [make_resource(0)], time.time() - 600, 1,
+                                      time.time() - 600, 'old')
+        # 応答を確認し終えるまでバックグラウンドでの取得し直しを止めておく
+        self.release = threading.Event()
+
+    def teardown_method(self):
+        """各テストメソッドの後に実行"""
+        self.release.set()
+        get_inventory_cache().clear()
+
+    def slow_fetch(self, *args, **kwargs):
+        """取得し直しを release まで待たせる"""
+        self.release.wait(5)
+        return [make_resource(0)]
+
+    @patch('app.routes.api.MCPService')
+    def test_api_marks_stale(self, mock_mcp_service):
+        """一覧 API は復元した内容に stale と経過秒数を付けることのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.side_effect = self.slow_fetch
+        app = create_app()
+        app.config['TESTING'] = True
+
+        data = app.test_client().get('/api/resources/aws?type=ec2').get_json()
+
+        assert data['stale'] is True
+        assert data['age'] >= 600
+        assert data['resources'][0]['id'] == 'i-0'
+
+    def test_chat_count_mentions_age(self):
+        """件数の回答に取得時刻の注記が付くことのテスト"""
+        chat_service = ChatService()
+        chat_service.llm_service = Mock()
+        chat_service.mcp_service = Mock()
+        chat_service.mcp_service.get_aws_resources.side_effect = self.slow_fetch
+
+        answer = chat_service._handle_count_question("EC2 は何台ありますか？")
+
+        assert "1 件" in answer
+        assert "10 分前に取得した情報です" in answer
@@ -0,0 +1,217 @@
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.models.resource import Resource, ResourcePage
+from app.services.chat_service import ChatService
+from app.services.inventory_cache import get_inventory_cache
+from app.services.mcp_service import MCPService
+from app.services.resource_query import ResourceQuery
+
+
+def _ec2_page(ids, state='running', token=None):
+    """describe_instances の1ページ分の応答"""
+    response = {'Reservations': [{'Instances': [
+        {'InstanceId': i, 'InstanceType': 't3.micro', 'State': {'Name': state}} for i in ids
+    ]}]}
+    if token:
+        response['NextToken'] = token
+    return response
+
+
+class TestMCPServiceLimit:
+    """MCPService の件数上限による取得打ち切りのテストクラス"""
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_ec2_stops_after_limit(self, mock_boto3_session):
+        """上限件数がそろった時点で次のページを取得しないことのテスト"""
+        mock_session = Mock(region_name='us-east-1')
+        mock_boto3_session.return_value = mock_session
+        mock_ec2 = mock_session.client.return_value
+        mock_ec2.describe_instances.side_effect = [
+            _ec2_page(['i-1', 'i-2', 'i-3'], token='t1'),
+            _ec2_page(['i-4'], token='t2'),
+        ]
+
+        result = MCPService().get_aws_resources('ec2', limit=3)
+
+        assert isinstance(result, ResourcePage)
+        assert [r.id for r in result] == ['i-1', 'i-2', 'i-3']
+        assert result.has_more is True
+        mock_ec2.describe_instances.assert_called_once_with(MaxResults=5)
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_ec2_follows_next_token_until_enough_matches(self, mock_boto3_session):
+        """取得後に適用する条件で件数が足りない場合は次のページを取得することのテスト"""
+        mock_session = Mock(region_name='us-east-1')
+        mock_boto3_session.return_value = mock_session
+        mock_ec2 = mock_session.client.return_value
+        mock_ec2.describe_instances.side_effect = [
+            _ec2_page(['i-1', 'i-2'], token='t1'),
+            _ec2_page(['i-3']),
+        ]
+
+        result = MCPService().get_aws_resources(
+            'ec2', query=ResourceQuery(filters={'region': ['us-east-1']}), limit=5)
+
+        assert [r.id for r in result] == ['i-1', 'i-2', 'i-3']
+        assert result.has_more is False
+        assert mock_ec2.describe_instances.call_args_list[1].kwargs == {'MaxResults': 6, 'NextToken': 't1'}
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_without_limit_fetches_all_pages(self, mock_boto3_session):
+        """上限を指定しない場合は全ページを取得し、MaxResults を渡さないことのテスト"""
+        mock_session = Mock(region_name='us-east-1')
+        mock_boto3_session.return_value = mock_session
+        mock_ec2 = mock_session.client.return_value
+        mock_ec2.describe_instances.side_effect = [
+            _ec2_page(['i-1'], token='t1'),
+            _ec2_page(['i-2']),
+        ]
+
+        result = MCPService().get_aws_resources('ec2')
+
+        assert [r.id for r in result] == ['i-1', 'i-2']
+        assert mock_ec2.describe_instances.call_args_list[0].kwargs == {}
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_rds_uses_marker(self, mock_boto3_session):
+        """RDS は MaxRecords と Marker で打ち切ることのテスト"""
+        mock_session = Mock(region_name='us-east-1')
+        mock_boto3_session.return_value = mock_session
+        mock_rds = mock_session.client.return_value
+        mock_rds.describe_db_instances.return_value = {
+            'DBInstances': [{'DBInstanceIdentifier': f'db-{i}', 'DBInstanceClass': 'db.t3.micro',
+                             'DBInstanceStatus': 'available', 'Engine': 'mysql'} for i in range(2)],
+            'Marker': 'm1'
+        }
+
+        result = MCPService().get_aws_resources('rds', limit=2)
+
+        assert len(result) == 2 and result.has_more is True
+        mock_rds.describe_db_instances.assert_called_once_with(MaxRecords=20)
+
+    @patch('app.services.mcp_service.StorageManagementClient')
+    @patch('app.services.mcp_service.DefaultAzureCredential')
+    def test_azure_stops_at_page_boundary(self, mock_credential, mock_storage_client, monkeypatch):
+        """Azure は続きのページを取得せずに打ち切ることのテスト"""
+        monkeypatch.setenv('AZURE_SUBSCRIPTION_ID', 'sub-1')
+        accounts = []
+        for i in range(3):
+            account = Mock(id=f'/subscriptions/sub-1/resourceGroups/rg/providers/x/sa{i}', location='japaneast',
+                           tags=None, creation_time=None)
+            account.name = f'sa{i}'
+            accounts.append(account)
+
+        fetched = []
+
+        class Pages:
+            continuation_token = None
+
+            def __iter__(self):
+                for page, token in ((accounts[:2], 'c1'), (accounts[2:], None)):
+                    fetched.append(token)
+                    self.continuation_token = token
+                    yield iter(page)
+
+        pager = Mock()
+        pager.by_page.return_value = Pages()
+        mock_storage_client.return_value.storage_accounts.list.return_value = pager
+
+        result = MCPService().get_azure_resources('storage', limit=2)
+
+        assert [r.name for r in result] == ['sa0', 'sa1']
+        assert result.has_more is True
+        assert fetched == ['c1']
+
+    def test_get_logs_passes_limit(self):
+        """ログの件数上限は指定した場合のみ渡されることのテスト"""
+        mcp_service = MCPService()
+        with patch.object(mcp_service, '_get_aws_logs', return_value=[]) as mock_get_aws_logs:
+            mcp_service.get_logs('aws', 'ec2', limit=5)
+        mock_get_aws_logs.assert_called_once_with('ec2', limit=5)
+
+
+class TestChatLimit:
+    """チャットの一覧表示での件数上限のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.chat_service = ChatService()
+        self.chat_service.llm_service = Mock()
+        self.chat_service.mcp_service = Mock()
+
+    def test_filtered_list_requests_limit(self):
+        """絞り込み付きの一覧は表示件数を上限として取得し、続きがあることを示すテスト"""
+        self.chat_service.mcp_service.get_aws_resources.return_value = ResourcePage(
+            [Resource(id=f'i-{i}', name=f'batch-{i}', type='t3.micro', provider='aws',
+                      region='us-east-1', status='stopped') for i in range(10)],
+            has_more=True)
+
+        result = self.chat_service.process_message("停止中のEC2インスタンス一覧を教えて")
+
+        kwargs = self.chat_service.mcp_service.get_aws_resources.call_args.kwargs
+        assert kwargs['limit'] == 10
+        assert "他にも該当するリソースがあります" in result
+
+    def test_unfiltered_list_requests_limit_without_cache(self):
+        """絞り込みのない一覧もキャッシュがなければ表示件数を上限として取得し、部分的な結果はキャッシュしないことのテスト"""
+        self.chat_service.mcp_service.get_aws_resources.return_value = ResourcePage(
+            [Resource(id=f'i-{i}', name=f'web-{i}', type='t3.micro', provider='aws',
+                      region='us-east-1', status='running') for i in range(10)],
+            has_more=True)
+
+        result = self.chat_service._handle_resource_list_request({'provider': 'aws', 'service': 'ec2'})
+
+        self.chat_service.mcp_service.get_aws_resources.assert_called_once_with('ec2', limit=10)
+        assert "他にも該当するリソースがあります" in result
+        assert get_inventory_cache().peek('aws', 'ec2') is None
+
+    def test_unfiltered_list_uses_cache(self):
+        """キャッシュが期限内なら全件のキャッシュから表示することのテスト"""
+        resources = [Resource(id=f'i-{i}', name=f'web-{i}', type='t3.micro', provider='aws',
+                              region='us-east-1', status='running') for i in range(12)]
+        get_inventory_cache().get('aws', 'ec2', lambda: resources)
+
+        result = self.chat_service._handle_resource_list_request({'provider': 'aws', 'service': 'ec2'})
+
+        self.chat_service.mcp_service.get_aws_resources.assert_not_called()
+        assert "他 2 件" in result
+
+    def test_log_query_requests_limit(self):
+        """ログは表示件数を上限として取得することのテスト"""
+        self.chat_service.mcp_service.get_logs.return_value = []
+
+        self.chat_service._handle_log_query({'provider': 'aws', 'service': 'ec2'})
+
+        self.chat_service.mcp_service.get_logs.assert_called_once_with('aws', 'ec2', limit=5)
+
+
+class TestResourceListLimitAPI:
+    """リソース一覧 API の limit パラメータのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_limit_returns_has_more(self, mock_mcp_service):
+        """limit を指定すると取得に渡され、応答に has_more が含まれることのテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = ResourcePage(
+            [Resource(id='i-1', name='web-1', type='t3.micro', provider='aws',
+                      region='us-east-1', status='running')], has_more=True)
+
+        response = self.client.get('/api/resources/aws?type=ec2&limit=1')
+
+        assert response.status_code == 200
+        assert response.get_json()['has_more'] is True
+        mock_mcp_service.return_value.get_aws_resources.assert_called_once_with('ec2', limit=1)
+
+    @pytest.mark.parametrize('limit', ['0', 'abc'])
+    def test_invalid_limit(self, limit):
+        """不正な limit は 400 になることのテスト"""
+        response = self.client.get(f'/api/resources/aws?limit={limit}')
+
+        assert response.status_code == 400
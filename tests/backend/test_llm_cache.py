@@ -0,0 +1,143 @@
+import multiprocessing
+import pytest
+from unittest.mock import Mock
+from app.services import llm_cache as llm_cache_module
+from app.services.llm_cache import LLMCache, cache_key, normalize_prompt
+from app.services.llm_router import LLMBackend, LLMRouter
+from app.services.llm_scheduler import LLMScheduler
+from app.services.llm_service import LLMService
+
+
+def _write_entries(path, start):
+    """別プロセスからキャッシュに書き込む"""
+    cache = LLMCache(path)
+    for i in range(start, start + 20):
+        cache.put(f"key-{i}", f"value-{i}", 'ollama:llama2')
+
+
+class TestLLMCache:
+    """LLM ディスクキャッシュのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.key = cache_key('text', 'ollama:llama2', 'system', 'EC2 とは？', 1000)
+
+    def test_put_and_get_across_instances(self, tmp_path):
+        """保存した結果が別のインスタンス（再起動後）からも読めることのテスト"""
+        path = str(tmp_path / 'llm_cache.sqlite3')
+        LLMCache(path).put(self.key, '回答', 'ollama:llama2')
+
+        cache = LLMCache(path)
+
+        assert cache.get(self.key) == '回答'
+        assert cache.get('missing') is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    def test_key_normalizes_prompt(self):
+        """空白や全角・半角の違いは同じキーになることのテスト"""
+        assert normalize_prompt("  ＥＣ２\n   とは？ ") == 'EC2 とは?'
+        assert cache_key('text', 'm', 's', 'EC2  とは？\n', 10) == cache_key('text', 'm', 's', 'ＥＣ２ とは？', 10)
+        assert cache_key('text', 'm', 's', 'EC2', 10) != cache_key('text', 'other', 's', 'EC2', 10)
+
+    def test_model_change_invalidates(self, tmp_path):
+        """モデルが変わった場合に以前のエントリが破棄されることのテスト"""
+        path = str(tmp_path / 'llm_cache.sqlite3')
+        cache = LLMCache(path)
+        cache.use_model('ollama:llama2')
+        cache.put(self.key, '回答')
+
+        restarted = LLMCache(path)
+        restarted.use_model('ollama:llama3')
+
+        assert restarted.get(self.key) is None
+        assert restarted.stats()['entries'] == 0
+
+    def test_lru_eviction(self, tmp_path, monkeypatch):
+        """容量の上限を超えた場合に参照の古いものから削除されることのテスト"""
+        monkeypatch.setattr(llm_cache_module, '_EVICTION_INTERVAL', 1)
+        monkeypatch.setattr(llm_cache_module, '_TOUCH_INTERVAL', 0)
+        cache = LLMCache(str(tmp_path / 'llm_cache.sqlite3'), max_bytes=250)
+        for i in range(2):
+            cache.put(f"key-{i}", 'x' * 100)
+        cache.get('key-0')  # key-0 を最近参照したものにする
+
+        cache.put('key-2', 'x' * 100)
+
+        assert cache.get('key-1') is None
+        assert cache.get('key-0') is not None
+        assert cache.size() <= 250
+
+    def test_ttl(self, tmp_path):
+        """期限を過ぎたエントリは返さないことのテスト"""
+        cache = LLMCache(str(tmp_path / 'llm_cache.sqlite3'), ttl=-1)
+        cache.put(self.key, '回答')
+
+        assert cache.get(self.key) is None
+
+    def test_multi_process_writes(self, tmp_path):
+        """複数プロセスから同時に書き込めることのテスト"""
+        path = str(tmp_path / 'llm_cache.sqlite3')
+        LLMCache(path)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_write_entries, args=(path, i * 20)) for i in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert LLMCache(path).stats()['entries'] == 60
+
+
+class TestLLMServiceCache:
+    """LLMService のキャッシュ利用のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.client = Mock()
+        backend = LLMBackend(name='test', llm_type='ollama', model='test-model', client=self.client,
+                             scheduler=LLMScheduler('test', max_concurrency=2))
+        self.service = LLMService.__new__(LLMService)
+        self.service.llm_type = 'ollama'
+        self.service.router = LLMRouter([backend])
+
+    def test_generate_response_uses_cache(self, tmp_path, monkeypatch):
+        """同じ質問は2回目以降 LLM を呼ばずにキャッシュから返すことのテスト"""
+        monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / 'llm_cache.sqlite3'))
+        self.client.chat.return_value = {'message': {'content': 'EC2 は仮想サーバーです'}}
+
+        first = self.service.generate_response("EC2 とは？")
+        second = self.service.generate_response("EC2  とは？")
+
+        assert first == second == 'EC2 は仮想サーバーです'
+        assert self.client.chat.call_count == 1
+
+    def test_errors_are_not_cached(self, tmp_path, monkeypatch):
+        """生成に失敗した場合はキャッシュしないことのテスト"""
+        monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / 'llm_cache.sqlite3'))
+        self.client.chat.side_effect = [RuntimeError('down'), {'message': {'content': '回答'}}]
+
+        assert 'エラー' in self.service.generate_response("S3 とは？")
+        assert self.service.generate_response("S3 とは？") == '回答'
+
+    def test_invalid_json_is_not_cached(self, tmp_path, monkeypatch):
+        """スキーマに一致しない構造化出力はキャッシュしないことのテスト"""
+        monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / 'llm_cache.sqlite3'))
+        schema = {'type': 'object', 'required': ['answer']}
+        self.client.chat.side_effect = [{'message': {'content': '{"other": 1}'}},
+                                        {'message': {'content': '{"answer": 1}'}}]
+
+        assert self.service.generate_json("count", schema) is None
+        assert self.service.generate_json("count", schema) == {'answer': 1}
+        assert self.service.generate_json("count", schema) == {'answer': 1}
+        assert self.client.chat.call_count == 2
+
+    def test_disabled_without_path(self, monkeypatch):
+        """LLM_CACHE_PATH が未設定の場合はキャッシュしないことのテスト"""
+        monkeypatch.delenv('LLM_CACHE_PATH', raising=False)
+        self.client.chat.return_value = {'message': {'content': '回答'}}
+
+        self.service.generate_response("VM とは？")
+        self.service.generate_response("VM とは？")
+
+        assert self.client.chat.call_count == 2
@@ -0,0 +1,169 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.llm_router import LLMBackend, LLMRouter, parse_backend_specs
+from app.services.llm_scheduler import LLMQueueTimeoutError, LLMScheduler
+
+
+def make_backend(name, latency=1.0):
+    """テスト用のバックエンドを作成"""
+    backend = LLMBackend(name=name, llm_type='ollama', model='llama2', client=Mock(),
+                         scheduler=LLMScheduler(name, max_concurrency=4))
+    backend.ewma_latency = latency
+    return backend
+
+
+class TestLLMRouter:
+    """LLMRouter のテストクラス"""
+
+    def test_parse_backend_specs(self):
+        """LLM_BACKENDS 設定値の解析テスト"""
+        specs = parse_backend_specs(
+            "ollama:llama2@http://ollama-1:11434, openai:gpt-4o-mini")
+
+        assert specs == [
+            {'type': 'ollama', 'model': 'llama2', 'host': 'http://ollama-1:11434'},
+            {'type': 'openai', 'model': 'gpt-4o-mini', 'host': None}
+        ]
+
+    def test_select_prefers_lower_latency(self):
+        """平均レイテンシの低いバックエンドが選択されることのテスト"""
+        slow = make_backend('slow', latency=2.0)
+        fast = make_backend('fast', latency=0.5)
+        router = LLMRouter([slow, fast])
+
+        assert router.select() is fast
+
+    def test_select_considers_outstanding(self):
+        """未完了リクエスト数が多いバックエンドが避けられることのテスト"""
+        busy = make_backend('busy', latency=0.5)
+        busy.outstanding = 5
+        idle = make_backend('idle', latency=1.0)
+        router = LLMRouter([busy, idle])
+
+        assert router.select() is idle
+
+    def test_failover_and_ejection(self):
+        """失敗時のフェイルオーバーと連続エラーでの除外のテスト"""
+        broken = make_backend('broken', latency=0.1)
+        healthy = make_backend('healthy', latency=1.0)
+        router = LLMRouter([broken, healthy], eject_threshold=2, eject_duration=60)
+
+        def fn(backend):
+            if backend is broken:
+                raise RuntimeError("connection refused")
+            return backend.name
+
+        assert router.call(fn) == 'healthy'
+        assert router.call(fn) == 'healthy'
+
+        assert broken.errors == 2
+        assert broken.ejections == 1
+        assert router.select() is healthy
+
+    def test_hedged_request_uses_second_backend(self):
+        """一次バックエンドが遅い場合にヘッジ先の応答が使われることのテスト"""
+        slow = make_backend('slow', latency=0.1)
+        fast = make_backend('fast', latency=1.0)
+        router = LLMRouter([slow, fast], hedge_delay=0.02)
+        release = threading.Event()
+
+        def fn(backend):
+            if backend is slow:
+                release.wait(2)
+                return 'slow'
+            return 'fast'
+
+        try:
+            assert router.call(fn, hedge=True) == 'fast'
+        finally:
+            release.set()
+
+    def test_hedged_request_retries_after_primary_failure(self):
+        """一次バックエンドがヘッジの待ち時間より前に失敗した場合も別のバックエンドで再試行することのテスト"""
+        broken = make_backend('broken', latency=0.1)
+        healthy = make_backend('healthy', latency=1.0)
+        router = LLMRouter([broken, healthy], hedge_delay=1.0)
+
+        def fn(backend):
+            if backend is broken:
+                raise RuntimeError("connection refused")
+            return backend.name
+
+        started = time.monotonic()
+        assert router.call(fn, hedge=True) == 'healthy'
+        assert time.monotonic() - started < 1.0
+        assert broken.errors == 1
+
+    def test_hedged_request_cancels_queued_loser(self):
+        """一方の結果が返ると、実行待ちのもう一方のリクエストを取り消して枠を使わないことのテスト"""
+        busy = make_backend('busy', latency=0.1)
+        busy.scheduler = LLMScheduler('busy', max_concurrency=1, queue_timeout=5)
+        busy.scheduler.acquire()
+        idle = make_backend('idle', latency=1.0)
+        router = LLMRouter([busy, idle], hedge_delay=0.02)
+        called = []
+
+        def fn(backend):
+            called.append(backend.name)
+            return backend.name
+
+        assert router.call(fn, hedge=True) == 'idle'
+
+        deadline = time.monotonic() + 1
+        while busy.scheduler.queued and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert busy.scheduler.queued == 0
+        busy.scheduler.release()
+        assert busy.scheduler.in_flight == 0
+        assert called == ['idle']
+
+    def test_queue_deadline_counts_from_submit(self):
+        """ワーカーへの投入後の待ち時間もキュー待ちの期限に含めることのテスト"""
+        backend = make_backend('busy')
+        backend.scheduler = LLMScheduler('busy', max_concurrency=1, queue_timeout=5)
+        backend.scheduler.acquire()
+        router = LLMRouter([backend])
+
+        started = time.monotonic()
+        with pytest.raises(LLMQueueTimeoutError):
+            router._invoke(backend, lambda b: 'ok', 10, queued_at=started - 5)
+        assert time.monotonic() - started < 1
+
+    def test_stats(self):
+        """バックエンド統計の取得テスト"""
+        backend = make_backend('ollama-1')
+        router = LLMRouter([backend])
+
+        router.call(lambda b: 'ok')
+        stats = router.stats()
+
+        assert stats[0]['name'] == 'ollama-1'
+        assert stats[0]['requests'] == 1
+        assert stats[0]['error_rate'] == 0.0
+        assert stats[0]['ejected'] is False
+
+
+class TestLLMBackendsEndpoint:
+    """LLM バックエンド統計 API のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.LLMService')
+    def test_get_llm_backends(self, mock_llm_service):
+        """バックエンド統計エンドポイントのテスト"""
+        mock_llm_service.return_value.backend_stats.return_value = [
+            {'name': 'ollama:llama2@http://ollama-1:11434', 'ewma_latency': 0.8}
+        ]
+
+        response = self.client.get('/api/llm/backends')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['backends'][0]['ewma_latency'] == 0.8
@@ -0,0 +1,120 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.llm_scheduler import (
+    CancelToken, LLMCancelledError, LLMScheduler, LLMQueueTimeoutError, PRIORITY_HIGH, PRIORITY_NORMAL
+)
+
+
+class TestLLMScheduler:
+    """LLMScheduler のテストクラス"""
+
+    def test_acquire_within_limit(self):
+        """同時実行数の上限内では即座に実行枠を取得できることのテスト"""
+        scheduler = LLMScheduler('test', max_concurrency=2)
+
+        scheduler.acquire()
+        scheduler.acquire()
+
+        assert scheduler.in_flight == 2
+        assert scheduler.queued == 0
+
+    def test_queue_timeout(self):
+        """待機期限を過ぎた場合に例外が送出されることのテスト"""
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_timeout=0.05)
+        scheduler.acquire()
+
+        with pytest.raises(LLMQueueTimeoutError) as exc_info:
+            scheduler.acquire()
+
+        assert exc_info.value.retry_after >= 1
+        assert scheduler.queued == 0
+        assert scheduler.in_flight == 1
+
+    def test_queue_full_rejects_immediately(self):
+        """キューが満杯の場合に待たずに拒否されることのテスト"""
+        scheduler = LLMScheduler('test', max_concurrency=1, max_queue_size=0)
+        scheduler.acquire()
+
+        started = time.monotonic()
+        with pytest.raises(LLMQueueTimeoutError):
+            scheduler.acquire(timeout=5)
+
+        assert time.monotonic() - started < 1
+
+    def test_cancel_removes_waiter(self):
+        """取り消すと待機中のリクエストがキューから外れ、実行枠は割り当てられないことのテスト"""
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_timeout=5)
+        scheduler.acquire()
+        cancel = CancelToken()
+        errors = []
+
+        def wait_for_slot():
+            try:
+                scheduler.acquire(cancel=cancel)
+            except LLMCancelledError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=wait_for_slot)
+        thread.start()
+        while scheduler.queued == 0:
+            time.sleep(0.001)
+        cancel.cancel()
+        thread.join(1)
+
+        assert len(errors) == 1
+        assert scheduler.queued == 0
+        scheduler.release()
+        assert scheduler.in_flight == 0
+
+    def test_priority_order(self):
+        """優先度の高いリクエストが先に実行枠を得ることのテスト"""
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_timeout=5)
+        scheduler.acquire()
+        order = []
+
+        def worker(label, priority):
+            with scheduler.slot(priority):
+                order.append(label)
+
+        normal = threading.Thread(target=worker, args=('normal', PRIORITY_NORMAL))
+        normal.start()
+        while scheduler.queued < 1:
+            time.sleep(0.001)
+        high = threading.Thread(target=worker, args=('high', PRIORITY_HIGH))
+        high.start()
+        while scheduler.queued < 2:
+            time.sleep(0.001)
+
+        scheduler.release()
+        normal.join()
+        high.join()
+
+        assert order == ['high', 'normal']
+        assert scheduler.in_flight == 0
+
+
+class TestChatBackpressure:
+    """チャット API の混雑時応答のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.ChatService')
+    def test_chat_returns_503_with_retry_after(self, mock_chat_service):
+        """キュー待ちタイムアウト時に 503 と Retry-After を返すことのテスト"""
+        mock_service_instance = Mock()
+        mock_chat_service.return_value = mock_service_instance
+        mock_service_instance.process_message.side_effect = LLMQueueTimeoutError(
+            "timeout", retry_after=7)
+
+        response = self.client.post('/api/chat', json={'message': 'テスト'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+        assert response.get_json()['retry_after'] == 7
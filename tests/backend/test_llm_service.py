@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import Mock
+from app.services.llm_router import LLMBackend, LLMRouter
+from app.services.llm_scheduler import LLMScheduler
+from app.services.llm_service import LLMService
+from app.services.intent_schema import INTENT_SCHEMA, build_intent_prompt
+from app.utils.json_schema import validate_json
+
+
+def make_service(llm_type='ollama'):
+    """モックのバックエンドを1台持つ LLMService を作成"""
+    client = Mock()
+    backend = LLMBackend(name='test', llm_type=llm_type, model='test-model', client=client,
+                         scheduler=LLMScheduler('test', max_concurrency=2))
+    service = LLMService.__new__(LLMService)
+    service.llm_type = llm_type
+    service.router = LLMRouter([backend])
+    return service, client
+
+
+class TestStructuredOutput:
+    """構造化出力モードのテストクラス"""
+
+    def test_validate_json_valid(self):
+        """スキーマに一致する意図の検証テスト"""
+        intent = {'type': 'log_query', 'provider': 'aws', 'service': 'ec2',
+                  'confidence': 0.9, 'parameters': {}}
+
+        assert validate_json(intent, INTENT_SCHEMA) == []
+
+    def test_validate_json_invalid(self):
+        """スキーマに一致しない意図の検証テスト"""
+        intent = {'type': 'unknown_type', 'provider': 'aws', 'confidence': 1.5}
+
+        errors = validate_json(intent, INTENT_SCHEMA)
+
+        assert any('$.type' in e for e in errors)
+        assert any('$.service' in e for e in errors)
+        assert any('$.confidence' in e for e in errors)
+
+    def test_intent_prompt_is_compact(self):
+        """意図解析プロンプトに日本語回答ラッパーが含まれないことのテスト"""
+        prompt = build_intent_prompt("S3バケット一覧")
+
+        assert '日本語で回答してください' not in prompt
+        assert len(prompt) < 400
+
+    def test_generate_json_ollama(self):
+        """Ollama の format=json による構造化出力のテスト"""
+        service, client = make_service('ollama')
+        client.chat.return_value = {'message': {'content': (
+            '{"type": "resource_list", "provider": "aws", "service": "EC2", '
+            '"confidence": 0.95, "parameters": {}}')}}
+
+        intent = service.analyze_user_intent("EC2の一覧")
+
+        assert intent['type'] == 'resource_list'
+        assert intent['service'] == 'ec2'
+        kwargs = client.chat.call_args.kwargs
+        assert kwargs['format'] == 'json'
+        assert '日本語' not in kwargs['messages'][1]['content']
+
+    def test_generate_json_openai(self):
+        """OpenAI の JSON モードによる構造化出力のテスト"""
+        service, client = make_service('openai')
+        response = Mock()
+        response.choices = [Mock()]
+        response.choices[0].message.content = '{"answer": 1}'
+        client.chat.completions.create.return_value = response
+
+        data = service.generate_json("count", {'type': 'object', 'required': ['answer']})
+
+        assert data == {'answer': 1}
+        kwargs = client.chat.completions.create.call_args.kwargs
+        assert kwargs['response_format'] == {'type': 'json_object'}
+
+    def test_generate_json_schema_mismatch(self):
+        """スキーマ不一致の場合に None が返ることのテスト"""
+        service, client = make_service('ollama')
+        client.chat.return_value = {'message': {'content': '{"type": "other"}'}}
+
+        assert service.generate_json("x", INTENT_SCHEMA) is None
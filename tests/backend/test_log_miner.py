@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.chat_service import ChatService
+from app.services.log_miner import LogTemplateMiner, format_clusters, mine_templates
+
+
+class TestLogTemplateMiner:
+    """ログのテンプレート分類のテストクラス"""
+
+    def test_groups_lines_by_template(self):
+        """変数部分だけが異なる行は1つのテンプレートにまとまることのテスト"""
+        miner = LogTemplateMiner()
+        for i in range(50):
+            miner.add(f"ERROR Connection to 10.0.0.{i}:5432 timed out after {i * 10}ms", timestamp=100 + i)
+        miner.add("ERROR Disk full on /dev/xvda1", timestamp=5)
+
+        top = miner.top(2)
+        assert miner.total == 51
+        assert len(miner.clusters()) == 2
+        assert top[0].count == 50
+        assert top[0].pattern() == "ERROR Connection to <*> timed out after <*>"
+        assert (top[0].first_seen, top[0].last_seen) == (100, 149)
+        assert len(top[0].samples) == 3
+
+    def test_merges_differing_words(self):
+        """数字を含まない語が異なる場合も、似ていれば変数に置き換えてまとめることのテスト"""
+        miner = LogTemplateMiner()
+        miner.add("login failed for user alice from office")
+        miner.add("login failed for user bob from home")
+
+        assert len(miner.clusters()) == 1
+        assert miner.clusters()[0].pattern() == "login failed for user <*> from <*>"
+
+    def test_different_lengths_are_separate(self):
+        """トークン数が異なる行は別のテンプレートになることのテスト"""
+        miner = LogTemplateMiner()
+        miner.add("job finished")
+        miner.add("job finished with warnings")
+
+        assert len(miner.clusters()) == 2
+
+    def test_cluster_limit(self):
+        """テンプレート数の上限を超えた行は分類せずに数えるのみであることのテスト"""
+        miner = LogTemplateMiner(max_clusters=1)
+        miner.add("alpha beta gamma")
+        assert miner.add("one two") is None
+
+        assert miner.unmatched == 1
+        assert len(miner.clusters()) == 1
+
+    def test_level_and_format(self):
+        """イベントのレベルを保持し、LLM 用の参考情報に件数と例を含めることのテスト"""
+        miner = mine_templates([{'message': 'ERROR timeout 1', 'level': 'ERROR', 'timestamp': 1},
+                                {'message': 'ERROR timeout 2', 'level': 'ERROR', 'timestamp': 2}])
+
+        text = format_clusters(miner.top(10))
+        assert "2 件 (ERROR, 1 〜 2): ERROR timeout <*>" in text
+        assert "例: ERROR timeout 1" in text
+
+
+class TestLogSummary:
+    """エラーログの要約のテストクラス"""
+
+    def test_chat_sends_only_top_templates(self):
+        """チャットでは分類したテンプレートのみを LLM に渡すことのテスト"""
+        chat_service = ChatService()
+        chat_service.llm_service = Mock()
+        chat_service.llm_service.summarize_map_reduce.return_value = "接続のタイムアウトが多発しています。"
+        chat_service.mcp_service = Mock()
+        chat_service.mcp_service.iter_logs.return_value = iter(
+            [{'timestamp': i, 'message': f'ERROR request {i} timed out', 'level': 'ERROR'} for i in range(1000)])
+
+        result = chat_service._handle_log_query(
+            {'provider': 'aws', 'service': 'ec2', 'parameters': {'level': 'ERROR'}})
+
+        assert "1000 件を 1 種類に分類しました" in result
+        assert "接続のタイムアウトが多発しています。" in result
+        items = chat_service.llm_service.summarize_map_reduce.call_args.args[1]
+        assert len(items) == 1
+        assert "1000 件" in items[0]
+
+    @patch('app.routes.api.MCPService')
+    def test_templates_api(self, mock_mcp_service):
+        """テンプレート分類 API のテスト"""
+        mock_mcp_service.return_value.iter_logs.return_value = iter(
+            [{'timestamp': i, 'message': f'WARN retry {i}'} for i in range(3)])
+        app = create_app()
+        app.config['TESTING'] = True
+
+        response = app.test_client().get('/api/logs/templates?provider=aws&level=warning&limit=100')
+
+        data = response.get_json()
+        assert response.status_code == 200
+        assert data['total'] == 3
+        assert data['templates'][0]['template'] == 'WARN retry <*>'
+        mock_mcp_service.return_value.iter_logs.assert_called_once_with(
+            'aws', 'ec2', limit=100, level='WARNING')
@@ -0,0 +1,222 @@
+import json
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.chat_service import ChatService
+from app.services.log_pipeline import dedupe_events, log_pipeline, normalize_level, parse_events
+from app.services.mcp_service import MCPService
+
+
+def _events(messages, start=0):
+    """テスト用のログイベント"""
+    return [{'timestamp': start + i, 'message': message} for i, message in enumerate(messages)]
+
+
+class TestLogPipeline:
+    """ログのパイプライン（解析・絞り込み・重複除去・件数上限）のテストクラス"""
+
+    def test_parse_detects_level(self):
+        """レベルがないイベントはメッセージから推定することのテスト"""
+        events = list(parse_events(_events(['[ERROR] disk full\n', 'WARN: slow', 'started'])))
+
+        assert [e['level'] for e in events] == ['ERROR', 'WARNING', None]
+        assert events[0]['message'] == '[ERROR] disk full'
+
+    def test_normalize_level(self):
+        """レベルの表記ゆれをそろえることのテスト"""
+        assert normalize_level('err') == 'ERROR'
+        assert normalize_level('fatal') == 'CRITICAL'
+        assert normalize_level('verbose') is None
+
+    def test_filter_by_level_and_keyword(self):
+        """指定したレベル以上かつキーワードを含むイベントのみ返すことのテスト"""
+        source = iter(_events(['INFO ok', 'ERROR Disk full', 'CRITICAL disk failure', 'ERROR timeout']))
+
+        events = list(log_pipeline(source, level='error', keyword='disk'))
+
+        assert [e['message'] for e in events] == ['ERROR Disk full', 'CRITICAL disk failure']
+
+    def test_dedupe_window_is_bounded(self):
+        """重複判定に覚えておく件数が window までであることのテスト"""
+        events = _events(['a', 'b', 'c'])
+        events = events + [events[0], events[2]]
+
+        assert [e['message'] for e in dedupe_events(iter(events), window=2)] == ['a', 'b', 'c', 'a']
+        assert [e['message'] for e in dedupe_events(iter(events), window=10)] == ['a', 'b', 'c']
+
+    def test_limit_closes_source(self):
+        """上限に達すると取得元を閉じ、次のページを取得しないことのテスト"""
+        pages = []
+        closed = []
+
+        def source():
+            try:
+                for page in range(10):
+                    pages.append(page)
+                    yield from _events([f'event {page}-{i}' for i in range(3)], start=page * 3)
+            finally:
+                closed.append(True)
+
+        events = list(log_pipeline(source(), limit=2))
+
+        assert len(events) == 2
+        assert pages == [0]
+        assert closed == [True]
+
+    def test_consumer_stop_closes_source(self):
+        """呼び出し側が読むのをやめた場合も取得元を閉じることのテスト"""
+        closed = []
+
+        def source():
+            try:
+                yield from _events(['a', 'b', 'c'])
+            finally:
+                closed.append(True)
+
+        events = log_pipeline(source())
+        next(events)
+        events.close()
+
+        assert closed == [True]
+
+    def test_scan_limit(self):
+        """条件に一致しなくても読み込む件数は scan_limit までであることのテスト"""
+        read = []
+
+        def source():
+            for event in _events(['INFO ok'] * 100):
+                read.append(event)
+                yield event
+
+        assert list(log_pipeline(source(), level='ERROR', scan_limit=10)) == []
+        assert len(read) == 10
+
+
+class TestMCPServiceLogs:
+    """MCPService のログ取得のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        with patch('app.services.mcp_service.boto3.Session') as mock_boto3_session:
+            self.logs_client = mock_boto3_session.return_value.client.return_value
+            self.mcp_service = MCPService()
+        self.logs_client.describe_log_groups.return_value = {'logGroups': [{'logGroupName': '/app'}]}
+        self.logs_client.describe_log_streams.return_value = {'logStreams': [{'logStreamName': 's1'}]}
+
+    def test_recent_events_page_backward(self):
+        """新しい順に1ページずつ遡り、上限に達したら次のページを取得しないことのテスト"""
+        self.logs_client.get_log_events.side_effect = [
+            {'events': _events(['a', 'b'], start=10), 'nextBackwardToken': 'b1'},
+            {'events': _events(['c', 'd'], start=0), 'nextBackwardToken': 'b2'},
+            {'events': _events(['e'], start=-10), 'nextBackwardToken': 'b3'},
+        ]
+
+        logs = self.mcp_service.get_logs('aws', 'ec2', limit=3)
+
+        assert [log['message'] for log in logs] == ['b', 'a', 'd']
+        assert self.logs_client.get_log_events.call_count == 2
+        assert self.logs_client.get_log_events.call_args_list[0].kwargs == {
+            'logGroupName': '/app', 'logStreamName': 's1', 'limit': 3}
+        assert self.logs_client.get_log_events.call_args_list[1].kwargs['nextToken'] == 'b1'
+
+    def test_recent_events_interleave_streams(self):
+        """複数のストリームのイベントを新しい順に混ぜ、グループ・ストリーム・イベント数の上限を守ることのテスト"""
+        self.logs_client.describe_log_groups.return_value = {
+            'logGroups': [{'logGroupName': f'/g{i}'} for i in range(10)], 'nextToken': 'g'}
+        self.logs_client.describe_log_streams.return_value = {
+            'logStreams': [{'logStreamName': f's{i}'} for i in range(5)], 'nextToken': 's'}
+
+        def get_log_events(logGroupName, logStreamName, limit, nextToken=None):
+            offset = int(logStreamName[1:])
+            # ストリームごとに時刻をずらし、常に次のページがある状態にする
+            return {'events': [{'timestamp': t * 10 + offset, 'message': f'{logGroupName}{logStreamName}-{t}'}
+                               for t in range(limit)], 'nextBackwardToken': f'{logStreamName}-{nextToken}'}
+
+        self.logs_client.get_log_events.side_effect = get_log_events
+
+        with patch('app.services.mcp_service.LOG_STREAM_EVENT_LIMIT', 4):
+            logs = self.mcp_service.get_logs('aws', 'ec2', limit=6)
+            assert [log['log_stream'] for log in logs] == ['s2', 's1', 's0'] * 2
+
+            events = list(self.mcp_service.iter_logs('aws', 'ec2', limit=None))
+
+        assert self.logs_client.describe_log_groups.call_args.kwargs == {'limit': 5}
+        assert self.logs_client.describe_log_streams.call_args.kwargs['limit'] == 3
+        # ロググループ5個 × ストリーム3個 × 4件
+        assert len(events) == 5 * 3 * 4
+
+    def test_time_range_uses_filter_log_events(self):
+        """期間を指定した場合は filter_log_events でページを辿ることのテスト"""
+        self.logs_client.filter_log_events.side_effect = [
+            {'events': [{'timestamp': 1, 'message': 'ERROR a', 'logStreamName': 's1'}], 'nextToken': 'n1'},
+            {'events': [{'timestamp': 2, 'message': 'ERROR b', 'logStreamName': 's1'}]},
+        ]
+
+        logs = self.mcp_service.get_logs('aws', 'ec2', start_time=1000, end_time=2000, level='ERROR')
+
+        assert [log['message'] for log in logs] == ['ERROR a', 'ERROR b']
+        first = self.logs_client.filter_log_events.call_args_list[0].kwargs
+        assert first['startTime'] == 1000 and first['endTime'] == 2000
+
+    def test_filters_are_passed_only_when_set(self):
+        """絞り込み条件は指定したものだけ渡すことのテスト"""
+        with patch.object(self.mcp_service, '_get_aws_logs', return_value=[]) as mock_get_aws_logs:
+            self.mcp_service.get_logs('aws', 'ec2', limit=5, level='ERROR', keyword=None)
+        mock_get_aws_logs.assert_called_once_with('ec2', limit=5, level='ERROR')
+
+
+class TestLogsAPI:
+    """ログ API の絞り込み・NDJSON 出力のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_filters(self, mock_mcp_service):
+        """level・keyword・start が取得に渡されることのテスト"""
+        mock_mcp_service.return_value.get_logs.return_value = []
+
+        response = self.client.get('/api/logs?provider=aws&level=warn&keyword=disk&start=1700000000')
+
+        assert response.status_code == 200
+        mock_mcp_service.return_value.get_logs.assert_called_once_with(
+            'aws', 'ec2', level='WARNING', keyword='disk', start_time=1700000000000)
+
+    @pytest.mark.parametrize('query', ['level=verbose', 'start=yesterday'])
+    def test_invalid_filters(self, query):
+        """不正な絞り込み条件は 400 になることのテスト"""
+        response = self.client.get(f'/api/logs?{query}')
+
+        assert response.status_code == 400
+
+    @patch('app.routes.api.MCPService')
+    def test_ndjson(self, mock_mcp_service):
+        """format=ndjson では1行1イベントで返すことのテスト"""
+        mock_mcp_service.return_value.iter_logs.return_value = iter(_events(['a', 'b']))
+
+        response = self.client.get('/api/logs?provider=aws&format=ndjson&limit=2')
+
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)['message'] for line in lines] == ['a', 'b']
+        mock_mcp_service.return_value.iter_logs.assert_called_once_with('aws', 'ec2', limit=2)
+
+
+class TestChatLogLevel:
+    """チャットのログ問い合わせのテストクラス"""
+
+    def test_error_question_filters_by_level(self):
+        """「エラー」を含む問い合わせはエラー以上のログのみ取得することのテスト"""
+        chat_service = ChatService()
+        chat_service.llm_service = Mock()
+        chat_service.mcp_service = Mock()
+        chat_service.mcp_service.iter_logs.return_value = iter([])
+
+        intent = chat_service._analyze_intent_by_keywords("最近のエラーログを見せて")
+        chat_service._handle_log_query({**intent, 'provider': 'aws', 'service': 'ec2'})
+
+        kwargs = chat_service.mcp_service.iter_logs.call_args.kwargs
+        assert kwargs['level'] == 'ERROR'
@@ -0,0 +1,80 @@
+import json
+import logging
+import queue
+from unittest.mock import patch
+from app import create_app
+from app.utils.logger import (JSONFormatter, NonBlockingQueueHandler, SamplingFilter, get_request_id,
+                              set_request_id)
+
+
+def _record(msg='処理しました: %s', args=('a',), level=logging.INFO, name='app.test', **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogRecords:
+    """構造化ログのテストクラス"""
+
+    def test_json_formatter(self):
+        """JSON の1行にメッセージ・リクエスト ID・extra の項目を含めることのテスト"""
+        line = JSONFormatter().format(_record(request_id='req-1', intent={'type': 'logs'}))
+        data = json.loads(line)
+
+        assert data['message'] == '処理しました: a'
+        assert data['level'] == 'INFO'
+        assert data['logger'] == 'app.test'
+        assert data['request_id'] == 'req-1'
+        assert data['intent'] == {'type': 'logs'}
+        assert '\n' not in line
+
+    def test_queue_handler_defers_formatting(self):
+        """キューに入れる時点ではメッセージを整形せず、リクエスト ID のみを記録することのテスト"""
+        log_queue = queue.Queue(maxsize=1)
+        handler = NonBlockingQueueHandler(log_queue)
+        set_request_id('req-2')
+        try:
+            handler.handle(_record())
+            handler.handle(_record())
+        finally:
+            set_request_id(None)
+
+        record = log_queue.get_nowait()
+        assert record.msg == '処理しました: %s' and record.args == ('a',)
+        assert record.request_id == 'req-2'
+        assert not hasattr(record, 'message')
+        # キューが満杯の場合は待たずに破棄する
+        assert handler.dropped == 1
+
+    def test_sampling_filter(self):
+        """同じ書式の INFO ログを間引き、WARNING 以上は常に通すことのテスト"""
+        sampler = SamplingFilter(burst=2, interval=60)
+        passed = [sampler.filter(_record()) for _ in range(5)]
+        assert passed == [True, True, False, False, False]
+        assert sampler.filter(_record(msg='別の書式: %s'))
+        assert all(sampler.filter(_record(level=logging.WARNING)) for _ in range(5))
+
+        with patch('app.utils.logger.time.monotonic', return_value=10 ** 9):
+            record = _record()
+            assert sampler.filter(record)
+        assert record.sampled_out == 3
+
+
+class TestRequestId:
+    """リクエスト ID のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_request_id_header(self):
+        """X-Request-ID を引き継ぎ、不正な値や未指定の場合は発行することのテスト"""
+        response = self.client.get('/health', headers={'X-Request-ID': 'abc-123'})
+        assert response.headers['X-Request-ID'] == 'abc-123'
+
+        response = self.client.get('/health', headers={'X-Request-ID': 'bad id;'})
+        assert len(response.headers['X-Request-ID']) == 32
+
+        assert get_request_id() is None
@@ -0,0 +1,127 @@
+import pytest
+from unittest.mock import Mock
+from app.services import llm_service as llm_service_module
+from app.services.llm_router import LLMRouter, LLMBackend
+from app.services.llm_scheduler import LLMScheduler, LLMQueueTimeoutError
+from app.services.llm_service import LLMService
+from app.services.chat_service import ChatService
+from app.utils.tokens import chunk_by_tokens, estimate_tokens
+
+
+def _reply(model=None, messages=None, options=None):
+    """チャンクの要約には行数、最終回答には参考情報の部分要約の数を返す"""
+    prompt = messages[-1]['content']
+    if prompt.startswith('質問:'):
+        return {'message': {'content': f"{prompt.count('row-')} 行の要約"}}
+    return {'message': {'content': f"回答（部分要約 {prompt.count('行の要約')} 件）"}}
+
+
+class TestChunkByTokens:
+    """トークン予算によるチャンク分割のテストクラス"""
+
+    def test_chunks_within_budget(self):
+        """各チャンクが予算に収まり、順序と内容を保つことのテスト"""
+        items = [f"row-{i} i-{i:08d} running t3.micro" for i in range(100)]
+
+        chunks = chunk_by_tokens(items, 100)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+        assert "\n".join(chunks).split("\n") == items
+
+    def test_oversized_item(self):
+        """予算を超える1件は単独のチャンクになることのテスト"""
+        assert chunk_by_tokens(['x' * 400, 'a', 'b'], 10) == ['x' * 400, 'a\nb']
+        assert chunk_by_tokens([], 10) == []
+
+
+class TestMapReduceSummary:
+    """分割要約（map-reduce）のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        llm_service_module._chunk_summaries.clear()
+        self.client = Mock()
+        self.client.chat.side_effect = _reply
+        backend = LLMBackend(name='test', llm_type='ollama', model='test-model', client=self.client,
+                             scheduler=LLMScheduler('test', max_concurrency=4))
+        self.service = LLMService.__new__(LLMService)
+        self.service.llm_type = 'ollama'
+        self.service.router = LLMRouter([backend])
+        self.items = [f"aws\tec2\trow-{i}\trunning\tt3.micro\tus-east-1" for i in range(200)]
+
+    def test_small_input_single_call(self):
+        """予算に収まる場合は分割せず1回で回答することのテスト"""
+        result = self.service.summarize_map_reduce("概要は？", self.items[:5], header='provider\tservice')
+
+        assert self.client.chat.call_count == 1
+        assert "row-4" in self.client.chat.call_args.kwargs['messages'][-1]['content']
+        assert result.startswith("回答")
+
+    def test_map_then_reduce(self, monkeypatch):
+        """チャンクごとに要約し、部分要約から最終回答を生成することのテスト"""
+        monkeypatch.delenv('LLM_CACHE_PATH', raising=False)
+
+        result = self.service.summarize_map_reduce("概要は？", self.items, chunk_tokens=500)
+
+        chunks = len(chunk_by_tokens(self.items, 500))
+        assert chunks > 1
+        assert self.client.chat.call_count == chunks + 1
+        assert result == f"回答（部分要約 {chunks} 件）"
+
+    def test_unchanged_chunks_are_cached(self, monkeypatch):
+        """同じ質問ではデータの変わったチャンクのみ要約し直すことのテスト"""
+        monkeypatch.delenv('LLM_CACHE_PATH', raising=False)
+        self.service.summarize_map_reduce("概要は？", self.items, chunk_tokens=500)
+        first = self.client.chat.call_count
+
+        self.items[-1] = self.items[-1].replace('running', 'stopped')
+        self.service.summarize_map_reduce("概要は？", self.items, chunk_tokens=500)
+
+        # 変更のあった末尾のチャンクと最終回答のみ生成する
+        assert self.client.chat.call_count == first + 2
+
+    def test_failed_chunk_is_skipped(self, monkeypatch):
+        """要約に失敗したチャンクを除いて回答することのテスト"""
+        monkeypatch.delenv('LLM_CACHE_PATH', raising=False)
+
+        def flaky(model=None, messages=None, options=None):
+            if 'row-0\t' in messages[-1]['content'] and messages[-1]['content'].startswith('質問:'):
+                raise RuntimeError('down')
+            return _reply(model, messages, options)
+        self.client.chat.side_effect = flaky
+
+        result = self.service.summarize_map_reduce("概要は？", self.items, chunk_tokens=500)
+
+        chunks = len(chunk_by_tokens(self.items, 500))
+        assert result == f"回答（部分要約 {chunks - 1} 件）"
+
+    def test_queue_timeout_propagates(self, monkeypatch):
+        """実行枠の待機期限切れは呼び出し元に伝えることのテスト"""
+        monkeypatch.delenv('LLM_CACHE_PATH', raising=False)
+        self.client.chat.side_effect = LLMQueueTimeoutError('busy')
+
+        with pytest.raises(LLMQueueTimeoutError):
+            self.service.summarize_map_reduce("概要は？", self.items, chunk_tokens=500)
+
+
+class TestOverviewQuestion:
+    """全体の要約を求める質問のテストクラス"""
+
+    def test_large_inventory_uses_map_reduce(self):
+        """予算に収まらないインベントリの要約は分割要約を使うことのテスト"""
+        chat_service = ChatService()
+        chat_service.session = None
+        chat_service.llm_service = Mock()
+        chat_service.llm_service.summarize_map_reduce.return_value = "全体の要約"
+        resources = [{'id': f'i-{i}', 'name': f'web-{i}', 'state': 'running', 'type': 't3.micro',
+                      'region': 'us-east-1'} for i in range(500)]
+        chat_service._get_resources = Mock(return_value=resources)
+
+        result = chat_service._handle_general_question("EC2 の全体の傾向をまとめて")
+
+        assert result == "全体の要約"
+        args = chat_service.llm_service.summarize_map_reduce.call_args
+        assert len(args.args[1]) == 500
+        assert args.kwargs['header'].startswith('provider\tservice')
+        chat_service.llm_service.generate_response.assert_not_called()
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
 import boto3
+from datetime import datetime, timezone
 from app.services.mcp_service import MCPService
 
 
@@ -147,7 +148,7 @@ class TestMCPService:
             'Buckets': [
                 {
                     'Name': 'test-bucket',
-                    'CreationDate': Mock(isoformat=lambda: '2024-01-01T00:00:00Z')
+                    'CreationDate': datetime(2024, 1, 1, tzinfo=timezone.utc)
                 }
             ]
         }
@@ -0,0 +1,191 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.models.resource import Resource
+from app.services.chat_service import ChatService
+from app.services.inventory_cache import get_inventory_cache
+from app.services.mcp_service import MCPService
+from app.services.metric_analysis import (
+    align_series, detect_anomalies, fill_gaps, rank_anomalies, rolling_mad_scores, rolling_zscores
+)
+
+DAY = 288  # 5 分間隔で 1 日分の点数
+
+
+def make_matrix(count=20, length=2 * DAY, seed=0):
+    """日次の周期と揺れを持つテスト用の系列"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(length)
+    return 30 + 10 * np.sin(2 * np.pi * t / DAY) + rng.normal(0, 2, (count, length))
+
+
+class TestMetricAnalysis:
+    """メトリクスの異常検知のテストクラス"""
+
+    def test_align_series(self):
+        """時刻ごとの枠にそろえ、値のない枠は NaN になることのテスト"""
+        keys, matrix = align_series({'a': ([0, 600, 900], [1.0, 3.0, 4.0]), 'b': ([], [])}, 0, 300, 4)
+
+        assert keys == ['a', 'b']
+        assert np.array_equal(matrix[0], [1.0, np.nan, 3.0, 4.0], equal_nan=True)
+        assert np.isnan(matrix[1]).all()
+
+    def test_fill_gaps(self):
+        """欠損を直前（先頭は最初）の値で埋めることのテスト"""
+        matrix = np.array([[np.nan, 1.0, np.nan, 3.0], [np.nan] * 4])
+
+        filled = fill_gaps(matrix)
+
+        assert filled[0].tolist() == [1.0, 1.0, 1.0, 3.0]
+        assert np.isnan(filled[1]).all()
+
+    def test_scores_shape(self):
+        """窓の後の全点についてスコアを求めることのテスト"""
+        matrix = make_matrix(3, 100)
+
+        assert rolling_zscores(matrix, window=10).shape == (3, 90)
+        scores, median, scale = rolling_mad_scores(matrix, window=10, points=5)
+        assert scores.shape == median.shape == scale.shape == (3, 5)
+
+    def test_ranks_spikes(self):
+        """急増・急減した系列のみを異常度の高い順に返すことのテスト"""
+        matrix = make_matrix()
+        matrix[3, -1] += 40
+        matrix[7, -2] -= 25
+
+        anomalies = rank_anomalies(list(range(20)), matrix, season=DAY)
+
+        assert [a['key'] for a in anomalies] == [3, 7]
+        assert anomalies[0]['direction'] == 'up'
+        assert anomalies[1]['direction'] == 'down'
+        assert anomalies[0]['score'] > anomalies[1]['score']
+
+    def test_seasonal_baseline_suppresses_daily_peak(self):
+        """毎日同じ時刻の増加は、前日の同じ時刻と比べて異常としないことのテスト"""
+        matrix = np.full((1, 2 * DAY), 10.0)
+        matrix[0, DAY - 3:DAY] = 80.0
+        matrix[0, -3:] = 80.0
+
+        assert rank_anomalies(['a'], matrix)
+        assert rank_anomalies(['a'], matrix, season=DAY) == []
+
+    def test_constant_series_small_changes(self):
+        """ほぼ一定の系列の小さな揺れは異常としないことのテスト"""
+        matrix = np.zeros((1, 100))
+        matrix[0, -1] = 0.5
+
+        assert rank_anomalies(['a'], matrix) == []
+
+    def test_detect_anomalies(self):
+        """取得した系列を期間の枠にそろえて判定することのテスト"""
+        end = 1_700_000_000
+        timestamps = [end - 300 * (100 - i) for i in range(100)]
+        series = {'i-1': (timestamps, [20.0] * 99 + [95.0]), 'i-2': (timestamps, [20.0] * 100)}
+
+        anomalies = detect_anomalies(series, end, period=300, hours=8)
+
+        assert [a['key'] for a in anomalies] == ['i-1']
+        assert anomalies[0]['value'] == 95.0
+
+
+class TestMetricSeries:
+    """MCPService のメトリクス取得のテストクラス"""
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_get_metric_data_batches(self, mock_boto3_session):
+        """500 リソースずつまとめて GetMetricData を呼び、NextToken を辿ることのテスト"""
+        cloudwatch = mock_boto3_session.return_value.client.return_value
+
+        def get_metric_data(**kwargs):
+            queries = kwargs['MetricDataQueries']
+            results = [{'Id': q['Id'], 'Timestamps': [1700000000], 'Values': [1.0]} for q in queries]
+            if len(queries) == 500 and 'NextToken' not in kwargs:
+                return {'MetricDataResults': results, 'NextToken': 'n1'}
+            return {'MetricDataResults': results}
+
+        cloudwatch.get_metric_data.side_effect = get_metric_data
+        ids = [f'i-{i}' for i in range(600)]
+
+        series = MCPService().get_metric_series('aws', 'ec2', ids, 1699990000, 1700000000)
+
+        assert cloudwatch.get_metric_data.call_count == 3
+        first = cloudwatch.get_metric_data.call_args_list[0].kwargs
+        assert first['MetricDataQueries'][0]['MetricStat']['Metric']['Dimensions'] == [
+            {'Name': 'InstanceId', 'Value': 'i-0'}]
+        assert series['i-0'] == ([1700000000, 1700000000], [1.0, 1.0])
+        assert series['i-599'] == ([1700000000], [1.0])
+
+    def test_unsupported_service(self):
+        """未対応のサービスは空の結果を返すことのテスト"""
+        assert MCPService().get_metric_series('aws', 's3', ['bucket'], 0, 1) == {}
+
+
+def _spiking_series(resource_ids, start, end, period):
+    """最初のリソースだけ最後に急増する系列"""
+    timestamps = list(range(int(start) + period, int(end), period))
+    return {resource_id: (timestamps, [20.0] * (len(timestamps) - 1) + [95.0 if i == 0 else 20.0])
+            for i, resource_id in enumerate(resource_ids)}
+
+
+class TestMetricAnomalyAnswers:
+    """チャット・API の異常検知のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.resources = [Resource(id=f'i-{i}', name=f'web-{i}', type='t3.micro', provider='aws',
+                                   region='us-east-1', status='running') for i in range(3)]
+
+    def test_intent(self):
+        """異常についての質問はメトリクスの問い合わせと判定することのテスト"""
+        chat_service = ChatService()
+
+        intent = chat_service._analyze_intent_by_keywords("EC2 の CPU 使用率に異常はある？")
+
+        assert intent['type'] == 'metric_query'
+        assert (intent['provider'], intent['service']) == ('aws', 'ec2')
+        assert chat_service._analyze_intent_by_keywords("エラーログに異常はある？")['type'] == 'log_query'
+
+    def test_chat_lists_only_flagged(self):
+        """異常と判定したリソースのみを回答に含めることのテスト"""
+        chat_service = ChatService()
+        chat_service.llm_service = Mock()
+        chat_service.mcp_service = Mock()
+        chat_service.mcp_service.get_aws_resources.return_value = self.resources
+        chat_service.mcp_service.get_metric_series.side_effect = \
+            lambda provider, service, ids, start, end, period: _spiking_series(ids, start, end, period)
+
+        answer = chat_service._handle_metric_query({'provider': 'aws', 'service': 'ec2'})
+
+        assert "3 件中 1 件" in answer
+        assert "web-0" in answer
+        assert "web-1" not in answer
+        chat_service.llm_service.generate_response.assert_not_called()
+
+    def test_chat_no_anomalies(self):
+        """異常がなければその旨を答えることのテスト"""
+        chat_service = ChatService()
+        chat_service.mcp_service = Mock()
+        chat_service.mcp_service.get_aws_resources.return_value = self.resources
+        chat_service.mcp_service.get_metric_series.return_value = {}
+
+        answer = chat_service._handle_metric_query({'provider': 'aws', 'service': 'ec2'})
+
+        assert "異常は見られませんでした" in answer
+
+    @patch('app.routes.api.MCPService')
+    def test_api(self, mock_mcp_service):
+        """異常検知 API のテスト"""
+        mock_mcp_service.return_value.get_aws_resources.return_value = self.resources
+        mock_mcp_service.return_value.get_metric_series.side_effect = \
+            lambda provider, service, ids, start, end, period: _spiking_series(ids, start, end, period)
+        app = create_app()
+        app.config['TESTING'] = True
+        client = app.test_client()
+
+        data = client.get('/api/metrics/anomalies?provider=aws&service=ec2&hours=12').get_json()
+
+        assert data['checked'] == 3
+        assert [a['name'] for a in data['anomalies']] == ['web-0']
+        assert client.get('/api/metrics/anomalies?provider=aws&service=s3').status_code == 400
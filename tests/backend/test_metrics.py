@@ -0,0 +1,147 @@
+import boto3
+from botocore.stub import Stubber
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.chat_service import ChatService
+from app.services.inventory_cache import get_inventory_cache
+from app.services.mcp_service import MCPService, _before_aws_call
+from app.utils.metrics import (
+    CACHE_REQUESTS, CHAT_STAGE_SECONDS, CLOUD_API_CALLS, CLOUD_FETCH_SECONDS, MetricsRegistry, REGISTRY
+)
+
+
+class TestMetricsRegistry:
+    """メトリクスの記録と Prometheus 形式の出力のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        """カウンターは _total 付き、ゲージはそのままの名前で出力することのテスト"""
+        calls = self.registry.counter('api_calls', '呼び出し回数', ('provider',))
+        in_flight = self.registry.gauge('in_flight', '実行中の件数')
+        calls.labels('aws').inc()
+        calls.inc(2, provider='aws')
+        with in_flight.track():
+            text = self.registry.render()
+
+        assert '# TYPE api_calls_total counter' in text
+        assert 'api_calls_total{provider="aws"} 3' in text
+        assert 'in_flight 1' in text
+        assert 'in_flight 0' in self.registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        """ヒストグラムのバケットが累積の件数になることのテスト"""
+        histogram = self.registry.histogram('latency_seconds', '処理時間', ('stage',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.labels('intent').observe(value)
+
+        text = self.registry.render()
+
+        assert 'latency_seconds_bucket{stage="intent",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{stage="intent",le="1"} 3' in text
+        assert 'latency_seconds_bucket{stage="intent",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{stage="intent"} 4' in text
+        assert 'latency_seconds_sum{stage="intent"} 6.25' in text
+
+    def test_label_values_are_escaped_and_shared(self):
+        """ラベルの値のエスケープと、文字列以外の値も同じ系列になることのテスト"""
+        counter = self.registry.counter('responses', '応答数', ('status', 'path'))
+        counter.labels(200, 'a"b').inc()
+        counter.labels('200', 'a"b').inc()
+
+        text = self.registry.render()
+        assert 'responses_total{status="200",path="a\\"b"} 2' in text
+        assert text.count('responses_total{') == 1
+
+    def test_redefinition(self):
+        """同じ名前は同じ定義なら共有し、異なる定義はエラーになることのテスト"""
+        first = self.registry.counter('calls', '回数', ('provider',))
+        assert self.registry.counter('calls', '回数', ('provider',)) is first
+        try:
+            self.registry.gauge('calls', '回数')
+        except ValueError:
+            pass
+        else:
+            assert False, 'ValueError が送出されていません'
+
+
+class TestInstrumentation:
+    """各処理段階の計測のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        REGISTRY.clear()
+        get_inventory_cache().clear()
+
+    def test_metrics_endpoint(self):
+        """/metrics で HTTP リクエストの処理時間を出力することのテスト"""
+        app = create_app()
+        app.config['TESTING'] = True
+        client = app.test_client()
+        client.get('/health')
+
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_count{endpoint="/health",method="GET",status="200"} 1' in text
+        assert 'http_requests_in_flight 1' in text
+
+    def test_chat_stages_by_intent(self):
+        """チャットの意図解析・処理・全体の時間を意図ごとに記録することのテスト"""
+        chat_service = ChatService()
+        chat_service.session = None
+        chat_service._analyze_intent = Mock(return_value={'type': 'log_query', 'provider': 'aws',
+                                                          'service': 'ec2', 'confidence': 1.0})
+        chat_service._handle_log_query = Mock(return_value='ログ')
+
+        chat_service._process_message("EC2 のログを見せて")
+
+        for stage in ('intent', 'handler', 'total'):
+            assert sum(CHAT_STAGE_SECONDS.labels(stage, 'log_query').counts) == 1
+
+    def test_cloud_fetch_and_cache(self):
+        """クラウド取得の時間とインベントリキャッシュのヒット・ミスを記録することのテスト"""
+        with patch('app.services.mcp_service.boto3.Session'), \
+                patch('app.services.mcp_service.DefaultAzureCredential'):
+            chat_service = ChatService()
+        chat_service.mcp_service.aws_session = None
+
+        chat_service._get_resources('aws', 'ec2')
+        chat_service._get_resources('aws', 'ec2')
+
+        assert sum(CLOUD_FETCH_SECONDS.labels('aws', 'ec2', 'resources').counts) == 2
+        # 結果が空のためキャッシュされず、2回ともミスになる
+        assert CACHE_REQUESTS.labels('inventory', 'miss').value == 2
+
+    def test_unknown_fetch_labels_are_grouped(self):
+        """リクエストで指定された未知の種別・プロバイダーは 'other' にまとめ、系列を増やさないことのテスト"""
+        with patch('app.services.mcp_service.boto3.Session'), \
+                patch('app.services.mcp_service.DefaultAzureCredential'):
+            mcp_service = MCPService()
+        mcp_service.aws_session = None
+        mcp_service.azure_credential = None
+
+        for i in range(20):
+            mcp_service.get_aws_resources(f"random-{i}")
+            mcp_service.get_logs(f"provider-{i}", f"service-{i}")
+
+        series = {values for values, _ in CLOUD_FETCH_SECONDS._children.items()}
+        assert series == {('aws', 'other', 'resources'), ('other', 'other', 'logs')}
+        assert sum(CLOUD_FETCH_SECONDS.labels('aws', 'other', 'resources').counts) == 20
+
+    def test_aws_api_calls_are_counted(self):
+        """botocore のフックで AWS API の呼び出し回数を数えることのテスト"""
+        session = boto3.Session(aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1')
+        session.events.register('before-parameter-build', _before_aws_call)
+        ec2 = session.client('ec2')
+        with Stubber(ec2) as stubber:
+            stubber.add_response('describe_instances', {'Reservations': []})
+            stubber.add_response('describe_instances', {'Reservations': []})
+            ec2.describe_instances()
+            ec2.describe_instances()
+
+        assert CLOUD_API_CALLS.labels('aws', 'ec2', 'DescribeInstances').value == 2
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from unittest.mock import patch
+from app import create_app
+from app.services.inventory_cache import get_inventory_cache
+from app.utils.profiling import SamplingProfiler, prune_profiles
+
+
+def _slow_logs(*args, **kwargs):
+    """プロファイルに現れる程度の時間がかかるログ取得"""
+    time.sleep(0.05)
+    return []
+
+
+class TestSamplingProfiler:
+    """サンプリングプロファイラーのテストクラス"""
+
+    def test_collapsed_and_speedscope(self):
+        """採取したスタックを折りたたみ形式と speedscope 形式で出力できることのテスト"""
+        profiler = SamplingProfiler(interval=0.001).start()
+        _slow_logs()
+        profiler.stop()
+
+        collapsed = profiler.collapsed()
+        assert '_slow_logs(' in collapsed
+        stack, count = collapsed.splitlines()[0].rsplit(' ', 1)
+        assert int(count) > 0 and ';' in stack
+
+        document = json.loads(profiler.speedscope('GET /api/logs'))
+        profile = document['profiles'][0]
+        assert profile['type'] == 'sampled'
+        assert len(profile['samples']) == len(profile['weights'])
+        assert any('_slow_logs(' in frame['name'] for frame in document['shared']['frames'])
+
+    def test_prune(self, tmp_path):
+        """新しいものから指定した件数だけ残すことのテスト"""
+        for i in range(5):
+            path = tmp_path / f"{i}.folded"
+            path.write_text('a 1\n')
+            os.utime(path, (i, i))
+        (tmp_path / 'other.txt').write_text('')
+
+        prune_profiles(str(tmp_path), 2)
+
+        assert sorted(os.listdir(tmp_path)) == ['3.folded', '4.folded', 'other.txt']
+
+
+class TestProfilingHook:
+    """リクエストのプロファイルのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_profile_with_admin_token(self, mock_mcp_service, tmp_path, monkeypatch):
+        """管理者トークン付きの要求でプロファイルを書き出すことのテスト"""
+        monkeypatch.setenv('PROFILE_ADMIN_TOKEN', 'secret')
+        monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+        monkeypatch.setenv('PROFILE_INTERVAL', '0.001')
+        mock_mcp_service.return_value.get_logs.side_effect = _slow_logs
+
+        response = self.client.get('/api/logs?profile=1', headers={'X-Profile-Token': 'secret'})
+
+        assert response.status_code == 200
+        filename = response.headers['X-Profile-File']
+        assert filename.endswith('.folded') and os.listdir(tmp_path) == [filename]
+        assert 'get_logs(app/routes/api.py:' in (tmp_path / filename).read_text(encoding='utf-8')
+
+    @patch('app.routes.api.MCPService')
+    def test_speedscope_and_retention(self, mock_mcp_service, tmp_path, monkeypatch):
+        """speedscope 形式で出力し、保持する件数を超えた分を削除することのテスト"""
+        monkeypatch.setenv('PROFILE_ADMIN_TOKEN', 'secret')
+        monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+        monkeypatch.setenv('PROFILE_FORMAT', 'speedscope')
+        monkeypatch.setenv('PROFILE_MAX_FILES', '2')
+        mock_mcp_service.return_value.get_logs.return_value = []
+
+        for _ in range(3):
+            response = self.client.get('/api/logs', headers={'X-Profile': '1', 'X-Profile-Token': 'secret'})
+            assert response.headers['X-Profile-File'].endswith('.speedscope.json')
+
+        assert len(os.listdir(tmp_path)) == 2
+
+    @patch('app.routes.api.MCPService')
+    def test_regular_users_cannot_profile(self, mock_mcp_service, tmp_path, monkeypatch):
+        """トークンが未設定・不一致の場合はプロファイルせずに通常どおり応答することのテスト"""
+        monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+        mock_mcp_service.return_value.get_logs.return_value = []
+
+        monkeypatch.delenv('PROFILE_ADMIN_TOKEN', raising=False)
+        response = self.client.get('/api/logs?profile=1', headers={'X-Profile-Token': ''})
+        assert response.status_code == 200 and 'X-Profile-File' not in response.headers
+
+        monkeypatch.setenv('PROFILE_ADMIN_TOKEN', 'secret')
+        response = self.client.get('/api/logs?profile=1', headers={'X-Profile-Token': 'guess'})
+        assert response.status_code == 200 and 'X-Profile-File' not in response.headers
+        response = self.client.get('/health?profile=1', headers={'X-Profile-Token': 'secret'})
+        assert 'X-Profile-File' not in response.headers
+
+        assert os.listdir(tmp_path) == []
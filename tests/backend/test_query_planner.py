@@ -0,0 +1,171 @@
+import pytest
+from unittest.mock import Mock, patch
+from app.models.resource import Resource
+from app.services import query_planner
+from app.services.chat_service import ChatService
+from app.services.inventory_cache import get_inventory_cache
+from app.services.mcp_service import MCPService
+from app.services.query_planner import extract_filters, plan_query, query_from_parameters
+from app.services.resource_query import ResourceQuery
+
+
+class TestQueryPlanner:
+    """クエリプランナーのテストクラス"""
+
+    def test_ec2_pushdown(self):
+        """EC2 の状態・タイプ・タグ・VPC が Filters に変換され、残りは取得後に適用されることのテスト"""
+        query = ResourceQuery(
+            filters={'status': ['Running'], 'type': ['t3.micro'], 'vpc_id': ['vpc-0abc1234'],
+                     'region': ['us-east-1']},
+            tags={'Env': 'prod', 'Owner': None})
+
+        plan = plan_query('aws', 'ec2', query)
+
+        assert plan.native['filters'] == [
+            {'Name': 'instance-state-name', 'Values': ['running']},
+            {'Name': 'instance-type', 'Values': ['t3.micro']},
+            {'Name': 'vpc-id', 'Values': ['vpc-0abc1234']},
+            {'Name': 'tag:Env', 'Values': ['prod']},
+            {'Name': 'tag-key', 'Values': ['Owner']},
+        ]
+        assert plan.residual.filters == {'region': ['us-east-1']}
+        assert plan.residual.tags == {}
+
+    def test_rds_pushdown(self):
+        """RDS はエンジンのみサーバー側で絞り込み、状態は取得後に適用されることのテスト"""
+        plan = plan_query('aws', 'rds', ResourceQuery(
+            filters={'engine': ['postgres'], 'status': ['available']}))
+
+        assert plan.native == {'filters': [{'Name': 'engine', 'Values': ['postgres']}]}
+        assert plan.residual.filters == {'status': ['available']}
+
+    def test_azure_resource_group(self):
+        """Azure はリソースグループを指定した列挙に変換されることのテスト"""
+        with patch.object(query_planner, 'AZURE_RESOURCE_GRAPH_ENABLED', False):
+            plan = plan_query('azure', 'vm', ResourceQuery(
+                filters={'resource_group': ['rg-web'], 'status': ['Succeeded']}))
+
+        assert plan.native == {'resource_group': 'rg-web'}
+        assert plan.residual.filters == {'status': ['Succeeded']}
+
+    def test_azure_resource_graph(self):
+        """Resource Graph が有効な場合はすべての条件が KQL に変換されることのテスト"""
+        with patch.object(query_planner, 'AZURE_RESOURCE_GRAPH_AVAILABLE', True), \
+                patch.object(query_planner, 'AZURE_RESOURCE_GRAPH_ENABLED', True):
+            plan = plan_query('azure', 'vm', ResourceQuery(
+                filters={'region': ['japaneast']}, tags={"Owner's": 'ops'}))
+
+        kql = plan.native['graph_query']
+        assert "where type =~ 'microsoft.compute/virtualmachines'" in kql
+        assert "where location in~ ('japaneast')" in kql
+        assert "where tags['Owner\\'s'] == 'ops'" in kql
+        assert plan.residual.filters == {} and plan.residual.tags == {}
+
+    def test_azure_resource_graph_residual(self):
+        """KQL に変換できない条件は Resource Graph の取得後に適用されることのテスト"""
+        query = ResourceQuery(filters={'region': ['japaneast'], 'vpc_id': ['vnet-web']},
+                              tags={'Env': 'prod'})
+        with patch.object(query_planner, 'AZURE_RESOURCE_GRAPH_AVAILABLE', True), \
+                patch.object(query_planner, 'AZURE_RESOURCE_GRAPH_ENABLED', True):
+            plan = plan_query('azure', 'vm', query)
+
+        assert 'vpc_id' not in plan.native['graph_query']
+        assert plan.residual.filters == {'vpc_id': ['vnet-web']}
+        assert plan.residual.tags == {}
+
+        resources = [
+            Resource(id='vm-1', name='vm-1', type='Standard_B1s', provider='azure', service='vm',
+                     region='japaneast', status='Succeeded',
+                     tags={'Env': 'prod'}, metadata={'vpc_id': 'vnet-web'}),
+            Resource(id='vm-2', name='vm-2', type='Standard_B1s', provider='azure', service='vm',
+                     region='japaneast', status='Succeeded',
+                     tags={'Env': 'prod'}, metadata={'vpc_id': 'vnet-db'}),
+        ]
+        assert [r.id for r in plan.residual.apply(resources, 'azure', 'vm')] == ['vm-1']
+
+    def test_no_query(self):
+        """条件がない場合は何も変換しないことのテスト"""
+        plan = plan_query('aws', 'ec2', None)
+
+        assert plan.native == {}
+        assert plan.residual.filters == {}
+
+    def test_extract_filters(self):
+        """質問文から絞り込み条件を読み取るテスト"""
+        assert extract_filters("停止中のt3.microのEC2一覧") == {
+            'state': ['stopped', 'stopping', 'deallocated', 'deallocating'],
+            'instance_type': 't3.micro'}
+        assert extract_filters("タグ Env:prodのEC2一覧") == {'tag': 'Env:prod'}
+        assert extract_filters("vpc-0abc12345のEC2") == {'vpc_id': 'vpc-0abc12345'}
+        assert extract_filters("EC2インスタンス一覧") == {}
+
+    def test_query_from_parameters(self):
+        """意図の parameters から絞り込み条件を作るテスト"""
+        query = query_from_parameters({'state': 'running', 'tag': 'Env:prod', 'action': 'x'})
+
+        assert query.filters == {'status': ['running']}
+        assert query.tags == {'Env': 'prod'}
+        assert query_from_parameters({}) is None
+
+
+class TestMCPServicePushdown:
+    """MCPService のサーバー側絞り込みのテストクラス"""
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_ec2_filters_are_sent(self, mock_boto3_session):
+        """EC2 の条件が describe_instances の Filters として渡されることのテスト"""
+        mock_session = Mock(region_name='us-east-1')
+        mock_boto3_session.return_value = mock_session
+        mock_ec2 = mock_session.client.return_value
+        mock_ec2.describe_instances.return_value = {'Reservations': [{'Instances': [{
+            'InstanceId': 'i-1', 'InstanceType': 't3.micro', 'State': {'Name': 'stopped'},
+            'VpcId': 'vpc-0abc1234', 'Tags': [{'Key': 'Name', 'Value': 'batch-1'}]
+        }]}]}
+
+        result = MCPService().get_aws_resources(
+            'ec2', query=ResourceQuery(filters={'status': ['stopped'], 'region': ['eu-west-1']}))
+
+        mock_ec2.describe_instances.assert_called_once_with(
+            Filters=[{'Name': 'instance-state-name', 'Values': ['stopped']}])
+        assert result == []  # region は取得後に適用される
+
+
+class TestChatFilterPushdown:
+    """チャットでの絞り込み条件のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.chat_service = ChatService()
+        self.chat_service.llm_service = Mock()
+        self.chat_service.mcp_service = Mock()
+
+    def test_filters_are_pushed_down(self):
+        """キャッシュがない場合、条件付きで取得されることのテスト"""
+        self.chat_service.mcp_service.get_aws_resources.return_value = [
+            Resource(id='i-1', name='batch-1', type='t3.micro', provider='aws',
+                     region='us-east-1', status='stopped')
+        ]
+
+        result = self.chat_service.process_message("停止中のEC2インスタンス一覧を教えて")
+
+        args, kwargs = self.chat_service.mcp_service.get_aws_resources.call_args
+        assert args == ('ec2',)
+        assert kwargs['query'].filters['status'][0] == 'stopped'
+        assert "条件: status=" in result
+        assert "batch-1" in result
+        assert get_inventory_cache().peek('aws', 'ec2') is None
+
+    def test_filters_use_fresh_cache(self):
+        """期限内のキャッシュがある場合はそこから絞り込むことのテスト"""
+        get_inventory_cache().put('aws', 'ec2', [
+            Resource(id='i-1', name='web-1', type='t3.micro', provider='aws',
+                     region='us-east-1', status='running'),
+            Resource(id='i-2', name='batch-1', type='t3.micro', provider='aws',
+                     region='us-east-1', status='stopped'),
+        ])
+
+        result = self.chat_service.process_message("停止中のEC2インスタンス一覧を教えて")
+
+        self.chat_service.mcp_service.get_aws_resources.assert_not_called()
+        assert "batch-1" in result and "web-1" not in result
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.utils.rate_limiter import InMemoryRateLimitBackend, RateLimiter
+
+
+class TestTokenBucket:
+    """InMemoryRateLimitBackend のテストクラス"""
+
+    def test_burst_then_reject(self):
+        """バケット容量を使い切ると拒否され、再試行秒数が返ることのテスト"""
+        backend = InMemoryRateLimitBackend()
+
+        results = [backend.consume('chat:10.0.0.1', rate=0.5, burst=3) for _ in range(4)]
+
+        assert [allowed for allowed, _ in results] == [True, True, True, False]
+        assert 0 < results[-1][1] <= 2
+
+    def test_clients_are_isolated(self):
+        """クライアントごとにバケットが分かれていることのテスト"""
+        backend = InMemoryRateLimitBackend()
+        backend.consume('chat:10.0.0.1', rate=0.1, burst=1)
+
+        allowed, _ = backend.consume('chat:10.0.0.2', rate=0.1, burst=1)
+
+        assert allowed
+
+    def test_concurrency(self):
+        """同時実行数の上限のテスト"""
+        backend = InMemoryRateLimitBackend()
+
+        assert backend.acquire('chat', 1)
+        assert not backend.acquire('chat', 1)
+        backend.release('chat')
+        assert backend.acquire('chat', 1)
+
+
+class TestRateLimitedRoutes:
+    """レート制限を適用したルートのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        with patch.dict('os.environ', {'RATE_LIMIT_INVENTORY_BURST': '2',
+                                       'RATE_LIMIT_INVENTORY_PER_MINUTE': '1'}):
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.MCPService')
+    def test_returns_429_with_retry_after(self, mock_mcp_service):
+        """バケットを使い切ると 429 と Retry-After を返すことのテスト"""
+        mock_mcp_service.return_value.get_azure_resources.return_value = []
+
+        statuses = [self.client.get('/api/resources/azure').status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        response = self.client.get('/api/resources/azure')
+        assert int(response.headers['Retry-After']) >= 1
+        assert response.get_json()['retry_after'] >= 1
+
+    @patch('app.routes.api.ChatService')
+    def test_returns_503_when_concurrency_exhausted(self, mock_chat_service):
+        """同時実行数の上限に達している場合に 503 を返すことのテスト"""
+        limiter = self.app.extensions['rate_limiter']
+        for _ in range(limiter.limits['chat'].max_concurrency):
+            limiter.backend.acquire('chat', limiter.limits['chat'].max_concurrency)
+
+        response = self.client.post('/api/chat', json={'message': 'テスト'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        mock_chat_service.assert_not_called()
+
+    @patch('app.routes.api.MCPService')
+    def test_streamed_response_holds_concurrency_slot(self, mock_mcp_service):
+        """ストリーミング応答では本文を送り終えるまで同時実行数の枠を保持することのテスト"""
+        mock_mcp_service.return_value.iter_logs.return_value = iter([{'message': 'a'}, {'message': 'b'}])
+        backend = self.app.extensions['rate_limiter'].backend
+
+        response = self.client.get('/api/logs?format=ndjson', buffered=False)
+        assert response.is_streamed
+        assert backend._in_flight['inventory'] == 1
+
+        assert len(response.get_data().splitlines()) == 2
+        response.close()
+        assert backend._in_flight['inventory'] == 0
+
+    @patch('app.routes.api.MCPService')
+    def test_buffered_response_releases_slot(self, mock_mcp_service):
+        """通常の応答ではビュー関数の終了時に枠を解放することのテスト"""
+        mock_mcp_service.return_value.get_azure_resources.return_value = []
+        backend = self.app.extensions['rate_limiter'].backend
+
+        self.client.get('/api/resources/azure')
+
+        assert backend._in_flight['inventory'] == 0
+
+
+class TestClientId:
+    """クライアント識別子のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+
+    @pytest.mark.parametrize('proxy_count, expected', [(0, '10.0.0.9'), (1, '203.0.113.7'), (2, '198.51.100.2')])
+    def test_spoofed_forwarded_for(self, proxy_count, expected):
+        """X-Forwarded-For の左側を偽装してもプロキシが付けた値のみ使うことのテスト"""
+        limiter = RateLimiter({}, proxy_count=proxy_count)
+        headers = {'X-Forwarded-For': '1.2.3.4, 198.51.100.2, 203.0.113.7'}
+
+        with self.app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+            assert limiter.client_id() == expected
+
+    def test_missing_forwarded_for(self):
+        """ヘッダーがない・段数より短い場合は接続元のアドレスを使うことのテスト"""
+        limiter = RateLimiter({}, proxy_count=2)
+
+        with self.app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+            assert limiter.client_id() == '10.0.0.9'
+        with self.app.test_request_context(headers={'X-Forwarded-For': '203.0.113.7'},
+                                           environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+            assert limiter.client_id() == '10.0.0.9'
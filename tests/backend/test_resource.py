@@ -0,0 +1,104 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+from app import create_app
+from app.models.resource import Resource
+from app.services.mcp_service import MCPService
+
+
+class TestResource:
+    """Resource モデルのテストクラス"""
+
+    def test_from_dict_normalizes_legacy_keys(self):
+        """プロバイダー別のキー名が共通項目に正規化されることのテスト"""
+        resource = Resource.from_dict({
+            'id': '/subscriptions/x/vm-1', 'name': 'vm-1', 'location': 'japaneast',
+            'status': 'Succeeded', 'size': 'Standard_B1s', 'os_type': 'Linux',
+            'tags': {'Env': 'prod'}
+        }, provider='azure', service='vm')
+
+        assert resource.region == 'japaneast'
+        assert resource.type == 'Standard_B1s'
+        assert resource.status == 'Succeeded'
+        assert resource.provider == 'azure'
+        assert resource.metadata == {'os_type': 'Linux'}
+
+    def test_legacy_key_access(self):
+        """旧来のキー名・metadata の項目を get()・[] で参照できることのテスト"""
+        resource = Resource(id='db-1', name='db-1', type='db.t3.micro', provider='aws',
+                            region='us-east-1', status='available', service='rds',
+                            created_at=1704067200, metadata={'engine': 'mysql'})
+
+        assert resource['state'] == 'available'
+        assert resource.get('class') == 'db.t3.micro'
+        assert resource.get('engine') == 'mysql'
+        assert resource['creation_date'] == '2024-01-01T00:00:00Z'
+        assert resource.get('public_ip', 'N/A') == 'N/A'
+        with pytest.raises(KeyError):
+            resource['unknown']
+
+    def test_compact_representation(self):
+        """__slots__ を使い、件数の多い文字列が共有されることのテスト"""
+        first = Resource(id='i-1', name='a', type=''.join(['t3.', 'micro']), provider='aws',
+                         region='us-east-1', status='running', tags={'Env': 'prod'})
+        second = Resource(id='i-2', name='b', type=''.join(['t3.', 'micro']), provider='aws',
+                          region='us-east-1', status='running')
+
+        assert not hasattr(first, '__dict__')
+        assert first.type is second.type
+        assert first.tags == (('Env', 'prod'),)
+        assert first.get('tags') == {'Env': 'prod'}
+        assert second.metadata is None and second.tags is None
+
+    def test_json_response(self):
+        """API レスポンスで共通スキーマの辞書としてシリアライズされることのテスト"""
+        app = create_app()
+        resource = Resource(id='i-1', name='web-1', type='t3.micro', provider='aws',
+                            region='us-east-1', status='running', service='ec2',
+                            created_at=1704067200, tags={'Name': 'web-1'})
+
+        decoded = json.loads(app.json.dumps({'resources': [resource]}))
+
+        assert decoded['resources'][0] == resource.to_dict()
+        assert decoded['resources'][0]['created_at'] == '2024-01-01T00:00:00Z'
+
+
+class TestMCPServiceNormalization:
+    """MCPService の取得結果の正規化のテストクラス"""
+
+    @patch('app.services.mcp_service.boto3.Session')
+    def test_rds_instances(self, mock_boto3_session):
+        """RDS の取得結果が Resource に正規化され、状態が参照できることのテスト"""
+        mock_session = Mock(region_name='ap-northeast-1')
+        mock_boto3_session.return_value = mock_session
+        mock_session.client.return_value.describe_db_instances.return_value = {
+            'DBInstances': [{
+                'DBInstanceIdentifier': 'orders-db',
+                'Engine': 'postgres',
+                'DBInstanceStatus': 'available',
+                'DBInstanceClass': 'db.t3.micro',
+                'InstanceCreateTime': datetime(2024, 1, 1, tzinfo=timezone.utc)
+            }]
+        }
+
+        result = MCPService().get_aws_resources('rds')
+
+        assert isinstance(result[0], Resource)
+        assert result[0].status == 'available'
+        assert result[0]['state'] == 'available'
+        assert result[0].type == 'db.t3.micro'
+        assert result[0].service == 'rds'
+        assert result[0].created_at == 1704067200
+
+    def test_fetcher_dicts_are_coerced(self):
+        """取得処理が辞書を返した場合も Resource に揃えられることのテスト"""
+        mcp_service = MCPService()
+        with patch.object(mcp_service, '_get_aws_ec2_instances') as mock_get_ec2:
+            mock_get_ec2.return_value = [{'name': 'web-1', 'state': 'running'}]
+
+            result = mcp_service.get_aws_resources('ec2')
+
+        assert result[0].status == 'running'
+        assert result[0].provider == 'aws'
+        assert result[0].service == 'ec2'
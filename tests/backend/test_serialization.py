@@ -0,0 +1,85 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from app import create_app
+from app.services.inventory_cache import get_inventory_cache
+from app.utils.compression import negotiate_encoding
+
+
+class Record:
+    """to_dict を持つオブジェクト"""
+
+    def to_dict(self):
+        return {'name': 'web-1'}
+
+
+class TestFastJSONProvider:
+    """FastJSONProvider のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+
+    def test_dumps_non_native_types(self):
+        """to_dict・Decimal・datetime・日本語を含む値をシリアライズできることのテスト"""
+        value = {'record': Record(), 'cost': Decimal('1.50'),
+                 'created': datetime(2024, 1, 1), 'state': '実行中'}
+
+        decoded = json.loads(self.app.json.dumps(value))
+
+        assert decoded['record'] == {'name': 'web-1'}
+        assert decoded['cost'] == '1.50'
+        assert decoded['created'].startswith('2024-01-01')
+        assert decoded['state'] == '実行中'
+
+    def test_loads_roundtrip(self):
+        """dumps した内容を loads で復元できることのテスト"""
+        value = {'resources': [{'name': 'web-1', 'tags': {'Env': 'prod'}}], 'count': 1}
+
+        assert self.app.json.loads(self.app.json.dumps(value)) == value
+
+
+class TestResponseCompression:
+    """API レスポンス圧縮のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        get_inventory_cache().clear()
+
+    def test_negotiate_encoding(self):
+        """Accept-Encoding の q 値に従って圧縮方式を選ぶことのテスト"""
+        assert negotiate_encoding('gzip, deflate') == 'gzip'
+        assert negotiate_encoding('gzip;q=0') is None
+        assert negotiate_encoding('identity') is None
+        assert negotiate_encoding('*') in ('br', 'gzip')
+
+    @patch('app.routes.api.MCPService')
+    def test_large_response_is_gzipped(self, mock_mcp_service):
+        """閾値以上のレスポンスが gzip で圧縮されることのテスト"""
+        resources = [{'name': f"vm-{i}", 'state': 'running'} for i in range(200)]
+        mock_mcp_service.return_value.get_azure_resources.return_value = resources
+
+        response = self.client.get('/api/resources/azure',
+                                   headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        body = json.loads(gzip.decompress(response.get_data()))
+        assert body['resources'] == resources
+
+    @patch('app.routes.api.MCPService')
+    def test_small_response_is_not_compressed(self, mock_mcp_service):
+        """閾値未満のレスポンスは圧縮しないことのテスト"""
+        mock_mcp_service.return_value.get_azure_resources.return_value = []
+
+        response = self.client.get('/api/resources/azure',
+                                   headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_json()['resources'] == []
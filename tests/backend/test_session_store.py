@@ -0,0 +1,159 @@
+import pytest
+from unittest.mock import Mock, patch
+from app import create_app
+from app.services.chat_service import ChatService
+from app.services.inventory_cache import get_inventory_cache
+from app.services.session_store import LAST_ENTRY_CHARS, SessionStore
+
+
+class TestSessionStore:
+    """SessionStore のテストクラス"""
+
+    def test_ring_buffer_and_summary(self):
+        """メッセージ数の上限を超えた古いターンが要約されることのテスト"""
+        store = SessionStore(max_sessions=10, max_messages=4, max_total_chars=10_000)
+        session = store.get_or_create()
+
+        for i in range(4):
+            store.append(session, 'user', f"質問{i}")
+            store.append(session, 'bot', f"回答{i}")
+
+        assert len(session.messages) == 4
+        assert session.messages[0].content == '質問2'
+        assert '質問0' in session.summary and '質問1' in session.summary
+        assert store.total_chars == sum(len(m.content) for m in session.messages)
+
+    def test_lru_eviction_by_count(self):
+        """セッション数の上限を超えると最も古いセッションが破棄されることのテスト"""
+        store = SessionStore(max_sessions=2, max_messages=4, max_total_chars=10_000)
+        first = store.get_or_create('a' * 32)
+        second = store.get_or_create('b' * 32)
+        store.get_or_create('a' * 32)  # a を最近使用したものにする
+        store.get_or_create('c' * 32)
+
+        assert len(store) == 2
+        assert store.get_or_create('a' * 32) is first
+        assert store.get_or_create('b' * 32) is not second
+
+    def test_eviction_by_memory_ceiling(self):
+        """全体のメモリ上限を超えると古いセッションが破棄されることのテスト"""
+        store = SessionStore(max_sessions=100, max_messages=10, max_total_chars=100)
+        old = store.get_or_create('0' * 32)
+        store.append(old, 'user', 'x' * 60)
+        new = store.get_or_create('1' * 32)
+        store.append(new, 'user', 'y' * 60)
+
+        assert len(store) == 1
+        assert store.total_chars == 60
+
+    @pytest.mark.parametrize('session_id', [['a' * 32], {'id': 'a' * 32}, 123, 'abc', 'A' * 32])
+    def test_invalid_session_id_issues_new_id(self, session_id):
+        """32 桁の16進数の文字列でないセッション ID は使わず、新しい ID を発行することのテスト"""
+        store = SessionStore(max_sessions=10, max_messages=4, max_total_chars=10_000)
+
+        session = store.get_or_create(session_id)
+
+        assert session.id != session_id
+        assert len(session.id) == 32
+
+    def test_last_result_counts_toward_memory_ceiling(self):
+        """追質問用の前回結果も全体のメモリ上限に含めることのテスト"""
+        store = SessionStore(max_sessions=100, max_messages=10,
+                             max_total_chars=LAST_ENTRY_CHARS * 10)
+        old = store.get_or_create('0' * 32)
+        store.set_last_result(old, {}, [('aws', 'ec2', {'name': f'web-{i}'}) for i in range(6)])
+        assert store.total_chars == LAST_ENTRY_CHARS * 6
+
+        new = store.get_or_create('1' * 32)
+        store.set_last_result(new, {}, [('aws', 'ec2', {'name': f'db-{i}'}) for i in range(6)])
+
+        assert len(store) == 1
+        assert store.total_chars == LAST_ENTRY_CHARS * 6
+
+    def test_prompt_history_respects_budget(self):
+        """会話履歴がトークン予算内に収まることのテスト"""
+        store = SessionStore(max_sessions=10, max_messages=20, max_total_chars=100_000)
+        session = store.get_or_create()
+        for i in range(10):
+            store.append(session, 'user', f"これは{i}番目の長めの質問です")
+
+        history = session.prompt_history(token_budget=40)
+
+        assert '9番目' in history
+        assert '0番目' not in history
+
+
+class TestFollowUpQuestions:
+    """追質問のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+        self.store = SessionStore(max_sessions=10, max_messages=20, max_total_chars=100_000)
+        self.session = self.store.get_or_create()
+        self.chat_service = ChatService(session=self.session)
+        self.chat_service.llm_service = Mock()
+        self.chat_service.mcp_service = Mock()
+        self.chat_service.mcp_service.get_aws_resources.return_value = [
+            {'name': 'web-1', 'state': 'running'},
+            {'name': 'batch-1', 'state': 'stopped'}
+        ]
+
+    @patch('app.services.chat_service.get_session_store')
+    def test_follow_up_reuses_previous_result(self, mock_get_store):
+        """追質問が前回の結果を再取得せずに絞り込むことのテスト"""
+        mock_get_store.return_value = self.store
+
+        self.chat_service.process_message("EC2インスタンス一覧を教えて")
+        result = self.chat_service.process_message("その中で停止中のものは？")
+
+        assert "2 件のうち" in result
+        assert "batch-1" in result
+        assert "web-1" not in result
+        self.chat_service.mcp_service.get_aws_resources.assert_called_once_with('ec2', limit=10)
+        assert len(self.session.messages) == 4
+
+
+    def test_follow_up_display_limit(self):
+        """追質問の回答の表示件数が RESOURCE_LIST_LIMIT に従うことのテスト"""
+        entries = [('aws', 'ec2', {'name': f'batch-{i}', 'state': 'stopped'}) for i in range(5)]
+        self.store.set_last_result(self.session, {'type': 'resource_list'}, entries)
+
+        with patch('app.services.chat_service.RESOURCE_LIST_LIMIT', 3):
+            result = self.chat_service._handle_follow_up("その中で停止中のものは？")
+
+        assert "batch-2" in result and "batch-3" not in result
+        assert "... 他 2 件" in result
+
+class TestChatSessionAPI:
+    """チャット API のセッション処理のテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    @patch('app.routes.api.ChatService')
+    def test_chat_returns_and_reuses_session_id(self, mock_chat_service):
+        """セッション ID が発行され、指定時は同じセッションが使われることのテスト"""
+        mock_chat_service.return_value.process_message.return_value = "応答"
+
+        first = self.client.post('/api/chat', json={'message': 'こんにちは'}).get_json()
+        session_id = first['session_id']
+        second = self.client.post('/api/chat', json={
+            'message': 'その中で停止中のものは？', 'session_id': session_id}).get_json()
+
+        assert second['session_id'] == session_id
+        sessions = [c.kwargs['session'] for c in mock_chat_service.call_args_list]
+        assert sessions[0] is sessions[1]
+
+    @patch('app.routes.api.ChatService')
+    def test_chat_with_malformed_session_id(self, mock_chat_service):
+        """セッション ID が文字列でない場合もエラーにならず、新しい ID を発行することのテスト"""
+        mock_chat_service.return_value.process_message.return_value = "応答"
+
+        response = self.client.post('/api/chat', json={'message': 'こんにちは', 'session_id': ['x']})
+
+        assert response.status_code == 200
+        assert len(response.get_json()['session_id']) == 32
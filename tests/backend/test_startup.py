@@ -0,0 +1,47 @@
+import os
+from app.utils.import_profile import StartupReport, measure_startup, parse_importtime
+
+# create_app() までの時間の上限（秒）。負荷の高い CI でも通る余裕を持たせ、STARTUP_BUDGET_SECONDS で上書きできる
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', 5))
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |      30500 |     numpy._core
+import time:       800 |      40000 |   numpy
+import time:      2000 |      42000 | app.services.metric_analysis
+{"level": "INFO", "message": "ログの行は無視する"}
+"""
+
+
+class TestImportTimeReport:
+    """読み込み時間の解析のテストクラス"""
+
+    def test_parse_importtime(self):
+        """-X importtime の出力からモジュールごとの時間と階層を読み取ることのテスト"""
+        entries = parse_importtime(IMPORTTIME_OUTPUT)
+
+        assert [entry.module for entry in entries] == ['_io', 'numpy._core', 'numpy',
+                                                        'app.services.metric_analysis']
+        assert [entry.depth for entry in entries] == [1, 2, 1, 0]
+        assert entries[1].self_us == 1500 and entries[1].cumulative_us == 30500
+
+        report = StartupReport(elapsed=0.1, imports=entries,
+                               modules=['app', 'azure.mgmt', 'boto3', 'boto3.session', 'numpy'])
+        assert report.top(1)[0].module == 'app.services.metric_analysis'
+        assert report.loaded() == ['boto3', 'boto3.session']
+
+
+class TestStartupBudget:
+    """起動時間のテストクラス"""
+
+    def test_create_app_defers_sdk_imports(self):
+        """新しいプロセスでの create_app() がクラウド・LLM の SDK を読み込まないことのテスト"""
+        report = measure_startup()
+
+        assert report.loaded() == [], report.format()
+
+    def test_create_app_within_budget(self):
+        """新しいプロセスでの create_app() が STARTUP_BUDGET_SECONDS 以内に終わることのテスト"""
+        report = min((measure_startup() for _ in range(3)), key=lambda r: r.elapsed)
+
+        assert report.elapsed < STARTUP_BUDGET_SECONDS, report.format()
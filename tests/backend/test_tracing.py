@@ -0,0 +1,178 @@
+import json
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from botocore.stub import Stubber
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from azure.core.pipeline import Pipeline
+from azure.core.pipeline.policies import RetryPolicy
+from azure.core.pipeline.transport import HttpRequest, HttpTransport
+from app import create_app
+from app.services.inventory_cache import get_inventory_cache
+from app.services.mcp_service import (_after_aws_call, _after_aws_call_error, _azure_client_options,
+                                      _before_aws_call)
+from app.utils import tracing
+
+
+class _FakeResponse:
+    def __init__(self, request, status_code):
+        self.request = request
+        self.status_code = status_code
+        self.headers = {}
+        self.reason = 'OK'
+        self.content_type = 'application/json'
+
+    def body(self):
+        return b'{}'
+
+    def text(self, encoding=None):
+        return '{}'
+
+
+class _FakeTransport(HttpTransport):
+    """指定した順にステータスコードを返すトランスポート"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def send(self, request, **kwargs):
+        return _FakeResponse(request, self.statuses.pop(0))
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+class TestTracing:
+    """リクエストのトレースのテストクラス"""
+
+    def setup_method(self):
+        """各テストメソッドの前に実行"""
+        get_inventory_cache().clear()
+
+    def test_nested_spans(self):
+        """スパンの親子関係と、トレース外では記録しないことのテスト"""
+        with tracing.span('outside') as outside:
+            assert outside is None
+
+        with tracing.start_trace('chat') as trace:
+            with tracing.span('chat.intent') as intent:
+                with tracing.span('llm.generate') as llm:
+                    pass
+
+        assert [span.name for span in trace.spans] == ['chat', 'chat.intent', 'llm.generate']
+        assert intent.parent_id == trace.root.span_id
+        assert llm.parent_id == intent.span_id
+        assert all(span.end_ns is not None for span in trace.spans)
+
+    def test_propagate_to_threads(self):
+        """スレッドプールで実行した処理も呼び出し元のスパンの子になることのテスト"""
+        def work(i):
+            with tracing.span(f'chunk-{i}') as chunk:
+                return chunk.parent_id
+
+        with tracing.start_trace('summary') as trace:
+            with tracing.span('map') as parent:
+                with ThreadPoolExecutor(max_workers=4) as executor:
+                    parents = list(executor.map(tracing.propagate(work), range(8)))
+
+        assert parents == [parent.span_id] * 8
+        assert len(trace.spans) == 10
+
+    def test_botocore_calls(self):
+        """botocore のフックで API 呼び出しごとのスパンと呼び出し回数・再試行回数を記録することのテスト"""
+        session = boto3.Session(aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1')
+        session.events.register('before-parameter-build', _before_aws_call)
+        session.events.register('after-call', _after_aws_call)
+        logs = session.client('logs')
+        with Stubber(logs) as stubber, tracing.start_trace('logs') as trace:
+            for _ in range(3):
+                stubber.add_response('get_log_events', {'events': [],
+                                                        'ResponseMetadata': {'RetryAttempts': 1}})
+                logs.get_log_events(logGroupName='g', logStreamName='s')
+
+        assert trace.summary()['calls'] == {'aws.logs.GetLogEvents': 3}
+        assert trace.api_retries == 3
+        api_spans = [span for span in trace.spans if span.name == 'aws.logs.GetLogEvents']
+        assert len(api_spans) == 3
+        assert all(span.end_ns is not None and span.attributes['rpc.retries'] == 1 for span in api_spans)
+
+    def test_botocore_call_error(self):
+        """応答を得られなかった呼び出しもスパンを例外付きで終了し、呼び出し回数に加えることのテスト"""
+        session = boto3.Session(aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1')
+        session.events.register('before-parameter-build', _before_aws_call)
+        session.events.register('after-call', _after_aws_call)
+        session.events.register('after-call-error', _after_aws_call_error)
+        logs = session.client('logs')
+        error = EndpointConnectionError(endpoint_url='https://logs.us-east-1.amazonaws.com')
+        with patch.object(logs._endpoint, 'make_request', side_effect=error), \
+                tracing.start_trace('logs') as trace:
+            with pytest.raises(EndpointConnectionError):
+                logs.get_log_events(logGroupName='g', logStreamName='s')
+
+        assert trace.summary()['calls'] == {'aws.logs.GetLogEvents': 1}
+        span = next(span for span in trace.spans if span.name == 'aws.logs.GetLogEvents')
+        assert span.end_ns is not None
+        assert span.error.startswith('EndpointConnectionError')
+
+    def test_azure_pipeline_policy(self):
+        """Azure のパイプラインポリシーで呼び出しと再試行を記録することのテスト"""
+        options = _azure_client_options('compute', 'virtual_machines.list')
+        pipeline = Pipeline(_FakeTransport([503, 200]), policies=options['per_call_policies'] + [
+            RetryPolicy(retry_backoff_factor=0)] + options['per_retry_policies'])
+
+        with tracing.start_trace('vms') as trace:
+            pipeline.run(HttpRequest('GET', 'https://management.azure.com/vms'))
+
+        assert trace.summary()['calls'] == {'azure.compute.virtual_machines.list': 1}
+        assert trace.api_retries == 1
+        assert trace.spans[1].attributes['http.status_code'] == 200
+
+    def test_json_file_export(self, tmp_path, monkeypatch):
+        """トレースを OTLP の JSON 形式でファイルに出力することのテスト"""
+        path = tmp_path / 'traces.jsonl'
+        monkeypatch.setenv('TRACE_EXPORTER', 'json')
+        monkeypatch.setenv('TRACE_FILE', str(path))
+
+        with tracing.start_trace('chat') as trace:
+            with tracing.span('chat.intent', **{'chat.intent': 'log_query'}):
+                pass
+        tracing.get_exporter().flush()
+
+        exported = json.loads(path.read_text(encoding='utf-8').splitlines()[0])
+        spans = exported['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert [span['name'] for span in spans] == ['chat', 'chat.intent']
+        assert all(span['traceId'] == trace.trace_id for span in spans)
+        assert spans[1]['parentSpanId'] == spans[0]['spanId']
+        assert {'key': 'chat.intent', 'value': {'stringValue': 'log_query'}} in spans[1]['attributes']
+
+    @patch('app.routes.api.MCPService')
+    def test_debug_headers(self, mock_mcp_service):
+        """デバッグ時はリクエストごとのクラウド API 呼び出し回数をヘッダーに付けることのテスト"""
+        def get_logs(*args, **kwargs):
+            for _ in range(5):
+                tracing.current_trace().record_api_call('aws', 'logs', 'GetLogEvents')
+            tracing.current_trace().record_api_call('aws', 'logs', 'DescribeLogGroups', retries=2)
+            return []
+        mock_mcp_service.return_value.get_logs.side_effect = get_logs
+        app = create_app()
+        app.config['TESTING'] = True
+        app.config['DEBUG'] = True
+
+        response = app.test_client().get('/api/logs?provider=aws&service=ec2')
+
+        assert response.status_code == 200
+        assert response.headers['X-Cloud-API-Calls'] == '6'
+        assert response.headers['X-Cloud-API-Retries'] == '2'
+        assert response.headers['X-Cloud-API-Calls-Detail'] == \
+            'aws.logs.GetLogEvents=5, aws.logs.DescribeLogGroups=1'
+        assert len(response.headers['X-Trace-Id']) == 32
+
+        app.config['DEBUG'] = False
+        assert 'X-Cloud-API-Calls' not in app.test_client().get('/api/logs').headers